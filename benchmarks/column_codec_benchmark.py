@@ -0,0 +1,91 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - Column codec benchmark
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+
+Compare how long it takes to decode the voters, solvers and answers columns of the problems table
+when they are pickled (the old format) and when they use column_codec (the new format).
+Run it from the root of the repository: python -m benchmarks.column_codec_benchmark [number of rows]"""
+import pickle
+import random
+import sys
+import time
+
+from helpful_modules.problems_module.column_codec import (
+    decode_list,
+    encode_answers,
+    encode_id_list,
+)
+
+ROUNDS = 7
+
+
+def make_rows(num_rows: int, seed: int = 0) -> list:
+    """Make (answers, voters, solvers) rows that look like real problems"""
+    rng = random.Random(seed)
+
+    def snowflake() -> int:
+        return rng.randrange(10**17, 2**63)
+
+    return [
+        (
+            [str(rng.randrange(10**6)) for _ in range(rng.randint(1, 3))],
+            [snowflake() for _ in range(rng.randint(0, 20))],
+            [snowflake() for _ in range(rng.randint(0, 10))],
+        )
+        for _ in range(num_rows)
+    ]
+
+
+def time_decoding(encoded_rows: list, decode) -> float:
+    start = time.perf_counter()
+    for answers, voters, solvers in encoded_rows:
+        decode(answers)
+        decode(voters)
+        decode(solvers)
+    return time.perf_counter() - start
+
+
+def main(num_rows: int = 100_000) -> None:
+    rows = make_rows(num_rows)
+    pickled = [tuple(pickle.dumps(column) for column in row) for row in rows]
+    encoded = [
+        (encode_answers(answers), encode_id_list(voters), encode_id_list(solvers))
+        for answers, voters, solvers in rows
+    ]
+    decoders = (
+        ("pickle.loads", pickled, pickle.loads),
+        ("column_codec.decode_list", encoded, decode_list),
+        ("column_codec.decode_list (pickled rows)", pickled, decode_list),
+    )
+    # The decoders take turns, so that noise (like another process using the CPU) affects all of them alike
+    best = {name: float("inf") for name, _, _ in decoders}
+    for _ in range(ROUNDS):
+        for name, encoded_rows, decode in decoders:
+            best[name] = min(best[name], time_decoding(encoded_rows, decode))
+    for name, encoded_rows, decode in decoders:
+        seconds = best[name]
+        size = sum(len(column) for row in encoded_rows for column in row)
+        print(
+            f"{name:42} {seconds * 1000:8.1f} ms for {num_rows} rows "
+            f"({seconds / num_rows * 1e6:.2f} us/row), {size / num_rows:.1f} bytes/row"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
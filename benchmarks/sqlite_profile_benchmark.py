@@ -0,0 +1,128 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - SQLite profile benchmark
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+
+Compare how many mixed reads and writes per second MathProblemCache can do on SQLite with each SQLite profile.
+Each run fills a new database with about as many problems as MathProblemCache1.db holds (some global, and some in
+a few guilds), then runs readers (get_problem) and writers (update_problem) concurrently for a fixed amount of time.
+Run it from the root of the repository:
+python -m benchmarks.sqlite_profile_benchmark [number of problems] [seconds per profile]"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import warnings
+
+from helpful_modules.problems_module import BaseProblem, MathProblemCache
+from helpful_modules.problems_module.sqlite_connection_pool import SQLITE_PROFILES
+
+NUM_READERS = 8
+NUM_WRITERS = 2
+# The problems are spread over global problems (None) and a few guilds
+GUILD_IDS = [None, 10**17 + 1, 10**17 + 2, 10**17 + 3]
+
+
+def guild_id_of(problem_id: int):
+    return GUILD_IDS[problem_id % len(GUILD_IDS)]
+
+
+def make_problem(problem_id: int, rng: random.Random) -> BaseProblem:
+    guild_id = guild_id_of(problem_id)
+    return BaseProblem(
+        question=f"What is {rng.randrange(10**6)} + {rng.randrange(10**6)}?",
+        answer=str(rng.randrange(10**7)),
+        id=problem_id,
+        guild_id=None if guild_id is None else str(guild_id),
+        voters=[],
+        solvers=[],
+        author=rng.randrange(10**17, 2**63),
+    )
+
+
+def make_cache(profile: str) -> MathProblemCache:
+    return MathProblemCache(
+        mysql_username="",
+        mysql_password="",
+        mysql_db_ip="",
+        mysql_db_name="",
+        use_sqlite=True,
+        db_name=f"{profile}.db",
+        max_guild_problems=10**6,
+        sqlite_profile=profile,
+    )
+
+
+async def run_workload(cache: MathProblemCache, num_problems: int, seconds: float) -> tuple:
+    """Return how many reads and writes were done in seconds"""
+    rng = random.Random(0)
+    await cache.add_problems([make_problem(problem_id, rng) for problem_id in range(num_problems)])
+    counts = {"reads": 0, "writes": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            problem_id = rng.randrange(num_problems)
+            await cache.get_problem(guild_id_of(problem_id), problem_id)
+            counts["reads"] += 1
+
+    async def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            problem_id = rng.randrange(num_problems)
+            await cache.update_problem(problem_id, make_problem(problem_id, rng))
+            counts["writes"] += 1
+
+    await asyncio.gather(
+        *(reader(seed) for seed in range(NUM_READERS)),
+        *(writer(seed) for seed in range(NUM_READERS, NUM_READERS + NUM_WRITERS)),
+    )
+    await cache.close()
+    return counts["reads"], counts["writes"]
+
+
+def main(num_problems: int = 500, seconds: float = 5.0) -> None:
+    warnings.simplefilter("ignore")  # SQLite is deprecated
+    logging.disable(logging.WARNING)  # The SQLite get_problem logs every query
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tempdir:
+        os.chdir(tempdir)  # MathProblemCache reads config.json
+        try:
+            with open("config.json", "w") as file:
+                file.write('{"permissions_required": {}}')
+            for profile in SQLITE_PROFILES:
+                cache = make_cache(profile)
+                reads, writes = asyncio.run(run_workload(cache, num_problems, seconds))
+                print(
+                    f"{profile:12} {reads / seconds:9.1f} reads/s {writes / seconds:9.1f} writes/s "
+                    f"({NUM_READERS} readers, {NUM_WRITERS} writers, {num_problems} problems, "
+                    f"{os.path.getsize(f'{profile}.db') / 1024:.0f} KiB)"
+                )
+        finally:
+            os.chdir(old_cwd)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5.0,
+    )
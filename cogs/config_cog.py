@@ -76,9 +76,9 @@ class GuildConfigCog(HelperCog):
         self, guild: Guild, author: User | Member
     ) -> bool:
         data: problems_module.GuildData = await self.cache.get_guild_data(
-            guild.id, default=problems_module.GuildData.default()
+            guild.id, default=problems_module.GuildData.default(guild.id)
         )
-        return data.mod_check.check_for_user_passage(author)
+        return data.mods_check.check_for_user_passage(author)
 
     async def cog_slash_command_check(
         self, inter: disnake.GuildCommandInteraction
@@ -134,9 +134,9 @@ class GuildConfigCog(HelperCog):
             return await inter.send("Invalid permission!")
 
         data = await self.cache.get_guild_data(
-            inter.guild.id, default=GuildData.default()
+            inter.guild.id, default=GuildData.default(inter.guild.id)
         )
-        data.mod_check.permissions_needed.append(permission)
+        data.mods_check.permissions_needed.append(permission)
         await self.cache.set_guild_data(data=data)
         await inter.send("This has been updated!")
 
@@ -155,10 +155,11 @@ class GuildConfigCog(HelperCog):
             inter.guild_id, default=problems_module.GuildData.default(inter.guild_id)
         )
         try:
-            data.mod_check.permissions_needed.remove(permission)
-        except (ValueError, TypeError) as t:
-            await self.cache.set_guild_data(inter.guild_id, data)
-            raise
+            data.mods_check.permissions_needed.remove(permission)
+        except ValueError:
+            await inter.send("This permission is not required!")
+            return
+        await self.cache.set_guild_data(data=data)  # get_guild_data returns a copy, so it has to be saved
         await inter.send("Successfully completed!")
         return
 
@@ -173,10 +174,10 @@ class GuildConfigCog(HelperCog):
             inter.guild_id,
             default=problems_module.GuildData.default(guild_id=inter.guild_id),
         )
-        if user.id in data.mod_check.whitelisted_users:
+        if user.id in data.mods_check.allowlisted_users:
             return await inter.send("This user is already whitelisted!")
-        data.mod_check.whitelisted_users.append(user.id)
-        await self.cache.set_guild_data(inter.guild_id, data)
+        data.mods_check.allowlisted_users.append(user.id)
+        await self.cache.set_guild_data(data=data)
         await inter.send("You have successfully added a whitelisted user!")
         return
 
@@ -195,10 +196,10 @@ class GuildConfigCog(HelperCog):
             default=problems_module.GuildData.default(guild_id=inter.guild_id),
         )
         try:
-            data.mod_check.whitelisted_users.remove(
+            data.mods_check.allowlisted_users.remove(
                 user.id
             )  # potentially O(N) operation
-            await self.cache.set_guild_data(inter.guild_id, data=data)
+            await self.cache.set_guild_data(data=data)
             await inter.send("Data sent!")
             return
         except ValueError:
@@ -217,8 +218,8 @@ class GuildConfigCog(HelperCog):
             inter.guild_id,
             default=problems_module.GuildData.default(guild_id=inter.guild_id),
         )
-        data.denylisted_users.append(user.id)
-        await self.cache.set_guild_data(inter.guild_id, data=data)
+        data.mods_check.denylisted_users.append(user.id)
+        await self.cache.set_guild_data(data=data)
         await inter.send(
             "Successfully added a denylisted user to the list of denylisted users..."
         )
@@ -231,11 +232,11 @@ class GuildConfigCog(HelperCog):
         Attempt to remove a denylisted user from the list of denylisted users, and don't do anything if the user is not denyisted
         """
         data = await self.cache.get_guild_data(
-            inter.guild_id, default=problems_module.GuildData.default()
+            inter.guild_id, default=problems_module.GuildData.default(inter.guild_id)
         )
         try:
-            data.mod_check.denylisted_users.remove(user.id)
-            await self.cache.set_guild_data(inter.guild_id, data=data)
+            data.mods_check.denylisted_users.remove(user.id)
+            await self.cache.set_guild_data(data=data)
             await inter.send("Successfully removed the user's denylistness")
             return
         except ValueError:
@@ -112,11 +112,9 @@ class DataModificationCog(HelperCog):
             _extra_data: dict,
         ) -> None:
             """The function that runs when the button gets pressed. This actually deletes the data.
-            Time complexity: O(V*N+P+S*M)
+            Time complexity: O(V+P+S)
             V: number of problems user voted for
-            N: number of votes for each problem the user voted for
             S: number of problems user solved
-            M: number of solvers for each problem the user solved
             P: number of problems user created
             """
             assert Self.check(interaction)
@@ -146,25 +144,9 @@ class DataModificationCog(HelperCog):
 
             await _extra_data["cache"].delete_all_by_user_id(interaction.user.id)
             if _extra_data["delete_votes"]:
-                problems_to_remove_votes_for = await _extra_data[
-                    "cache"
-                ].get_problems_by_func(
-                    func=lambda prob, user_id: user_id in prob.voters,  # prob: problem
-                    args=[interaction.user.id],
-                )
-                for problem in problems_to_remove_votes_for:
-                    problem.voters.remove(interaction.user.id)
-                    await problem.update_self()
+                await _extra_data["cache"].remove_all_votes_by(interaction.user.id)
             if _extra_data["delete_solves"]:
-                problems_to_remove_solves_for = await _extra_data[
-                    "cache"
-                ].get_problems_by_func(
-                    func=lambda problem, user_id: user_id in problem.solvers,
-                    args=[interaction.user.id],
-                )  # Get all the problems the user voted for
-                for problem in problems_to_remove_solves_for:
-                    problem.solvers.remove(interaction.user.id)
-                    await problem.update_self()
+                await _extra_data["cache"].remove_all_solves_by(interaction.user.id)
 
             await interaction.send(**kwargs)
             Self.disable()
@@ -224,13 +206,9 @@ class DataModificationCog(HelperCog):
         Return a user's stored data as a dictionary.
         """
         raw_data = await self.cache.get_all_by_author_id(author.id)
-        problems_user_voted_for = await self.cache.get_problems_by_func(
-            func=lambda problem, user_id: user_id in problem.voters, args=(author,)
-        )
+        problems_user_voted_for = await self.cache.get_problems_voted_for_by(author.id)
         # self.bot.log.trace("Getting problems user voted & solved.")
-        problems_user_solved = await self.cache.get_problems_by_func(
-            func=lambda problem, user_id: user_id in problem.solvers, args=(author,)
-        )
+        problems_user_solved = await self.cache.get_problems_solved_by(author.id)
         user_data: problems_module.UserData = await self.bot.cache.get_user_data(
             user_id=author.id,
             default=problems_module.UserData(
@@ -223,19 +223,17 @@ class DeveloperCommands(HelperCog):
             return
         me = guild.me
         my_permissions = me.guild_permissions
+        num_guild_problems = await self.bot.cache.count_guild_problems(inter.guild.id)
         debug_dict = {
             "Server Guild ID": inter.guild.id,
             "Invoker's user ID": inter.author.id,
             "Maximum number of guild-only problems allowed.": self.bot.cache.max_guild_problems,
             "Has this guild reached the maximum number of problems?": (
                 "✅"
-                if len(await self.bot.cache.get_guild_problems(inter.guild))
-                >= self.bot.cache.max_guild_problems
+                if num_guild_problems >= self.bot.cache.max_guild_problems
                 else "❌"
             ),
-            "Number of guild-only problems": len(
-                await self.bot.cache.get_guild_problems(inter.guild)
-            ),
+            "Number of guild-only problems": num_guild_problems,
         }
         correct_permissions = {  # todo: don't hardcode
             "Read Message History": "✅" if my_permissions.read_messages else "❌",
@@ -36,7 +36,6 @@ from helpful_modules.problem_generator import (
     generate_arithmetic_problem,
     generate_linear_algebra_problem,
 )
-from helpful_modules.threads_or_useful_funcs import generate_new_id
 
 from .helper_cog import HelperCog
 
@@ -86,24 +85,13 @@ class ProblemGenerationCog(HelperCog):
             return await inter.send(
                 embed=ErrorEmbed("You can only create a positive number of problems")
             )
-        for i in range(num_new_problems_to_generate):  # basic problems for now.... :(
-            print(i)
-            # TODO: linear equations, etc
-
-            while True:
-                problem_id = generate_new_id()
-                try:
-                    already_existing_problem = await self.cache.get_problem(
-                        None, problem_id
-                    )
-                    print(already_existing_problem)
-                except problems_module.ProblemNotFound:
-                    break
-
-            problem_generator = random.choice(PROBLEM_GENERATORS)
-            problem = problem_generator()
-            print(problem)
-            await self.cache.add_problem(problem_id, problem)
+        # The generators give each problem a new id
+        problems = [
+            random.choice(PROBLEM_GENERATORS)()
+            for _ in range(num_new_problems_to_generate)
+        ]
+        # One transaction for all of them. Random problems can repeat, so the repeats are left out
+        problems = await self.cache.add_problems(problems, skip_duplicates=True)
 
         try:
             await self.cache.bgsave(schedule=True)
@@ -111,7 +99,7 @@ class ProblemGenerationCog(HelperCog):
             pass
         await inter.send(
             embed=SuccessEmbed(
-                f"Successfully created {str(num_new_problems_to_generate)} new problems!"
+                f"Successfully created {len(problems)} new problems!"
             ),
             ephemeral=True,
         )
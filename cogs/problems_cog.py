@@ -337,9 +337,8 @@ class ProblemsCog(HelperCog):
                 )  # TODO: could be lists
 
             else:
-                guild_problems = await self.bot.cache.get_problems_by_func(
-                    func=lambda problem, guild_id: problem.guild_id == guild_id,
-                    args=[inter.guild.id],
+                guild_problems = await self.bot.cache.get_problems(
+                    ProblemQuery().where("guild_id", inter.guild.id)
                 )
             thing_to_write = [str(problem) for problem in guild_problems]
             await inter.send(
@@ -554,7 +553,7 @@ class ProblemsCog(HelperCog):
             pass
         elif (
             guild_question
-            and len(self.cache.get_guild_problems(inter.guild))
+            and await self.cache.count_guild_problems(inter.guild.id)
             >= self.cache.max_guild_problems
         ):  # Check to make sure the maximum guild problem limit is not reached
             await inter.send(
@@ -570,15 +569,7 @@ class ProblemsCog(HelperCog):
             )
             return  # Exit the function
 
-        while True:
-            problem_id = generate_new_id()
-            if problem_id not in [
-                problem.id
-                for problem in await self.cache.get_problems_by_func(
-                    func=lambda problem: True
-                )  # Get everything
-            ]:  # Make sure this id isn't already used!
-                break  # Break the loop if the problem isn't already used
+        problem_id = generate_new_id()  # Ids never collide, so there's no need to check
         if guild_question:
             # If this is a guild question, set the guild id
             # to the guild id of the guild this command was run in
@@ -595,9 +586,19 @@ class ProblemsCog(HelperCog):
             cache=self.cache,
         )  # Create the problem!
         print(problem)
-        await self.cache.add_problem(
-            problem_id=problem_id, problem=problem
-        )  # Add the problem
+        try:
+            await self.cache.add_problem(
+                problem_id=problem_id, problem=problem
+            )  # Add the problem
+        except DuplicateProblem:
+            await inter.send(
+                embed=ErrorEmbed(
+                    "A problem with the same question and answer already exists!",
+                    custom_title="Duplicate problem",
+                ),
+                ephemeral=True,
+            )
+            return
 
         await inter.send(
             embed=SuccessEmbed(
@@ -776,8 +777,7 @@ class ProblemsCog(HelperCog):
                 ),
                 ephemeral=True,
             )
-            problem.solvers.append(inter.author.id)
-            await self.cache.update_problem(problem.id, problem)
+            await self.cache.add_solver(problem.id, inter.author.id)
 
             return
 
@@ -838,17 +838,20 @@ class ProblemsCog(HelperCog):
             )
             return
 
-        problem.voters.append(inter.author.id)
-        await self.bot.cache.update_problem(problem.id, problem)
+        try:
+            num_voters = await self.bot.cache.add_voter(problem.id, inter.author.id)
+        except problems_module.ProblemNotFound:  # It was deleted after we got it
+            await inter.send(
+                embed=ErrorEmbed("This problem doesn't exist!"), ephemeral=True
+            )
+            return
         string_to_print = "You successfully voted for the problem's deletion! As long as this problem is not deleted, you can always un-vote. There are "
-        string_to_print += f"{problem.get_num_voters()}/{self.bot.vote_threshold} votes on this problem!"  # Tell the user how many votes there are now
+        string_to_print += f"{num_voters}/{self.bot.vote_threshold} votes on this problem!"  # Tell the user how many votes there are now
         await inter.send(
             embed=SuccessEmbed(string_to_print, title="You Successfully Voted"),
             ephemeral=True,
         )
-        if (
-            problem.get_num_voters() >= self.bot.vote_threshold
-        ):  # Has it passed the vote threshold?
+        if num_voters >= self.bot.vote_threshold:  # Has it passed the vote threshold?
             # If it did, delete the problem
             await self.bot.cache.remove_problem(
                 guild_id=problem.guild_id, problem_id=problem.id
@@ -914,15 +917,19 @@ class ProblemsCog(HelperCog):
                 ephemeral=True,
             )
             return
-        # Step 3: Remove their vote
-        problem.voters.remove(inter.author.id)  # Remove the user id from problem
-        # Step 4: Update the DB so it reflects this change
-        await self.cache.update_problem(problem.id, problem)
-        # Step 5: Notify them
+        # Step 3: Remove their vote from the DB
+        try:
+            num_voters = await self.cache.remove_voter(problem.id, inter.author.id)
+        except problems_module.ProblemNotFound:  # It was deleted after we got it
+            await inter.send(
+                embed=ErrorEmbed("This problem doesn't exist!"), ephemeral=True
+            )
+            return
+        # Step 4: Notify them
         successMessage = f"You successfully un-voted for the problem's deletion!" + (
             "As long as this problem is not deleted, you can always re-vote."
             + (
-                f"There are {problem.get_num_voters()}/{self.bot.vote_threshold} votes on this problem!"
+                f"There are {num_voters}/{self.bot.vote_threshold} votes on this problem!"
             )
         )
         await inter.send(
@@ -210,14 +210,7 @@ JSON error: {e}"""
                     guild_id=guild_id,
                 )
             )
-        already_existing_quiz_ids = [
-            quiz.id
-            for quiz in await self.cache.get_quizzes_by_func(func=lambda quiz: True)
-        ]
-        while True:
-            id = generate_new_id()
-            if id not in already_existing_quiz_ids:
-                break
+        id = generate_new_id()
 
         quiz_to_create = Quiz(
             id=id,
@@ -238,14 +231,7 @@ JSON error: {e}"""
         """
 
         # TODO: only some people can create quizzes
-        already_existing_quiz_ids = [
-            quiz.id
-            for quiz in await self.cache.get_quizzes_by_func(func=lambda quiz: True)
-        ]
-        while True:
-            id = generate_new_id()
-            if id not in already_existing_quiz_ids:
-                break
+        id = generate_new_id()
         quiz = Quiz(
             id=id,
             quiz_problems=[],
@@ -202,14 +202,7 @@ class CreatingQuizzesCommandsCog(HelperCog):
                     guild_id=guild_id,
                 )
             )
-        already_existing_quiz_ids = [
-            _quiz.id
-            for _quiz in await self.cache.get_quizzes_by_func(func=lambda _quiz: True)
-        ]
-        while True:
-            id = generate_new_id()
-            if id not in already_existing_quiz_ids:
-                break
+        id = generate_new_id()
 
         quiz_to_create = Quiz(
             id=id,
@@ -234,14 +227,7 @@ class CreatingQuizzesCommandsCog(HelperCog):
 
         # TODO: only some people can create quizzes
         warnings.warn("This command has been deprecated", DeprecationWarning)
-        already_existing_quiz_ids = [
-            quiz.id
-            for quiz in await self.cache.get_quizzes_by_func(func=lambda quiz: True)
-        ]
-        while True:
-            id = generate_new_id()
-            if id not in already_existing_quiz_ids:
-                break
+        id = generate_new_id()
         quiz = Quiz(
             id=id,
             quiz_problems=[],
@@ -311,14 +297,7 @@ class CreatingQuizzesCommandsCog(HelperCog):
             max_points=max_points,
             is_written=is_written,
         )
-        await self.cache.update_cache()
-        already_existing_quiz_ids = [quiz.id for quiz in self.cache.cached_quizzes]
-        while True:
-            quiz_id = generate_new_id()
-            if quiz_id not in already_existing_quiz_ids:
-                break
-            else:
-                continue
+        quiz_id = generate_new_id()
 
         quiz: Quiz = Quiz(
             authors=[inter.author.id],
@@ -127,7 +127,7 @@ class QuizSolveCog(HelperCog):
         )
 
         await session.modify_answer(answer_to_add=answer, index=problem_num)
-        await self.cache.update_quiz(quiz)
+        await self.cache.update_quiz_session(session.special_id, session)
         await inter.send(
             "You have successfully set your answer to the one specified.",
             ephemeral=True,
@@ -98,6 +98,7 @@ class TaskCog(HelperCog):
         self.make_sure_config_json_is_correct.stop()
         self.make_sure_stats_are_saved.stop()
         self.bgsave_every_so_often.stop()
+        self.manage_redis_memory.stop()
 
     # Task to update support server information
     @tasks.loop(minutes=4)
@@ -111,7 +112,7 @@ class TaskCog(HelperCog):
     @tasks.loop(seconds=5)
     async def make_sure_config_json_is_correct(self):
         """Ensure config JSON is correct"""
-        await self.bot.config_json.update_my_file()
+        await self.bot.config_json.update_my_file(only_if_changed=True)
 
     # Task to ensure stats are saved
     @tasks.loop(seconds=45)
@@ -128,11 +129,14 @@ class TaskCog(HelperCog):
         except BGSaveNotSupportedOnSQLException:
             pass
 
+    # Task to keep Redis under its memory watermark
     @tasks.loop(seconds=60)
     async def manage_redis_memory(self):
+        """Move the problems and quizzes that haven't been used recently out of Redis, if it uses too much memory"""
         if not isinstance(self.bot.cache, RedisCache):
+            self.manage_redis_memory.stop()
             return
-        memory_info = await self.bot.cache.redis.info("memory")
+        await self.bot.cache.enforce_memory_watermark()
 
 
 def setup(bot: TheDiscordMathProblemBot):
@@ -45,16 +45,28 @@ class AsyncFileDict:
                 category=RuntimeWarning)
             asyncio.run(self.update_my_file())
 
-    async def update_my_file(self):
+    async def update_my_file(self, only_if_changed: bool = False):
         """
         Asynchronously update the file with the internal dictionary.
 
+        Parameters:
+        - only_if_changed (bool): If True, don't write the file if it already has the right contents
+          (so that its modification time doesn't change, and ConfigSource doesn't parse it again).
+
         Returns:
         - None
 
         """
+        new_contents = str(json.dumps(self.dict))
+        if only_if_changed:
+            try:
+                async with aiofiles.open(self.filename, "r") as file:
+                    if await file.read(-1) == new_contents:
+                        return
+            except FileNotFoundError:
+                pass
         async with aiofiles.open(self.filename, "w") as file:
-            await file.write(str(json.dumps(self.dict)))
+            await file.write(new_contents)
 
     async def read_from_file(self) -> dict:
         """
@@ -0,0 +1,103 @@
+"""You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - ConfigSource
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import logging
+import os
+import types
+import typing
+
+import aiofiles
+import orjson
+
+__all__ = ("ConfigSnapshot", "ConfigSource")
+
+log = logging.getLogger(__name__)
+
+FileFingerprint = typing.Tuple[int, int, int]  # (inode, size, mtime in nanoseconds)
+
+
+def _freeze(value: typing.Any) -> typing.Any:
+    """Make a parsed JSON value read-only"""
+    if isinstance(value, dict):
+        return types.MappingProxyType({key: _freeze(val) for key, val in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class ConfigSnapshot(typing.NamedTuple):
+    """The contents of config.json at one point in time. Everything in it is read-only."""
+
+    data: typing.Mapping[str, typing.Any]
+    permissions_required: typing.Mapping[str, typing.Mapping[str, bool]]  # command name -> requirements
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConfigSnapshot":
+        data = _freeze(data)
+        return cls(
+            data=data,
+            permissions_required=data.get(
+                "permissions_required", types.MappingProxyType({})
+            ),
+        )
+
+
+class ConfigSource:
+    """Reads a JSON config file (usually config.json), but only parses it again when it changes.
+    A change is noticed when the file's inode, size or modification time changes (one os.stat per call),
+    or when reload() is called."""
+
+    def __init__(self, filename: str = "config.json"):
+        self.filename = filename
+        self._snapshot: typing.Optional[ConfigSnapshot] = None
+        self._fingerprint: typing.Optional[FileFingerprint] = None
+        self.reloads = 0
+
+    def _stat(self) -> FileFingerprint:
+        stat = os.stat(self.filename)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    async def get(self) -> ConfigSnapshot:
+        """Return the contents of the file, parsing it again only if it has changed"""
+        if self._snapshot is None or self._stat() != self._fingerprint:
+            await self.reload()
+        return self._snapshot
+
+    async def reload(self) -> ConfigSnapshot:
+        """Parse the file again, even if it hasn't changed"""
+        fingerprint = self._stat()  # Before reading, so that a write during the read is noticed next time
+        async with aiofiles.open(self.filename, "rb") as file:
+            contents = await file.read()
+        try:
+            snapshot = ConfigSnapshot.from_dict(orjson.loads(contents))
+        except orjson.JSONDecodeError:
+            if self._snapshot is None:
+                raise
+            # Probably read while the file was being rewritten. Try again next time.
+            log.warning(f"{self.filename} isn't valid JSON; using the last valid version")
+            return self._snapshot
+        self._snapshot = snapshot
+        self._fingerprint = fingerprint
+        self.reloads += 1
+        return snapshot
+
+    async def get_permissions_required_for_command(
+        self, command_name: str
+    ) -> typing.Mapping[str, bool]:
+        """Return the permissions required for a command. Raises KeyError if the command has none."""
+        return (await self.get()).permissions_required[command_name]
@@ -20,6 +20,8 @@ import os
 
 import dotenv
 
+from .snowflake import MAX_WORKER_ID
+
 
 class BotConstants:
     """Bot constants"""
@@ -34,3 +36,14 @@ class BotConstants:
         self.USE_SQLITE = os.environ.get("use_sqlite") == "True"
         self.SQLITE_DB_PATH = os.environ.get("sqlite_database_path")
         self.SOURCE_CODE_LINK = os.environ.get("source_code_link")
+        # Every process running the bot on the same database needs its own id worker id
+        id_worker_id = os.environ.get("id_worker_id", "0")
+        if not id_worker_id.isdigit() or int(id_worker_id) > MAX_WORKER_ID:
+            raise ValueError(
+                f"id_worker_id must be an integer from 0 to {MAX_WORKER_ID}, not {id_worker_id!r}"
+            )
+        self.ID_WORKER_ID = int(id_worker_id)
+        # Where the ids this process used are remembered between restarts
+        self.ID_STATE_FILE = os.environ.get(
+            "id_state_file", f"id_worker_{self.ID_WORKER_ID}_state.txt"
+        )
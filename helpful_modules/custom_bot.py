@@ -190,12 +190,20 @@ class TheDiscordMathProblemBot(disnake.ext.commands.Bot):
             await asyncio.sleep(5)
             self.storer.close()
             await asyncio.gather(*self.closing_things)
+            await self.cache.close()  # Close the database connections
         except Exception as e:
             print(f"An exception of {e} happened while the bot was trying to close.")
             self.log.exception(e)
             await log_error(e)
             await asyncio.sleep(3)
         finally:
+            try:
+                # Buffered quiz answers would be lost if closing failed before the cache was closed
+                flush = getattr(self.cache, "flush_quiz_session_updates", None)  # RedisCache doesn't buffer
+                if flush is not None:
+                    await flush()
+            except Exception as e:
+                self.log.exception(e)
             await super().close()
             self.is_closing = False
 
@@ -166,6 +166,23 @@ class GuildData(Denylistable):
             denylist_expiry=float('-inf')
         )
 
+    def compile_checks(self) -> None:
+        """Compile the checks now (instead of the first time they are used)"""
+        for check in (self.can_create_problems_check, self.can_create_quizzes_check, self.mods_check):
+            check.recompile()
+
+    def copy(self) -> "GuildData":
+        """Return a copy of this GuildData. The checks are copied too, and are compiled again when they are used."""
+        return GuildData(
+            guild_id=self.guild_id,
+            denylisted=self.denylisted,
+            can_create_problems_check=self.can_create_problems_check.copy(),
+            can_create_quizzes_check=self.can_create_quizzes_check.copy(),
+            mods_check=self.mods_check.copy(),
+            denylist_reason=self.denylist_reason,
+            denylist_expiry=self.denylist_expiry,
+        )
+
     @classmethod
     def from_dict(cls, data: dict) -> "GuildData":
         return cls(
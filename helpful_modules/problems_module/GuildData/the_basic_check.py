@@ -27,6 +27,28 @@ import disnake
 import orjson
 
 
+class CompiledCheck(t.NamedTuple):
+    """A CheckForUserPassage, compiled into sets and a permission bitmask so that it is fast to evaluate"""
+
+    denylisted_users: t.FrozenSet[int]
+    allowlisted_users: t.FrozenSet[int]
+    roles_allowed: t.FrozenSet[int]
+    permissions_needed: int  # The value of a disnake.Permissions, or 0 if no permissions are needed
+
+    def check_for_user_passage(self, member: disnake.Member) -> bool:
+        "Return whether the member passes this check. See CheckForUserPassage.check_for_user_passage"
+        if member.id in self.denylisted_users:
+            return False
+        if member.id in self.allowlisted_users:
+            return True
+        if not self.roles_allowed.isdisjoint(role.id for role in member.roles):
+            return True  # This member has at least 1 of the allowed roles
+        return (
+            member.guild_permissions.value & self.permissions_needed
+            == self.permissions_needed
+        )
+
+
 class CheckForUserPassage:
     def __init__(
         self,
@@ -40,33 +62,46 @@ class CheckForUserPassage:
         self.roles_allowed = roles_allowed
         self.permissions_needed = permissions_needed
 
-    def check_for_user_passage(self, member: disnake.Member) -> bool:
-        "Return whether the user passes this check. First we check for denylisted/allowlisted people. Then roles and permissions are checked. If none of those checks succeed, False is returned. Otherwise True is returned"
-        if member.id in self.denylisted_users:
-            return False
-        if member.id in self.allowlisted_users:
-            return True
+    def __setattr__(self, name: str, value: t.Any) -> None:
+        super().__setattr__(name, value)
+        if name != "_compiled":
+            super().__setattr__("_compiled", None)  # Compile again next time
 
-        role_ids_of_this_user: set = {
-            role.id for role in member.roles
-        }  # Create a list containing the ids of the member's roles
-        roles_allowed: set = set(self.allowed_roles)
-        if (
-            role_ids_of_this_user.intersection(roles_allowed) != set()
-        ):  # This user has at least 1 of the allowed roles
-            return True
-        if not self.permissions_needed:
-            return True
-        _permissions_needed_dict = dict.fromkeys(self.permissions_needed, True)
+    @property
+    def compiled(self) -> CompiledCheck:
+        """Return this check, compiled. It is compiled once and then reused,
+        so if you change one of the lists in place, call recompile() (or assign a new list instead)."""
+        if self._compiled is None:
+            self.recompile()
+        return self._compiled
 
-        all_permissions_needed = disnake.Permissions(
-            **_permissions_needed_dict
-        )  # Create the Permissions instance based on what permissions are required
+    def recompile(self) -> CompiledCheck:
+        """Compile this check again"""
+        compiled = CompiledCheck(
+            denylisted_users=frozenset(self.denylisted_users),
+            allowlisted_users=frozenset(self.allowlisted_users),
+            roles_allowed=frozenset(self.roles_allowed),
+            permissions_needed=disnake.Permissions(
+                **dict.fromkeys(self.permissions_needed, True)
+            ).value,
+        )
+        self._compiled = compiled
+        return compiled
 
-        if member.guild_permissions.is_superset(all_permissions_needed):
-            return True
+    def check_for_user_passage(self, member: disnake.Member) -> bool:
+        "Return whether the user passes this check. First we check for denylisted/allowlisted people. Then roles and permissions are checked. If none of those checks succeed, False is returned. Otherwise True is returned"
+        return self.compiled.check_for_user_passage(member)
 
-        return False
+    def copy(self) -> "CheckForUserPassage":
+        """Return a copy of this check (with copies of the lists). The copy is compiled separately,
+        because its lists can be changed in place without changing this check."""
+        new = CheckForUserPassage(
+            denylisted_users=list(self.denylisted_users),
+            allowlisted_users=list(self.allowlisted_users),
+            roles_allowed=list(self.roles_allowed),
+            permissions_needed=list(self.permissions_needed),
+        )
+        return new
 
     @classmethod
     def from_dict(cls, data: dict) -> "CheckForUserPassage":
@@ -38,6 +38,7 @@ from .errors import *
 from .GuildData import CheckForUserPassage, GuildData
 from .linear_algebra_problem import LinearAlgebraProblem
 from .parse_problem import convert_dict_to_problem, convert_row_to_problem
+from .query import ProblemQuery, QuizQuery
 from .quizzes import *
 from .user_data import UserData
 from .verification_code_info import VerificationCodeInfo, VerificationCodeThreadHashingManager, ScryptParameters
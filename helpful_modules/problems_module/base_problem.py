@@ -23,7 +23,6 @@ Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
 
 import asyncio
-import pickle
 import sys
 import traceback
 import typing
@@ -34,6 +33,7 @@ from typing import Optional
 import disnake
 import orjson
 
+from .column_codec import content_fingerprint, decode_list
 from .dict_convertible import DictConvertible
 from .errors import *
 
@@ -207,7 +207,7 @@ class BaseProblem(DictConvertible):
     @staticmethod
     def try_to_convert_to_list(thing):
         if isinstance(thing, bytes):
-            return pickle.loads(thing)
+            return decode_list(thing)
         elif isinstance(thing, str):
             return orjson.loads(thing)
         else:
@@ -255,8 +255,12 @@ class BaseProblem(DictConvertible):
         """Convert a dictionary to a math problem. cache must be a valid MathProblemCache"""
         # print(cls)
         assert isinstance(_dict, dict)
-        assert _dict["guild_id"] is None or isinstance(_dict["guild_id"], int)
+        assert _dict["guild_id"] is None or isinstance(_dict["guild_id"], (int, str))
         problem = _dict
+        guild_id = problem["guild_id"]
+        if guild_id is not None:
+            # to_dict() stores a guild id of None as "None", and __init__ only takes strings
+            guild_id = None if guild_id == "None" else str(guild_id)
         # Remove the guild_id null (used for global problems), which is not used any more because of conflicts with sql.
         other_stuff = {
             key: value
@@ -271,6 +275,9 @@ class BaseProblem(DictConvertible):
                 "guild_id",
                 "solvers",
                 "author",
+                "num_voters",  # Counted by the database, not stored in the problem
+                "num_solvers",
+                "content_fingerprint",  # Computed from the question and answers
             }
         }
         problem_id = -1
@@ -285,7 +292,7 @@ class BaseProblem(DictConvertible):
             question=problem["question"],
             answers=problem["answers"],
             id=int(problem_id),
-            guild_id=problem["guild_id"],
+            guild_id=guild_id,
             voters=problem["voters"],
             solvers=problem["solvers"],
             author=problem["author"],
@@ -390,6 +397,10 @@ class BaseProblem(DictConvertible):
         """Returns id & guild_id in a list. id is first and guild_id is second."""
         return [self.id, self.guild_id]
 
+    def get_content_fingerprint(self) -> str:
+        """Return a hash of the question and answers, which is the same for duplicate problems"""
+        return content_fingerprint(self.question, self.answers)
+
     def get_voters(self):
         """Returns self.voters"""
         return self.voters
@@ -0,0 +1,98 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - BatchLoader
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import asyncio
+import typing
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+
+class BatchLoader(typing.Generic[K, V]):
+    """Collect the keys that are loaded in the same event loop iteration and load them with one call to batch_load.
+
+    batch_load takes a list of distinct keys and returns a dict mapping each key that was found to its value.
+    Keys that aren't in the dict raise the exception returned by not_found(key).
+    Concurrent loads of the same key share one result, so don't mutate it.
+    Callers that get cancelled don't cancel the batch, because other callers may still be waiting for it."""
+
+    def __init__(
+        self,
+        batch_load: typing.Callable[[typing.List[K]], typing.Awaitable[typing.Dict[K, V]]],
+        max_batch_size: int = 100,
+        not_found: typing.Callable[[K], BaseException] = KeyError,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._not_found = not_found
+        self._pending: typing.Dict[K, asyncio.Future] = {}
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: typing.Set[asyncio.Task] = set()  # So that running batches aren't garbage collected
+        self.batches = 0
+        self.loads = 0
+
+    async def load(self, key: K) -> V:
+        """Load one key, together with every other key loaded in this event loop iteration"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures from an event loop that is no longer running can never finish
+            self._loop = loop
+            self._pending = {}
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is None:
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = self._pending[key] = loop.create_future()
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: typing.Iterable[K]) -> typing.List[V]:
+        """Load several keys at once. Like asyncio.gather, the first exception is raised."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self) -> None:
+        pending = list(self._pending.items())
+        self._pending = {}
+        for start in range(0, len(pending), self.max_batch_size):
+            task = asyncio.ensure_future(
+                self._run_batch(dict(pending[start : start + self.max_batch_size]))
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, futures: typing.Dict[K, asyncio.Future]) -> None:
+        self.batches += 1
+        try:
+            values = await self._batch_load(list(futures.keys()))
+        except BaseException as exc:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for key, future in futures.items():
+            if future.done():
+                continue
+            if key in values:
+                future.set_result(values[key])
+            else:
+                future.set_exception(self._not_found(key))
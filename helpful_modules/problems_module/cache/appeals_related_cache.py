@@ -23,7 +23,6 @@ Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
 import typing
 
-import aiosqlite
 import orjson
 from aiomysql import DictCursor
 
@@ -35,7 +34,6 @@ from ..errors import (
     InvalidDictionaryInDatabaseException,
     SQLException,
 )
-from ..mysqlcontextmanager import mysql_connection
 from .guild_data_related_cache import GuildDataRelatedCache
 
 
@@ -43,7 +41,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
     async def set_appeal_data(self, data: Appeal):
         assert isinstance(data, Appeal)  # Basic type-checking
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """INSERT OR REPLACE INTO appeals (special_id, appeal_msg, appeal_num, user_id, timestamp,type) 
@@ -58,9 +56,8 @@ class AppealsRelatedCache(GuildDataRelatedCache):
                         int(data.type),
                     ),
                 )  # TODO: test
-                await conn.commit()
         else:
-            with self.get_a_connection() as connection:
+            async with self.get_a_connection() as connection:
                 cursor = await connection.cursor(DictCursor)
                 await cursor.execute(
                     """INSERT INTO appeals (special_id, appeal_msg appeal_num, user_id, timestamp,type) 
@@ -88,7 +85,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
         assert isinstance(default, Appeal)
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
@@ -114,7 +111,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
             )
     async def get_all_appeals(self):
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
@@ -137,7 +134,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
         """Initialize SQL table for appeals."""
         await super().initialize_sql_table()
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS appeals (
@@ -176,12 +173,12 @@ class AppealsRelatedCache(GuildDataRelatedCache):
                 )
                 await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS appeal_view_info (
-                        message_id INTEGER PRIMARY KEY,
-                        user_id INTEGER NOT NULL,
-                        guild_id INTEGER,
+                        message_id BIGINT PRIMARY KEY,
+                        user_id BIGINT NOT NULL,
+                        guild_id BIGINT,
                         done TEXT,
                         pages TEXT,
-                        appeal_type INTEGER,
+                        appeal_type INTEGER
                         ); 
                     """
                 )
@@ -207,7 +204,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
         if not isinstance(message_id, int):
             raise TypeError("Message ID is not an integer")
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
@@ -219,7 +216,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
                 cursor = await connection.cursor(DictCursor)
 
                 await cursor.execute(
-                    "SELECT * FROM appeal_view_info WHERE message_id=?", (message_id,)
+                    "SELECT * FROM appeal_view_info WHERE message_id=%s", (message_id,)
                 )
                 results = list(await cursor.fetchall())
         if len(results) == 0:
@@ -236,18 +233,12 @@ class AppealsRelatedCache(GuildDataRelatedCache):
         if not isinstance(message_id, int):
             raise TypeError("Message ID is not an integer")
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute("DELETE FROM appeal_view_info WHERE message_id=?", (message_id,))
-                await conn.commit()
         else:
-            async with mysql_connection(
-                    host=self.mysql_db_ip,
-                    password=self.mysql_password,
-                    user=self.mysql_username,
-                    database=self.mysql_db_name,
-            ) as conn:
-                cursor = await conn.cursor()
+            async with self.get_a_connection() as conn:
+                cursor = await conn.cursor(DictCursor)
                 await cursor.execute("DELETE FROM appeal_view_info WHERE message_id=%s", (message_id,))
                 await conn.commit()
 
@@ -257,7 +248,7 @@ class AppealsRelatedCache(GuildDataRelatedCache):
                 f"view_info is not an AppealViewInfo, but a(n) {view_info.__class__.__name__}"
             )
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """INSERT INTO appeal_view_info (message_id, user_id, guild_id, done, pages, appeal_type) VALUES (?,?,?,?,?,?) 
@@ -277,18 +268,12 @@ class AppealsRelatedCache(GuildDataRelatedCache):
                         int(view_info.appeal_type)
                     ),
                 )
-                await conn.commit()
         else:
-            async with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """INSERT INTO appeal_view_info (message_id, user_id, guild_id, done,pages, appeal_type) VALUES (?,?,?,?,?,?) 
-                    ON DUPLICATE KEY UPDATE message_id=?, user_id=?, guild_id=?, done=?,pages=?, appeal_type=?""",
+            async with self.get_a_connection() as conn:
+                cursor = await conn.cursor(DictCursor)
+                await cursor.execute(
+                    """INSERT INTO appeal_view_info (message_id, user_id, guild_id, done,pages, appeal_type) VALUES (%s,%s,%s,%s,%s,%s) 
+                    ON DUPLICATE KEY UPDATE message_id=%s, user_id=%s, guild_id=%s, done=%s,pages=%s, appeal_type=%s""",
                     (
                         view_info.message_id,
                         view_info.user_id,
@@ -304,11 +289,11 @@ class AppealsRelatedCache(GuildDataRelatedCache):
                         int(view_info.appeal_type),
                     ),
                 )
-                conn.commit()
+                await conn.commit()
 
     async def get_all_appeal_view_infos(self) -> typing.Sequence[AppealViewInfo]:
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute("SELECT * from appeal_view_info")
@@ -25,15 +25,13 @@ import asyncio
 import copy
 
 import aiomysql
-import aiosqlite
 import orjson
 from aiomysql import DictCursor
 
 from ...dict_factory import dict_factory
 from ..errors import SQLException
 from ..GuildData.guild_data import GuildData
-from ..mysql_connector_with_stmt import *
-from ..mysql_connector_with_stmt import mysql_connection
+from ..ttl_cache import MISSING
 from .permissions_required_related_cache import PermissionsRequiredRelatedCache
 
 
@@ -45,7 +43,7 @@ class GuildDataRelatedCache(PermissionsRequiredRelatedCache):
         CCQCTD = orjson.dumps(data.can_create_quizzes_check.to_dict()).decode("utf-8")
         MCTD = orjson.dumps(data.mods_check.to_dict()).decode("utf-8")
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """INSERT INTO guild_data (guild_id, denylisted, can_create_problems_check, can_create_quizzes_check, mod_check) 
@@ -73,7 +71,7 @@ class GuildDataRelatedCache(PermissionsRequiredRelatedCache):
                     """INSERT INTO guild_data (guild_id, denylisted, can_create_problems_check, can_create_quizzes_check, mod_check)
                     VALUES (%s, %s, %s, %s, %s)
                     ON DUPLICATE KEY UPDATE
-                    guild_id=?, denylisted=?, can_create_problems_check=?, can_create_quizzes_check=?, mod_check = ?""",
+                    guild_id=%s, denylisted=%s, can_create_problems_check=%s, can_create_quizzes_check=%s, mod_check = %s""",
                     (
                         data.guild_id,
                         int(data.denylisted),
@@ -87,15 +85,33 @@ class GuildDataRelatedCache(PermissionsRequiredRelatedCache):
                         MCTD,
                     ),
                 )  # TODO: test this
+                await connection.commit()
+        cached = data.copy()  # So that changing data doesn't change the cache
+        cached.compile_checks()
+        self._guild_data_cache.put(data.guild_id, cached)
 
     async def get_guild_data(self, guild_id: int, default: GuildData | None = None):
+        """Get the guild data of a guild, or default if it doesn't have any.
+        Guild data is cached (with its checks compiled), and a copy of the cached guild data is returned."""
         if default is None:
             default = GuildData.default(guild_id)
         assert isinstance(guild_id, int)
         assert isinstance(default, GuildData)
+        data = self._guild_data_cache.get(guild_id)
+        if data is MISSING:
+            version = self._guild_data_cache.version
+            data = await self._select_guild_data(guild_id)
+            if data is not None:
+                data.compile_checks()
+            self._guild_data_cache.put(guild_id, data, version=version)
+        if data is None:
+            return default
+        return data.copy()
 
+    async def _select_guild_data(self, guild_id: int) -> GuildData | None:
+        """Select the guild data of a guild from the database, or None if it doesn't have any"""
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
@@ -103,7 +119,7 @@ class GuildDataRelatedCache(PermissionsRequiredRelatedCache):
                 )
                 results = list(await cursor.fetchall())
                 if len(results) == 0:
-                    return default
+                    return None
                 elif len(results) == 1:
                     return GuildData.from_dict(results[0])
                 else:
@@ -119,7 +135,7 @@ class GuildDataRelatedCache(PermissionsRequiredRelatedCache):
                 )
                 results = list(await cursor.fetchall())
                 if len(results) == 0:
-                    return default
+                    return None
                 elif len(results) == 1:
                     return GuildData.from_dict(results[0])
                 else:
@@ -131,7 +147,7 @@ class GuildDataRelatedCache(PermissionsRequiredRelatedCache):
         """Initialize SQL table for guild data."""
         await super().initialize_sql_table()
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS guild_data (
@@ -22,14 +22,17 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
 
+import asyncio
 import logging
 import pickle
+import time
 import typing
 from copy import copy, deepcopy
 from typing import *
 from warnings import warn
 
-import aiosqlite
+import pymysql
+from aiomysql import DictCursor
 
 
 from helpful_modules.dict_factory import dict_factory
@@ -37,161 +40,370 @@ from helpful_modules.dict_factory import dict_factory
 from ..appeal import Appeal, AppealViewInfo
 from ..base_problem import BaseProblem
 from ..errors import *
-from ..mysql_connector_with_stmt import mysql_connection
 from ..parse_problem import convert_row_to_problem
 from ..quizzes import Quiz, QuizProblem, QuizSolvingSession, QuizSubmission
 from ..quizzes.quiz_description import QuizDescription
+from ..schema import (
+    MYSQL_SCHEMA_VERSION_TABLE,
+    SCHEMA_MIGRATIONS,
+    SQLITE_SCHEMA_VERSION_TABLE,
+    SchemaMigration,
+)
+from .problems_related_cache import VOTE_AND_SOLVE_TABLES
 from .verification_codes_related_cache import VerificationCodesRelatedCache
 
 log = logging.getLogger(__name__)
 
+# The tables whose changes are recorded in the change feed, and the column used to identify what changed
+CHANGE_FEED_TABLES = {
+    "problems": "problem_id",
+    "quizzes": "quiz_id",
+    "quiz_submissions": "quiz_id",
+    "quiz_submission_sessions": "quiz_id",
+    "quiz_description": "quiz_id",
+}
+# How often (in seconds) the maintenance task started by start_maintenance() runs
+MAINTENANCE_INTERVAL = 3600
+# The error codes MySQL uses when a column (1060) or an index (1061) already exists
+MYSQL_ALREADY_EXISTS_ERRORS = frozenset({1060, 1061})
+
+
+def change_feed_trigger_statements(use_sqlite: bool) -> typing.List[str]:
+    """Return the statements that create the triggers that record every change to CHANGE_FEED_TABLES in change_feed.
+    Deletes are recorded as tombstones (deleted = 1), and updates are recorded as a tombstone for the old row
+    followed by the new row (because the id or the guild id could have changed)."""
+    statements = []
+    for table, column in CHANGE_FEED_TABLES.items():
+        insert = "INSERT INTO change_feed (table_name, item_id, guild_id, deleted) VALUES "
+        values = {
+            "INSERT": f"('{table}', NEW.{column}, NEW.guild_id, 0)",
+            "UPDATE": f"('{table}', OLD.{column}, OLD.guild_id, 1), ('{table}', NEW.{column}, NEW.guild_id, 0)",
+            "DELETE": f"('{table}', OLD.{column}, OLD.guild_id, 1)",
+        }
+        for event, row in values.items():
+            body = insert + row
+            if use_sqlite:
+                body = f"BEGIN {body}; END"
+            statements.append(
+                f"""CREATE TRIGGER IF NOT EXISTS {table}_change_feed_{event.lower()}
+                AFTER {event} ON {table} FOR EACH ROW {body}"""
+            )
+    return statements
+
 
 class MiscRelatedCache(VerificationCodesRelatedCache):
+    def start_maintenance(self, interval: float = MAINTENANCE_INTERVAL) -> None:
+        """Start the background task that re-encodes the problems that are still pickled (once, in batches,
+        while the bot keeps running) and prunes the change feed every interval seconds.
+        Call this from the event loop the bot runs on (for example, in on_ready). Calling it again while
+        the task is running does nothing. close() stops it."""
+        if self._maintenance_task is not None and not self._maintenance_task.done():
+            return
+        self._maintenance_task = asyncio.create_task(self._run_maintenance(interval))
+
+    async def _run_maintenance(self, interval: float) -> None:
+        pickled_problems_left = True
+        while True:
+            if pickled_problems_left:
+                try:
+                    await self.reencode_pickled_problem_rows()
+                    pickled_problems_left = False  # New rows are never pickled
+                except Exception:
+                    log.exception("Re-encoding the pickled problems failed; trying again later")
+            try:
+                await self.prune_change_feed()
+            except Exception:
+                log.exception("Pruning the change feed failed; trying again later")
+            await asyncio.sleep(interval)
+
+    async def close(self) -> None:
+        """Stop the maintenance task, and then close the connections to the database"""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        await super().close()
+
     async def update_cache(self: "MathProblemCache") -> None:
-        """Method revamped! This method updates the cache of the guilds, the guild problems, and the cache of the global problems. Takes O(N) time"""
-        warn(message="update_cache hangs", category=PMDeprecationWarning, stacklevel=-1)
-        await self.get_all_problems()
-        guild_problems = {}
+        """Update the cached problems, quizzes, quiz submissions and quiz sessions.
+        Only the rows that changed since the last update are read (they are found using the change_feed table),
+        so this takes time proportional to the number of changes instead of the size of the database.
+        The first update (or an update after the change feed was pruned past the last revision seen) reloads everything.
+        Concurrent calls share one update, and calls right after an update finished return immediately,
+        unless this process wrote to a cached table since that update started.
+        """
+        await self._update_cache_flight.run(self._update_cache)
 
-        guild_ids = []
-        quiz_problems_dict = {}
-        quiz_sessions_dict = {}
-        quiz_submissions_dict = {}
+    async def _update_cache(self) -> None:
+        """Update the cache now (use update_cache instead)"""
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
-                await cursor.execute("SELECT * FROM quizzes")
-                for Row in await cursor.fetchall():
-                    quiz_problem = QuizProblem.from_row(Row, cache=copy(self))
-                    # Add the problem to the cache
-                    try:
-                        quiz_problems_dict[quiz_problem.id].append(quiz_problem)
-                    except KeyError:
-                        quiz_problems_dict[quiz_problem.id] = [quiz_problem]
-                await cursor.execute("SELECT submissions from quiz_submissions")
-                for Row in await cursor.fetchall():
-                    submission = QuizSubmission.from_dict(
-                        pickle.loads(Row["submission"]), cache=copy(self)
-                    )
-                    try:
-                        quiz_submissions_dict[submission.quiz_id].append(submission)
-                    except KeyError:
-                        quiz_submissions_dict[submission.quiz_id] = [submission]
-                await cursor.execute("SELECT * FROM quiz_submission_sessions")
-                for _row in await cursor.fetchall():
-                    session = QuizSolvingSession.from_sqlite_dict(_row, cache=self)
-                    try:
-                        quiz_sessions_dict[session.quiz_id].append(session)
-                    except KeyError:
-                        quiz_sessions_dict[session.quiz_id] = [session]
+                await self._update_cache_with_cursor(cursor, "?")
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await self._update_cache_with_cursor(cursor, "%s")
+
+    async def _update_cache_with_cursor(self, cursor, placeholder: str) -> None:
+        """Apply the change feed using the cursor. placeholder is the placeholder used by the database (? or %s)"""
+        await cursor.execute(
+            "SELECT MIN(revision) AS first_revision, MAX(revision) AS last_revision FROM change_feed"
+        )
+        bounds = (await cursor.fetchall())[0]
+        last_revision = bounds["last_revision"] or 0
+        if self._change_feed_revision is None or (
+            bounds["first_revision"] is not None
+            and bounds["first_revision"] > self._change_feed_revision + 1
+        ):
+            # We've never loaded anything, or changes we haven't seen were pruned
+            log.info("Reloading every problem and quiz into the cache")
+            self.guild_problems = {}
+            self.guild_ids = set()
+            self._problem_index.clear()
+            self._cached_quizzes_by_id = {}
+            self.cached_sessions = {}
+            self.cached_submissions_organized_by_dict = {}
+            await self._cache_problems_from_rows(cursor, placeholder, None)
+            await self._cache_quizzes_from_rows(cursor, placeholder, None)
+            self._change_feed_revision = last_revision
+            self._applied_revisions = set()  # The window is applied again once, which is harmless
+            return
+        window = self.change_feed_reread_window
+        if window == 0 and last_revision <= self._change_feed_revision:
+            return  # Nothing changed
+        # Changes that committed late have revisions below the last one seen, so the last window is read again
+        await cursor.execute(
+            f"""SELECT revision, table_name, item_id, guild_id, deleted FROM change_feed
+            WHERE revision > {placeholder} AND revision <= {placeholder} ORDER BY revision""",
+            (max(self._change_feed_revision - window, 0), last_revision),
+        )
+        changes = [
+            change
+            for change in await cursor.fetchall()
+            if change["revision"] > self._change_feed_revision
+            or change["revision"] not in self._applied_revisions
+        ]
+        # Only the last change to each row matters
+        problem_changes: Dict[Tuple[Optional[int], int], bool] = {}
+        changed_quiz_ids = set()
+        for change in changes:
+            if change["table_name"] == "problems":
+                problem_changes[(change["guild_id"], change["item_id"])] = bool(
+                    change["deleted"]
+                )
+            else:
+                changed_quiz_ids.add(change["item_id"])
+        for (guild_id, problem_id), deleted in problem_changes.items():
+            if deleted:  # Tombstone
+                self._uncache_problem(guild_id, problem_id)
+        # Tombstoned problems are read again too, because a late tombstone can be older than the row it follows.
+        # Problems that no longer exist aren't found, so they stay uncached.
+        changed_problem_ids = {problem_id for (guild_id, problem_id) in problem_changes}
+        if changed_problem_ids:
+            await self._cache_problems_from_rows(
+                cursor, placeholder, changed_problem_ids
+            )
+        if changed_quiz_ids:
+            await self._cache_quizzes_from_rows(cursor, placeholder, changed_quiz_ids)
+        log.debug(
+            f"Applied {len(problem_changes)} problem changes and {len(changed_quiz_ids)} quiz changes to the cache"
+        )
+        self._change_feed_revision = max(last_revision, self._change_feed_revision)
+        if window:
+            self._applied_revisions.update(change["revision"] for change in changes)
+            self._applied_revisions = {
+                revision
+                for revision in self._applied_revisions
+                if revision > self._change_feed_revision - window
+            }
+
+    async def _cache_problems_from_rows(
+        self, cursor, placeholder: str, problem_ids: Optional[Set[int]]
+    ) -> None:
+        """(Re-)load the problems with the given ids (or every problem, if problem_ids is None) into the cache"""
+        problems = []
+        for where, params in self._where_in("problem_id", problem_ids, placeholder):
+            await cursor.execute("SELECT * FROM problems" + where, params)
+            problems.extend(
+                convert_row_to_problem(row, cache=copy(self))
+                for row in await cursor.fetchall()
+            )
+        await self._load_votes_and_solves(
+            cursor, placeholder, problems, every_problem=problem_ids is None
+        )
+        for problem in problems:
+            self._cache_problem(problem)
 
+    async def _cache_quizzes_from_rows(
+        self, cursor, placeholder: str, quiz_ids: Optional[Set[int]]
+    ) -> None:
+        """(Re-)load the quizzes with the given ids (or every quiz, if quiz_ids is None) into the cache.
+        This includes their problems, submissions and sessions. Quizzes that no longer exist are removed from the cache.
+        """
+        quiz_problems_dict = {}
+        quiz_sessions_dict = {}
+        quiz_submissions_dict = {}
+        quiz_descriptions_dict = {}
+        for where, params in self._where_in("quiz_id", quiz_ids, placeholder):
+            await cursor.execute("SELECT * FROM quizzes" + where, params)
+            for row in await cursor.fetchall():
+                quiz_problem = QuizProblem.from_row(row, cache=copy(self))
+                try:
+                    quiz_problems_dict[quiz_problem.quiz_id].append(quiz_problem)
+                except KeyError:
+                    quiz_problems_dict[quiz_problem.quiz_id] = [quiz_problem]
+            await cursor.execute("SELECT submissions FROM quiz_submissions" + where, params)
+            for row in await cursor.fetchall():
+                submission = QuizSubmission.from_dict(
+                    pickle.loads(row["submissions"]), cache=copy(self)
+                )
+                try:
+                    quiz_submissions_dict[submission.quiz_id].append(submission)
+                except KeyError:
+                    quiz_submissions_dict[submission.quiz_id] = [submission]
+            await cursor.execute(
+                "SELECT * FROM quiz_submission_sessions" + where, params
+            )
+            for row in await cursor.fetchall():
+                if self.use_sqlite:
+                    session = QuizSolvingSession.from_sqlite_dict(row)
+                else:
+                    session = QuizSolvingSession.from_mysql_dict(row)
+                try:
+                    quiz_sessions_dict[session.quiz_id].append(session)
+                except KeyError:
+                    quiz_sessions_dict[session.quiz_id] = [session]
+            await cursor.execute("SELECT * FROM quiz_description" + where, params)
+            for row in await cursor.fetchall():
+                quiz_descriptions_dict[row["quiz_id"]] = QuizDescription.from_dict(row)
+        if quiz_ids is None:
+            quiz_ids = set(quiz_problems_dict.keys())
+        for quiz_id in quiz_ids:
+            # Replace whatever was cached before
+            self._cached_quizzes_by_id.pop(quiz_id, None)
+            self.cached_sessions.pop(quiz_id, None)
+            self.cached_submissions_organized_by_dict.pop(quiz_id, None)
+            if quiz_id in quiz_sessions_dict.keys():
+                self.cached_sessions[quiz_id] = quiz_sessions_dict[quiz_id]
+            if quiz_id in quiz_submissions_dict.keys():
+                self.cached_submissions_organized_by_dict[quiz_id] = (
+                    quiz_submissions_dict[quiz_id]
+                )
+            if quiz_id not in quiz_problems_dict.keys():
+                continue  # There could be submissions or sessions left over from a deleted quiz
+            if quiz_id not in quiz_descriptions_dict.keys():
+                continue  # get_quiz can't load quizzes without a description either
+            problems = quiz_problems_dict[quiz_id]
+            quiz = Quiz(
+                quiz_id,
+                authors=list(set((problem.author for problem in problems))),
+                quiz_problems=problems,
+                description=quiz_descriptions_dict[quiz_id],
+            )
+            quiz._submissions = quiz_submissions_dict.get(quiz_id, [])
+            quiz.existing_sessions = quiz_sessions_dict.get(quiz_id, [])
+            self._cached_quizzes_by_id[quiz_id] = quiz
+        self.cached_quizzes = list(self._cached_quizzes_by_id.values())
+        self.cached_submissions = self.cached_submissions_organized_by_dict.values()
+
+    async def prune_change_feed(self, older_than: float = 86400) -> None:
+        """Delete the change feed entries that are more than older_than seconds old.
+        The newest entry is always kept, so that update_cache can tell whether it missed any changes."""
+        cutoff = int(time.time() - older_than)
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                await conn.execute(
+                    """DELETE FROM change_feed WHERE changed_at < ?
+                    AND revision < (SELECT MAX(revision) FROM change_feed)""",
+                    (cutoff,),
+                )
+                await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute("SELECT * FROM problems")  # Get all problems
-                for row in cursor.fetchall():
-                    problem = convert_row_to_problem(row, cache=copy(self))
-                    if (
-                        problem.guild_id not in guild_ids
-                    ):  # Similar logic: Make sure it's there!
-                        guild_ids.append(problem.guild_id)
-                        guild_problems[problem.guild_id] = (
-                            {}
-                        )  # For quick, cached access?
-                    try:
-                        guild_problems[problem.guild_id][problem.id] = problem
-                    except BaseException as e:
-                        raise SQLException(
-                            "An error occurred while assigning the problem..."
-                        ) from e
-                cursor.execute("SELECT * FROM quizzes")  # Get all quiz problems
-                for row in cursor.fetchall():
-                    quiz_problem = QuizProblem.from_row(
-                        row, cache=copy(self)
-                    )  # Turn the quiz problems into QuizProblem objects
-                    try:
-                        quiz_problems_dict[quiz_problem.id].append(
-                            quiz_problem
-                        )  # Add it to the quiz with the given id
-                    except KeyError:
-                        quiz_problems_dict[quiz_problem.id] = [
-                            quiz_problem
-                        ]  # New quiz!
-                # Similar log for quiz submissions
-                cursor.execute("SELECT submissions from quiz_submissions")
-                for row in cursor.fetchall():
-                    submission = QuizSubmission.from_dict(
-                        pickle.loads(row["submission"]), cache=copy(self)
-                    )
-                    try:
-                        quiz_submissions_dict[submission.quiz_id].append(submission)
-                    except KeyError:
-                        quiz_submissions_dict[submission.quiz_id] = [submission]
-                cursor.execute("SELECT * FROM quiz_submission_sessions")
-                for _row in cursor.fetchall():
-                    session = QuizSolvingSession.from_sqlite_dict(_row, cache=self)
-                    try:
-                        quiz_sessions_dict[session.quiz_id].append(session)
-                    except KeyError:
-                        quiz_sessions_dict[session.quiz_id] = [session]
-        try:
-            global_problems = deepcopy(
-                guild_problems[None]
-            )  # Must deepcopy or weird warnings will occur
-            # TODO: fix this so this doesn't lead to errors
-        except KeyError:  # No global problems yet
-            global_problems = {}
-        # Don't deepcopy the problems
-        self.guild_problems = guild_problems
-        self.guild_ids = guild_ids
-        self.global_problems = global_problems
-        self.cached_sessions = quiz_sessions_dict
-        self.cached_quizzes = []  # Could cause a race condition
-        for _id in quiz_problems_dict.keys():
-            has_submissions = _id in list(
-                quiz_submissions_dict.keys()
-            )  # There could be a quiz with problems but not submissions
-            if has_submissions:
-                self.cached_quizzes.append(
-                    Quiz(
-                        _id,
-                        quiz_problems=quiz_problems_dict[_id],
-                        submissions=quiz_submissions_dict[_id],
-                        existing_sessions=(
-                            [quiz_sessions_dict[quiz_id]]
-                            if quiz_id in quiz_sessions_dict.keys()
-                            else []
-                        ),
-                        authors=set(
-                            (problem.author for problem in quiz_submissions_dict[_id])
-                        ),
-                    )
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                # MySQL doesn't allow a subquery on the table being deleted from
+                await cursor.execute("SELECT MAX(revision) AS last_revision FROM change_feed")
+                last_revision = (await cursor.fetchone())["last_revision"]
+                if last_revision is None:
+                    return
+                await cursor.execute(
+                    "DELETE FROM change_feed WHERE changed_at < %s AND revision < %s",
+                    (cutoff, last_revision),
                 )
+                await connection.commit()
 
-            else:
-                self.cached_quizzes.append(
-                    Quiz(
-                        _id,
-                        quiz_problems=quiz_problems_dict[_id],
-                        submissions=[],
-                        existing_sessions=(
-                            [quiz_sessions_dict[quiz_id]]
-                            if quiz_id in quiz_sessions_dict.keys()
-                            else []
-                        ),
-                        authors=set(
-                            (problem.author for problem in quiz_submissions_dict[_id])
-                        ),
+    async def get_cold_storage_values(
+        self, redis_keys: typing.Iterable[str]
+    ) -> typing.Dict[str, str]:
+        """Return the values that a RedisCache moved here, by Redis key. Keys that aren't here are left out."""
+        redis_keys = set(redis_keys)
+        if not redis_keys:
+            return {}
+        placeholder = "?" if self.use_sqlite else "%s"
+        values = {}
+        if self.use_sqlite:
+            async with self.sqlite_pool.reader() as conn:
+                for where, params in self._where_in("redis_key", redis_keys, placeholder):
+                    cursor = await conn.execute(
+                        f"SELECT redis_key, value FROM redis_cold_storage{where}", params
                     )
+                    values.update(await cursor.fetchall())
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                for where, params in self._where_in("redis_key", redis_keys, placeholder):
+                    await cursor.execute(
+                        f"SELECT redis_key, value FROM redis_cold_storage{where}", params
+                    )
+                    values.update(await cursor.fetchall())
+        return values
+
+    async def set_cold_storage_values(self, values: typing.Dict[str, str]) -> None:
+        """Store values that a RedisCache moved out of Redis, replacing the ones with the same Redis key"""
+        if not values:
+            return
+        demoted_at = int(time.time())
+        rows = [(redis_key, value, demoted_at) for redis_key, value in values.items()]
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                await conn.executemany(
+                    """INSERT INTO redis_cold_storage (redis_key, value, demoted_at) VALUES (?, ?, ?)
+                    ON CONFLICT (redis_key) DO UPDATE SET value = excluded.value, demoted_at = excluded.demoted_at""",
+                    rows,
                 )
-        self.cached_submissions = quiz_submissions_dict.values()
-        self.cached_submissions_organized_by_dict = quiz_submissions_dict
+                await conn.commit()
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                await cursor.executemany(
+                    """INSERT INTO redis_cold_storage (redis_key, value, demoted_at) VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE value = VALUES(value), demoted_at = VALUES(demoted_at)""",
+                    rows,
+                )
+                await connection.commit()
+
+    async def delete_cold_storage_values(self, redis_keys: typing.Iterable[str]) -> None:
+        """Delete values that a RedisCache moved back into Redis"""
+        redis_keys = set(redis_keys)
+        if not redis_keys:
+            return
+        placeholder = "?" if self.use_sqlite else "%s"
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                for where, params in self._where_in("redis_key", redis_keys, placeholder):
+                    await conn.execute(f"DELETE FROM redis_cold_storage{where}", params)
+                await conn.commit()
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                for where, params in self._where_in("redis_key", redis_keys, placeholder):
+                    await cursor.execute(f"DELETE FROM redis_cold_storage{where}", params)
+                await connection.commit()
 
     async def get_all_by_user_id(self, user_id: int) -> dict:
         return self.get_all_by_author_id(user_id)
@@ -200,7 +412,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
         """Return a dictionary containing everything that was created by the author"""
         assert isinstance(author_id, int)  # Make sure it is of type integer
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()  # Create a cursor
                 # Get all quiz problems they made
@@ -234,6 +446,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                 problems = [
                     convert_row_to_problem(row) for row in await cursor.fetchall()
                 ]
+                await self._load_votes_and_solves(cursor, "?", problems)
                 await cursor.execute(
                     """SELECT * FROM quiz_submission_sessions WHERE user_id = ?""",
                     (author_id,),
@@ -264,51 +477,47 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                     AppealViewInfo.from_dict(data) for data in await cursor.fetchall()
                 ]
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    "SELECT * FROM quizzes WHERE author = '%s'", (author_id,)
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    "SELECT * FROM quizzes WHERE author = %s", (author_id,)
                 )
                 quiz_problems = [
                     QuizProblem.from_row(row, cache=copy(self))
-                    for row in cursor.fetchall()
+                    for row in await cursor.fetchall()
                 ]
-                cursor.execute(
-                    "SELECT submissions FROM quiz_submissions WHERE user_id = '%s'",
+                await cursor.execute(
+                    "SELECT submissions FROM quiz_submissions WHERE user_id = %s",
                     (author_id,),
                 )
                 quiz_submissions = [
                     QuizSubmission.from_dict(submission, cache=copy(self))
                     for submission in [
-                        pickle.loads(item["submissions"]) for item in cursor.fetchall()
+                        pickle.loads(item["submissions"]) for item in await cursor.fetchall()
                     ]
                 ]
-                cursor.execute(
-                    "SELECT * FROM problems WHERE author = '%s'", (author_id,)
+                await cursor.execute(
+                    "SELECT * FROM problems WHERE author = %s", (author_id,)
                 )
                 problems = [
                     BaseProblem.from_dict(item, cache=copy(self))
-                    for item in cursor.fetchall()
+                    for item in await cursor.fetchall()
                 ]
-                cursor.execute(
+                await self._load_votes_and_solves(cursor, "%s", problems)
+                await cursor.execute(
                     "SELECT * FROM quiz_submission_sessions WHERE author = %s",
                     (author_id,),
                 )
                 sessions = [
                     QuizSolvingSession.from_mysql_dict(cache=self, dict=item)
-                    for item in cursor.fetchall()
+                    for item in await cursor.fetchall()
                 ]
-                cursor.execute(
+                await cursor.execute(
                     "SELECT * FROM quiz_description WHERE author = %s", (author_id,)
                 )
                 descriptions = [
                     QuizDescription.from_dict(cache=self, data=data)
-                    for data in cursor.fetchall()
+                    for data in await cursor.fetchall()
                 ]
                 await cursor.execute(
                     "SELECT * FROM appeals WHERE user_id=%s", (author_id,)
@@ -318,7 +527,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                     for data in await cursor.fetchall()
                 ]
                 await cursor.execute(
-                    "SELECT * from appeal_view_infos WHERE user_id=?", (author_id)
+                    "SELECT * from appeal_view_infos WHERE user_id=%s", (author_id)
                 )
                 appeal_view_infos = [
                     AppealViewInfo.from_dict(data) for data in await cursor.fetchall()
@@ -339,7 +548,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
         assert isinstance(user_id, int)
         await self.del_user_data(user_id)
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "DELETE FROM problems WHERE author = ?", (user_id,)
@@ -362,29 +571,27 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                 )
                 await conn.commit()  # Otherwise, nothing happens and it rolls back!!
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute("DELETE FROM problems WHERE author = '%s'", (user_id,))
-                cursor.execute("DELETE FROM quizzes WHERE author = '%s'", (user_id,))
-                cursor.execute(
-                    "DELETE FROM quiz_submissions WHERE author = '%s'", (user_id,)
-                )
-                cursor.execute(
-                    "DELETE FROM quiz_submission_sessions WHERE author = %s", (user_id,)
-                )
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute("DELETE FROM problems WHERE author = %s", (user_id,))
+                await cursor.execute("DELETE FROM quizzes WHERE author = %s", (user_id,))
+                await cursor.execute(
+                    "DELETE FROM quiz_submissions WHERE user_id = %s", (user_id,)
+                )
+                await cursor.execute(
+                    "DELETE FROM quiz_submission_sessions WHERE user_id = %s", (user_id,)
+                )
+                await cursor.execute(
                     "DELETE FROM quiz_description WHERE author = %s", (user_id,)
                 )
                 await cursor.execute("DELETE FROM appeals WHERE user_id=%s", (user_id,))
                 await cursor.execute(
-                    "DELETE FROM appeal_view_info WHERE user_id=?", (user_id,)
+                    "DELETE FROM appeal_view_info WHERE user_id=%s", (user_id,)
                 )
-                connection.commit()
+                await connection.commit()
+        for problem_id in self._problem_index.ids_by_author(user_id):
+            self._uncache_problem(None, problem_id)  # Found under the guild it was cached under
+        self._invalidate_cache_refreshes()
 
     async def delete_all_by_guild_id(self, guild_id: int) -> None:
         """Delete all data stored by a given guild. This deletes all problems & quizzes & quiz submissions under that guild!"""
@@ -394,7 +601,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
             )
         assert isinstance(guild_id, int)
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "DELETE FROM problems WHERE guild_id = ?", (guild_id,)
@@ -410,41 +617,41 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                     (guild_id,),
                 )  # Delete all quiz submissions from the guild!
                 await cursor.execute(
-                    "DELETE FROM quiz_description WHERE guild_id = %s", (guild_id,)
+                    "DELETE FROM quiz_description WHERE guild_id = ?", (guild_id,)
                 )
                 await cursor.execute(
-                    "DELETE FROM appeal_view_infos WHERE guild_id=?", (guild_id,)
+                    "DELETE FROM appeal_view_info WHERE guild_id=?", (guild_id,)
                 )
                 await conn.commit()  # Otherwise, nothing happens!
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     "DELETE FROM problems WHERE guild_id = %s", (guild_id,)
                 )  # Remove all guild problems from this guild
-                cursor.execute(
+                await cursor.execute(
                     "DELETE FROM quizzes WHERE guild_id = %s", (guild_id,)
                 )  # Remove all quizzes from the guild
-                cursor.execute(
+                await cursor.execute(
                     "DELETE FROM quiz_submissions WHERE guild_id = %s", (guild_id,)
                 )  # Remove all quiz submissions as well
-                cursor.execute(
+                await cursor.execute(
                     "DELETE FROM quiz_submission_sessions WHERE guild_id = %s",
                     (guild_id,),
                 )
-                cursor.execute(
+                await cursor.execute(
                     "DELETE FROM quiz_description WHERE guild_id = %s", (guild_id,)
                 )
                 await cursor.execute(
-                    "DELETE FROM appeal_view_infos WHERE guild_id=?", (guild_id,)
+                    "DELETE FROM appeal_view_info WHERE guild_id=%s", (guild_id,)
                 )
                 # uh oh - we don't have a guild id
-                connection.commit()
+                await connection.commit()
+        # Cached problems can store the guild id as an int or as a string
+        index = self._problem_index
+        for problem_id in index.ids_by_guild(guild_id) | index.ids_by_guild(str(guild_id)):
+            self._uncache_problem(guild_id, problem_id)
+        self._invalidate_cache_refreshes()
 
     def __bool__(self):
         """Return bool(self)"""
@@ -455,7 +662,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
         log.info("Initializing my internal SQL tables")
         await super().initialize_sql_table()
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS problems (
@@ -471,6 +678,14 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                 )  # Blob types will be compiled with pickle.loads() and pickle.dumps() (they are lists)
                 # author: int = user_id
                 # Create table of problems
+                for table in VOTE_AND_SOLVE_TABLES:
+                    await cursor.execute(
+                        f"""CREATE TABLE IF NOT EXISTS {table} (
+                        problem_id INTEGER NOT NULL,
+                        user_id INTEGER NOT NULL,
+                        PRIMARY KEY (problem_id, user_id)
+                        ) WITHOUT ROWID"""
+                    )  # One row per vote (or solve), so that voting doesn't rewrite the list of voters
                 log.debug("Created problems table")
                 await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS quizzes (
@@ -544,18 +759,26 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                 )
                 # Maybe SQL won't understand enums... but that's ok :)
                 log.debug("Created user_data table")
+                await cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS change_feed (
+                    revision INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name VARCHAR NOT NULL,
+                    item_id INT,
+                    guild_id INT,
+                    deleted INT NOT NULL,
+                    changed_at INT NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INT))
+                    )"""
+                )  # AUTOINCREMENT, so revisions are never reused after the newest entries are deleted
+                for statement in change_feed_trigger_statements(use_sqlite=True):
+                    await cursor.execute(statement)
+                log.debug("Created the change feed")
                 await conn.commit()  # Otherwise, when this closes, the database just reverted!
                 log.debug("Saved!")
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
                 log.debug("Created cursor")
-                cursor.execute(
+                await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS problems (
                         guild_id BIGINT,
                         problem_id BIGINT NOT NULL,
@@ -568,8 +791,16 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                         )"""
                 )  # Blob types will be compiled with pickle.loads() and pickle.dumps() (they are lists)
                 # author: int = user_id
+                for table in VOTE_AND_SOLVE_TABLES:
+                    await cursor.execute(
+                        f"""CREATE TABLE IF NOT EXISTS {table} (
+                        problem_id BIGINT NOT NULL,
+                        user_id BIGINT NOT NULL,
+                        PRIMARY KEY (problem_id, user_id)
+                        )"""
+                    )
                 log.debug("Created problems table!")
-                cursor.execute(
+                await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS quizzes (
                     guild_id BIGINT,
                     quiz_id BIGINT NOT NULL PRIMARY KEY,
@@ -582,7 +813,7 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                 )"""
                 )
                 log.debug("Created quizzes table")
-                cursor.execute(
+                await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS quiz_submissions (
                     guild_id BIGINT,
                     quiz_id BIGINT NOT NULL,
@@ -592,51 +823,134 @@ class MiscRelatedCache(VerificationCodesRelatedCache):
                 )  # as dictionary
                 # Used to store submissions
                 log.debug("Created submissions table")
-                cursor.execute(
+                await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS user_data (
-                    user_id INT,
+                    user_id BIGINT,
                     trusted BOOLEAN DEFAULT false,
                     denylisted BOOLEAN DEFAULT false
                     )"""
                 )
-                cursor.execute(
+                await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS quiz_submission_sessions (
-                    quiz_id INT NOT NULL,
-                    user_id INT NOT NULL,
+                    quiz_id BIGINT NOT NULL,
+                    user_id BIGINT NOT NULL,
                     is_finished INT,
                     start_time INT,
                     expire_time INT,
-                    guild_id INT,
+                    guild_id BIGINT,
                     answers BLOB,
-                    special_id VARCHAR,
+                    special_id VARCHAR(64),
                     attempt_num INT
                     )"""
-                )
-                cursor.execute(
-                    """CREATE TABLE IF NOT EXISTS quiz_description ("
-                               description VARCHAR,
-                               quiz_id INT PRIMARY KEY,
+                )  # MySQL can't index a VARCHAR without a length
+                await cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS quiz_description (
+                               description TEXT,
+                               quiz_id BIGINT PRIMARY KEY,
                                time_limit INT,
                                intensity FLOAT,
-                               license VARCHAR,
-                               category VARCHAR,
-                               author INT,
-                               guild_id INT,
+                               license VARCHAR(255),
+                               category VARCHAR(255),
+                               author BIGINT,
+                               guild_id BIGINT
                                )
                                """
                 )
-                cursor.execute(
+                await cursor.execute(
                     """CREATE TABLE IF NOT EXISTS guild_data (
-                    denylisted INT,
-                    guild_id INT,
-                    can_create_problems_check VARCHAR,
-                    can_create_quizzes_check VARCHAR,
-                    mod_check VARCHAR,
+                    denylisted BOOLEAN,
+                    guild_id BIGINT PRIMARY KEY,
+                    can_create_problems_check JSON,
+                    can_create_quizzes_check JSON,
+                    mod_check JSON
                     )
                     """
-                )
+                )  # The same as in GuildDataRelatedCache
                 # TODO: test whether SQL can serialize enums
                 # I don't know whether SQL can serialize enums
                 log.debug("Created user data table")
-                connection.commit()
+                await cursor.execute(
+                    """CREATE TABLE IF NOT EXISTS change_feed (
+                    revision BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                    table_name VARCHAR(64) NOT NULL,
+                    item_id BIGINT,
+                    guild_id BIGINT,
+                    deleted BOOLEAN NOT NULL,
+                    changed_at BIGINT NOT NULL DEFAULT (UNIX_TIMESTAMP())
+                    )"""
+                )
+                for statement in change_feed_trigger_statements(use_sqlite=False):
+                    await cursor.execute(statement)
+                log.debug("Created the change feed")
+                await connection.commit()
                 log.debug("Saved tables!")
+        await self.apply_schema_migrations()
+
+    async def get_schema_version(self) -> int:
+        """Return the version of the last schema migration applied (0 if none have been applied)"""
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                await conn.execute(SQLITE_SCHEMA_VERSION_TABLE)
+                cursor = await conn.execute("SELECT MAX(version) FROM schema_version")
+                return (await cursor.fetchone())[0] or 0
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                await cursor.execute(MYSQL_SCHEMA_VERSION_TABLE)
+                await cursor.execute("SELECT MAX(version) FROM schema_version")
+                return (await cursor.fetchone())[0] or 0
+
+    async def apply_schema_migrations(self) -> int:
+        """Apply the schema migrations that haven't been applied yet, in order, and return the new schema version.
+        Migrations that were already applied are skipped. If a migration fails, it is rolled back (on SQLite),
+        and the exception is raised, because the code after it expects the whole schema to be there.
+        The migration is retried on the next startup."""
+        version = await self.get_schema_version()
+        for migration in SCHEMA_MIGRATIONS:
+            if migration.version <= version:
+                continue
+            log.info(
+                f"Applying schema migration {migration.version}: {migration.description}"
+            )
+            await self._apply_schema_migration(migration)
+            version = migration.version
+        return version
+
+    async def _apply_schema_migration(self, migration: SchemaMigration) -> None:
+        """Apply one migration and record it in schema_version"""
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                # SQLite can roll back DDL, so either the whole migration is applied or none of it is
+                await conn.execute("BEGIN")
+                cursor = await conn.cursor()
+                if migration.prepare is not None:
+                    await migration.prepare(cursor, True)
+                for statement in migration.sqlite_statements:
+                    await cursor.execute(statement)
+                if migration.data_migration is not None:
+                    await migration.data_migration(cursor, True)
+                await cursor.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (migration.version, migration.description, int(time.time())),
+                )
+                await conn.commit()
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                if migration.prepare is not None:
+                    await migration.prepare(cursor, False)
+                for statement in migration.mysql_statements:
+                    # MySQL commits after every DDL statement, so a migration that failed halfway
+                    # could have created some of its indexes or columns already
+                    try:
+                        await cursor.execute(statement)
+                    except pymysql.err.MySQLError as exc:
+                        if exc.args[0] not in MYSQL_ALREADY_EXISTS_ERRORS:
+                            raise
+                if migration.data_migration is not None:
+                    await migration.data_migration(cursor, False)
+                await cursor.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (%s, %s, %s)",
+                    (migration.version, migration.description, int(time.time())),
+                )
+                await connection.commit()
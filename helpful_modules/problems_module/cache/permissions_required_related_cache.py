@@ -29,7 +29,8 @@ This uses config.json.
 
 The dict in the permissions_needed key should not be modified.
 
-Also, most of the logic is delegated either to UserDataRequiredCache or AsyncFileReader
+Also, most of the logic is delegated either to UserDataRequiredCache or ConfigSource
+(which only parses config.json again when it changes)
 
 Of course, this is licensed under the AGPLv3.
 
@@ -38,7 +39,7 @@ Of course, this is licensed under the AGPLv3.
 
 import typing
 
-from ...FileDictionaryReader import AsyncFileDict
+from ...config_source import ConfigSource
 from ..user_data import UserData
 from .user_data_related_cache import UserDataRelatedCache
 
@@ -46,18 +47,23 @@ from .user_data_related_cache import UserDataRelatedCache
 class PermissionsRequiredRelatedCache(UserDataRelatedCache):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._async_file_dict = AsyncFileDict("config.json")
+        if not hasattr(self, "_config_source"):  # initialize_sql_table might have created it already
+            self._config_source = ConfigSource("config.json")
 
     async def get_permissions_required_for_command(
         self, command_name
-    ) -> typing.Dict[str, bool]:
-        await self._async_file_dict.read_from_file()
-        return self._async_file_dict.dict["permissions_required"][command_name]
+    ) -> typing.Mapping[str, bool]:
+        """Return the (read-only) permissions required to use a command. config.json is only parsed when it changes."""
+        return await self._config_source.get_permissions_required_for_command(command_name)
+
+    async def reload_config(self) -> None:
+        """Read config.json again, even if it doesn't look like it has changed"""
+        await self._config_source.reload()
 
     async def user_meets_permissions_required_to_use_command(
         self,
         user_id: int,
-        permissions_required: typing.Optional[typing.Dict[str, bool]] = None,
+        permissions_required: typing.Optional[typing.Mapping[str, bool]] = None,
         command_name: str | None = None,
     ) -> bool:
         """Return whether the user meets permissions required to use the command"""
@@ -86,8 +92,8 @@ class PermissionsRequiredRelatedCache(UserDataRelatedCache):
         return True
 
     async def initialize_sql_table(self) -> None:
-        """Initialize file dictionary from config.json."""
+        """Read config.json."""
         await super().initialize_sql_table()
-        if not hasattr(self, "_async_file_dict"):
-            self._async_file_dict = AsyncFileDict("config.json")
-        await self._async_file_dict.read_from_file()
+        if not hasattr(self, "_config_source"):
+            self._config_source = ConfigSource("config.json")
+        await self._config_source.reload()
@@ -23,6 +23,7 @@ Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
 
 import asyncio
+import collections
 import logging
 import pickle
 import sqlite3
@@ -32,18 +33,43 @@ from copy import copy, deepcopy
 from types import FunctionType
 from typing import *
 
-import aiosqlite
 import disnake
+import disnake.ext.commands
+import aiomysql
+from aiomysql import DictCursor
 
 from helpful_modules.dict_factory import dict_factory
 
 from ..base_problem import BaseProblem
+from ..column_codec import decode_list, encode_answers, encode_id_list, is_pickled
 from ..errors import *
-from ..mysql_connector_with_stmt import mysql_connection
+from ..mysql_connection_pool import MySQLConnectionPool
 from ..parse_problem import convert_dict_to_problem, convert_row_to_problem
+from ..problem_index import ProblemIndex
+from ..query import ProblemQuery, normalize
 from ..quizzes import QuizProblem
+from ..single_flight import SingleFlight
+from ..sqlite_connection_pool import SQLiteConnectionPool
+from ..ttl_cache import TTLCache
 
 log = logging.getLogger(__name__)
+# How many ids to put in one "WHERE ... IN (...)"
+WHERE_IN_CHUNK_SIZE = 500
+# How many revisions before the last one seen update_cache() reads again, to find changes that committed late
+CHANGE_FEED_REREAD_WINDOW = 1000
+# table -> (the column of the problems table that counts its rows, the attribute of BaseProblem it is loaded into)
+VOTE_AND_SOLVE_TABLES = {
+    "problem_votes": ("num_voters", "voters"),
+    "problem_solves": ("num_solvers", "solvers"),
+}
+# ProblemQuery field -> column (or, for collections, a condition with a placeholder for the user id)
+PROBLEM_QUERY_COLUMNS = {
+    "id": "problem_id",
+    "guild_id": "guild_id",
+    "author": "author",
+    "voters": "problem_id IN (SELECT problem_id FROM problem_votes WHERE user_id = {placeholder})",
+    "solvers": "problem_id IN (SELECT problem_id FROM problem_solves WHERE user_id = {placeholder})",
+}
 
 
 # TODO: make a function that takes into account the 3 types of problems, and make a function that given a problem dictionary, converts the problem to the right type
@@ -66,8 +92,33 @@ class ProblemsRelatedCache:
         db_name: str = "problems_module.db",
         update_cache_by_default_when_requesting: bool = True,
         use_cached_problems: bool = False,
+        sqlite_reader_connections: int = 4,
+        sqlite_pragmas: Optional[Dict[str, Any]] = None,
+        sqlite_profile: str = "default",
+        sqlite_group_commit_delay: float = 0.002,
+        mysql_pool_min_size: int = 1,
+        mysql_pool_max_size: int = 10,
+        mysql_statement_timeout: Optional[float] = None,
+        mysql_acquire_timeout: Optional[float] = None,
+        cache_refresh_min_interval: float = 0.5,
+        user_data_cache_size: int = 4096,
+        user_data_cache_ttl: float = 60.0,
+        guild_data_cache_size: int = 1024,
+        guild_data_cache_ttl: float = 300.0,
     ):
         """Create a new MathProblemCache. The arguments should be self-explanatory.
+        sqlite_reader_connections is the number of persistent reader connections (there is always 1 writer connection),
+        and sqlite_pragmas are the pragmas to run on every SQLite connection when it is opened.
+        sqlite_profile is a named set of pragmas to run before those (see SQLITE_PROFILES).
+        "throughput" makes SQLite use write-ahead logging, so readers don't block on the writer.
+        Small SQLite writes (votes, solves, quiz sessions, user data and appeals) are queued, and the ones queued within
+        sqlite_group_commit_delay seconds of each other are committed in one transaction.
+        The mysql_pool_* arguments control the MySQL connection pool, and the timeouts are in seconds.
+        Concurrent calls to update_cache() or cache_all_problems() share one refresh, and calls less than
+        cache_refresh_min_interval seconds after a refresh finished don't refresh again (unless this process wrote
+        to a cached table since the refresh started, so that it always sees its own writes).
+        Up to user_data_cache_size UserData rows are kept in memory for user_data_cache_ttl seconds
+        (set user_data_cache_size to 0 to disable this), and the guild_data_cache_* arguments do the same for GuildData.
         Many methods are async!"""
         self.cached_submissions_organized_by_dict = None
         log.info("Initializing the MathProblemCache object.")
@@ -99,6 +150,27 @@ class ProblemsRelatedCache:
         self.mysql_password = mysql_password
         self.mysql_db_ip = mysql_db_ip
         self.mysql_db_name = mysql_db_name
+        self.sqlite_pool = SQLiteConnectionPool(
+            db_name,
+            num_readers=sqlite_reader_connections,
+            pragmas=sqlite_pragmas,
+            profile=sqlite_profile,
+            group_commit_delay=sqlite_group_commit_delay,
+        )  # Every SQLite method borrows a connection from here instead of reconnecting
+        self.mysql_pool = MySQLConnectionPool(
+            host=mysql_db_ip,
+            user=mysql_username,
+            password=mysql_password,
+            db=mysql_db_name,
+            min_size=mysql_pool_min_size,
+            max_size=mysql_pool_max_size,
+            statement_timeout=mysql_statement_timeout,
+            acquire_timeout=mysql_acquire_timeout,
+        )  # Same for MySQL
+        self._update_cache_flight = SingleFlight(cache_refresh_min_interval)
+        self._cache_all_problems_flight = SingleFlight(cache_refresh_min_interval)
+        self._user_data_cache = TTLCache(user_data_cache_size, user_data_cache_ttl)
+        self._guild_data_cache = TTLCache(guild_data_cache_size, guild_data_cache_ttl)
         asyncio.run(
             self.initialize_sql_table()
         )  # Initialize the SQL tables (but asyncio.run() has to be used because __init__ cannot be async)
@@ -109,9 +181,18 @@ class ProblemsRelatedCache:
         self.cached_submissions = []
         self.cached_quizzes = []
         self.guild_problems = dict()
+        self._problem_index = ProblemIndex()  # Must be kept in sync with guild_problems
         self._guilds: typing.List[disnake.Guild] = []
         # asyncio.run(self.update_cache())
         self.cached_sessions = {}
+        self._cached_quizzes_by_id = {}
+        self._change_feed_revision = None  # The last change feed revision applied by update_cache()
+        # The revisions in the re-read window that have been applied (see MiscRelatedCache._update_cache_with_cursor)
+        self._applied_revisions: typing.Set[int] = set()
+        # InnoDB hands out AUTO_INCREMENT values when rows are inserted, not when transactions commit,
+        # so a change can show up after changes with higher revisions. SQLite has one writer, so it can't.
+        self.change_feed_reread_window = 0 if self.use_sqlite else CHANGE_FEED_REREAD_WINDOW
+        self._maintenance_task: typing.Optional[asyncio.Task] = None  # See MiscRelatedCache.start_maintenance
 
     async def bgsave(
         self,
@@ -139,6 +220,35 @@ class ProblemsRelatedCache:
         """
         raise BGSaveNotSupportedOnSQLException("Only Redis caches can do bgsave")
 
+    async def close(self) -> None:
+        """Close the connections to the database. Call this when the bot closes."""
+        await self.sqlite_pool.close()
+        await self.mysql_pool.close()
+
+    def get_a_connection(self) -> typing.AsyncContextManager[aiomysql.Connection]:
+        """Borrow a MySQL connection from the pool. Use this with `async with`.
+        Anything that hasn't been committed is rolled back when the connection is given back."""
+        return self.mysql_pool.connection()
+
+    @property
+    def mysql_pool_stats(self) -> dict:
+        """Return statistics about how long it takes to get a MySQL connection"""
+        return {
+            "size": self.mysql_pool.size,
+            "free_size": self.mysql_pool.free_size,
+            **self.mysql_pool.stats.to_dict(),
+        }
+
+    @property
+    def user_data_cache_stats(self) -> dict:
+        """Return the hit/miss counters of the UserData cache"""
+        return self._user_data_cache.stats
+
+    @property
+    def guild_data_cache_stats(self) -> dict:
+        """Return the hit/miss counters of the GuildData cache"""
+        return self._guild_data_cache.stats
+
     async def convert_to_dict(self) -> dict:
         """A method that converts self to a dictionary (not used, will probably be removed soon)"""
         e = {}
@@ -212,7 +322,7 @@ class ProblemsRelatedCache:
         else:
             # Otherwise, use SQL to get the problem!
             if self.use_sqlite:
-                async with aiosqlite.connect(self.db_name) as conn:
+                async with self.sqlite_pool.reader() as conn:
                     try:
                         conn.row_factory = dict_factory  # Make sure the row_factory can be set to dict_factory
                     except Exception as e:
@@ -248,35 +358,40 @@ class ProblemsRelatedCache:
                         row = dict_factory(cursor, rows[0])  #
                     else:
                         row = rows[0]
-                    return convert_dict_to_problem(row, cache=copy(self))
+                    problem = convert_dict_to_problem(row, cache=copy(self))
+                    await self._load_votes_and_solves(cursor, "?", [problem])
+                    return problem
             else:
-                with mysql_connection(
-                    host=self.mysql_db_ip,
-                    password=self.mysql_password,
-                    user=self.mysql_username,
-                    database=self.mysql_db_name,
-                ) as connection:
-                    cursor = connection.cursor(dictionaries=True)
-                    cursor.execute(
+                async with self.get_a_connection() as connection:
+                    cursor = await connection.cursor(DictCursor)
+                    await cursor.execute(
                         "SELECT * from problems WHERE problem_id = %s", (problem_id,)
                     )  # Get the problem
-                    rows = cursor.fetchall()
+                    rows = await cursor.fetchall()
                     if len(rows) == 0:
                         raise ProblemNotFound("Problem not found!")
                     elif len(rows) > 1:
                         raise TooManyProblems(
                             "Uh oh... 2 problems exist with the same guild id and the same problem id"
                         )
-                    return convert_row_to_problem(cache=copy(self), row=rows[0])
+                    problem = convert_row_to_problem(cache=copy(self), row=rows[0])
+                    await self._load_votes_and_solves(cursor, "%s", [problem])
+                    return problem
 
     async def cache_all_problems(self):
+        """Reload every problem into the cache. Concurrent calls share one reload."""
+        await self._cache_all_problems_flight.run(self._cache_all_problems)
+
+    async def _cache_all_problems(self):
         self.guild_ids = set()
         self.guild_problems = {}
+        self._problem_index.clear()
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute("SELECT * FROM problems")  # Get all problems
+                problems = []
                 for row in await cursor.fetchall():  # For each problem:
                     if not isinstance(row, dict):
 
@@ -285,45 +400,139 @@ class ProblemsRelatedCache:
                         )  # Convert the problems to problem objects
                     else:
                         problem = convert_row_to_problem(row=row, cache=None)
-                    if (
-                        problem.guild_id not in self.guild_ids
-                    ):  # Similar logic: Make sure it's there!
-                        self.guild_ids.add(problem.guild_id)
-                        self.guild_problems[problem.guild_id] = (
-                            {}
-                        )  # For quick, cached access?
+                    problems.append(problem)
+                await self._load_votes_and_solves(
+                    cursor, "?", problems, every_problem=True
+                )
+                for problem in problems:
                     try:
-                        self.guild_problems[problem.guild_id][problem.id] = problem
+                        self._cache_problem(problem)
                     except BaseException as e:
                         raise SQLException(
                             "The cache could not be updated because assigning the problem failed!"
                         ) from e
             return
 
-        with mysql_connection(
-            host=self.mysql_db_ip,
-            password=self.mysql_password,
-            user=self.mysql_username,
-            database=self.mysql_db_name,
-        ) as connection:
-            cursor = connection.cursor(dictionaries=True)
-            cursor.execute("SELECT * FROM problems")  # Get all problems
-            for row in cursor.fetchall():
-                problem = convert_row_to_problem(row, cache=None)
-                if (
-                    problem.guild_id not in self.guild_ids
-                ):  # Similar logic: Make sure it's there!
-                    self.guild_ids.add(problem.guild_id)
-                    self.guild_problems[problem.guild_id] = (
-                        {}
-                    )  # For quick, cached access?
+        async with self.get_a_connection() as connection:
+            cursor = await connection.cursor(DictCursor)
+            await cursor.execute("SELECT * FROM problems")  # Get all problems
+            problems = [
+                convert_row_to_problem(row, cache=None)
+                for row in await cursor.fetchall()
+            ]
+            await self._load_votes_and_solves(
+                cursor, "%s", problems, every_problem=True
+            )
+            for problem in problems:
                 try:
-                    self.guild_problems[problem.guild_id][problem.id] = problem
+                    self._cache_problem(problem)
                 except BaseException as e:
                     raise SQLException(
                         "An error occurred while assigning the problem..."
                     ) from e
 
+    @staticmethod
+    def _where_in(
+        column: str, ids: Optional[Set[int]], placeholder: str
+    ) -> Iterator[Tuple[str, tuple]]:
+        """Yield (WHERE clause, parameters) pairs that select the rows whose column is in ids, in chunks
+        (because there is a limit to how many parameters a statement can have). If ids is None, select every row."""
+        if ids is None:
+            yield "", ()
+            return
+        ids = sorted(ids)
+        for start in range(0, len(ids), WHERE_IN_CHUNK_SIZE):
+            chunk = tuple(ids[start : start + WHERE_IN_CHUNK_SIZE])
+            yield f" WHERE {column} IN ({', '.join([placeholder] * len(chunk))})", chunk
+
+    async def _load_votes_and_solves(
+        self,
+        cursor,
+        placeholder: str,
+        problems: typing.Iterable[BaseProblem],
+        every_problem: bool = False,
+    ) -> None:
+        """Add the voters and solvers stored in problem_votes and problem_solves to problems that were just read.
+        The cursor must return rows as dictionaries. If every_problem is True, problems are all the problems,
+        so the whole tables are read instead of looking up each problem."""
+        problems_by_id = {problem.id: problem for problem in problems}
+        if not problems_by_id:
+            return
+        problem_ids = None if every_problem else set(problems_by_id)
+        for table, (_, attribute) in VOTE_AND_SOLVE_TABLES.items():
+            for where, params in self._where_in("problem_id", problem_ids, placeholder):
+                await cursor.execute(
+                    f"SELECT problem_id, user_id FROM {table}" + where, params
+                )
+                for row in await cursor.fetchall():
+                    problem = problems_by_id.get(row["problem_id"])
+                    if problem is not None:
+                        getattr(problem, attribute).append(row["user_id"])
+
+    @staticmethod
+    def _guild_key(guild_id) -> typing.Optional[int]:
+        """Return the key of guild_problems for this guild id. Problems store the guild id as a string
+        (or as "None"), but guild_problems is keyed by the int guild id (or None for global problems)."""
+        guild_id = normalize(guild_id)
+        if guild_id is None:
+            return None
+        return int(guild_id)
+
+    def _cache_problem(self, problem: BaseProblem) -> None:
+        """Put a problem in the cache (and the indexes), replacing the cached problem with the same id"""
+        guild_id = self._guild_key(problem.guild_id)
+        self._uncache_problem(guild_id, problem.id)
+        self.guild_ids.add(guild_id)
+        try:
+            self.guild_problems[guild_id][problem.id] = problem
+        except KeyError:
+            self.guild_problems[guild_id] = {problem.id: problem}
+        self._problem_index.add(problem)
+
+    def _uncache_problem(self, guild_id: typing.Optional[int], problem_id: int) -> None:
+        """Remove a problem from the cache (and the indexes). This does nothing if it isn't cached."""
+        indexed_problem = self._problem_index.get(problem_id)
+        guild_ids = {self._guild_key(guild_id)}
+        if indexed_problem is not None:
+            # The problem could have been cached under a different guild
+            guild_ids.add(self._guild_key(self._problem_index.guild_id_of(problem_id)))
+        for _guild_id in guild_ids:
+            try:
+                del self.guild_problems[_guild_id][problem_id]
+            except KeyError:
+                pass
+        self._problem_index.remove(problem_id)
+
+    async def get_problems_by_author_id(
+        self, author_id: int, replace_cache: bool = False
+    ) -> typing.List[BaseProblem]:
+        """Return the cached problems written by the author, sorted by id. Takes O(number of problems found) time."""
+        assert isinstance(author_id, int)
+        if replace_cache:
+            await self.cache_all_problems()
+        index = self._problem_index
+        return index.problems(index.ids_by_author(author_id))
+
+    async def get_problems_voted_for_by(
+        self, user_id: int, replace_cache: bool = False
+    ) -> typing.List[BaseProblem]:
+        """Return the cached problems the user voted for, sorted by id. Takes O(number of problems found) time."""
+        assert isinstance(user_id, int)
+        if replace_cache:
+            await self.cache_all_problems()
+        index = self._problem_index
+        return index.problems(index.ids_voted_by(user_id))
+
+    async def get_problems_solved_by(
+        self, user_id: int, replace_cache: bool = False
+    ) -> typing.List[BaseProblem]:
+        """Return the cached problems the user solved, sorted by id. Takes O(number of problems found) time."""
+        assert isinstance(user_id, int)
+        if replace_cache:
+            await self.cache_all_problems()
+        index = self._problem_index
+        return index.problems(index.ids_solved_by(user_id))
+
     @property
     def global_problems(self):
         return self.guild_problems.get(None, {})
@@ -332,6 +541,12 @@ class ProblemsRelatedCache:
     def global_problems(self, value):
         self.guild_problems[None] = value
 
+    def _invalidate_cache_refreshes(self) -> None:
+        """Make the next update_cache() and cache_all_problems() read the database again, even if the last refresh
+        is still fresh or was in flight during the write. Call this after writing to a cached table."""
+        self._update_cache_flight.invalidate()
+        self._cache_all_problems_flight.invalidate()
+
     async def get_all_problems(self, replace_cache: bool = False):
         if replace_cache:
             await self.cache_all_problems()
@@ -371,7 +586,8 @@ class ProblemsRelatedCache:
         args: typing.Optional[typing.Union[tuple, list]] = None,
         kwargs: Optional[dict] = None,
     ) -> typing.List[BaseProblem]:
-        """Returns the list of all problems that match the given function. args and kwargs are extra parameters to give to the function"""
+        """Returns the list of all problems that match the given function. args and kwargs are extra parameters to give to the function.
+        This looks at every cached problem; if the condition can be written as a ProblemQuery, use get_problems instead."""
         if args is None:
             args = []
         if kwargs is None:
@@ -395,6 +611,51 @@ class ProblemsRelatedCache:
         problems_that_meet_the_criteria.extend(guild_problems_that_meet_the_criteria)
         return problems_that_meet_the_criteria
 
+    async def get_problems(
+        self, query: ProblemQuery, replace_cache: bool = False
+    ) -> typing.List[BaseProblem]:
+        """Return the problems that match the query. If problems are cached, the cache's indexes answer the query;
+        otherwise, it is compiled to SQL, so that only the matching rows are read."""
+        if not isinstance(query, ProblemQuery):
+            raise TypeError("query is not a ProblemQuery")
+        if self.use_cached_problems:
+            if replace_cache:
+                await self.cache_all_problems()
+            return self._problem_index.query(query)
+        placeholder = "?" if self.use_sqlite else "%s"
+        columns = {
+            field: column.format(placeholder=placeholder)
+            for field, column in PROBLEM_QUERY_COLUMNS.items()
+        }
+        if self.use_sqlite:
+            async with self.sqlite_pool.reader() as conn:
+                conn.row_factory = dict_factory
+                cursor = await conn.cursor()
+                return await self._select_problems(cursor, placeholder, query, columns)
+        async with self.get_a_connection() as connection:
+            cursor = await connection.cursor(DictCursor)
+            return await self._select_problems(cursor, placeholder, query, columns)
+
+    async def _select_problems(
+        self, cursor, placeholder: str, query: ProblemQuery, columns: Dict[str, str]
+    ) -> typing.List[BaseProblem]:
+        """Select the problems that match the query. The cursor must return rows as dictionaries.
+        Long where_in() conditions are split into chunks of WHERE_IN_CHUNK_SIZE values, one statement per chunk."""
+        clauses = list(query.where_sql_chunks(columns, placeholder, WHERE_IN_CHUNK_SIZE))
+        problems = []
+        for where, params in clauses:
+            await cursor.execute(
+                "SELECT * FROM problems" + where + query.order_sql(columns), params
+            )
+            problems.extend(
+                convert_row_to_problem(row, cache=None)
+                for row in await cursor.fetchall()
+            )
+        if len(clauses) > 1:
+            problems = query.sort_and_limit(problems)  # Merge the chunks
+        await self._load_votes_and_solves(cursor, placeholder, problems)
+        return problems
+
     async def get_global_problems(
         self: "MathProblemCache", replace_cache: bool = False
     ) -> typing.List[BaseProblem]:
@@ -422,9 +683,10 @@ class ProblemsRelatedCache:
     async def add_problem(
         self, problem_id: int, problem: BaseProblem
     ) -> Optional[BaseProblem]:
-        """Adds a problem and returns the added MathProblem"""
+        """Adds a problem and returns the added MathProblem.
+        The limit is checked with a COUNT(*) on the indexed guild_id column, in the same transaction as the insert,
+        so this never reloads the cache."""
         # Preliminary checks -otherwise SQL bugs
-        guild_id = problem.guild_id
         if not isinstance(problem_id, int):
             if self.warnings:
                 warnings.warn(
@@ -432,89 +694,181 @@ class ProblemsRelatedCache:
                 )
             else:
                 raise TypeError("problem_id is not a integer.")
-
-        # Make sure the problem does not exist!
-
-        try:
-            if (await self.get_problem(None, problem_id)) is not None:
-                raise MathProblemsModuleException(
-                    "Problem already exists! Use update_problem instead"
-                )
-        except ProblemNotFound:
-            # an exception raised when the problem does not exist! That means we're good to add the problem!
-            pass
-
-        if self.update_cache_by_default_when_requesting:
-            # Used to determine whether it has reached the limit! Takes O(N) time
-            await self.update_cache()
-        try:
-            if guild_id is None:
-                # There is no limit for global problems (which could be exploited!)
-                pass
-            elif (
-                len(self.guild_problems[guild_id]) >= self.max_guild_problems
-            ):  # Make sure this doesn't go over the max guild problem limit (which is 150)
-                raise TooManyProblems(
-                    f"There are already {self.max_guild_problems} problems!"
-                )
-        except KeyError:  # New guild creating first problem
-            pass
         if not isinstance(
             problem, BaseProblem
         ):  # Make sure it's actually a Problem and not something else
             raise TypeError("Problem is not a valid Problem object.")
-        # All the checks passed, hooray! Now let's add the problem.
+        # add_problems raises if the problem already exists, duplicates another problem, or the guild has too many problems
+        return (await self.add_problems([problem]))[0]
+
+    async def add_problems(
+        self, problems: typing.Iterable[BaseProblem], skip_duplicates: bool = False
+    ) -> typing.List[BaseProblem]:
+        """Add many problems at once and return them. This is much faster than calling add_problem for each problem,
+        because the limits are checked once and the problems are inserted with one executemany, in one transaction.
+        Either every problem is added or none of them are.
+        Raises MathProblemsModuleException if a problem id is already used (or used twice),
+        TooManyProblems if a guild would have more than max_guild_problems problems,
+        and DuplicateProblem if a problem has the same question and answers as another problem in its guild.
+        If skip_duplicates is True, duplicates are left out instead (so they aren't in the returned list)."""
+        problems = list(problems)
+        for problem in problems:
+            if not isinstance(problem, BaseProblem) or isinstance(problem, QuizProblem):
+                raise TypeError(f"{problem} is not a valid Problem object.")
+        problem_ids = [int(problem.id) for problem in problems]
+        if len(set(problem_ids)) != len(problem_ids):
+            raise MathProblemsModuleException("Two of the problems have the same id!")
+        if not problems:
+            return []
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
-                try:
-                    conn.row_factory = dict_factory  # Make sure the row_factory can be set to dict_factory
-                except BaseException as exc:
-                    # Not writeable?
-                    if isinstance(exc, AttributeError):  # Can't set attribute
-                        pass
-                    else:
-                        raise  # Re-raise the exception
+            async with self.sqlite_pool.writer() as conn:
+                # Take the write lock now, so that nothing can be added between the checks and the inserts
+                await conn.execute("BEGIN IMMEDIATE")
                 cursor = await conn.cursor()
-                # We will raise if the problem already exists!
-                await cursor.execute(
-                    """INSERT INTO problems (guild_id, problem_id, question, answers, voters, solvers, author, extra_stuff)
-                VALUES (?,?,?,?,?,?,?,?); COMMIT;""",
-                    (
-                        problem.guild_id,  # We expect the problem's guild id to be either an integer or None
-                        int(problem.id),
-                        problem.get_question(),
-                        pickle.dumps(problem.answers),
-                        pickle.dumps(problem.get_voters()),
-                        pickle.dumps(problem.get_solvers()),
-                        int(problem.author),
-                        str(problem.get_extra_stuff()),
-                    ),
+                problems = await self._insert_new_problems(
+                    cursor, "?", problems, skip_duplicates
                 )
-
                 await conn.commit()
-            return problem
         else:
-            async with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = await connection.cursor(dictionaries=True)
-                await cursor.execute(
-                    """INSERT INTO problems (guild_id, problem_id, question, answer, voters, solvers, author, extra_stuff)
-                VALUES (%s,%s,%s,%b,%b,%b,%s, %s)""",
-                    (
-                        int(problem.guild_id),
-                        int(problem.id),
-                        problem.get_question(),
-                        pickle.dumps(problem.answers),
-                        pickle.dumps(problem.get_voters()),
-                        pickle.dumps(problem.get_solvers()),
-                        int(problem.author),
-                        str(problem.get_extra_stuff()),
-                    ),
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                problems = await self._insert_new_problems(
+                    cursor, "%s", problems, skip_duplicates
                 )
+                await connection.commit()
+        self._invalidate_cache_refreshes()
+        for problem in problems:
+            self._cache_problem(problem)
+        log.info(f"Added {len(problems)} problems")
+        return problems
+
+    async def _insert_new_problems(
+        self,
+        cursor,
+        placeholder: str,
+        problems: typing.List[BaseProblem],
+        skip_duplicates: bool,
+    ) -> typing.List[BaseProblem]:
+        """Check the problems and insert them (but don't commit). Returns the problems that were inserted.
+        The cursor must return rows as tuples."""
+        fingerprints = [problem.get_content_fingerprint() for problem in problems]
+        problems, fingerprints = await self._remove_duplicates(
+            cursor, placeholder, problems, fingerprints, skip_duplicates
+        )
+        if not problems:
+            return []
+        await self._check_new_problems(
+            cursor,
+            placeholder,
+            [int(problem.id) for problem in problems],
+            collections.Counter(
+                int(problem.guild_id) for problem in problems if problem.guild_id is not None
+            ),  # There is no limit for global problems
+        )
+        await cursor.executemany(
+            f"""INSERT INTO problems (guild_id, problem_id, question, answers, voters, solvers, author, extra_stuff, content_fingerprint)
+            VALUES ({", ".join([placeholder] * 9)})""",
+            [
+                (
+                    problem.guild_id,
+                    int(problem.id),
+                    problem.get_question(),
+                    encode_answers(problem.answers),
+                    encode_id_list(()),  # The voters and solvers are stored in their own tables
+                    encode_id_list(()),
+                    int(problem.author),
+                    str(problem.get_extra_stuff()),
+                    fingerprint,
+                )
+                for problem, fingerprint in zip(problems, fingerprints)
+            ],
+        )
+        for problem in problems:
+            await self._insert_votes_and_solves(cursor, placeholder, problem)
+        return problems
+
+    async def _remove_duplicates(
+        self,
+        cursor,
+        placeholder: str,
+        problems: typing.List[BaseProblem],
+        fingerprints: typing.List[str],
+        skip_duplicates: bool,
+    ) -> typing.Tuple[typing.List[BaseProblem], typing.List[str]]:
+        """Find the problems that duplicate an existing problem (or an earlier problem in the list) in the same guild.
+        Raise DuplicateProblem, or if skip_duplicates is True, return the other problems and their fingerprints.
+        This is one lookup in the (content_fingerprint, guild_id) index per 500 problems."""
+        seen = set()
+        for where, params in self._where_in("content_fingerprint", set(fingerprints), placeholder):
+            await cursor.execute(
+                "SELECT content_fingerprint, guild_id FROM problems" + where, params
+            )
+            seen.update(
+                (fingerprint, None if guild_id is None else int(guild_id))
+                for fingerprint, guild_id in await cursor.fetchall()
+            )
+        unique_problems = []
+        unique_fingerprints = []
+        for problem, fingerprint in zip(problems, fingerprints):
+            key = (fingerprint, None if problem.guild_id is None else int(problem.guild_id))
+            if key in seen:
+                if skip_duplicates:
+                    continue
+                raise DuplicateProblem(
+                    f"A problem with the same question and answers as problem {problem.id} already exists!"
+                )
+            seen.add(key)
+            unique_problems.append(problem)
+            unique_fingerprints.append(fingerprint)
+        return unique_problems, unique_fingerprints
+
+    async def _check_new_problems(
+        self,
+        cursor,
+        placeholder: str,
+        problem_ids: typing.List[int],
+        new_problems_per_guild: typing.Mapping[int, int],
+    ) -> None:
+        """Make sure none of the problem ids are used, and that no guild would go over the limit.
+        The cursor must return rows as tuples."""
+        for where, params in self._where_in("problem_id", set(problem_ids), placeholder):
+            await cursor.execute("SELECT problem_id FROM problems" + where, params)
+            existing_ids = [row[0] for row in await cursor.fetchall()]
+            if existing_ids:
+                raise MathProblemsModuleException(
+                    f"Problems with the ids {existing_ids} already exist! Use update_problem instead"
+                )
+        num_problems_per_guild = collections.Counter(new_problems_per_guild)
+        for where, params in self._where_in(
+            "guild_id", set(new_problems_per_guild), placeholder
+        ):
+            await cursor.execute(
+                f"SELECT guild_id, COUNT(*) FROM problems{where} GROUP BY guild_id",
+                params,
+            )
+            for guild_id, count in await cursor.fetchall():
+                num_problems_per_guild[guild_id] += count
+        for guild_id, count in num_problems_per_guild.items():
+            if count > self.max_guild_problems:
+                raise TooManyProblems(
+                    f"The guild {guild_id} would have {count} problems, but the limit is {self.max_guild_problems}!"
+                )
+
+    async def count_guild_problems(self, guild_id: int) -> int:
+        """Return how many problems the guild has, without loading them (problems.guild_id is indexed)"""
+        assert isinstance(guild_id, int)
+        if self.use_sqlite:
+            async with self.sqlite_pool.reader() as conn:
+                cursor = await conn.execute(
+                    "SELECT COUNT(*) FROM problems WHERE guild_id = ?", (guild_id,)
+                )
+                return (await cursor.fetchone())[0]
+        async with self.get_a_connection() as connection:
+            cursor = await connection.cursor()
+            await cursor.execute(
+                "SELECT COUNT(*) FROM problems WHERE guild_id = %s", (guild_id,)
+            )
+            return (await cursor.fetchone())[0]
 
     async def remove_problem(
         self, guild_id: typing.Optional[int], problem_id: int
@@ -537,7 +891,7 @@ class ProblemsRelatedCache:
             else:
                 raise TypeError("problem_id isn't an integer!")
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 try:
                     conn.row_factory = dict_factory  # Make sure the row_factory can be set to dict_factory
                 except BaseException as exc:
@@ -557,72 +911,61 @@ class ProblemsRelatedCache:
                     "DELETE FROM problems WHERE problem_id = ?",
                     (problem_id,),
                 )  # The actual deletion
-                try:
-                    del self.guild_problems[guild_id][
-                        problem_id
-                    ]  # Delete from the cache
-                    await self.update_cache()
-                except KeyError:
-                    # It's already deleted!
-                    pass
-
                 await conn.commit()
+            self._invalidate_cache_refreshes()
+            self._uncache_problem(guild_id, problem_id)  # Delete from the cache
 
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     "DELETE FROM problems WHERE problem_id = %s",
                     (problem_id,),
                 )  # The actual deletion
-                connection.commit()
-                try:
-                    del self.guild_problems[guild_id][
-                        problem_id
-                    ]  # Delete from the cache
-                    await self.update_cache()
-                except KeyError:
-                    pass
+                await connection.commit()
+            self._invalidate_cache_refreshes()
+            self._uncache_problem(guild_id, problem_id)  # Delete from the cache
 
-    async def remove_duplicate_problems(self) -> None:
-        """Deletes duplicate problems. Takes O(N^2) time which is slow"""
+    async def remove_duplicate_problems(self) -> int:
+        """Deletes the problems that have the same question and answers as an older problem in the same guild
+        (problems with the same content fingerprint), keeping the problem with the smallest id.
+        Returns how many problems were deleted. The duplicates are found with one GROUP BY."""
+        # MySQL can't select from the table being deleted from, unless the subquery is a derived table
+        select_duplicates = """SELECT guild_id, problem_id FROM problems
+            WHERE content_fingerprint IS NOT NULL AND problem_id NOT IN (
+                SELECT problem_id FROM (
+                    SELECT MIN(problem_id) AS problem_id FROM problems
+                    WHERE content_fingerprint IS NOT NULL
+                    GROUP BY guild_id, content_fingerprint
+                ) AS originals
+            )"""
         if self.use_sqlite:
-            async with aiosqlite.connect(
-                self.db_name
-            ) as conn:  # Fetch the list of problems
+            async with self.sqlite_pool.writer() as conn:
+                await conn.execute("BEGIN IMMEDIATE")
                 cursor = await conn.cursor()
-                await cursor.execute("SELECT * FROM problems")
-                all_problems = [
-                    BaseProblem.from_row(dict_factory(cursor, row))
-                    for row in deepcopy(await cursor.fetchall())
-                ]
+                await cursor.execute(select_duplicates)
+                duplicates = list(await cursor.fetchall())
+                for where, params in self._where_in(
+                    "problem_id", {problem_id for _, problem_id in duplicates}, "?"
+                ):
+                    await cursor.execute("DELETE FROM problems" + where, params)
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                await cursor.execute("SELECT * FROM Problems")
-                all_problems = [
-                    BaseProblem.from_row(row, cache=copy(self))
-                    for row in cursor.fetchall()
-                ]
-        for problemA in range(len(all_problems)):
-            for problemB in range(len(all_problems)):
-                if problemA == problemB:  # Same index?
-                    pass  # Don't do anything
-                if all_problems[problemA] == all_problems[problemB]:
-                    await self.remove_problem_without_returning(
-                        guild_id=problemB.guild_id, problem_id=[problemA].id
-                    )  # Delete the problem
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                await cursor.execute(select_duplicates)
+                duplicates = list(await cursor.fetchall())
+                for where, params in self._where_in(
+                    "problem_id", {problem_id for _, problem_id in duplicates}, "%s"
+                ):
+                    await cursor.execute("DELETE FROM problems" + where, params)
+                await connection.commit()
+        self._invalidate_cache_refreshes()
+        for guild_id, problem_id in duplicates:
+            self._uncache_problem(guild_id, problem_id)
+        if duplicates:
+            log.info(f"Deleted {len(duplicates)} duplicate problems")
+        return len(duplicates)
 
     async def get_guilds(
         self, bot: disnake.ext.commands.Bot = None
@@ -654,11 +997,13 @@ class ProblemsRelatedCache:
         return self.guild_ids
 
     async def update_problem(self, problem_id: int, new: BaseProblem) -> None:
-        """Update the problem stored with the given guild id and problem id. This replaces the problem with the new problem"""
+        """Update the problem stored with the given guild id and problem id. This replaces the problem with the new problem.
+        The voters and solvers aren't changed (use add_voter, remove_voter and add_solver instead),
+        so that updating a problem can't undo a vote that happened at the same time."""
         assert isinstance(problem_id, int)
         assert isinstance(new, BaseProblem) and not isinstance(new, QuizProblem)
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 try:
                     conn.row_factory = dict_factory  # Make sure the row_factory can be set to dict_factory
                 except BaseException as exc:
@@ -670,48 +1015,290 @@ class ProblemsRelatedCache:
                 # We will raise if the problem already exists!
                 await cursor.execute(
                     """UPDATE problems 
-                    SET guild_id = ?, problem_id = ?, question = ?, answers = ?, voters = ?, solvers = ?, author = ?, extra_stuff = ?
+                    SET guild_id = ?, problem_id = ?, question = ?, answers = ?, author = ?, extra_stuff = ?,
+                    content_fingerprint = ?
                     WHERE problem_id = ?;""",
                     (
                         new.guild_id,
                         int(new.id),
                         new.question,
-                        pickle.dumps(new.answers),
-                        pickle.dumps(new.voters),
-                        pickle.dumps(new.solvers),
+                        encode_answers(new.answers),
                         int(new.author),
                         str(new.get_extra_stuff()),
+                        new.get_content_fingerprint(),
                         int(problem_id),
                     ),
                 )
+                if problem_id != new.id:
+                    for table in VOTE_AND_SOLVE_TABLES:
+                        await cursor.execute(
+                            f"UPDATE {table} SET problem_id = ? WHERE problem_id = ?",
+                            (int(new.id), problem_id),
+                        )
                 await conn.commit()
                 await cursor.close()
                 # await conn.close()
+            self._invalidate_cache_refreshes()
+            if problem_id != new.id:
+                self._uncache_problem(None, problem_id)
+            self._cache_problem(new)
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     """UPDATE problems 
-                    SET guild_id = '%s', problem_id = '%s', question = %s, answer = %s, voters = %s, solvers = %s, author = '%s', extra_stuff = '%s'
-                    WHERE problem_id = '%s'""",
+                    SET guild_id = %s, problem_id = %s, question = %s, answers = %s, author = %s, extra_stuff = %s,
+                    content_fingerprint = %s
+                    WHERE problem_id = %s""",
                     (
-                        int(new.guild_id),
+                        new.guild_id,
                         int(new.id),
                         new.question,
-                        pickle.dumps(new.answers),
-                        pickle.dumps(new.voters),
-                        pickle.dumps(new.solvers),
+                        encode_answers(new.answers),
                         int(new.author),
                         str(new.get_extra_stuff()),
+                        new.get_content_fingerprint(),
                         problem_id,
                     ),
                 )
-                connection.commit()
+                if problem_id != new.id:
+                    for table in VOTE_AND_SOLVE_TABLES:
+                        await cursor.execute(
+                            f"UPDATE {table} SET problem_id = %s WHERE problem_id = %s",
+                            (int(new.id), problem_id),
+                        )
+                await connection.commit()
+            self._invalidate_cache_refreshes()
+            if problem_id != new.id:
+                self._uncache_problem(None, problem_id)
+            self._cache_problem(new)
+
+    @staticmethod
+    async def _insert_votes_and_solves(
+        cursor, placeholder: str, problem: BaseProblem
+    ) -> None:
+        """Store the voters and solvers of a problem that was just inserted, and count them"""
+        insert = "INSERT OR IGNORE" if placeholder == "?" else "INSERT IGNORE"
+        for table, (count_column, attribute) in VOTE_AND_SOLVE_TABLES.items():
+            user_ids = {int(user_id) for user_id in getattr(problem, attribute)}
+            if not user_ids:
+                continue
+            await cursor.executemany(
+                f"{insert} INTO {table} (problem_id, user_id) VALUES ({placeholder}, {placeholder})",
+                [(int(problem.id), user_id) for user_id in user_ids],
+            )
+            await cursor.execute(
+                f"UPDATE problems SET {count_column} = {placeholder} WHERE problem_id = {placeholder}",
+                (len(user_ids), int(problem.id)),
+            )
+
+    async def add_voter(self, problem_id: int, user_id: int) -> int:
+        """Record that the user voted for the deletion of the problem, and return the problem's new number of voters.
+        Voting twice does nothing. This doesn't read or rewrite the other votes, so concurrent votes can't undo each other.
+        Raises ProblemNotFound if the problem doesn't exist."""
+        return await self._change_votes_or_solves("problem_votes", problem_id, user_id, add=True)
+
+    async def remove_voter(self, problem_id: int, user_id: int) -> int:
+        """Remove the user's vote for the deletion of the problem, and return the problem's new number of voters.
+        This does nothing if the user didn't vote. Raises ProblemNotFound if the problem doesn't exist."""
+        return await self._change_votes_or_solves("problem_votes", problem_id, user_id, add=False)
+
+    async def add_solver(self, problem_id: int, user_id: int) -> int:
+        """Record that the user solved the problem, and return the problem's new number of solvers.
+        Solving twice does nothing. Raises ProblemNotFound if the problem doesn't exist."""
+        return await self._change_votes_or_solves("problem_solves", problem_id, user_id, add=True)
+
+    async def _change_votes_or_solves(
+        self, table: str, problem_id: int, user_id: int, add: bool
+    ) -> int:
+        """Add (or remove) the row (problem_id, user_id) of table and update the count, in one transaction"""
+        assert isinstance(problem_id, int)
+        assert isinstance(user_id, int)
+        count_column, attribute = VOTE_AND_SOLVE_TABLES[table]
+        if self.use_sqlite:
+            async with self.sqlite_pool.transaction() as conn:
+                if add:
+                    cursor = await conn.execute(
+                        f"INSERT OR IGNORE INTO {table} (problem_id, user_id) VALUES (?, ?)",
+                        (problem_id, user_id),
+                    )
+                else:
+                    cursor = await conn.execute(
+                        f"DELETE FROM {table} WHERE problem_id = ? AND user_id = ?",
+                        (problem_id, user_id),
+                    )
+                changed = cursor.rowcount == 1
+                if changed:
+                    await conn.execute(
+                        f"UPDATE problems SET {count_column} = {count_column} + ? WHERE problem_id = ?",
+                        (1 if add else -1, problem_id),
+                    )
+                cursor = await conn.execute(
+                    f"SELECT {count_column} FROM problems WHERE problem_id = ?",
+                    (problem_id,),
+                )
+                row = await cursor.fetchone()
+                if row is None:
+                    raise ProblemNotFound("Problem not found!")
+                count = row[0]
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                if add:
+                    await cursor.execute(
+                        f"INSERT IGNORE INTO {table} (problem_id, user_id) VALUES (%s, %s)",
+                        (problem_id, user_id),
+                    )
+                else:
+                    await cursor.execute(
+                        f"DELETE FROM {table} WHERE problem_id = %s AND user_id = %s",
+                        (problem_id, user_id),
+                    )
+                changed = cursor.rowcount == 1
+                if changed:
+                    await cursor.execute(
+                        f"UPDATE problems SET {count_column} = {count_column} + %s WHERE problem_id = %s",
+                        (1 if add else -1, problem_id),
+                    )
+                await cursor.execute(
+                    f"SELECT {count_column} FROM problems WHERE problem_id = %s",
+                    (problem_id,),
+                )
+                row = await cursor.fetchone()
+                if row is None:
+                    raise ProblemNotFound(
+                        "Problem not found!"
+                    )  # The insert is rolled back when the connection is given back
+                await connection.commit()
+                count = row[0]
+        if changed:
+            self._invalidate_cache_refreshes()
+            self._update_cached_users(attribute, problem_id, user_id, add)
+        return count
+
+    def _update_cached_users(
+        self, attribute: str, problem_id: int, user_id: int, add: bool
+    ) -> None:
+        """Add the user to (or remove them from) the voters or solvers of the cached problem, if it is cached"""
+        problem = self._problem_index.get(problem_id)
+        if problem is None:
+            return
+        index = self._problem_index
+        if attribute == "voters":
+            update_index = index.add_voter if add else index.remove_voter
+        else:
+            update_index = index.add_solver if add else index.remove_solver
+        users = getattr(problem, attribute)
+        if add and user_id not in users:
+            users.append(user_id)
+        elif not add and user_id in users:
+            users.remove(user_id)
+        update_index(problem_id, user_id)
+
+    async def remove_all_votes_by(self, user_id: int) -> None:
+        """Remove every vote the user made. This is one DELETE, no matter how many problems the user voted for."""
+        await self._remove_user_from(
+            "problem_votes", user_id, self._problem_index.ids_voted_by(user_id)
+        )
+
+    async def remove_all_solves_by(self, user_id: int) -> None:
+        """Remove the user from the solvers of every problem they solved, with one DELETE"""
+        await self._remove_user_from(
+            "problem_solves", user_id, self._problem_index.ids_solved_by(user_id)
+        )
+
+    async def _remove_user_from(
+        self, table: str, user_id: int, cached_problem_ids: typing.FrozenSet[int]
+    ) -> None:
+        """Delete every row of table with this user id, and update the counts of the problems they were in"""
+        assert isinstance(user_id, int)
+        count_column, attribute = VOTE_AND_SOLVE_TABLES[table]
+        decrement_counts = f"""UPDATE problems SET {count_column} = {count_column} - 1
+        WHERE problem_id IN (SELECT problem_id FROM {table} WHERE user_id = {{0}})"""
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                await conn.execute(decrement_counts.format("?"), (user_id,))
+                await conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+                await conn.commit()
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                await cursor.execute(decrement_counts.format("%s"), (user_id,))
+                await cursor.execute(
+                    f"DELETE FROM {table} WHERE user_id = %s", (user_id,)
+                )
+                await connection.commit()
+        self._invalidate_cache_refreshes()
+        for problem_id in cached_problem_ids:
+            self._update_cached_users(attribute, problem_id, user_id, add=False)
+
+    @staticmethod
+    def _reencode_pickled_columns(rows) -> List[tuple]:
+        """Given (problem_id, answers, voters, solvers) rows, return the (answers, voters, solvers, problem_id)
+        parameters needed to re-encode the rows that still have pickled columns"""
+        updates = []
+        for problem_id, answers, voters, solvers in rows:
+            if not any(
+                value is not None and is_pickled(bytes(value))
+                for value in (answers, voters, solvers)
+            ):
+                continue
+            updates.append(
+                (
+                    encode_answers(decode_list(answers or b"[]")),
+                    encode_id_list(decode_list(voters or b"[]")),
+                    encode_id_list(decode_list(solvers or b"[]")),
+                    problem_id,
+                )
+            )
+        return updates
+
+    async def reencode_pickled_problem_rows(self, batch_size: int = 500) -> int:
+        """Re-encode the problems whose voters, solvers or answers are still pickled, batch_size rows at a time.
+        Each batch is its own transaction, and other coroutines get a chance to use the database between batches,
+        so this can run while the bot is running. Returns the number of rows that were re-encoded."""
+        assert isinstance(batch_size, int) and batch_size > 0
+        last_problem_id = -(2**63)  # The rows are read in order of problem_id
+        reencoded = 0
+        while True:
+            if self.use_sqlite:
+                async with self.sqlite_pool.writer() as conn:
+                    cursor = await conn.execute(
+                        """SELECT problem_id, answers, voters, solvers FROM problems
+                        WHERE problem_id > ? ORDER BY problem_id LIMIT ?""",
+                        (last_problem_id, batch_size),
+                    )
+                    rows = list(await cursor.fetchall())
+                    updates = self._reencode_pickled_columns(rows)
+                    await conn.executemany(
+                        "UPDATE problems SET answers = ?, voters = ?, solvers = ? WHERE problem_id = ?",
+                        updates,
+                    )
+                    await conn.commit()
+            else:
+                async with self.get_a_connection() as connection:
+                    cursor = await connection.cursor()
+                    await cursor.execute(
+                        """SELECT problem_id, answers, voters, solvers FROM problems
+                        WHERE problem_id > %s ORDER BY problem_id LIMIT %s FOR UPDATE""",
+                        (last_problem_id, batch_size),
+                    )
+                    rows = list(await cursor.fetchall())
+                    updates = self._reencode_pickled_columns(rows)
+                    if updates:
+                        await cursor.executemany(
+                            "UPDATE problems SET answers = %s, voters = %s, solvers = %s WHERE problem_id = %s",
+                            updates,
+                        )
+                    await connection.commit()
+            reencoded += len(updates)
+            if len(rows) < batch_size:
+                break
+            last_problem_id = rows[-1][0]
+            await asyncio.sleep(0)  # Let everything else use the database
+        if reencoded:
+            log.info(f"Re-encoded {reencoded} problems that were pickled")
+        return reencoded
 
     @property
     def max_question_length(self):
@@ -732,7 +1319,7 @@ class ProblemsRelatedCache:
     async def initialize_sql_table(self):
         """Initialize the SQL tables if they don't already exist"""
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """
@@ -751,29 +1338,24 @@ class ProblemsRelatedCache:
                 )
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     """
                     CREATE TABLE IF NOT EXISTS problems (
-                        id INT PRIMARY KEY,
-                        guild_id INT,
-                        problem_id INT,
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        guild_id BIGINT,
+                        problem_id BIGINT,
                         question TEXT,
                         answers LONGBLOB,
                         voters LONGBLOB,
                         solvers LONGBLOB,
-                        author INT,
+                        author BIGINT,
                         extra_stuff TEXT
                     )
                     """
                 )
-                connection.commit()
+                await connection.commit()
 
     async def run_sql(
         self, sql: str, placeholders: typing.Optional[typing.List[Any]] = None
@@ -783,21 +1365,21 @@ class ProblemsRelatedCache:
         assert isinstance(placeholders, list) or placeholders is None
         if placeholders is None:
             placeholders = []
+        # The SQL might change user data or guild data
+        self._user_data_cache.clear()
+        self._guild_data_cache.clear()
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(sql, placeholders)
                 await conn.commit()
-                return await cursor.fetchall()
+                rows = await cursor.fetchall()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(sql, placeholders)
-                connection.commit()
-                return cursor.fetchall()
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(sql, placeholders)
+                await connection.commit()
+                rows = await cursor.fetchall()
+        self._invalidate_cache_refreshes()  # The SQL might change problems or quizzes too
+        return rows
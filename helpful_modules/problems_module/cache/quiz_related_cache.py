@@ -21,6 +21,8 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
+import asyncio
+import collections
 import logging
 import pickle
 import typing
@@ -28,69 +30,113 @@ from copy import copy
 from typing import *
 import warnings
 
-import aiosqlite
+from aiomysql import DictCursor
 
 from helpful_modules.dict_factory import dict_factory
 
+from ..batch_loader import BatchLoader
 from ..errors import *
-from ..mysql_connector_with_stmt import *
+from ..query import QuizQuery
+from ..ttl_cache import MISSING
+from ..write_behind import WriteBehindBuffer
 from ..quizzes import Quiz, QuizProblem, QuizSolvingSession, QuizSubmission
 from ..quizzes.quiz_description import QuizDescription
-from .problems_related_cache import ProblemsRelatedCache
+from .problems_related_cache import WHERE_IN_CHUNK_SIZE, ProblemsRelatedCache
 
 log = logging.getLogger(__name__)
+# The tables that get_quiz reads. Each has a quiz_id column.
+QUIZ_TABLES = ("quizzes", "quiz_submissions", "quiz_submission_sessions", "quiz_description")
+# QuizQuery field -> column. Every problem of a quiz is a row, so a quiz has an author if any of its rows does.
+QUIZ_QUERY_COLUMNS = {"id": "quiz_id", "guild_id": "guild_id", "authors": "author = {placeholder}"}
+
+class QuizRows(typing.NamedTuple):
+    """The rows (as dicts) that make up one quiz"""
+
+    problems: List[dict]
+    submissions: List[dict]
+    sessions: List[dict]
+    description: Optional[dict]
+
 
 class QuizRelatedCache(ProblemsRelatedCache):
     """An extension of ProblemsRelatedCache that contains quiz stuff"""
+
+    def __init__(self, *args, quiz_session_flush_interval: Optional[float] = None, **kwargs):
+        """If quiz_session_flush_interval is not None, update_quiz_session buffers the updates in memory
+        and writes them in batches, at most quiz_session_flush_interval seconds later
+        (or immediately, when the session is finished). close() writes whatever is still buffered."""
+        super().__init__(*args, **kwargs)
+        self._quiz_loader: BatchLoader[int, QuizRows] = BatchLoader(
+            self._load_quiz_rows,
+            max_batch_size=WHERE_IN_CHUNK_SIZE,
+            not_found=lambda quiz_id: QuizNotFound(f"Quiz {quiz_id} not found"),
+        )
+        self._session_buffer: Optional[WriteBehindBuffer[int, QuizSolvingSession]] = None
+        if quiz_session_flush_interval is not None:
+            self._session_buffer = WriteBehindBuffer(
+                self._write_quiz_sessions, quiz_session_flush_interval
+            )
+
+    async def close(self) -> None:
+        """Write the buffered quiz session updates, and then close the connections to the database"""
+        await self.flush_quiz_session_updates()
+        await super().close()
+
+    async def flush_quiz_session_updates(self) -> None:
+        """Write the quiz session updates that update_quiz_session has buffered (if any)"""
+        if self._session_buffer is not None:
+            await self._session_buffer.flush()
+
+    @property
+    def quiz_session_buffer_stats(self) -> Optional[dict]:
+        """Return how many quiz session updates were buffered and written, or None if they aren't buffered"""
+        return None if self._session_buffer is None else self._session_buffer.stats
+
     # MARK: Quiz Sessions
     async def get_quiz_sessions(self, quiz_id: int) -> List[QuizSolvingSession]:
         """Get the quiz sessions for a quiz"""
         assert isinstance(quiz_id, int)
+        await self.flush_quiz_session_updates()
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
-                await cursor.execute("SELECT * FROM quiz_submissions_sessions WHERE quiz_id = ?", (quiz_id,))
+                await cursor.execute("SELECT * FROM quiz_submission_sessions WHERE quiz_id = ?", (quiz_id,))
                 # For each row retrieved: use from_sqlite_dict to turn into a QuizSolvingSession and return it
                 return [
                     QuizSolvingSession.from_sqlite_dict(item)
                     for item in await cursor.fetchall()
                 ]
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     "SELECT * FROM quiz_submission_sessions WHERE quiz_id = %s",
                     (quiz_id,),
                 )
                 # For each row retrieved: turn it into a QuizSolvingSession using from_mysql_dict and return the result
                 return [
                     QuizSolvingSession.from_mysql_dict(item)
-                    for item in cursor.fetchall()
+                    for item in await cursor.fetchall()
                 ]
 
     async def add_quiz_session(self, session: QuizSolvingSession):
         """Add a QuizSession to the SQL database"""
         assert isinstance(session, QuizSolvingSession)
         try:
-            await self.get_quiz_submission_by_special_id(session.special_id)
+            await self.get_quiz_session_by_special_id(session.special_id)
             raise MathProblemsModuleException("Quiz session already exists")
         except QuizSessionNotFoundException:
             pass
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """INSERT OR REPLACE INTO quiz_submission_sessions (user_id, quiz_id, guild_id, is_finished, answers, start_time, expire_time, special_id, attempt_num)
-                    VALUES (?,?,?,?,?,?,?,?)""",
+                    VALUES (?,?,?,?,?,?,?,?,?)""",
                     (
                         session.user_id,
                         session.quiz_id,
@@ -103,19 +149,12 @@ class QuizRelatedCache(ProblemsRelatedCache):
                         session.attempt_num,
                     ),
                 )
-                await conn.commit()
-                return
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    """INSERT OR REPLACE INTO quiz_submission_sessions (user_id, quiz_id, guild_id, is_finished, answers, start_time, expire_time, special_id, attempt_num)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s)""",
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    """REPLACE INTO quiz_submission_sessions (user_id, quiz_id, guild_id, is_finished, answers, start_time, expire_time, special_id, attempt_num)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
                     (
                         session.user_id,
                         session.quiz_id,
@@ -130,104 +169,103 @@ class QuizRelatedCache(ProblemsRelatedCache):
                         session.attempt_num,
                     ),
                 )
-                connection.commit()
+                await connection.commit()
+        self._invalidate_cache_refreshes()
 
     async def update_quiz_session(self, special_id: int, session: QuizSolvingSession):
-        """Update the quiz session given the special id"""
+        """Update the quiz session given the special id.
+        If updates are buffered, this returns before the update is written, unless the session is finished."""
         assert isinstance(special_id, int)
         assert isinstance(session, QuizSolvingSession)
-        try:
-            await self.get_quiz_submission_by_special_id(special_id)
-        except QuizSessionNotFoundException as quiz_session_not_found_exception:
+        if (
+            self._session_buffer is None or special_id not in self._session_buffer
+        ) and not await self._quiz_session_exists(special_id):
             raise QuizSessionNotFoundException(
                 "Quiz session not found - use add_quiz_session instead"
-            ) from quiz_session_not_found_exception
+            )
+        if self._session_buffer is None:
+            await self._write_quiz_sessions([session])
+            return
+        self._session_buffer.put(special_id, session)
+        if session.is_final or session.is_finished:
+            await self._session_buffer.flush()
 
+    async def _quiz_session_exists(self, special_id: int) -> bool:
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
-                conn.row_factory = dict_factory
-                cursor = await conn.cursor()
-                await cursor.execute(
-                    """INSERT OR REPLACE INTO quiz_submission_sessions (guild_id, quiz_id, user_id, answers, start_time, expire_time, is_finished, special_id, attempt_num)
-                    (?,?,?,?,?,?,?,?,?)""",
-                    (
-                        session.guild_id,
-                        session.quiz_id,
-                        session.user_id,
-                        pickle.dumps(session.answers),
-                        session.start_time,
-                        session.expire_time,
-                        int(session.is_finished),
-                        session.special_id,
-                        session.attempt_num,
-                        session.special_id,
-                    ),
+            async with self.sqlite_pool.reader() as conn:
+                cursor = await conn.execute(
+                    "SELECT 1 FROM quiz_submission_sessions WHERE special_id = ? LIMIT 1",
+                    (special_id,),
                 )
-                await conn.commit()
-                return
+                return await cursor.fetchone() is not None
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(  # Connect to SQL and actually change it
-                    """UPDATE quiz_submission_sessions 
-                    SET guild_id = %s, quiz_id = %s, user_id = %s, answers = %s, start_time = %s, expire_time = %s, is_finished = %s, special_id = %s, attempt_num = %s
-                    WHERE special_id = %s""",
-                    (
-                        session.guild_id,
-                        session.quiz_id,
-                        session.user_id,
-                        pickle.dumps(session.answers),
-                        session.start_time,
-                        session.expire_time,
-                        int(session.is_finished),
-                        session.special_id,
-                        session.attempt_num,
-                        session.special_id,
-                    ),
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor()
+                await cursor.execute(
+                    "SELECT 1 FROM quiz_submission_sessions WHERE special_id = %s LIMIT 1",
+                    (special_id,),
                 )
-                connection.commit()
-                return
+                return await cursor.fetchone() is not None
+
+    async def _write_quiz_sessions(self, sessions: List[QuizSolvingSession]) -> None:
+        """Update the rows of several quiz sessions in one transaction"""
+        rows = [self._quiz_session_row(session) for session in sessions]
+        if not rows:
+            return
+        placeholder = "?" if self.use_sqlite else "%s"
+        statement = (
+            "UPDATE quiz_submission_sessions SET "
+            + ", ".join(f"{column} = {placeholder}" for column in rows[0].keys())
+            + f" WHERE special_id = {placeholder}"
+        )
+        params = [tuple(row.values()) + (row["special_id"],) for row in rows]
+        if self.use_sqlite:
+            async with self.sqlite_pool.transaction() as conn:
+                await conn.executemany(statement, params)
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.executemany(statement, params)
+                await connection.commit()
+        self._invalidate_cache_refreshes()
 
     async def delete_quiz_session(self, special_id: int):
         """DELETE a quiz session!"""
         assert isinstance(special_id, int)  # basic type-checking
+        if self._session_buffer is not None:
+            self._session_buffer.discard(special_id)
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "DELETE FROM quiz_submission_sessions WHERE special_id = ?",
                     (special_id,),
                 )
-                await conn.commit()
 
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    "DELETE FROM quiz_submission_session WHERE special_id=%s",
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    "DELETE FROM quiz_submission_sessions WHERE special_id=%s",
                     (special_id,),
                 )
-                connection.commit()
+                await connection.commit()
+        self._invalidate_cache_refreshes()
 
     async def get_quiz_session_by_special_id(
         self, special_id: int
     ) -> QuizSolvingSession:
         """Get a quiz submission by its special id"""
         assert isinstance(special_id, int)  # Basic type-checking
+        if self._session_buffer is not None:
+            buffered = self._session_buffer.get(special_id)
+            if buffered is not MISSING:
+                return buffered
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.reader() as conn:
+                conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "SELECT * FROM quiz_submission_sessions WHERE special_id = ?",
@@ -236,18 +274,13 @@ class QuizRelatedCache(ProblemsRelatedCache):
                 potential_sessions = list(await cursor.fetchall())
 
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     "SELECT * FROM quiz_submission_sessions WHERE special_id = %s",
                     (special_id,),
                 )
-                potential_sessions = list(cursor.fetchall())
+                potential_sessions = list(await cursor.fetchall())
 
         if len(potential_sessions) < 1:
             raise QuizSessionNotFoundException(
@@ -257,30 +290,22 @@ class QuizRelatedCache(ProblemsRelatedCache):
             raise SQLException(
                 "There are too many quiz sessions with this special id"
             )
-        else:
+        elif self.use_sqlite:
             return QuizSolvingSession.from_sqlite_dict(potential_sessions[0])
+        else:
+            return QuizSolvingSession.from_mysql_dict(potential_sessions[0])
 
     # MARK: Quizzes
 
     async def add_quiz(self, quiz: Quiz, insert_sessions: bool = True) -> Quiz:
-        """Add a quiz"""
+        """Add a quiz. Raises MathProblemsModuleException if the quiz already exists,
+        and TooManyQuizzesException if its guild already has max_quizzes_per_guild quizzes."""
         assert isinstance(quiz, Quiz)
         warnings.warn("add_quiz will not automatically save its sessions in the future", category=FutureWarning, stacklevel=2)
-        if not quiz.empty:
-            num_already_existing_quizzes = await self.get_quizzes_by_func(
-                func=lambda _quiz: not _quiz.empty and _quiz.guild_id == quiz.guild_id  # type: ignore
-            )
-            if len(num_already_existing_quizzes) >= self.cache.max_quizzes_per_guild:
-                raise TooManyQuizzesException(len(num_already_existing_quizzes) + 1)
-        try:
-            await self.get_quiz(quiz.id)
-            raise MathProblemsModuleException(
-                "Quiz already exists! Use update_quiz instead"
-            )
-        except QuizNotFound:
-            pass
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
+                # Take the write lock now, so that no quiz can be added between the checks and the inserts
+                await conn.execute("BEGIN IMMEDIATE")
                 try:
                     conn.row_factory = dict_factory  # Make sure the row_factory can be set to dict_factory
                 except BaseException as exc:
@@ -297,20 +322,13 @@ class QuizRelatedCache(ProblemsRelatedCache):
                         raise  # Re-raise the exception
 
                 cursor = await conn.cursor()
-                for item in quiz.problems:
-                    await cursor.execute(
-                        """INSERT OR REPLACE INTO quizzes (guild_id, quiz_id, problem_id, question, answer, voters, solvers, author)
-                    VALUES (?,?,?,?,?,?,?,?)""",
-                        (
-                            item.guild_id,
-                            item.quiz_id,
-                            item.problem_id,
-                            item.question,
-                            pickle.dumps(item.answers),
-                            pickle.dumps(item.voters),
-                            pickle.dumps(item.solvers),
-                            item.author,
-                        ),
+                await self._check_new_quiz(cursor, "?", quiz)
+                problem_rows = [self._quiz_problem_row(quiz.id, item) for item in quiz.problems]
+                if problem_rows:
+                    await cursor.executemany(
+                        f"""INSERT OR REPLACE INTO quizzes ({', '.join(problem_rows[0].keys())})
+                        VALUES (?,?,?,?,?,?,?,?)""",
+                        [tuple(row.values()) for row in problem_rows],
                     )
                 # TODO: do we need to do this? I don't think so
                 if insert_sessions:
@@ -329,33 +347,21 @@ class QuizRelatedCache(ProblemsRelatedCache):
                     warnings.warn("The QuizSessions are not being saved", category=UnsavedContentWarning)
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                for item in quiz.problems:
-                    cursor.execute(
-                        """INSERT INTO quizzes (guild_id, quiz_id, problem_id, question, answer, voters, solvers, author)
-                    VALUES ('%s','%s','%s',%s,%s,%s,%s,'%s')""",
-                        (
-                            item.guild_id,
-                            item.quiz_id,
-                            item.problem_id,
-                            item.question,
-                            pickle.dumps(item.answers),
-                            pickle.dumps(item.voters),
-                            pickle.dumps(item.solvers),
-                            item.author,
-                        ),
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await self._check_new_quiz(cursor, "%s", quiz)
+                problem_rows = [self._quiz_problem_row(quiz.id, item) for item in quiz.problems]
+                if problem_rows:
+                    await cursor.executemany(
+                        f"""INSERT INTO quizzes ({', '.join(problem_rows[0].keys())})
+                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s)""",
+                        [tuple(row.values()) for row in problem_rows],
                     )
                 if insert_sessions:
                     for item in quiz.submissions:
-                        cursor.execute(
+                        await cursor.execute(
                             """INSERT INTO quiz_submissions (guild_id, quiz_id, user_id, submissions)
-                        VALUES ('%s','%s','%s',%s)""",
+                        VALUES (%s,%s,%s,%s)""",
                             (
                                 item.guild_id,
                                 item.quiz_id,
@@ -365,99 +371,312 @@ class QuizRelatedCache(ProblemsRelatedCache):
                         )
                 else:
                     warnings.warn("The QuizSessions are not being saved", category=UnsavedContentWarning)
+                await connection.commit()
+        self._invalidate_cache_refreshes()
         return quiz
 
+    async def _check_new_quiz(self, cursor, placeholder: str, quiz: Quiz) -> None:
+        """Make sure the quiz doesn't exist yet, and that its guild isn't at the quiz limit.
+        Both are indexed lookups, so this takes O(quizzes in the guild) time instead of loading every quiz.
+        The cursor must return rows as dictionaries."""
+        await cursor.execute(
+            f"SELECT quiz_id FROM quizzes WHERE quiz_id = {placeholder} LIMIT 1",
+            (quiz.id,),
+        )
+        if await cursor.fetchall():
+            raise MathProblemsModuleException(
+                "Quiz already exists! Use update_quiz instead"
+            )
+        if not quiz.problems:
+            return  # Empty quizzes don't count towards the limit
+        num_quizzes = await self._count_quizzes_in(cursor, placeholder, quiz.guild_id)
+        if num_quizzes >= self.max_quizzes_per_guild:
+            raise TooManyQuizzesException(num_quizzes + 1)
+
+    @staticmethod
+    async def _count_quizzes_in(cursor, placeholder: str, guild_id: Optional[int]) -> int:
+        """Count the quizzes in a guild (or the global quizzes, if guild_id is None) using the guild_id index.
+        Every problem of a quiz is a row, so the distinct quiz ids are counted."""
+        if guild_id is None:
+            await cursor.execute(
+                "SELECT COUNT(DISTINCT quiz_id) AS num_quizzes FROM quizzes WHERE guild_id IS NULL"
+            )
+        else:
+            await cursor.execute(
+                f"SELECT COUNT(DISTINCT quiz_id) AS num_quizzes FROM quizzes WHERE guild_id = {placeholder}",
+                (guild_id,),
+            )
+        return (await cursor.fetchone())["num_quizzes"]
+
+    async def count_guild_quizzes(self, guild_id: Optional[int]) -> int:
+        """Return how many quizzes the guild has (or how many global quizzes there are, if guild_id is None),
+        without loading them"""
+        assert isinstance(guild_id, int) or guild_id is None
+        if self.use_sqlite:
+            async with self.sqlite_pool.reader() as conn:
+                conn.row_factory = dict_factory
+                cursor = await conn.cursor()
+                return await self._count_quizzes_in(cursor, "?", guild_id)
+        async with self.get_a_connection() as connection:
+            cursor = await connection.cursor(DictCursor)
+            return await self._count_quizzes_in(cursor, "%s", guild_id)
+
     def __str__(self):
         raise NotImplementedError
 
     async def get_quiz(self, quiz_id: int, retrieve_submissions: bool = True) -> Optional[Quiz]:
-        """Get the quiz with the id specified. Returns None if not found"""
+        """Get the quiz with the id specified. Raises QuizNotFound if it doesn't exist.
+        Concurrent calls (for any quiz ids) are batched, so that their problems, submissions, sessions and
+        descriptions are loaded with one query per table, on one connection."""
         warnings.warn("In the future, quizzes will not retrieve their submissions", category=FutureWarning)
         assert isinstance(quiz_id, int)
-        if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
-                try:
-                    conn.row_factory = dict_factory  # Make sure the row_factory can be set to dict_factory
-                except BaseException as exc:
-                    # Not writeable?
-                    try:
-                        dict_factory()  # Check for name error
-                    except NameError as exc2:
-                        raise MathProblemsModuleException(
-                            "dict_factory could not be found"
-                        ) from exc2
-                    if isinstance(exc, AttributeError):  # Can't set attribute
-                        pass
-                    else:
-                        raise  # Re-raise the exception
-                cursor = await conn.cursor()
-                await cursor.execute(
-                    "SELECT * FROM quizzes WHERE quiz_id=?", (quiz_id,)
-                )
-                problems = list(await cursor.fetchall())
-                if len(problems) == 0:
-                    raise QuizNotFound(f"Quiz {quiz_id} not found")
-                if retrieve_submissions:
-                    await cursor.execute(
-                        "SELECT submissions FROM quiz_submissions WHERE quiz_id = ?"
-                    )
-                    submissions = await cursor.fetchall()
-                    submissions = [
-                        QuizSubmission.from_dict(pickle.loads(item[0]), cache=copy(self))
-                        for item in submissions
-                    ]
-                problems = [
-                    QuizProblem.from_row(dict_factory(cursor, row), cache=copy(self))
-                    for row in problems
-                ]
-        else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute("SELECT * FROM quizzes WHERE quiz_id = '%s'", (quiz_id,))
-                problems = [
-                    QuizProblem.from_row(row, copy(self)) for row in cursor.fetchall()
-                ]
-                if retrieve_submissions:
-                    cursor.execute(
-                        "SELECT * FROM submissions WHERE quiz_id = '%s'", (quiz_id,)
-                    )
-                    submissions = [
-                        QuizSubmission.from_dict(pickle.loads(row[0]), cache=copy(self))
-                        for row in cursor.fetchall()
-                    ]
+        rows = await self._quiz_loader.load(quiz_id)
+        # The rows are shared with the other callers in the batch, so every caller gets its own Quiz
+        if rows.description is None:
+            raise QuizDescriptionNotFoundException("Quiz description not found")
+        problems = [QuizProblem.from_row(row, cache=copy(self)) for row in rows.problems]
         authors = set((problem.author for problem in problems))
-        sessions = await self.get_quiz_sessions(quiz_id)
-        description = await self.get_quiz_description(quiz_id)
         quiz = Quiz(
             quiz_id,
-            problems,
-            submissions if retrieve_submissions else [],
-            cache=self,
-            authors=authors,  # type: ignore
-            existing_sessions=sessions,
-            description=description,
+            authors=list(authors),
+            quiz_problems=problems,
+            description=QuizDescription.from_dict(rows.description),
         )
+        if retrieve_submissions:
+            quiz._submissions = [
+                QuizSubmission.from_dict(pickle.loads(row["submissions"]), cache=copy(self))
+                for row in rows.submissions
+            ]
+        else:
+            quiz._submissions = []
+        if self.use_sqlite:
+            quiz.existing_sessions = list(map(QuizSolvingSession.from_sqlite_dict, rows.sessions))
+        else:
+            quiz.existing_sessions = list(map(QuizSolvingSession.from_mysql_dict, rows.sessions))
+        quiz._loaded_rows = rows  # update_quiz compares the quiz to these rows
         return quiz
 
-    async def update_quiz(self, quiz_id: int, new: Quiz) -> None:
-        """Update the quiz with the id given"""
-        # Because quizzes consist of multiple rows, it would be hard/impossible to replace each row one at a time
+    async def _load_quiz_rows(self, quiz_ids: List[int]) -> Dict[int, QuizRows]:
+        """Load the rows of every quiz in quiz_ids, on one connection. Quizzes without problems aren't returned."""
+        await self.flush_quiz_session_updates()  # So that the sessions are up to date
+        if self.use_sqlite:
+            async with self.sqlite_pool.reader() as conn:
+                conn.row_factory = dict_factory
+                cursor = await conn.cursor()
+                return await self._select_quiz_rows(cursor, "?", set(quiz_ids))
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                return await self._select_quiz_rows(cursor, "%s", set(quiz_ids))
+
+    async def _select_quiz_rows(
+        self, cursor, placeholder: str, quiz_ids: Set[int]
+    ) -> Dict[int, QuizRows]:
+        rows_by_table = {table: collections.defaultdict(list) for table in QUIZ_TABLES}
+        for where, params in self._where_in("quiz_id", quiz_ids, placeholder):
+            for table in QUIZ_TABLES:
+                await cursor.execute(f"SELECT * FROM {table}" + where, params)
+                for row in await cursor.fetchall():
+                    rows_by_table[table][row["quiz_id"]].append(row)
+        descriptions = rows_by_table["quiz_description"]
+        if any(len(rows) > 1 for rows in descriptions.values()):
+            raise MathProblemsModuleException(
+                "There are too many quiz descriptions with the same id!"
+            )
+        return {
+            quiz_id: QuizRows(
+                problems=problems,
+                submissions=rows_by_table["quiz_submissions"].get(quiz_id, []),
+                sessions=rows_by_table["quiz_submission_sessions"].get(quiz_id, []),
+                description=descriptions[quiz_id][0] if quiz_id in descriptions else None,
+            )
+            for quiz_id, problems in rows_by_table["quizzes"].items()
+        }
+
+    async def update_quiz(self, quiz_id: int, new: Quiz) -> int:
+        """Update the quiz with the id given, in one transaction, and return the number of rows written.
+        Only the problem, session and description rows that changed are written: if the quiz came from get_quiz,
+        it is compared to the rows it was loaded from (so concurrent changes to other rows aren't overwritten),
+        and otherwise to the rows in the database. Problems that were removed are deleted,
+        but sessions are never deleted (use delete_quiz_session). Submissions aren't changed.
+        Raises QuizNotFound if the quiz doesn't exist (use add_quiz instead)."""
         assert isinstance(quiz_id, int)
         assert isinstance(new, Quiz)
         assert new.id == quiz_id
-        await self.delete_quiz(quiz_id)
+        await self.flush_quiz_session_updates()  # Otherwise, a buffered update could be written after this one
+        new_rows = QuizRows(
+            problems=[self._quiz_problem_row(quiz_id, problem) for problem in new.problems],
+            submissions=[],
+            sessions=[
+                self._quiz_session_row(session)
+                for session in getattr(new, "existing_sessions", [])
+            ],
+            description=None
+            if new.description is None
+            else self._quiz_description_row(quiz_id, new.description),
+        )
+        old_rows: Optional[QuizRows] = getattr(new, "_loaded_rows", None)
+        if self.use_sqlite:
+            async with self.sqlite_pool.writer() as conn:
+                await conn.execute("BEGIN IMMEDIATE")
+                conn.row_factory = dict_factory
+                cursor = await conn.cursor()
+                old_rows, rows_written = await self._write_quiz_changes(
+                    cursor, "?", quiz_id, old_rows, new_rows
+                )
+                await conn.commit()
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                old_rows, rows_written = await self._write_quiz_changes(
+                    cursor, "%s", quiz_id, old_rows, new_rows
+                )
+                await connection.commit()
+        self._invalidate_cache_refreshes()
+        sessions = {str(row["special_id"]): row for row in old_rows.sessions}
+        sessions.update((str(row["special_id"]), row) for row in new_rows.sessions)
+        new._loaded_rows = new_rows._replace(
+            submissions=old_rows.submissions,
+            sessions=list(sessions.values()),
+            description=new_rows.description or old_rows.description,
+        )  # So that updating the same quiz again only writes what changed since now
+        return rows_written
+
+    async def _write_quiz_changes(
+        self,
+        cursor,
+        placeholder: str,
+        quiz_id: int,
+        old_rows: Optional[QuizRows],
+        new_rows: QuizRows,
+    ) -> Tuple[QuizRows, int]:
+        """Write the difference between old_rows and new_rows. If old_rows is None, the rows in the database are used.
+        Returns the old rows and the number of rows written. The cursor must return rows as dictionaries."""
+        if old_rows is None:
+            old_rows = (await self._select_quiz_rows(cursor, placeholder, {quiz_id})).get(quiz_id)
+            if old_rows is None:
+                raise QuizNotFound(f"Quiz {quiz_id} not found - use add_quiz instead")
+        rows_written = await self._write_changed_rows(
+            cursor, placeholder, "quizzes", "problem_id", old_rows.problems, new_rows.problems, delete_removed=True
+        )
+        rows_written += await self._write_changed_rows(
+            cursor, placeholder, "quiz_submission_sessions", "special_id", old_rows.sessions, new_rows.sessions
+        )
+        if new_rows.description is not None:
+            rows_written += await self._write_changed_rows(
+                cursor,
+                placeholder,
+                "quiz_description",
+                "quiz_id",
+                [old_rows.description] if old_rows.description is not None else [],
+                [new_rows.description],
+            )
+        return old_rows, rows_written
+
+    @staticmethod
+    async def _write_changed_rows(
+        cursor,
+        placeholder: str,
+        table: str,
+        key_column: str,
+        old_rows: List[dict],
+        new_rows: List[dict],
+        delete_removed: bool = False,
+    ) -> int:
+        """Insert the new rows whose key isn't in old_rows, update the ones that are different,
+        and (if delete_removed is True) delete the old rows whose key isn't in new_rows.
+        Every row must belong to the same quiz. Returns the number of rows written."""
+        # Keys are compared as strings, because SQLite stores some ids in VARCHAR columns
+        old_by_key = {str(row[key_column]): row for row in old_rows}
+        new_by_key = {str(row[key_column]): row for row in new_rows}
+        where = f"quiz_id = {placeholder}"
+        if key_column != "quiz_id":
+            where += f" AND {key_column} = {placeholder}"
+
+        def where_params(row: dict) -> tuple:
+            return (row["quiz_id"],) if key_column == "quiz_id" else (row["quiz_id"], row[key_column])
+
+        inserts = []
+        updates = []
+        for key, row in new_by_key.items():
+            old = old_by_key.get(key)
+            if old is None:
+                inserts.append(row)
+            elif any(
+                old.get(column) != value for column, value in row.items() if column != key_column
+            ):
+                updates.append(row)
+        deletes = (
+            [row for key, row in old_by_key.items() if key not in new_by_key]
+            if delete_removed
+            else []
+        )
+        if deletes:
+            await cursor.executemany(
+                f"DELETE FROM {table} WHERE {where}", [where_params(row) for row in deletes]
+            )
+        if updates:
+            columns = list(updates[0].keys())
+            await cursor.executemany(
+                f"UPDATE {table} SET {', '.join(f'{column} = {placeholder}' for column in columns)} WHERE {where}",
+                [tuple(row[column] for column in columns) + where_params(row) for row in updates],
+            )
+        if inserts:
+            columns = list(inserts[0].keys())
+            await cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})",
+                [tuple(row[column] for column in columns) for row in inserts],
+            )
+        return len(inserts) + len(updates) + len(deletes)
+
+    @staticmethod
+    def _quiz_problem_row(quiz_id: int, problem: QuizProblem) -> dict:
+        """Return the row of the quizzes table that stores a quiz problem"""
+        return {
+            "guild_id": problem.guild_id,
+            "quiz_id": quiz_id,
+            "problem_id": problem.id,
+            "question": problem.question,
+            "answer": pickle.dumps(problem.answers),
+            "voters": pickle.dumps(problem.voters),
+            "solvers": pickle.dumps(problem.solvers),
+            "author": problem.author,
+        }
+
+    @staticmethod
+    def _quiz_session_row(session: QuizSolvingSession) -> dict:
+        """Return the row of the quiz_submission_sessions table that stores a session"""
+        return {
+            "user_id": session.user_id,
+            "quiz_id": session.quiz_id,
+            "guild_id": session.guild_id,
+            "is_finished": int(session.is_finished),
+            "answers": pickle.dumps(session.answers),  # TODO: don't use pickle (because RCE)
+            "start_time": session.start_time,
+            "expire_time": session.expire_time,
+            "special_id": session.special_id,
+            "attempt_num": session.attempt_num,
+        }
 
-        await self.add_quiz(new)
+    @staticmethod
+    def _quiz_description_row(quiz_id: int, description: QuizDescription) -> dict:
+        """Return the row of the quiz_description table that stores a quiz description"""
+        return {
+            "quiz_id": quiz_id,
+            "description": description.description,
+            "license": description.license,
+            "time_limit": description.time_limit,
+            "intensity": description.intensity,
+            "category": description.category,
+            "author": description.author,
+            "guild_id": description.guild_id,
+        }
 
     async def delete_quiz(self, quiz_id: int):
         """Delete a quiz!"""
+        await self.flush_quiz_session_updates()  # Otherwise, a buffered update could be written after the delete
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "DELETE FROM quizzes WHERE quiz_id = ?", (quiz_id,)
@@ -473,30 +692,29 @@ class QuizRelatedCache(ProblemsRelatedCache):
                 )
                 await conn.commit()  # Commit
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    "DELETE FROM quizzes WHERE quiz_id = '?'", (quiz_id,)
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    "DELETE FROM quizzes WHERE quiz_id = %s", (quiz_id,)
                 )  # Delete the quiz's problems
-                cursor.execute(
-                    "DELETE FROM quiz_submissions WHERE quiz_id='?'", (quiz_id,)
+                await cursor.execute(
+                    "DELETE FROM quiz_submissions WHERE quiz_id=%s", (quiz_id,)
                 )  # Delete the submissions as well.
-                cursor.execute(
-                    "DELETE FROM quiz_submission_sessions WHERE quiz_id = ?", (quiz_id,)
+                await cursor.execute(
+                    "DELETE FROM quiz_submission_sessions WHERE quiz_id = %s", (quiz_id,)
                 )  # Delete the sessions associated with it
-                connection.commit()
+                await cursor.execute(
+                    "DELETE FROM quiz_description WHERE quiz_id = %s", (quiz_id,)
+                )
+                await connection.commit()
+        self._invalidate_cache_refreshes()
     # MARK: Quiz Descriptions
 
     async def get_quiz_description(self, quiz_id: int) -> QuizDescription:
         """Get a quiz description from a quiz id"""
         assert isinstance(quiz_id, int)
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
@@ -513,17 +731,12 @@ class QuizRelatedCache(ProblemsRelatedCache):
                     possible_quiz_descriptions[0], cache=self
                 )
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    "SELECT * FROM quiz_description WHERE quiz_id = ?", (quiz_id,)
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    "SELECT * FROM quiz_description WHERE quiz_id = %s", (quiz_id,)
                 )
-                possible_quiz_descriptions = cursor.fetchall()
+                possible_quiz_descriptions = await cursor.fetchall()
                 if len(possible_quiz_descriptions) == 0:
                     raise QuizDescriptionNotFoundException("Quiz description not found")
                 elif len(possible_quiz_descriptions) > 1:
@@ -546,7 +759,7 @@ class QuizRelatedCache(ProblemsRelatedCache):
             )
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """UPDATE quiz_description
@@ -566,14 +779,9 @@ class QuizRelatedCache(ProblemsRelatedCache):
                 )
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     """UPDATE quiz_description
                     SET description = %s, license = %s, time_limit = %s, intensity = %s, category = %s, quiz_id = %s, author = %s, guild_id = %s
                     WHERE quiz_id = %s""",
@@ -589,7 +797,7 @@ class QuizRelatedCache(ProblemsRelatedCache):
                         description.quiz_id,
                     ),
                 )
-                connection.commit()
+                await connection.commit()
 
     async def add_quiz_description(self, description: QuizDescription):
         """Add quiz description"""
@@ -600,11 +808,11 @@ class QuizRelatedCache(ProblemsRelatedCache):
         except QuizDescriptionNotFoundException:
             pass
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
-                    """INSERT INTO quiz_description (description, license, time_limit, intensity, quiz_id, author, category. guild_id)
+                    """INSERT INTO quiz_description (description, license, time_limit, intensity, quiz_id, author, category, guild_id)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """,
                     (
@@ -621,19 +829,14 @@ class QuizRelatedCache(ProblemsRelatedCache):
                 )
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     """INSERT INTO quiz_description (description, license, time_limit, intensity, quiz_id, author, category, guild_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s. %s)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                     """,
                     (
-                        # These will replace the ?'s
+                        # These will replace the %s's
                         description.description,
                         description.license,
                         description.time_limit,
@@ -644,32 +847,27 @@ class QuizRelatedCache(ProblemsRelatedCache):
                         description.guild_id,
                     ),
                 )
-                connection.commit()
+                await connection.commit()
 
     async def delete_quiz_description(self, quiz_id: int):
         """DELETE quiz description!"""
 
         assert isinstance(quiz_id, int)
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
-                    "DELETE * FROM quiz_description WHERE quiz_id = ?", (quiz_id,)
+                    "DELETE FROM quiz_description WHERE quiz_id = ?", (quiz_id,)
                 )  # Delete it
                 await conn.commit()
 
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    "DELETE * FROM quiz_description WHERE quiz_id = ?", (quiz_id,)
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    "DELETE FROM quiz_description WHERE quiz_id = %s", (quiz_id,)
                 )  # Delete it
-                connection.commit()
+                await connection.commit()
     # MARK: misc
     async def get_quizzes_by_func(
         self: "QuizRelatedCache",
@@ -680,6 +878,7 @@ class QuizRelatedCache(ProblemsRelatedCache):
         """Get the quizzes that match the function.
         Function is a function that takes in the quiz, and the provided arguments and keyword arguments.
         Return something True-like to signify you want the quiz in the list, and False-like to signify you don't.
+        If the condition can be written as a QuizQuery, use get_quizzes instead.
         """
         if args is None:
             args = []
@@ -689,12 +888,62 @@ class QuizRelatedCache(ProblemsRelatedCache):
         await self.update_cache()
         return [quiz for quiz in self.cached_quizzes if func(quiz, *args, **kwargs)]  # type: ignore
 
+    async def get_quiz_ids(self, query: QuizQuery) -> List[int]:
+        """Return the ids of the quizzes that match the query, using the indexes of the quizzes table"""
+        if not isinstance(query, QuizQuery):
+            raise TypeError("query is not a QuizQuery")
+        placeholder = "?" if self.use_sqlite else "%s"
+        columns = {
+            field: column.format(placeholder=placeholder)
+            for field, column in QUIZ_QUERY_COLUMNS.items()
+        }
+        clauses = list(query.where_sql_chunks(columns, placeholder, WHERE_IN_CHUNK_SIZE))
+        rows = []
+        if self.use_sqlite:
+            async with self.sqlite_pool.reader() as conn:
+                conn.row_factory = dict_factory
+                cursor = await conn.cursor()
+                for where, params in clauses:
+                    await cursor.execute(self._quiz_ids_sql(query, columns, where), params)
+                    rows.extend(await cursor.fetchall())
+        else:
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                for where, params in clauses:
+                    await cursor.execute(self._quiz_ids_sql(query, columns, where), params)
+                    rows.extend(await cursor.fetchall())
+        if len(clauses) > 1:  # Long where_in() conditions were split into chunks, so merge them
+            rows = query.sort_and_limit(
+                {"id": row["quiz_id"], "guild_id": row["guild_id"]} for row in rows
+            )
+            return [row["id"] for row in rows]
+        return [row["quiz_id"] for row in rows]
+
+    @staticmethod
+    def _quiz_ids_sql(query: QuizQuery, columns: Dict[str, str], where: str) -> str:
+        return (
+            "SELECT quiz_id, guild_id FROM quizzes"
+            + where
+            + " GROUP BY quiz_id, guild_id"
+            + query.order_sql(columns)
+        )
+
+    async def get_quizzes(self, query: QuizQuery, retrieve_submissions: bool = True) -> List[Quiz]:
+        """Return the quizzes that match the query, in the query's order. Unlike get_quizzes_by_func,
+        only the matching quizzes are loaded (in one batch)."""
+        quiz_ids = await self.get_quiz_ids(query)
+        return list(
+            await asyncio.gather(
+                *(self.get_quiz(quiz_id, retrieve_submissions) for quiz_id in quiz_ids)
+            )
+        )
+
     async def initialize_sql_table(self):
         """Initialize the SQL tables if they don't already exist"""
         await super().initialize_sql_table()  # Initialize base problem-related tables
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """
@@ -759,72 +1008,67 @@ class QuizRelatedCache(ProblemsRelatedCache):
                 )
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                # MySQL checks foreign keys when the table is created, so quiz_description has to be created first
+                await cursor.execute(
                     """
                     CREATE TABLE IF NOT EXISTS quiz_description (
                         id INT AUTO_INCREMENT PRIMARY KEY,
-                        quiz_id INT,
+                        quiz_id BIGINT UNIQUE,
                         description TEXT,
                         license TEXT,
                         time_limit INT,
                         intensity REAL,
                         category TEXT,
-                        author INT,
-                        guild_id INT,
-                        FOREIGN KEY (quiz_id) REFERENCES quizzes(quiz_id)
+                        author BIGINT,
+                        guild_id BIGINT
                     )
                     """
                 )
-                cursor.execute(
+                await cursor.execute(
                     """
                     CREATE TABLE IF NOT EXISTS quizzes (
                         id INT AUTO_INCREMENT PRIMARY KEY,
-                        guild_id INT,
-                        quiz_id INT,
-                        problem_id INT,
+                        guild_id BIGINT,
+                        quiz_id BIGINT,
+                        problem_id BIGINT,
                         question TEXT,
                         answer LONGBLOB,
                         voters LONGBLOB,
                         solvers LONGBLOB,
-                        author INT,
+                        author BIGINT,
                         FOREIGN KEY (quiz_id) REFERENCES quiz_description(quiz_id)
                     )
                     """
                 )
-                cursor.execute(
+                await cursor.execute(
                     """
                     CREATE TABLE IF NOT EXISTS quiz_submissions (
                         id INT AUTO_INCREMENT PRIMARY KEY,
-                        guild_id INT,
-                        quiz_id INT,
-                        user_id INT,
+                        guild_id BIGINT,
+                        quiz_id BIGINT,
+                        user_id BIGINT,
                         submissions LONGBLOB,
                         FOREIGN KEY (quiz_id) REFERENCES quiz_description(quiz_id)
                     )
                     """
                 )
-                cursor.execute(
+                await cursor.execute(
                     """
                     CREATE TABLE IF NOT EXISTS quiz_submission_sessions (
                         id INT AUTO_INCREMENT PRIMARY KEY,
-                        user_id INT,
-                        quiz_id INT,
-                        guild_id INT,
+                        user_id BIGINT,
+                        quiz_id BIGINT,
+                        guild_id BIGINT,
                         is_finished INT,
                         answers LONGBLOB,
                         start_time INT,
                         expire_time INT,
-                        special_id INT,
+                        special_id BIGINT,
                         attempt_num INT,
                         FOREIGN KEY (quiz_id) REFERENCES quiz_description(quiz_id)
                     )
                     """
                 )
-                connection.commit()
+                await connection.commit()
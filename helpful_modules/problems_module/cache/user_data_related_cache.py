@@ -29,14 +29,14 @@ from copy import copy, deepcopy
 from types import FunctionType
 from typing import *
 
-import aiosqlite
 import disnake
 import orjson
+from aiomysql import DictCursor
 
 from helpful_modules.dict_factory import dict_factory
 
 from ..errors import *
-from ..mysql_connector_with_stmt import mysql_connection
+from ..ttl_cache import MISSING
 from ..user_data import UserData
 from .quiz_related_cache import QuizRelatedCache
 
@@ -50,6 +50,9 @@ class UserDataRelatedCache(QuizRelatedCache):
     async def get_user_data(
         self, user_id: int, default: typing.Optional[UserData] | str = None
     ):
+        """Get the user data of a user, or default if they don't have any.
+        This is called by the checks of almost every command, so the rows (including missing ones) are cached;
+        see user_data_cache_stats."""
         log.debug(
             f"get_user_data method called. user_id: {user_id}, default: {default}"
         )
@@ -60,62 +63,65 @@ class UserDataRelatedCache(QuizRelatedCache):
         if default is None:
             default = UserData.default(user_id=user_id)
             # To avoid mutable default arguments
+        row = self._user_data_cache.get(user_id)
+        if row is MISSING:
+            version = self._user_data_cache.version
+            row = await self._select_user_data_row(user_id)
+            self._user_data_cache.put(user_id, row, version=version)
+        if row is None:
+            return default
+        # A new UserData every time, so that changing it doesn't change the cache
+        return UserData.from_dict(row)
+
+    async def _select_user_data_row(self, user_id: int) -> typing.Optional[dict]:
+        """Select the user data of a user from the database, or None if they don't have any"""
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "SELECT * FROM user_data WHERE user_id = ?", (user_id,)
                 )  # Select the data
                 cursor_results = list(await cursor.fetchall())
-                log.debug(f"Data selected (results: {cursor_results})")
-                if len(cursor_results) == 0:
-                    return default
-                elif len(cursor_results) == 1:
-                    dict_to_use = cursor_results[0]
-                    dict_to_use["trusted"] = bool(dict_to_use["trusted"])
-                    dict_to_use["denylisted"] = bool(dict_to_use["denylisted"])
-                    dict_to_use["user_id"] = int(dict_to_use["user_id"])
-                    log.debug("Data successfully returned!")
-                    return UserData.from_dict(dict_to_use)
-                else:
-                    raise TooMuchUserDataException(
-                        f"Too much user data; found {len(cursor_results)} results, but only 0 or 1 results are expected."
-                        f"Results: {cursor_results}"
-                    )
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
+            async with self.get_a_connection() as connection:
                 log.debug("Connected to MySQL")
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     "SELECT * FROM user_data WHERE user_id=%s",
-                    (user_id,),  # TODO: fix placeholders
+                    (user_id,),
                 )
-                results = list(cursor.fetchall())
-                if len(results) == 0:
-                    return default
-                elif len(results) == 1:
-                    results[0]["user_id"] = results[0]["USER_ID"]
-                    return UserData.from_dict(results[0])
-                else:
-                    try:
-                        raise TooMuchUserDataException(
-                            f"Too much user data; found {len(results)} results, but only 0 or 1 results are expected."
-                        )
-                    except NameError:
-                        raise TooMuchUserDataException("Too much user data found!")
+                cursor_results = list(await cursor.fetchall())
+        log.debug(f"Data selected (results: {cursor_results})")
+        if len(cursor_results) == 0:
+            return None
+        elif len(cursor_results) == 1:
+            return self._normalize_user_data_row(cursor_results[0])
+        else:
+            raise TooMuchUserDataException(
+                f"Too much user data; found {len(cursor_results)} results, but only 0 or 1 results are expected."
+                f"Results: {cursor_results}"
+            )
+
+    @staticmethod
+    def _normalize_user_data_row(row: dict) -> dict:
+        """Convert the columns to the types UserData.from_dict expects (SQLite and MySQL store booleans as integers)"""
+        row = dict(row)
+        row["trusted"] = bool(row["trusted"])
+        row["denylisted"] = bool(row["denylisted"])
+        row["user_id"] = int(row["user_id"])
+        if row.get("denylist_reason") is None:
+            row["denylist_reason"] = ""
+        row["denylist_expiry"] = float(row["denylist_expiry"] or 0.0)
+        return row
 
     async def set_user_data(self, user_id: int, new: UserData) -> None:
-        """Set the user_data of a user."""
+        """Set the user_data of a user. The cached user data is replaced too."""
         assert isinstance(user_id, int)
         assert isinstance(new, UserData)
+        verification_code_denylist = orjson.dumps(new.verification_code_denylist.to_dict()).decode('utf-8')
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 log.debug("Connected to SQLite!")
                 conn.row_factory = dict_factory
                 denylisted_int = int(new.denylisted)
@@ -123,53 +129,51 @@ class UserDataRelatedCache(QuizRelatedCache):
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "INSERT OR REPLACE INTO user_data (user_id, denylisted, trusted, denylist_reason, denylist_expiry, verification_code_denylist) VALUES (?, ?, ?, ?, ?, ?)",
-                    (user_id, denylisted_int, trusted_int, new.denylist_reason, new.denylist_expiry, orjson.dumps(new.verification_code_denylist.to_dict()).decode('utf-8')),
+                    (user_id, denylisted_int, trusted_int, new.denylist_reason, new.denylist_expiry, verification_code_denylist),
                 )
-                await conn.commit()
                 log.debug("Finished!")
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
+            async with self.get_a_connection() as connection:
                 log.debug("Connected to MySQL")
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute(
-                    """INSERT OR REPLACE INTO user_data (user_id, denylisted, trusted, denylist_reason, denylist_expiry, verification_code_denylist) VALUES (%s, %s, %s, %s, %s, %s)""",
-                    (user_id, new.trusted, new.denylisted, new.denylist_reason, new.denylist_expiry, orjson.dumps(new.verification_code_denylist.to_dict()).decode('utf-8')),
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
+                    """INSERT INTO user_data (user_id, denylisted, trusted, denylist_reason, denylist_expiry, verification_code_denylist) VALUES (%s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE denylisted = VALUES(denylisted), trusted = VALUES(trusted), denylist_reason = VALUES(denylist_reason),
+                    denylist_expiry = VALUES(denylist_expiry), verification_code_denylist = VALUES(verification_code_denylist)""",
+                    (user_id, new.denylisted, new.trusted, new.denylist_reason, new.denylist_expiry, verification_code_denylist),
                 )
-                connection.commit()
+                await connection.commit()
                 log.debug("Finished!")
-                return
+        # Write through, storing what was written (not new, which the caller might change later)
+        self._user_data_cache.put(
+            user_id,
+            {
+                **new.to_dict(),
+                "user_id": user_id,
+                "verification_code_denylist": verification_code_denylist,
+            },
+        )
 
     async def del_user_data(self, user_id: int):
         """Delete user data given the user id"""
         assert isinstance(user_id, int)
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.transaction() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "DELETE FROM user_data WHERE user_id = ?", (user_id,)
                 )
-                await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor(dictionaries=True)
-                cursor.execute("DELETE FROM user_data WHERE user_id = %s", (user_id,))
-                connection.commit()
-                connection.close()
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute("DELETE FROM user_data WHERE user_id = %s", (user_id,))
+                await connection.commit()
+        self._user_data_cache.invalidate(user_id)
 
     async def initialize_sql_table(self) -> None:
         """Initialize SQL tables if they don't exist."""
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db_name) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     """
@@ -185,17 +189,12 @@ class UserDataRelatedCache(QuizRelatedCache):
                 )
                 await conn.commit()
         else:
-            with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as connection:
-                cursor = connection.cursor()
-                cursor.execute(
+            async with self.get_a_connection() as connection:
+                cursor = await connection.cursor(DictCursor)
+                await cursor.execute(
                     """
                     CREATE TABLE IF NOT EXISTS user_data (
-                        user_id INT PRIMARY KEY,
+                        user_id BIGINT PRIMARY KEY,
                         trusted BOOLEAN,
                         denylisted BOOLEAN,
                         denylist_reason TEXT,
@@ -204,4 +203,4 @@ class UserDataRelatedCache(QuizRelatedCache):
                     )
                 """
                 )
-                connection.commit()
+                await connection.commit()
@@ -23,11 +23,10 @@ Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
 
 import aiomysql
-import aiosqlite
 import orjson
+from aiomysql import DictCursor
 
 from ..errors import SQLException, VerificationCodeInfoNotFound
-from ..mysqlcontextmanager import mysql_connection
 from ..verification_code_info import VerificationCodeInfo
 from .appeals_related_cache import AppealsRelatedCache
 from ...dict_factory import dict_factory
@@ -38,7 +37,7 @@ class VerificationCodesRelatedCache(AppealsRelatedCache):
         await super().initialize_sql_table()
         await self.run_sql(
             """CREATE TABLE IF NOT EXISTS verification_code_infos(
-            user_id INT PRIMARY KEY,
+            user_id BIGINT PRIMARY KEY,
             hashed_verification_code BLOB,
             salt BLOB,
             expiry DOUBLE,
@@ -53,7 +52,7 @@ class VerificationCodesRelatedCache(AppealsRelatedCache):
             )
 
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute(
                     "INSERT OR REPLACE INTO verification_code_infos (user_id, hashed_verification_code, salt, expiry, created_at, scrypt_parameters) VALUES (?, ?, ?, ?, ?, ?)",
@@ -68,13 +67,8 @@ class VerificationCodesRelatedCache(AppealsRelatedCache):
                 )
                 await conn.commit()
         else:
-            async with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as conn:
-                cursor = await conn.cursor()
+            async with self.get_a_connection() as conn:
+                cursor = await conn.cursor(DictCursor)
                 await cursor.execute(
                     """INSERT INTO verification_code_infos (user_id, hashed_verification_code, salt, expiry, created_at, scrypt_parameters)
                     VALUES (%s, %s, %s, %s, %s, %s)
@@ -102,7 +96,7 @@ class VerificationCodesRelatedCache(AppealsRelatedCache):
                 f"user_id is not an int, but an instance of {user_id.__class__.__name__} and is {user_id}"
             )
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.reader() as conn:
                 conn.row_factory = dict_factory
                 cursor = await conn.cursor()
                 await cursor.execute(
@@ -111,12 +105,7 @@ class VerificationCodesRelatedCache(AppealsRelatedCache):
                 )
                 results = list(await cursor.fetchall())
         else:
-            async with mysql_connection(
-                host=self.mysql_db_ip,
-                password=self.mysql_password,
-                user=self.mysql_username,
-                database=self.mysql_db_name,
-            ) as conn:
+            async with self.get_a_connection() as conn:
                 cursor = await conn.cursor(aiomysql.DictCursor)
                 await cursor.execute(
                     "SELECT * from verification_code_infos WHERE user_id=%s", (user_id,)
@@ -146,17 +135,12 @@ class VerificationCodesRelatedCache(AppealsRelatedCache):
                 f"user_id is not an int, but an instance of {user_id.__class__.__name__} and is {user_id}"
             )
         if self.use_sqlite:
-            async with aiosqlite.connect(self.db) as conn:
+            async with self.sqlite_pool.writer() as conn:
                 cursor = await conn.cursor()
                 await cursor.execute("DELETE FROM verification_code_infos WHERE user_id = ?", (user_id,))
                 await conn.commit()
         else:
-            async with mysql_connection(
-                    host=self.mysql_db_ip,
-                    password=self.mysql_password,
-                    user=self.mysql_username,
-                    database=self.mysql_db_name,
-            ) as conn:
-                cursor = await conn.cursor()
+            async with self.get_a_connection() as conn:
+                cursor = await conn.cursor(DictCursor)
                 await cursor.execute("DELETE FROM verification_code_infos WHERE user_id = %s", (user_id,))
                 await conn.commit()
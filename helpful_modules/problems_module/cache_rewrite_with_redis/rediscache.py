@@ -24,13 +24,16 @@ Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 
 import asyncio
 import json
+import logging
+import time
 import typing
 from typing import List
 
 import orjson
 from redis import asyncio as aioredis  # type: ignore
+from redis.exceptions import WatchError  # type: ignore
 
-from ...FileDictionaryReader import AsyncFileDict
+from ...config_source import ConfigSource
 from ..appeal import Appeal, AppealViewInfo
 from ..base_problem import BaseProblem
 from ..dict_convertible import DictConvertible
@@ -46,22 +49,179 @@ from ..errors import (
 )
 from ..GuildData import GuildData
 from ..parse_problem import convert_dict_to_problem
+from ..query import ProblemQuery
+from ..ttl_cache import MISSING, TTLCache
 from ..quizzes import Quiz
 from ..user_data import UserData
 from ..verification_code_info import VerificationCodeInfo
 
+if typing.TYPE_CHECKING:
+    from ..cache import MathProblemCache
+
+log = logging.getLogger(__name__)
+
+# Sets of the keys of problems, so that listing problems doesn't have to look at every key
+ALL_PROBLEMS_KEY = "problems:all"
+GLOBAL_PROBLEMS_KEY = "problems:global"
+PROBLEM_KEYS_KEY = "problems:keys"  # A hash from problem id to the key the problem is stored at
+SCAN_BATCH_SIZE = 500  # How many problems to fetch per round trip when listing problems
+
+# Problems and quizzes that haven't been read for a while can be moved to a SQL cache (the cold store).
+# Their keys stay in the index sets, but their values are only in the SQL cache until they are read again.
+ACCESS_TIMES_KEY = "tiering:access_times"  # A sorted set of the keys in Redis, by when they were last accessed
+COLD_KEYS_KEY = "tiering:cold"  # The set of the keys whose values are in the cold store
+TIERED_KEY_PREFIXES = ("BaseProblem:", "QuizProblem:", "Quiz:")
+RECENT_ACCESSES_SIZE = 10000  # How many recently accessed keys each process remembers
+
+
+def guild_problems_key(guild_id: int | str | None) -> str:
+    """Return the key of the set of the keys of a guild's problems"""
+    if guild_id is None or guild_id == "None":  # BaseProblem.to_dict() stores None as "None"
+        return GLOBAL_PROBLEMS_KEY
+    return f"problems:guild:{guild_id}"
+
+
+def author_problems_key(author: int | str) -> str:
+    """Return the key of the set of the keys of the problems written by author"""
+    return f"problems:author:{author}"
+
+
+def user_keys_key(user_id: int | str) -> str:
+    """Return the key of the set of the keys of everything that belongs to a user (for exporting and deleting it)"""
+    return f"user:{user_id}:keys"
+
+
+def is_tiered_key(key: str) -> bool:
+    """Return whether the value at key can be moved to the cold store"""
+    return key.startswith(TIERED_KEY_PREFIXES)
+
 
 class RedisCache:
     """A class that is supposed to handle the problems, and have the same API as problems_related_cache"""
 
-    def __init__(self, redis_url: str, password: str):
+    def __init__(
+            self,
+            redis_url: str,
+            password: str,
+            near_cache_size: int = 0,
+            near_cache_ttl: float = 30.0,
+            invalidation_channel: str = "cache:invalidations",
+            cold_store: "MathProblemCache | None" = None,
+            memory_high_watermark: int | None = None,
+            memory_low_watermark: int | None = None,
+            access_time_resolution: float = 60.0,
+    ):
+        """
+        :param near_cache_size: How many problems, quizzes, UserData and GuildData to keep in this process.
+            0 (the default) disables the near cache. Every write publishes the keys it changed on
+            invalidation_channel, and every process evicts them from its near cache.
+        :param near_cache_ttl: How many seconds an entry is kept for. This bounds how stale an entry can get
+            if an invalidation is lost.
+        :param cold_store: A SQL cache to move problems and quizzes that haven't been read recently to.
+            None (the default) disables this.
+        :param memory_high_watermark: When Redis uses more than this many bytes, enforce_memory_watermark()
+            moves the least recently accessed problems and quizzes to the cold store...
+        :param memory_low_watermark: ...until Redis uses at most this many bytes (by default, the high watermark).
+        :param access_time_resolution: How accurate (in seconds) the access times are. Each process records
+            at most one access per key per this many seconds.
+        """
         self.redis_url = redis_url
         self.password = password
         self.redis = aioredis.from_url(
             redis_url, encoding="utf-8", decode_responses=True, password=password
         )
         self.lock = asyncio.Lock()
-        self._async_file_dict = AsyncFileDict("config.json")
+        self._config_source = ConfigSource("config.json")
+        self.invalidation_channel = invalidation_channel
+        self._near_cache: TTLCache[str, typing.Any] | None = (
+            TTLCache(near_cache_size, near_cache_ttl) if near_cache_size > 0 else None
+        )
+        self._listener: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+        self.invalidations_received = 0
+        self.max_invalidation_lag = 0.0  # in seconds
+        self._total_invalidation_lag = 0.0
+        self.cold_store = cold_store
+        self.memory_high_watermark = memory_high_watermark
+        self.memory_low_watermark = memory_low_watermark
+        self.access_time_resolution = access_time_resolution
+        self._recent_accesses: TTLCache[str, bool] = TTLCache(RECENT_ACCESSES_SIZE, access_time_resolution)
+        self.demotions = 0
+        self.promotions = 0
+
+    async def close(self):
+        """Close the connection to Redis"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        await self.redis.aclose()
+
+    @property
+    def near_cache_stats(self) -> dict | None:
+        """Return the near cache's hit rate and how long invalidations take to arrive,
+        or None if there's no near cache"""
+        if self._near_cache is None:
+            return None
+        return {
+            **self._near_cache.stats,
+            "ttl": self._near_cache.ttl,
+            "listening": self._subscribed.is_set(),
+            "invalidations_received": self.invalidations_received,
+            "avg_invalidation_lag": self._total_invalidation_lag / self.invalidations_received
+            if self.invalidations_received
+            else 0.0,
+            "max_invalidation_lag": self.max_invalidation_lag,
+        }
+
+    def _ensure_listener(self) -> None:
+        """Start listening for invalidations, if this process isn't already"""
+        if self._listener is None or self._listener.done():
+            self._subscribed.clear()
+            self._listener = asyncio.ensure_future(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.invalidation_channel)
+            # Anything cached before now might have missed an invalidation
+            self._near_cache.clear()
+            self._subscribed.set()
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                data = orjson.loads(message["data"])
+                lag = max(time.time() - data["sent_at"], 0.0)
+                self.invalidations_received += 1
+                self._total_invalidation_lag += lag
+                self.max_invalidation_lag = max(self.max_invalidation_lag, lag)
+                for key in data["keys"]:
+                    self._near_cache.invalidate(key)
+        except Exception as exc:
+            log.exception(exc)
+        finally:
+            # Without the subscription, nothing in the near cache can be trusted
+            self._subscribed.clear()
+            self._near_cache.clear()
+            await pubsub.aclose()
+
+    async def _get_key_cached(self, key: str) -> str | None:
+        """Return the value at key (None if the key doesn't exist), using the near cache if there is one.
+        The near cache holds the JSON, not the decoded objects, because callers modify what they get."""
+        if self._near_cache is None:
+            return await self.get_key(key)
+        self._ensure_listener()
+        cached = self._near_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        version = self._near_cache.version  # If the key is invalidated during the GET, the value isn't cached
+        value = await self.get_key(key)
+        if self._subscribed.is_set():
+            self._near_cache.put(key, value, version)
+        return value
 
     @property
     def is_locked(self):
@@ -71,48 +231,370 @@ class RedisCache:
     async def get_key(self, thing: str):
         """Return the value with key thing
         Time complexity: O(1)"""
-        return await self.redis.hget(thing)
+        return await self.redis.get(thing)
 
-    async def set_key(self, key: str, value: str | dict):
-        """Set the thing at key to value.
+    async def set_key(self, key: str, value: str | bytes | dict):
+        """Set the thing at key to value. Dictionaries are stored as JSON.
         Time complexity: O(1)
         :param key: the key
         :param value: the value
         :return: Nothing
         :raises LockedCacheException: If the cache is locked"""
-        if self.is_locked:
-            raise LockedCacheException("The cache is currently locked!")
-        await self.redis.hset(key, str(value))
+        await self._set_keys({key: value})
 
     async def del_key(self, key: str):
         """Delete the key associated with key:
         Time complexity: O(1)"""
+        await self._set_keys({key: None})
+
+    @staticmethod
+    def _decode_problem(value: str) -> BaseProblem:
+        """Convert what BaseProblem.to_dict() stored back to a problem"""
+        return convert_dict_to_problem(orjson.loads(value))
+
+    @staticmethod
+    def _parse_value(value: str | bytes | dict | None) -> dict | None:
+        """Return the value as a dictionary, or None if it isn't a JSON dictionary"""
+        if value is None or isinstance(value, dict):
+            return value
+        try:
+            parsed = orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    @staticmethod
+    def _user_ids_of(value: dict | None) -> typing.Set[str]:
+        """Return the ids of the users a thing belongs to (its author, authors or user_id)"""
+        if value is None:
+            return set()
+        user_ids = set(value.get("authors") or [])
+        user_ids.add(value.get("author"))
+        user_ids.add(value.get("user_id"))
+        user_ids.discard(None)
+        return {str(user_id) for user_id in user_ids}
+
+    @staticmethod
+    def _index_problem(pipeline, key: str, problem: dict, add: bool = True) -> None:
+        """Queue the commands that add key to (or if add is False, remove it from) the problem index sets"""
+        sets = (
+            ALL_PROBLEMS_KEY,
+            guild_problems_key(problem.get("guild_id")),
+            author_problems_key(problem.get("author")),
+        )
+        for set_key in sets:
+            if add:
+                pipeline.sadd(set_key, key)
+            else:
+                pipeline.srem(set_key, key)
+        if add:
+            pipeline.hset(PROBLEM_KEYS_KEY, str(problem["id"]), key)
+        else:
+            pipeline.hdel(PROBLEM_KEYS_KEY, str(problem["id"]))
+
+    async def _set_keys(
+            self, values: typing.Dict[str, str | bytes | dict | None], problems: bool = False
+    ) -> None:
+        """Set each key to its value, or unlink the key if the value is None, in one transaction.
+        Each user's set of keys (user_keys_key) is updated in the same transaction, and so are the problem
+        index sets if problems is True (then the new values must be problems). The old values are read first,
+        so that the keys are removed from the sets they were in. If one of the keys is changed in the meantime,
+        this is retried.
+        :raises LockedCacheException: If the cache is locked"""
         if self.is_locked:
-            raise LockedCacheException("The cache is currently locked")
-        await self.redis.hdel(key)
+            raise LockedCacheException("The cache is currently locked!")
+        if not values:
+            return
+        keys = list(values.keys())
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            while True:
+                try:
+                    await pipeline.watch(*keys)
+                    old_values = await pipeline.mget(keys)
+                    cold_keys = await self._cold_keys_among(keys, pipeline)
+                    if cold_keys:
+                        # The index sets are updated based on the old values, so those have to be read too
+                        cold_values = await self.cold_store.get_cold_storage_values(cold_keys)
+                        old_values = [
+                            cold_values.get(key) if key in cold_keys else old_value
+                            for key, old_value in zip(keys, old_values)
+                        ]
+                    if problems:
+                        were_problems = await pipeline.smismember(ALL_PROBLEMS_KEY, keys)
+                    else:
+                        were_problems = [False] * len(keys)
+                    pipeline.multi()
+                    for key, old_value, was_problem in zip(keys, old_values, were_problems):
+                        old = self._parse_value(old_value)
+                        new = self._parse_value(values[key])
+                        old_users = self._user_ids_of(old)
+                        new_users = self._user_ids_of(new)
+                        for user_id in old_users - new_users:
+                            pipeline.srem(user_keys_key(user_id), key)
+                        for user_id in new_users - old_users:
+                            pipeline.sadd(user_keys_key(user_id), key)
+                        if was_problem and old is not None:
+                            self._index_problem(pipeline, key, old, add=False)
+                        if key in cold_keys:
+                            pipeline.srem(COLD_KEYS_KEY, key)
+                        if self.cold_store is not None and is_tiered_key(key):
+                            if values[key] is None:
+                                pipeline.zrem(ACCESS_TIMES_KEY, key)
+                            else:
+                                pipeline.zadd(ACCESS_TIMES_KEY, {key: time.time()})
+                        if values[key] is None:
+                            pipeline.unlink(key)
+                            continue
+                        pipeline.set(
+                            key, orjson.dumps(values[key]) if isinstance(values[key], dict) else values[key]
+                        )
+                        if problems and new is not None:
+                            self._index_problem(pipeline, key, new)
+                    # Published even without a near cache here, because other processes might have one
+                    pipeline.publish(
+                        self.invalidation_channel,
+                        orjson.dumps({"sent_at": time.time(), "keys": keys}),
+                    )
+                    await pipeline.execute()
+                    break
+                except WatchError:
+                    continue  # Someone else changed one of the keys, so the old values might be wrong
+        if self._near_cache is not None:
+            for key in keys:
+                self._near_cache.invalidate(key)  # Don't wait for our own invalidation to arrive
+        if self.cold_store is not None:
+            # The cold store can have a copy even if the key isn't cold anymore, and deleted things must be deleted
+            deleted = [key for key in keys if values[key] is None and is_tiered_key(key)]
+            await self.cold_store.delete_cold_storage_values(deleted)
+
+    async def _cold_keys_among(self, keys: typing.List[str], client=None) -> typing.Set[str]:
+        """Return the keys whose values are in the cold store"""
+        if self.cold_store is None:
+            return set()
+        tiered = [key for key in keys if is_tiered_key(key)]
+        if not tiered:
+            return set()
+        client = self.redis if client is None else client
+        return {key for key, is_cold in zip(tiered, await client.smismember(COLD_KEYS_KEY, tiered)) if is_cold}
+
+    async def _fill_in_cold_values(
+            self, keys: typing.List[str], values: typing.List[str | None]
+    ) -> typing.List[str | None]:
+        """Return values (read from Redis), with the values of the cold keys read from the cold store.
+        The cold keys aren't moved back into Redis, so that listing everything doesn't make everything hot."""
+        if self.cold_store is None:
+            return values
+        cold_keys = await self._cold_keys_among([key for key, value in zip(keys, values) if value is None])
+        if not cold_keys:
+            return values
+        cold_values = await self.cold_store.get_cold_storage_values(cold_keys)
+        return [cold_values.get(key) if value is None else value for key, value in zip(keys, values)]
+
+    async def _record_access(self, keys: typing.Iterable[str]) -> None:
+        """Record that keys (which are in Redis) were just read.
+        Each process records at most one access per key per access_time_resolution seconds."""
+        if self.cold_store is None:
+            return
+        now = time.time()
+        accessed = {}
+        for key in keys:
+            if is_tiered_key(key) and key not in self._recent_accesses:
+                self._recent_accesses.put(key, True)
+                accessed[key] = now
+        if accessed:
+            await self.redis.zadd(ACCESS_TIMES_KEY, accessed)
+
+    async def _promote(self, key: str) -> str | None:
+        """Move the value at key back from the cold store into Redis, and return it.
+        Return None if the key doesn't exist in either."""
+        if self.cold_store is None:
+            return None
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            while True:
+                try:
+                    # COLD_KEYS_KEY is watched too, because deleting a cold key doesn't change the key itself
+                    await pipeline.watch(key, COLD_KEYS_KEY)
+                    value = await pipeline.get(key)
+                    if value is not None:
+                        return value  # Someone else promoted it first
+                    if not await pipeline.sismember(COLD_KEYS_KEY, key):
+                        return None
+                    value = (await self.cold_store.get_cold_storage_values([key])).get(key)
+                    if value is None:
+                        log.warning(f"{key} is cold, but it isn't in the cold store")
+                        return None
+                    pipeline.multi()
+                    pipeline.set(key, value)
+                    pipeline.srem(COLD_KEYS_KEY, key)
+                    pipeline.zadd(ACCESS_TIMES_KEY, {key: time.time()})
+                    # Near caches could have cached that the key doesn't exist
+                    pipeline.publish(
+                        self.invalidation_channel,
+                        orjson.dumps({"sent_at": time.time(), "keys": [key]}),
+                    )
+                    await pipeline.execute()
+                    break
+                except WatchError:
+                    continue
+        # The copy in the cold store is left there: it is ignored until the key is demoted (and overwritten) again
+        if self._near_cache is not None:
+            self._near_cache.invalidate(key)
+        self._recent_accesses.put(key, True)
+        self.promotions += 1
+        return value
+
+    async def _get_tiered_key(self, key: str) -> str | None:
+        """Return the value at key, moving it back into Redis if it's in the cold store"""
+        value = await self._get_key_cached(key)
+        if value is not None:
+            await self._record_access([key])
+            return value
+        return await self._promote(key)
+
+    async def demote_coldest(self, count: int = SCAN_BATCH_SIZE, min_idle: float | None = None) -> int:
+        """Move up to count of the least recently accessed problems and quizzes to the cold store,
+        but only ones that haven't been accessed for min_idle seconds (by default, access_time_resolution).
+        Return how many were moved.
+        :raises ValueError: If there is no cold store"""
+        if self.cold_store is None:
+            raise ValueError("There is no cold store to move things to")
+        if min_idle is None:
+            min_idle = self.access_time_resolution
+        keys = await self.redis.zrangebyscore(
+            ACCESS_TIMES_KEY, "-inf", time.time() - min_idle, start=0, num=count
+        )
+        if not keys:
+            return 0
+        async with self.redis.pipeline(transaction=True) as pipeline:
+            while True:
+                try:
+                    await pipeline.watch(*keys)
+                    values = await pipeline.mget(keys)
+                    present = {key: value for key, value in zip(keys, values) if value is not None}
+                    # Written before the keys are unlinked, so that the values are never only in the transaction.
+                    # If one of the keys changes in the meantime, this is retried (and the copy is overwritten).
+                    await self.cold_store.set_cold_storage_values(present)
+                    pipeline.multi()
+                    pipeline.zrem(ACCESS_TIMES_KEY, *keys)  # Keys that don't exist anymore are just forgotten
+                    if present:
+                        pipeline.sadd(COLD_KEYS_KEY, *present)
+                        pipeline.unlink(*present)
+                    await pipeline.execute()
+                    break
+                except WatchError:
+                    continue
+        self.demotions += len(present)
+        return len(present)
+
+    async def used_memory(self) -> int:
+        """Return how many bytes of memory Redis uses"""
+        return (await self.redis.info("memory"))["used_memory"]
+
+    async def enforce_memory_watermark(self, batch_size: int = SCAN_BATCH_SIZE) -> int:
+        """If Redis uses more memory than memory_high_watermark, move the least recently accessed problems
+        and quizzes to the cold store until it uses at most memory_low_watermark (or there's nothing left to move).
+        Return how many were moved. Nothing happens if there's no cold store or no watermark."""
+        if self.cold_store is None or self.memory_high_watermark is None:
+            return 0
+        used_memory = await self.used_memory()
+        if used_memory <= self.memory_high_watermark:
+            return 0
+        target = self.memory_high_watermark if self.memory_low_watermark is None else self.memory_low_watermark
+        demoted = 0
+        while used_memory > target:
+            count = await self.demote_coldest(batch_size)
+            if count == 0:
+                break
+            demoted += count
+            used_memory = await self.used_memory()
+        log.info(f"Moved {demoted} problems and quizzes out of Redis (which now uses {used_memory} bytes)")
+        return demoted
+
+    @property
+    def tiering_stats(self) -> dict:
+        """Return how many problems and quizzes this process moved to and from the cold store"""
+        return {
+            "enabled": self.cold_store is not None,
+            "demotions": self.demotions,
+            "promotions": self.promotions,
+            "memory_high_watermark": self.memory_high_watermark,
+            "memory_low_watermark": self.memory_low_watermark,
+        }
 
     async def get_problem(self, guild_id: int, problem_id: int) -> BaseProblem:
         """Attempt to return the problem with guild_id and problem_id =problem_id
         Time complexity: O(1)"""
         if guild_id is not None and not isinstance(guild_id, int):
             raise TypeError("guild_id is not an int")
-        result = await self.get_key(f"BaseProblem:{guild_id}:{problem_id}")
-        if result is not None:
-            return convert_dict_to_problem(orjson.loads(result))
-        result = await self.get_key(f"QuizProblem:{guild_id}:{problem_id}")
-        if result is not None:
-            return convert_dict_to_problem(orjson.loads(result))
+        for cls_name in ("BaseProblem", "QuizProblem"):
+            result = await self._get_tiered_key(f"{cls_name}:{guild_id}:{problem_id}")
+            if result is not None:
+                return self._decode_problem(result)
         raise ProblemNotFoundException("That problem is not found")
 
+    async def get_problems_many(
+            self, problem_ids: typing.Iterable[int]
+    ) -> typing.Dict[int, BaseProblem]:
+        """
+        Get many problems by their ids, in 2 round trips to Redis (an HMGET and an MGET).
+        Time complexity: O(N)
+
+        :param problem_ids: The ids of the problems.
+        :return: A dictionary from problem id to problem. Problems that don't exist are left out.
+        """
+        problem_ids = list(problem_ids)
+        if not problem_ids:
+            return {}
+        keys = await self.redis.hmget(PROBLEM_KEYS_KEY, [str(problem_id) for problem_id in problem_ids])
+        found = [(problem_id, key) for problem_id, key in zip(problem_ids, keys) if key is not None]
+        if not found:
+            return {}
+        values = await self.redis.mget([key for _, key in found])
+        await self._record_access(key for (_, key), value in zip(found, values) if value is not None)
+        values = await self._fill_in_cold_values([key for _, key in found], values)
+        return {
+            problem_id: self._decode_problem(value)
+            for (problem_id, _), value in zip(found, values)
+            if value is not None  # Deleted between the 2 round trips
+        }
+
+    async def _scan_problems(
+            self, set_key: str, batch_size: int = SCAN_BATCH_SIZE
+    ) -> typing.AsyncIterator[BaseProblem]:
+        """Yield the problems whose keys are in a set, fetching about batch_size problems per SSCAN and MGET"""
+        seen = set()  # SSCAN can return a key more than once
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis.sscan(set_key, cursor, count=batch_size)
+            keys = [key for key in keys if key not in seen]
+            seen.update(keys)
+            if keys:
+                values = await self._fill_in_cold_values(keys, await self.redis.mget(keys))
+                for value in values:
+                    if value is not None:  # Deleted since the scan
+                        yield self._decode_problem(value)
+            if cursor == 0:
+                return
+
+    def iter_problems_by_guild(self, guild_id: int | None) -> typing.AsyncIterator[BaseProblem]:
+        """Yield the problems of a guild (or the global problems if guild_id is None) in batches.
+        Time complexity: O(number of problems in the guild)"""
+        return self._scan_problems(guild_problems_key(guild_id))
+
+    def iter_all_problems(self) -> typing.AsyncIterator[BaseProblem]:
+        """Yield every problem in batches.
+        Time complexity: O(N)"""
+        return self._scan_problems(ALL_PROBLEMS_KEY)
+
     async def get_all_problems(self):
         """Return a list of all problems!
         Time complexity: O(N)"""
-        return list(
-            map(
-                convert_dict_to_problem,
-                await self.redis.hgetall("BaseProblem").values(),
-            )
-        )
+        return [problem async for problem in self.iter_all_problems()]
+
+    async def get_problems_by_author_id(self, author_id: int) -> List[BaseProblem]:
+        """Return a list of the problems written by the author.
+        Time complexity: O(number of problems written by the author)"""
+        return [problem async for problem in self._scan_problems(author_problems_key(author_id))]
 
     async def get_all_things(self):
         """Return a list of EVERYTHING in the database"""
@@ -120,20 +602,74 @@ class RedisCache:
 
     async def get_all_problems_by_guild(self, guild_id: int | None):
         """return a list of all problems with the guild id = id
-        Time complexity: O(N)"""
-        return list(
-            map(
-                convert_dict_to_problem,
-                await self.redis.hgetall(f"BaseProblem:{guild_id}").values(),
-            )
-        )
+        Time complexity: O(number of problems in the guild)"""
+        return [problem async for problem in self.iter_problems_by_guild(guild_id)]
 
     async def get_all_problems_by_func(self, func):
-        """Return a list of all problems that satisfy the function.
-        It is actually implemented as filter(func, await self.get_all_problems())
+        """Return a list of all problems that satisfy the function. If the condition can be written as
+        a ProblemQuery, use get_problems instead, which only reads the problems the index sets point to.
+        The problems are streamed in batches, so they don't all have to be in memory at once.
         Time complexity: O(N + sumF(P) over all problems) where F(P) is the big O runtime
         of calling func on a problem P"""
-        return filter(func, await self.get_all_problems())
+        return [problem async for problem in self.iter_all_problems() if func(problem)]
+
+    async def _problem_keys_matching(self, query: ProblemQuery) -> typing.Set[str] | None:
+        """Return the keys of the problems that meet the query's id, guild_id and author conditions,
+        using the index sets, or None if the query has none of these conditions"""
+        set_keys_per_condition: typing.List[typing.List[str]] = []  # The union of each list's sets meets a condition
+        ids_per_condition: typing.List[typing.List[str]] = []
+        for field, operator, value in query.conditions:
+            values = list(value) if operator == "in" else [value]
+            if field == "guild_id":
+                set_keys_per_condition.append([guild_problems_key(item) for item in values])
+            elif field == "author":
+                set_keys_per_condition.append([author_problems_key(item) for item in values])
+            elif field == "id":
+                ids_per_condition.append([str(item) for item in values])
+        if not set_keys_per_condition and not ids_per_condition:
+            return None
+        if any(not values for values in set_keys_per_condition + ids_per_condition):
+            return set()  # An "in" condition with no values
+        keys = None
+        if all(len(set_keys) == 1 for set_keys in set_keys_per_condition):
+            if set_keys_per_condition:
+                keys = set(await self.redis.sinter([set_keys[0] for set_keys in set_keys_per_condition]))
+        else:
+            async with self.redis.pipeline(transaction=False) as pipeline:
+                for set_keys in set_keys_per_condition:
+                    pipeline.sunion(set_keys)
+                keys = set.intersection(*(set(members) for members in await pipeline.execute()))
+        for problem_ids in ids_per_condition:
+            if keys is not None and not keys:
+                break
+            found = {key for key in await self.redis.hmget(PROBLEM_KEYS_KEY, problem_ids) if key is not None}
+            keys = found if keys is None else keys & found
+        return keys
+
+    async def get_problems(self, query: ProblemQuery) -> List[BaseProblem]:
+        """Return the problems that match the query. The id, guild_id and author conditions are answered with
+        the index sets (intersected by Redis when there is one set per condition). Redis has no index of voters
+        or solvers, so those conditions are checked on the problems the other conditions leave.
+        Time complexity: O(number of problems that meet the indexed conditions), or O(N) if there are none"""
+        if not isinstance(query, ProblemQuery):
+            raise TypeError("query is not a ProblemQuery")
+        keys = await self._problem_keys_matching(query)
+        if keys is None:
+            problems = self.iter_all_problems()
+        else:
+            problems = self._get_problems_at(sorted(keys))
+        return query.sort_and_limit([problem async for problem in problems if query.matches(problem)])
+
+    async def _get_problems_at(
+            self, keys: typing.List[str], batch_size: int = SCAN_BATCH_SIZE
+    ) -> typing.AsyncIterator[BaseProblem]:
+        """Yield the problems at keys, fetching batch_size problems per MGET"""
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start: start + batch_size]
+            values = await self._fill_in_cold_values(batch, await self.redis.mget(batch))
+            for value in values:
+                if value is not None:  # Deleted since the keys were found
+                    yield self._decode_problem(value)
 
     async def get_global_problems(self):
         """
@@ -165,10 +701,48 @@ class RedisCache:
         if problem.id != problem_id:
             raise ValueError("Ids do not match")
 
-        await self.set_key(
-            f"BaseProblem:{problem.guild_id}:{problem_id}",
-            str(problem.to_dict(show_answer=True)),
+        await self._set_keys(
+            {f"BaseProblem:{problem.guild_id}:{problem_id}": problem.to_dict(show_answer=True)},
+            problems=True,
+        )
+
+    async def add_problems(
+            self, problems: List[BaseProblem], skip_duplicates: bool = False
+    ) -> List[BaseProblem]:
+        """
+        Add many problems to the cache (and the index sets) in one transaction.
+        Time complexity: O(N), but with only 2 round trips to Redis
+
+        :param problems: The BaseProblem instances.
+        :param skip_duplicates: If True, leave out problems with the same question and answers
+            as an earlier problem (in the same guild) in the list.
+        :return: The problems that were added.
+        :raises TypeError: If one of the problems is not a BaseProblem.
+        :raises ValueError: If two of the problems have the same id.
+        :raises LockedCacheException: If the cache is locked
+        """
+        problems = list(problems)
+        if not all(isinstance(problem, BaseProblem) for problem in problems):
+            raise TypeError("One of the problems is not a base problem")
+        if len({problem.id for problem in problems}) != len(problems):
+            raise ValueError("Two of the problems have the same id")
+        if skip_duplicates:
+            seen = set()
+            unique_problems = []
+            for problem in problems:
+                key = (problem.get_content_fingerprint(), problem.guild_id)
+                if key not in seen:
+                    seen.add(key)
+                    unique_problems.append(problem)
+            problems = unique_problems
+        await self._set_keys(
+            {
+                f"BaseProblem:{problem.guild_id}:{problem.id}": problem.to_dict(show_answer=True)
+                for problem in problems
+            },
+            problems=True,
         )
+        return problems
 
     async def update_problem(self, problem_id: int, problem: BaseProblem):
         """
@@ -191,8 +765,13 @@ class RedisCache:
                 guild_id is not None and not isinstance(guild_id, int)
         ):
             raise TypeError("Bad types!")
-        await self.del_key(f"BaseProblem:{guild_id}:{problem_id}")
-        await self.del_key(f"QuizProblem:{guild_id}:{problem_id}")
+        await self._set_keys(
+            {
+                f"BaseProblem:{guild_id}:{problem_id}": None,
+                f"QuizProblem:{guild_id}:{problem_id}": None,
+            },
+            problems=True,
+        )
 
     # Additional methods for quizzes
 
@@ -219,7 +798,7 @@ class RedisCache:
         :return: The data associated with the quiz.
         :raises ProblemNotFoundException: If the quiz is not found.
         """
-        result = await self.get_key(f"Quiz:{quiz_id}")
+        result = await self._get_tiered_key(f"Quiz:{quiz_id}")
         if result is not None:
             return orjson.loads(result)
         raise ProblemNotFoundException("That quiz is not found")
@@ -240,7 +819,11 @@ class RedisCache:
         :type thing: DictConvertible
         :return: Nothing.
         """
-        await self.set_key(f"{thing.__class__.__name__}:{thing.guild_id}:{thing.id}", thing.to_dict())  # type: ignore
+        key = f"{thing.__class__.__name__}:{thing.guild_id}:{thing.id}"  # type: ignore
+        if isinstance(thing, BaseProblem):
+            await self._set_keys({key: thing.to_dict(show_answer=True)}, problems=True)
+        else:
+            await self.set_key(key, thing.to_dict())
 
     async def add_things(self, things: List[DictConvertible]):
         """
@@ -250,24 +833,16 @@ class RedisCache:
         :type things: List[DictConvertible]
         :return: Nothing.
         """
-        # Check if the cache is locked before acquiring the lock
-        if self.is_locked:
-            raise LockedCacheException("The cache is currently locked!")
-
-        async with self.lock:
-            # Inside the lock-protected block
-
-            # Create a pipeline to execute batch commands
-            pipeline = self.redis.pipeline()
-
-            # Add each thing to the pipeline
-            for thing in things:
-                key = f"{thing.__class__.__name__}:{thing.guild_id}:{thing.id}"
-                value = str(thing.to_dict())
-                pipeline.hset(key, value)
-
-            # Execute the batch set operation
-            await pipeline.execute()
+        problems = {}
+        others = {}
+        for thing in things:
+            key = f"{thing.__class__.__name__}:{thing.guild_id}:{thing.id}"
+            if isinstance(thing, BaseProblem):
+                problems[key] = thing.to_dict(show_answer=True)
+            else:
+                others[key] = thing.to_dict()
+        await self._set_keys(others)
+        await self._set_keys(problems, problems=True)
 
     async def remove_thing(self, thing: DictConvertible):
         """
@@ -277,7 +852,11 @@ class RedisCache:
         :type thing: DictConvertible
         :return: Nothing.
         """
-        await self.del_key(f"{thing.__class__.__name__}:{thing.guild_id}:{thing.id}")  # type: ignore
+        key = f"{thing.__class__.__name__}:{thing.guild_id}:{thing.id}"  # type: ignore
+        if isinstance(thing, BaseProblem):
+            await self._set_keys({key: None}, problems=True)
+        else:
+            await self.del_key(key)
 
     async def get_thing(
             self,
@@ -321,11 +900,11 @@ class RedisCache:
         raise ThingNotFound("The thing is not found!")
 
     async def get_user_data(self, user_id: int, default: UserData | None = None):
-        result = await self.get_key(f"UserData:{user_id}")
+        result = await self._get_key_cached(f"UserData:{user_id}")
         return self.parse_user_data(result, default)
 
     @staticmethod
-    def parse_user_data(self, data: dict | str, default: UserData | None = None):
+    def parse_user_data(data: dict | str, default: UserData | None = None):
 
         if data is not None:
             if isinstance(data, str):
@@ -337,34 +916,33 @@ class RedisCache:
                         "We have a non-dictionary on our hands"
                     )
             try:
-                return UserData.from_dict(orjson.loads(data))
+                return UserData.from_dict(data)
             except FormatException as fe:
                 raise FormatException("Oh no, the formatting is bad") from fe
         else:
             return default
 
     async def add_user_data(self, thing: UserData):
-        await self.set_key(f"UserData:{thing.user_id}", str(thing.to_dict()))
+        await self.set_key(f"UserData:{thing.user_id}", thing.to_dict())
 
     async def remove_user_data(self, thing: UserData):
         await self.del_key(f"UserData:{thing.user_id}")
 
     async def get_permissions_required_for_command(
             self, command_name
-    ) -> typing.Dict[str, bool]:
+    ) -> typing.Mapping[str, bool]:
         """
-        Get the permissions required for a command.
+        Get the permissions required for a command. config.json is only parsed again when it changes.
 
         :param command_name: The name of the command.
-        :return: A dictionary of permissions required for the command.
+        :return: A read-only mapping of the permissions required for the command.
         """
-        await self._async_file_dict.read_from_file()
-        return self._async_file_dict.dict["permissions_required"][command_name]
+        return await self._config_source.get_permissions_required_for_command(command_name)
 
     async def user_meets_permissions_required_to_use_command(
             self,
             user_id: int,
-            permissions_required: typing.Optional[typing.Dict[str, bool]] = None,
+            permissions_required: typing.Optional[typing.Mapping[str, bool]] = None,
             command_name: str | None = None,
     ) -> bool:
         """
@@ -483,94 +1061,80 @@ class RedisCache:
         :return: The GuildData instance.
         :raises ThingNotFound: If the guild data is not found.
         """
-
-        result = await self.get_key(f"GuildData:{guild_id}")
+        result = await self._get_key_cached(f"GuildData:{guild_id}")
         if result is not None:
-            try:
-                return Appeal.from_dict(orjson.loads(result))
-            except orjson.JSONDecodeError:
-                raise InvalidDictionaryInDatabaseException(
-                    "We have a non-dictionary on our hands"
-                )
-            except FormatException as fe:
-                raise FormatException("Oh no, the formatting is bad") from fe
+            return self._decode_guild_data(result)
         if default is not None:
             return default
         raise ThingNotFound("I could not find any guild_data")
 
+    async def _scan_user_keys(
+            self, user_id: int, batch_size: int = SCAN_BATCH_SIZE
+    ) -> typing.AsyncIterator[typing.List[str]]:
+        """Yield the keys of the things that belong to a user, in batches of about batch_size keys"""
+        seen = set()  # SSCAN can return a key more than once
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis.sscan(user_keys_key(user_id), cursor, count=batch_size)
+            keys = [key for key in keys if key not in seen]
+            seen.update(keys)
+            if keys:
+                yield keys
+            if cursor == 0:
+                return
+
     async def get_all_by_user_id(self, user_id: int) -> list[str]:
         """
         Get a list of values corresponding to things authored by the specified user.
 
-        This method queries all things stored in the Redis database and returns the keys
-        of the items where the provided user_id matches the 'author', 'authors', or 'user_id'
-        field in the stored JSON data.
+        The keys of the things whose 'author', 'authors' or 'user_id' field matches the user are kept
+        in a set that is updated on every write, so only the user's own things are read.
+        Time complexity: O(number of things that belong to the user)
 
         :param user_id: The user ID to match against.
         :type user_id: int
-        :return: A list of keys corresponding to things authored by the specified user.
+        :return: A list of the (JSON) values of the things that belong to the user.
         :rtype: List[str]
-        :raises FormatException: If a stored value in Redis is not a valid JSON dictionary.
         """
-        # get all things
-        things = await self.get_all_things()
         things_authored = []
-        for key, value in things.items():
-            try:
-                dictionarified = orjson.loads(value)  # type: ignore
-            except orjson.JSONDecodeError:
-                raise FormatException("Something in the redis is not a dictionary..")
-            if dictionarified is None:
-                raise FormatException("No dictionary found")
-            if dictionarified.get("author", None) == user_id:
-                things_authored.append(value)
-                continue
-            elif user_id in dictionarified.get("authors", []):
-                things_authored.append(value)
-                continue
-            elif dictionarified.get("user_id", None) == user_id:
-                things_authored.append(value)
-                continue
-
+        async for keys in self._scan_user_keys(user_id):
+            values = await self._fill_in_cold_values(keys, await self.redis.mget(keys))
+            things_authored.extend(value for value in values if value is not None)
         return things_authored
 
     async def del_all_by_user_id(self, user_id: int):
         """DELETE all things that match the user_id
         This operation is IRREVERSIBLE!
-        Time complexity: O(N)
+        The keys are unlinked in batches (each batch is one transaction), without locking the cache.
+        Time complexity: O(number of things that belong to the user)
         Params:
         :param user_id: the user id of the user we need to remove all things of
         Raises
         :raises TypeError: if the user_id is not actually an int
-        :raises FormatException: if something in the redis isn't a dict
 
         Returns
         nothing"""
-        things_to_remove = await self.get_all_by_user_id(user_id=user_id)
-        async with self.lock:
-            await asyncio.sleep(3.0000)
-            await self.redis.delete(*things_to_remove)
-            await asyncio.sleep(3.0000)
+        if not isinstance(user_id, int):
+            raise TypeError("user_id is not an int")
+        # Collect the keys first, because unlinking them removes them from the set that is being scanned
+        batches = [keys async for keys in self._scan_user_keys(user_id)]
+        for keys in batches:
+            # problems=True, so that the problems among them are removed from the problem index sets too
+            await self._set_keys({key: None for key in keys}, problems=True)
 
-    async def get_guild_data(
-            self, guild_id: int, default: GuildData | None = None
-    ) -> GuildData | None:
-        result = await self.get_key(f"GuildData:{guild_id}")
-        if result is not None:
-            try:
-                return GuildData.from_dict(orjson.loads(result))
-            except orjson.JSONDecodeError:
-                raise InvalidDictionaryInDatabaseException(
-                    "We have a non-dictionary on our hands"
-                )
-            except FormatException as fe:
-                raise FormatException("Oh no, the formatting is bad") from fe
-        if default is not None:
-            return default
-        raise ThingNotFound("I could not find any guild data")
+    @staticmethod
+    def _decode_guild_data(value: str) -> GuildData:
+        try:
+            return GuildData.from_dict(orjson.loads(value))
+        except orjson.JSONDecodeError:
+            raise InvalidDictionaryInDatabaseException(
+                "We have a non-dictionary on our hands"
+            )
+        except FormatException as fe:
+            raise FormatException("Oh no, the formatting is bad") from fe
 
     async def add_guild_data(self, thing: GuildData):
-        await self.set_key(f"GuildData:{thing.guild_id}", str(thing.to_dict()))
+        await self.set_key(f"GuildData:{thing.guild_id}", thing.to_dict())
 
     async def remove_guild_data(self, thing: GuildData | int):
         if isinstance(thing, GuildData):
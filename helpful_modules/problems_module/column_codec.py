@@ -0,0 +1,113 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - Column codec
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+
+How the list columns of the problems table (voters, solvers and answers) are stored.
+They used to be pickled, which can run arbitrary code and can't be read by anything except Python.
+Now, lists of user ids are stored as a format byte followed by packed little-endian unsigned 64-bit integers,
+and answers are stored as JSON (using orjson).
+Pickled values can still be decoded, so that rows which haven't been re-encoded yet can be read
+(see MathProblemCache.reencode_pickled_problem_rows).
+The content_fingerprint column is a hash of a problem's question and answers, used to find duplicate problems."""
+import hashlib
+import pickle
+import struct
+import typing
+
+import orjson
+
+ID_LIST_FORMAT = b"\x01"  # Pickles never start with this byte, so the formats can't be confused
+_UINT64 = struct.Struct("<Q")
+_JSON_LIST_START = b"["  # A pickled list never starts with this byte either
+# Compiled structs for decoding id lists, by the number of ids. Most lists are short, so only short ones are kept.
+_ID_LIST_STRUCTS: typing.Dict[int, struct.Struct] = {}
+_MAX_CACHED_ID_LIST_LENGTH = 256
+
+
+def _id_list_struct(count: int) -> struct.Struct:
+    try:
+        return _ID_LIST_STRUCTS[count]
+    except KeyError:
+        compiled = struct.Struct(f"<{count}Q")
+        if count <= _MAX_CACHED_ID_LIST_LENGTH:
+            _ID_LIST_STRUCTS[count] = compiled
+        return compiled
+
+
+def encode_id_list(ids: typing.Iterable[int]) -> bytes:
+    """Encode a list of user ids (which must fit in an unsigned 64-bit integer)"""
+    ids = list(ids)
+    try:
+        return ID_LIST_FORMAT + struct.pack(f"<{len(ids)}Q", *ids)
+    except struct.error as exc:
+        raise ValueError(
+            f"{ids} can't be encoded: every id must be an integer between 0 and 2**64-1"
+        ) from exc
+
+
+def decode_id_list(data: bytes) -> typing.List[int]:
+    """Decode a list of user ids encoded by encode_id_list"""
+    if not is_id_list(data):
+        raise ValueError("data is not an encoded list of ids")
+    return decode_list(data)
+
+
+def is_id_list(data: bytes) -> bool:
+    return data[:1] == ID_LIST_FORMAT and (len(data) - 1) % _UINT64.size == 0
+
+
+def encode_answers(answers: typing.List[str]) -> bytes:
+    """Encode a list of answers"""
+    return orjson.dumps(list(answers))
+
+
+def is_pickled(data: bytes) -> bool:
+    """Return whether data is in the old (pickled) format"""
+    return not (is_id_list(data) or data[:1] == _JSON_LIST_START)
+
+
+def decode_list(data: typing.Union[bytes, bytearray, memoryview]) -> list:
+    """Decode a voters, solvers or answers column, in any format (including the old pickled format).
+    This is called 3 times for every problem loaded, so it is written to be fast rather than pretty."""
+    if type(data) is not bytes:
+        data = bytes(data)
+    first_byte = data[:1]
+    if first_byte == ID_LIST_FORMAT and len(data) & 7 == 1:  # 2 of the 3 columns are id lists, so they go first
+        count = len(data) >> 3
+        # A compiled struct unpacks straight from data, without copying it or building a format string
+        compiled = _ID_LIST_STRUCTS.get(count)
+        if compiled is None:
+            compiled = _id_list_struct(count)
+        return list(compiled.unpack_from(data, 1))
+    if first_byte == _JSON_LIST_START:
+        return orjson.loads(data)
+    return pickle.loads(data)  # Not re-encoded yet
+
+
+def _normalize_text(text) -> str:
+    return " ".join(str(text).casefold().split())
+
+
+def content_fingerprint(question: str, answers: typing.Iterable) -> str:
+    """Return the content fingerprint of a problem (a SHA-256 hex digest).
+    Problems whose questions only differ in case and whitespace, and that have the same answers in any order,
+    have the same fingerprint."""
+    normalized_answers = sorted(set(_normalize_text(answer) for answer in answers))
+    content = _normalize_text(question) + "\x00" + "\x1f".join(normalized_answers)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
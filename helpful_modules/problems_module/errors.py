@@ -67,6 +67,12 @@ class TooManyProblems(MathProblemsModuleException):
     pass
 
 
+class DuplicateProblem(MathProblemsModuleException):
+    """Raised when trying to add a problem with the same question and answers as another problem in the same guild."""
+
+    pass
+
+
 class ThingNotFound(KeyError, IndexError, MathProblemsModuleException):
     """Raised when a thing is not found"""
 
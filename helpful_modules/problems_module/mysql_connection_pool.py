@@ -0,0 +1,187 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - MySQLConnectionPool
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import asyncio
+import contextlib
+import logging
+import time
+import typing
+
+import aiomysql
+
+log = logging.getLogger(__name__)
+
+
+class MySQLPoolStats:
+    """Statistics about how long coroutines waited to get a connection from a MySQLConnectionPool"""
+
+    __slots__ = ("acquisitions", "total_wait_time", "max_wait_time", "timeouts")
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, wait_time: float) -> None:
+        """Record that a connection was acquired after waiting wait_time seconds"""
+        self.acquisitions += 1
+        self.total_wait_time += wait_time
+        if wait_time > self.max_wait_time:
+            self.max_wait_time = wait_time
+
+    @property
+    def average_wait_time(self) -> float:
+        if self.acquisitions == 0:
+            return 0.0
+        return self.total_wait_time / self.acquisitions
+
+    def to_dict(self) -> dict:
+        return {
+            "acquisitions": self.acquisitions,
+            "total_wait_time": self.total_wait_time,
+            "average_wait_time": self.average_wait_time,
+            "max_wait_time": self.max_wait_time,
+            "timeouts": self.timeouts,
+        }
+
+
+class MySQLConnectionPool:
+    """A pool of aiomysql connections shared by every part of the cache.
+
+    The aiomysql pool is created lazily the first time a connection is needed. aiomysql pools belong to the event loop
+    they were created in, so if the pool is used from a different event loop
+    (this happens because MathProblemCache.__init__ uses asyncio.run), a new aiomysql pool is created.
+
+    statement_timeout (in seconds) is enforced by the server using max_execution_time (which only affects SELECTs).
+    acquire_timeout (in seconds) is how long to wait for a free connection before giving up."""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        user: str,
+        password: str,
+        db: str,
+        port: int = 3306,
+        min_size: int = 1,
+        max_size: int = 10,
+        statement_timeout: typing.Optional[float] = None,
+        acquire_timeout: typing.Optional[float] = None,
+        pool_recycle: int = 3600,
+    ):
+        if min_size < 0:
+            raise ValueError("min_size must be at least 0")
+        if max_size < 1 or max_size < min_size:
+            raise ValueError("max_size must be at least 1 and at least min_size")
+        if statement_timeout is not None and statement_timeout <= 0:
+            raise ValueError("statement_timeout must be positive")
+        self.host = host
+        self.user = user
+        self.password = password
+        self.db = db
+        self.port = port
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_timeout = statement_timeout
+        self.acquire_timeout = acquire_timeout
+        self.pool_recycle = pool_recycle
+        self.stats = MySQLPoolStats()
+        self._pool: typing.Optional[aiomysql.Pool] = None
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+
+    @property
+    def init_command(self) -> typing.Optional[str]:
+        """The SQL that is run on every new connection"""
+        if self.statement_timeout is None:
+            return None
+        return f"SET SESSION max_execution_time = {int(self.statement_timeout * 1000)}"
+
+    async def _get_pool(self) -> aiomysql.Pool:
+        """Return the aiomysql pool for the running event loop, creating it if needed"""
+        if self.closed:
+            raise RuntimeError("This pool has been closed")
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and self._loop is loop:
+            return self._pool
+        if self._pool is not None:
+            # The old event loop is gone, so its connections can't be used (or closed gracefully) anymore
+            self._pool.terminate()
+        log.info(
+            f"Creating a MySQL connection pool (min size: {self.min_size}, max size: {self.max_size})"
+        )
+        self._loop = loop
+        self._pool = await aiomysql.create_pool(
+            minsize=self.min_size,
+            maxsize=self.max_size,
+            pool_recycle=self.pool_recycle,
+            host=self.host,
+            user=self.user,
+            password=self.password,
+            db=self.db,
+            port=self.port,
+            autocommit=False,
+            init_command=self.init_command,
+        )
+        return self._pool
+
+    @property
+    def size(self) -> int:
+        """The number of connections currently open"""
+        return 0 if self._pool is None else self._pool.size
+
+    @property
+    def free_size(self) -> int:
+        """The number of connections that are open but not being used"""
+        return 0 if self._pool is None else self._pool.freesize
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> typing.AsyncIterator[aiomysql.Connection]:
+        """Borrow a connection. Anything that hasn't been committed when the connection is given back is rolled back,
+        just like closing a connection without committing."""
+        pool = await self._get_pool()
+        start = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_wait(time.perf_counter() - start)
+        try:
+            yield conn
+        finally:
+            try:
+                # Also ends the read snapshot, so the next borrower doesn't see stale data
+                await conn.rollback()
+            finally:
+                pool.release(conn)
+
+    async def close(self) -> None:
+        """Close every connection. The pool can't be used afterwards."""
+        self.closed = True
+        if self._pool is None:
+            return
+        pool = self._pool
+        self._pool = None
+        if self._loop is asyncio.get_running_loop():
+            pool.close()
+            await pool.wait_closed()
+        else:
+            pool.terminate()
@@ -19,30 +19,35 @@ If not, see <https://www.gnu.org/licenses/>.
 
 Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
 import contextlib
+import typing
 
 import aiomysql
 
 # Licensed under AGPLv3 (or later)
 
 
-@contextlib.contextmanager  # type: ignore
-def mysql_connection(*args, **kwargs) -> aiomysql.Connection:
-    """A custom with statement to connect to a MySQL database.
-    This makes connecting to MYSQL possible within a context wrapper. This is a wrapper around MySQL
-    You must take care to provide the correct arguments and keyword arguments, which will be directly passed to the mysql.connector.connect() method.
+@contextlib.asynccontextmanager
+async def mysql_connection(*args, **kwargs) -> typing.AsyncIterator[aiomysql.Connection]:
+    """A custom async with statement to connect to a MySQL database.
+    This makes connecting to MYSQL possible within a context wrapper. This is a wrapper around aiomysql.connect()
+    You must take care to provide the correct arguments and keyword arguments, which will be directly passed to aiomysql.connect()
+    (database= is accepted as an alias for db=, for compatibility with mysql.connector).
     If an exception happens in the with statement, the connection will commit and close and then the exception will be raised.
     Otherwise, the connection will commit and close. It will not return anything. :-)
+    This opens a new connection every time. The cache uses its MySQLConnectionPool instead (see MathProblemCache.get_a_connection)
     This function is licensed under GPLv3."""
-    connection = aiomysql.connect(*args, **kwargs)  # type: ignore
+    if "database" in kwargs:
+        kwargs["db"] = kwargs.pop("database")
+    connection = await aiomysql.connect(*args, **kwargs)  # type: ignore
     try:
         yield connection
     except:
         print(
             "An exception occured!. After closing resources, the exception will be raised"
         )
-        connection.commit()
-        connection.close()
         raise
     finally:
-        connection.commit()
-        connection.close()
+        try:
+            await connection.commit()
+        finally:
+            connection.close()
@@ -17,20 +17,30 @@ If not, see <https://www.gnu.org/licenses/>.
 
 Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
 
-import pickle
-
 import orjson
 
 from .base_problem import BaseProblem
+from .column_codec import decode_list
 from .computational_problem import ComputationalProblem
 from .errors import FormatException
 from .linear_algebra_problem import LinearAlgebraProblem
 
 
 # TODO: When there are new problem types, this must handle it
+def _decode_list(data) -> list:
+    """Decode a voters, solvers or answers column, unless it is already a list (as in BaseProblem.to_dict())"""
+    if isinstance(data, list):
+        return data
+    return decode_list(data)
+
+
 def convert_dict_to_problem(data: dict, cache=None):
+    """Convert a dictionary to a problem of the right type. The dictionary can be a problem row
+    (with an extra_stuff column) or what BaseProblem.to_dict() returns (where the extra stuff is at the top level)."""
     if not isinstance(data, dict):
         raise TypeError("data is not a dict")
+    if "extra_stuff" not in data:
+        data["extra_stuff"] = {"type": data.get("type")}
     if isinstance(data["extra_stuff"], str):
         try:
             data["extra_stuff"] = orjson.loads(data["extra_stuff"].replace("'", '"'))
@@ -38,9 +48,9 @@ def convert_dict_to_problem(data: dict, cache=None):
             raise FormatException(
                 f"The extra stuff, which is {data['extra_stuff']}, is not valid json"
             ) from err
-    data["voters"] = pickle.loads(data["voters"])
-    data["solvers"] = pickle.loads(data["solvers"])
-    data["answers"] = pickle.loads(data["answers"])
+    data["voters"] = _decode_list(data["voters"])
+    data["solvers"] = _decode_list(data["solvers"])
+    data["answers"] = _decode_list(data.get("answers", []))
     if "type" not in data["extra_stuff"].keys():
         raise ValueError(f"data {data} doesn't have a type")
     match data["extra_stuff"]["type"]:
@@ -65,9 +75,9 @@ def convert_row_to_problem(row: dict, cache=None):
             raise FormatException(
                 f"The extra stuff, which is {extra_stuff} is not valid json"
             ) from err
-    row["voters"] = pickle.loads(row["voters"])
-    row["solvers"] = pickle.loads(row["solvers"])
-    row["answers"] = pickle.loads(row["answers"])
+    row["voters"] = decode_list(row["voters"])
+    row["solvers"] = decode_list(row["solvers"])
+    row["answers"] = decode_list(row["answers"])
     if "type" not in extra_stuff.keys():
         raise ValueError(f"row {row} doesn't have a type")
     match extra_stuff["type"]:
@@ -0,0 +1,195 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - ProblemIndex
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import typing
+
+from .base_problem import BaseProblem
+from .query import ProblemQuery, normalize
+
+
+class _IndexedKeys(typing.NamedTuple):
+    """The values a problem was indexed under. They are remembered because problems are often mutated in place
+    (for example, problem.voters.append(...)), so the problem itself doesn't tell us what to un-index."""
+
+    guild_id: typing.Optional[int]
+    author: int
+    voters: typing.Set[int]
+    solvers: typing.Set[int]
+
+
+class ProblemIndex:
+    """Inverted indexes over the cached problems: guild id -> problem ids, author -> problem ids,
+    voter -> problem ids and solver -> problem ids. Problem ids are unique across every guild.
+    Looking up the problems for one user or guild takes time proportional to the number of results."""
+
+    def __init__(self):
+        self._problems: typing.Dict[int, BaseProblem] = {}
+        self._keys: typing.Dict[int, _IndexedKeys] = {}
+        self._by_guild: typing.Dict[typing.Optional[int], typing.Set[int]] = {}
+        self._by_author: typing.Dict[int, typing.Set[int]] = {}
+        self._by_voter: typing.Dict[int, typing.Set[int]] = {}
+        self._by_solver: typing.Dict[int, typing.Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._problems)
+
+    def __contains__(self, problem_id: int) -> bool:
+        return problem_id in self._problems
+
+    @staticmethod
+    def _link(index: dict, key, problem_id: int) -> None:
+        try:
+            index[key].add(problem_id)
+        except KeyError:
+            index[key] = {problem_id}
+
+    @staticmethod
+    def _unlink(index: dict, key, problem_id: int) -> None:
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.discard(problem_id)
+        if not ids:
+            del index[key]  # Don't keep empty sets around for users who no longer have anything
+
+    def add(self, problem: BaseProblem) -> None:
+        """Index a problem. If a problem with the same id was already indexed, it is replaced."""
+        self.remove(problem.id)
+        keys = _IndexedKeys(
+            guild_id=problem.guild_id,
+            author=problem.author,
+            voters=set(problem.voters),
+            solvers=set(problem.solvers),
+        )
+        self._problems[problem.id] = problem
+        self._keys[problem.id] = keys
+        self._link(self._by_guild, keys.guild_id, problem.id)
+        self._link(self._by_author, keys.author, problem.id)
+        for voter in keys.voters:
+            self._link(self._by_voter, voter, problem.id)
+        for solver in keys.solvers:
+            self._link(self._by_solver, solver, problem.id)
+
+    def remove(self, problem_id: int) -> None:
+        """Stop indexing a problem. This does nothing if the problem isn't indexed."""
+        keys = self._keys.pop(problem_id, None)
+        if keys is None:
+            return
+        del self._problems[problem_id]
+        self._unlink(self._by_guild, keys.guild_id, problem_id)
+        self._unlink(self._by_author, keys.author, problem_id)
+        for voter in keys.voters:
+            self._unlink(self._by_voter, voter, problem_id)
+        for solver in keys.solvers:
+            self._unlink(self._by_solver, solver, problem_id)
+
+    def add_voter(self, problem_id: int, user_id: int) -> None:
+        """Index a new voter of an indexed problem without re-indexing the whole problem.
+        Raises KeyError if the problem isn't indexed."""
+        self._keys[problem_id].voters.add(user_id)
+        self._link(self._by_voter, user_id, problem_id)
+
+    def remove_voter(self, problem_id: int, user_id: int) -> None:
+        """Stop indexing a voter of an indexed problem. Raises KeyError if the problem isn't indexed."""
+        self._keys[problem_id].voters.discard(user_id)
+        self._unlink(self._by_voter, user_id, problem_id)
+
+    def add_solver(self, problem_id: int, user_id: int) -> None:
+        """Index a new solver of an indexed problem. Raises KeyError if the problem isn't indexed."""
+        self._keys[problem_id].solvers.add(user_id)
+        self._link(self._by_solver, user_id, problem_id)
+
+    def remove_solver(self, problem_id: int, user_id: int) -> None:
+        """Stop indexing a solver of an indexed problem. Raises KeyError if the problem isn't indexed."""
+        self._keys[problem_id].solvers.discard(user_id)
+        self._unlink(self._by_solver, user_id, problem_id)
+
+    def clear(self) -> None:
+        """Remove every problem from the index"""
+        self.__init__()
+
+    def get(self, problem_id: int) -> typing.Optional[BaseProblem]:
+        """Return the indexed problem with this id, or None if it isn't indexed"""
+        return self._problems.get(problem_id)
+
+    def guild_id_of(self, problem_id: int) -> typing.Optional[int]:
+        """Return the guild id the problem was indexed under. Raises KeyError if it isn't indexed."""
+        return self._keys[problem_id].guild_id
+
+    def ids_by_guild(self, guild_id: typing.Optional[int]) -> typing.FrozenSet[int]:
+        return frozenset(self._by_guild.get(guild_id, ()))
+
+    def ids_by_author(self, author: int) -> typing.FrozenSet[int]:
+        return frozenset(self._by_author.get(author, ()))
+
+    def ids_voted_by(self, user_id: int) -> typing.FrozenSet[int]:
+        return frozenset(self._by_voter.get(user_id, ()))
+
+    def ids_solved_by(self, user_id: int) -> typing.FrozenSet[int]:
+        return frozenset(self._by_solver.get(user_id, ()))
+
+    def problems(self, ids: typing.Iterable[int]) -> typing.List[BaseProblem]:
+        """Return the indexed problems with these ids, sorted by id"""
+        return [self._problems[problem_id] for problem_id in sorted(ids)]
+
+    @staticmethod
+    def _variants(value) -> set:
+        """Return the ways value may have been stored, because problems store ids as ints or as strings"""
+        variants = {value}
+        if normalize(value) is None:
+            variants.update((None, "None"))
+        elif isinstance(value, int):
+            variants.add(str(value))
+        elif isinstance(value, str) and value.isdigit():
+            variants.add(int(value))
+        return variants
+
+    @classmethod
+    def _lookup(cls, index: dict, value) -> typing.Set[int]:
+        """Return the ids indexed under value, whether the problems stored it as an int or as a string"""
+        ids = set()
+        for variant in cls._variants(value):
+            ids.update(index.get(variant, ()))
+        return ids
+
+    def query(self, query: ProblemQuery) -> typing.List[BaseProblem]:
+        """Return the indexed problems that match the query. Every condition is answered with an index,
+        so this takes time proportional to the sizes of the index entries used, not the number of problems."""
+        indexes = {
+            "guild_id": self._by_guild,
+            "author": self._by_author,
+            "voters": self._by_voter,
+            "solvers": self._by_solver,
+        }
+        matching: typing.Optional[typing.Set[int]] = None
+        for field, operator, value in query.conditions:
+            values = value if operator == "in" else (value,)
+            ids = set()
+            for item in values:
+                if field == "id":
+                    ids.update(variant for variant in self._variants(item) if variant in self._problems)
+                else:
+                    ids.update(self._lookup(indexes[field], item))
+            matching = ids if matching is None else matching & ids
+            if not matching:
+                return []
+        if matching is None:
+            matching = self._problems.keys()
+        return query.sort_and_limit(self._problems[problem_id] for problem_id in matching)
+
@@ -0,0 +1,230 @@
+"""You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - Declarative queries
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+
+Queries that describe which problems or quizzes to get as data (conditions on indexed fields, an order and a limit)
+instead of as a function, so that each cache can answer them with its indexes instead of looking at everything.
+A query is built by chaining methods, which return new queries:
+ProblemQuery().where("guild_id", guild_id).contains("voters", user_id).order_by("id", descending=True).limit(10)"""
+import typing
+
+OPERATORS = ("eq", "in", "contains")
+
+
+class Condition(typing.NamedTuple):
+    field: str
+    operator: str  # One of OPERATORS
+    value: typing.Any  # For "in", a frozenset of values
+
+
+def normalize(value: typing.Any) -> typing.Optional[str]:
+    """Make a field value comparable, because problems store ids as ints or strings depending on where they came from
+    (and BaseProblem.to_dict() stores a guild id of None as "None")"""
+    if value is None or value == "None":
+        return None
+    return str(value)
+
+
+def get_field(thing: typing.Any, field: str) -> typing.Any:
+    """Return a field of a problem or quiz (or of a problem that is still a dictionary)"""
+    if isinstance(thing, dict):
+        return thing.get(field)
+    return getattr(thing, field)
+
+
+class Query:
+    """Which things to get: every condition must be met. Queries are immutable.
+    Subclasses list their fields in FIELDS (field name -> whether it is a collection of user ids).
+    Scalar fields support where() and where_in(), and collection fields support contains()."""
+
+    FIELDS: typing.ClassVar[typing.Dict[str, bool]] = {}
+
+    __slots__ = ("conditions", "order_field", "descending", "max_results")
+
+    def __init__(
+        self,
+        conditions: typing.Iterable[Condition] = (),
+        order_field: str = "id",
+        descending: bool = False,
+        max_results: typing.Optional[int] = None,
+    ):
+        self.conditions: typing.Tuple[Condition, ...] = tuple(conditions)
+        for condition in self.conditions:
+            self._check_field(condition.field, collection=condition.operator == "contains")
+            if condition.operator not in OPERATORS:
+                raise ValueError(f"{condition.operator} is not an operator")
+        self._check_field(order_field, collection=False)
+        if max_results is not None and (not isinstance(max_results, int) or max_results < 0):
+            raise ValueError("The limit must be a non-negative integer")
+        self.order_field = order_field
+        self.descending = descending
+        self.max_results = max_results
+
+    def _check_field(self, field: str, collection: bool) -> None:
+        if field not in self.FIELDS:
+            raise ValueError(f"{type(self).__name__} can't use {field} (it can use {', '.join(self.FIELDS)})")
+        if self.FIELDS[field] != collection:
+            kind = "a collection" if self.FIELDS[field] else "not a collection"
+            raise ValueError(f"{field} is {kind}, so it can't be used like that")
+
+    def _replace(self, **changes) -> "Query":
+        values = {
+            "conditions": self.conditions,
+            "order_field": self.order_field,
+            "descending": self.descending,
+            "max_results": self.max_results,
+        }
+        values.update(changes)
+        return type(self)(**values)
+
+    def where(self, field: str, value: typing.Any) -> "Query":
+        """Only get the things whose field is equal to value"""
+        return self._replace(conditions=self.conditions + (Condition(field, "eq", value),))
+
+    def where_in(self, field: str, values: typing.Iterable[typing.Any]) -> "Query":
+        """Only get the things whose field is one of values"""
+        return self._replace(conditions=self.conditions + (Condition(field, "in", frozenset(values)),))
+
+    def contains(self, field: str, user_id: int) -> "Query":
+        """Only get the things whose field (a collection of user ids) contains user_id"""
+        return self._replace(conditions=self.conditions + (Condition(field, "contains", user_id),))
+
+    def order_by(self, field: str, descending: bool = False) -> "Query":
+        """Sort the results by field (by default, they are sorted by id)"""
+        return self._replace(order_field=field, descending=descending)
+
+    def limit(self, max_results: typing.Optional[int]) -> "Query":
+        """Get at most max_results things (None means no limit)"""
+        return self._replace(max_results=max_results)
+
+    def matches(self, thing: typing.Any) -> bool:
+        """Return whether a thing meets every condition. Caches use this for conditions they have no index for."""
+        for field, operator, value in self.conditions:
+            actual = get_field(thing, field)
+            if operator == "eq":
+                if normalize(actual) != normalize(value):
+                    return False
+            elif operator == "in":
+                if normalize(actual) not in {normalize(item) for item in value}:
+                    return False
+            elif normalize(value) not in {normalize(item) for item in actual or ()}:
+                return False
+        return True
+
+    def sort_and_limit(self, things: typing.Iterable[typing.Any]) -> typing.List[typing.Any]:
+        """Sort things (which meet the conditions) in the query's order, and apply the limit"""
+
+        def key(thing):
+            value = get_field(thing, self.order_field)
+            if isinstance(value, str) and value.lstrip("-").isdigit():
+                value = int(value)  # Ids can be strings
+            return (value is not None, value if value is not None else 0)
+
+        things = sorted(things, key=key, reverse=self.descending)
+        return things if self.max_results is None else things[: self.max_results]
+
+    def where_sql(
+        self, columns: typing.Dict[str, str], placeholder: str
+    ) -> typing.Tuple[str, typing.List[typing.Any]]:
+        """Compile the conditions to a SQL WHERE clause (an empty string if there are no conditions) and its parameters.
+        columns maps each field to its column, or for collection fields, to a condition on the id column
+        with one placeholder for the user id (for example, "problem_id IN (SELECT problem_id FROM problem_votes
+        WHERE user_id = ?)")."""
+        clauses = []
+        params = []
+        for field, operator, value in self.conditions:
+            column = columns[field]
+            if operator == "contains":
+                clauses.append(column)
+                params.append(value)
+            elif operator == "eq":
+                if normalize(value) is None:
+                    clauses.append(f"{column} IS NULL")
+                else:
+                    clauses.append(f"{column} = {placeholder}")
+                    params.append(value)
+            else:
+                values = [item for item in value if normalize(item) is not None]
+                in_clause = f"{column} IN ({', '.join([placeholder] * len(values))})" if values else "1 = 0"
+                if len(values) < len(value):  # None is one of the values
+                    in_clause = f"({in_clause} OR {column} IS NULL)"
+                clauses.append(in_clause)
+                params.extend(values)
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def where_sql_chunks(
+        self, columns: typing.Dict[str, str], placeholder: str, chunk_size: int
+    ) -> typing.Iterator[typing.Tuple[str, typing.List[typing.Any]]]:
+        """Like where_sql, but the values of each where_in() condition are split into chunks of at most chunk_size
+        values (because there is a limit to how many parameters a statement can have), and a WHERE clause is yielded
+        for each combination of chunks. Every matching row matches exactly one of the clauses, so if there is more
+        than one, the rows they select must be sorted and limited again (with sort_and_limit)."""
+        queries = [self]
+        for index, (field, operator, value) in enumerate(self.conditions):
+            if operator != "in" or len(value) <= chunk_size:
+                continue
+            values = list(value)
+            chunks = [
+                Condition(field, "in", frozenset(values[start : start + chunk_size]))
+                for start in range(0, len(values), chunk_size)
+            ]
+            queries = [
+                query._replace(
+                    conditions=query.conditions[:index] + (chunk,) + query.conditions[index + 1 :]
+                )
+                for query in queries
+                for chunk in chunks
+            ]
+        for query in queries:
+            yield query.where_sql(columns, placeholder)
+
+    def order_sql(self, columns: typing.Dict[str, str]) -> str:
+        """Compile the order and the limit to SQL"""
+        sql = f" ORDER BY {columns[self.order_field]}{' DESC' if self.descending else ''}"
+        if self.max_results is not None:
+            sql += f" LIMIT {int(self.max_results)}"
+        return sql
+
+    def __eq__(self, other: typing.Any) -> bool:
+        return type(other) is type(self) and (
+            self.conditions, self.order_field, self.descending, self.max_results
+        ) == (other.conditions, other.order_field, other.descending, other.max_results)
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.conditions, self.order_field, self.descending, self.max_results))
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(conditions={self.conditions!r}, order_field={self.order_field!r}, "
+            f"descending={self.descending!r}, max_results={self.max_results!r})"
+        )
+
+
+class ProblemQuery(Query):
+    """A query for problems (see MathProblemCache.get_problems and RedisCache.get_problems)"""
+
+    FIELDS = {"id": False, "guild_id": False, "author": False, "voters": True, "solvers": True}
+    __slots__ = ()
+
+
+class QuizQuery(Query):
+    """A query for quizzes (see MathProblemCache.get_quizzes)"""
+
+    FIELDS = {"id": False, "guild_id": False, "authors": True}
+    __slots__ = ()
@@ -21,6 +21,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
+import pickle
 import time
 import typing
 import warnings
@@ -119,34 +120,29 @@ class QuizSolvingSession(DictConvertible):
         return QuizSession
 
     @classmethod
-    def from_sqlite_dict(cls, dict: dict) -> "QuizSolvingSession":
+    def from_row(cls, row: dict) -> "QuizSolvingSession":
+        """Convert a row of the quiz_submission_sessions table into a QuizSolvingSession.
+        This doesn't call __init__, because __init__ starts a new session (and loads its quiz)."""
+        session = cls.__new__(cls)
+        session.user_id = row["user_id"]
+        session.quiz_id = row["quiz_id"]
+        session.guild_id = row["guild_id"]
+        session.special_id = int(row["special_id"])
+        session.start_time = row["start_time"]
+        session.expire_time = row["expire_time"]
+        session.attempt_num = row["attempt_num"]
+        session.answers = pickle.loads(row["answers"])  # TODO: don't use pickle because RCE
+        session.is_final = False  # is_finished is worked out from expire_time, so it isn't read from the row
+        return session
+
+    @classmethod
+    def from_sqlite_dict(cls, dict: dict, cache=None) -> "QuizSolvingSession":
         """Convert a dict returned from sql into a QuizSolvingSession"""
-        return cls.better_init(
-            start_time=dict["start_time"],
-            expire_time=dict["expire_time"],
-            user_id=dict["user_id"],
-            quiz_id=dict["quiz_id"],
-            guild_id=dict["guild_id"],
-            answers=list(
-                map(QuizSubmissionAnswer.to_dict, dict["answers"])
-            ),  # TODO: don't use pickle because RCE
-            special_id=dict["special_id"],
-            attempt_num=dict["attempt_num"],
-        )
+        return cls.from_row(dict)
 
     @classmethod
-    def from_mysql_dict(cls, dict: dict) -> "QuizSolvingSession":
-        return cls.better_init(
-            start_time=dict["start_time"],
-            user_id=dict["user_id"],
-            quiz_id=dict["quiz_id"],
-            guild_id=dict["guild_id"],
-            expire_time=dict["expire_time"],
-            is_finished=dict["is_finished"],
-            answers=dict["answers"],
-            special_id=dict["special_id"],
-            attempt_num=dict["attempt_num"],
-        )
+    def from_mysql_dict(cls, dict: dict, cache=None) -> "QuizSolvingSession":
+        return cls.from_row(dict)
 
     def to_dict(self) -> dict:
         return {
@@ -66,16 +66,17 @@ class QuizDescription(DictConvertible):
         self.time_limit = time_limit
 
     @classmethod
-    def from_dict(cls, data: dict) -> "QuizDescription":
+    def from_dict(cls, data: dict, cache=None) -> "QuizDescription":
         try:
             return cls(
+                cache=cache,
                 author=data["author"],
                 quiz_id=data["quiz_id"],
                 category=data["category"],
                 intensity=data["intensity"],
                 description=data["description"],
                 license=data["license"],
-                time_limit=data["timelimit"],
+                time_limit=data["time_limit"],
                 guild_id=data["guild_id"],
             )
         except KeyError as ke:
@@ -21,6 +21,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
 """
+import pickle
 import sqlite3
 import sys
 import traceback
@@ -51,9 +52,11 @@ class QuizProblem(BaseProblem, DictConvertible):
         quiz=None,
     ):
         """A method that allows the creation of new QuizMathProblems"""
-        if not isinstance(quiz, Quiz):
+        from .quiz import Quiz  # quiz.py imports this module
+
+        if quiz is not None and not isinstance(quiz, Quiz):
             raise TypeError(
-                f"quiz is of type {quiz.__class.__name}, not Quiz"
+                f"quiz is of type {quiz.__class__.__name__}, not Quiz"
             )  # Here to help me debug
         if voters is None:
             voters = []
@@ -62,8 +65,16 @@ class QuizProblem(BaseProblem, DictConvertible):
         if answers is None:
             answers = []
         super().__init__(
-            question, answer, id, author, guild_id, voters, solvers, cache, answers
-        )  #
+            question=question,
+            id=id,
+            author=author,
+            answer=answer,
+            guild_id=guild_id,
+            voters=voters,
+            solvers=solvers,
+            cache=cache,
+            answers=answers,
+        )
         self.is_written = is_written
         if quiz is not None:
             self.quiz_id = quiz.id
@@ -113,7 +124,7 @@ class QuizProblem(BaseProblem, DictConvertible):
             self.is_written = is_written
 
         if self.cache:
-            self.cache.update_quiz(self.quiz_id, quiz)
+            await self.cache.update_quiz(self.quiz_id, quiz)
         await self.update_self()
 
     def to_dict(self, show_answer: bool = False):
@@ -136,7 +147,7 @@ class QuizProblem(BaseProblem, DictConvertible):
     @classmethod
     def from_dict(cls, _dict: dict, cache=None):
         """Convert a dictionary to a QuizProblem. Even though the bot uses SQL, this is used in the from_row method"""
-        _dict.pop("type")
+        _dict.pop("type", None)
         return cls(**_dict, cache=cache)
 
     @classmethod
@@ -145,9 +156,14 @@ class QuizProblem(BaseProblem, DictConvertible):
             raise TypeError("Oh no.")
         try:
             _dict = {
+                "question": row["question"],
+                "id": row["problem_id"],
+                "author": row["author"],
                 "quiz_id": row["quiz_id"],
-                "guild_id": row["guild_id"],
-                "voters": row["voters"],
+                "guild_id": None if row["guild_id"] is None else str(row["guild_id"]),
+                "answers": pickle.loads(row["answer"]),
+                "voters": pickle.loads(row["voters"]),
+                "solvers": pickle.loads(row["solvers"]),
             }
             return cls.from_dict(_dict, cache=cache)
         except BaseException as e:
@@ -0,0 +1,266 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - Schema migrations
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+
+The tables themselves are created by initialize_sql_table (with CREATE TABLE IF NOT EXISTS).
+Everything that changes them afterwards (indexes, constraints, new columns...) is a SchemaMigration.
+The version of the last migration applied is stored in the schema_version table, so each migration only runs once.
+To change the schema, add a new SchemaMigration to the end of SCHEMA_MIGRATIONS. Never edit one that was released!"""
+import typing
+
+from .column_codec import content_fingerprint, decode_list, encode_id_list
+
+SQLITE_SCHEMA_VERSION_TABLE = """CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at INTEGER NOT NULL
+)"""
+MYSQL_SCHEMA_VERSION_TABLE = """CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at BIGINT NOT NULL
+)"""
+
+
+class SchemaMigration(typing.NamedTuple):
+    """One change to the schema. sqlite_statements and mysql_statements must do the same thing.
+    data_migration, if given, is called with (cursor, use_sqlite) after the statements, to move existing data.
+    prepare, if given, is called the same way before the statements, to fix existing data that would violate them.
+    Both must be safe to run again, because MySQL can't roll back the statements if they fail."""
+
+    version: int
+    description: str
+    sqlite_statements: typing.Tuple[str, ...]
+    mysql_statements: typing.Tuple[str, ...]
+    data_migration: typing.Optional[
+        typing.Callable[[typing.Any, bool], typing.Awaitable[None]]
+    ] = None
+    prepare: typing.Optional[
+        typing.Callable[[typing.Any, bool], typing.Awaitable[None]]
+    ] = None
+
+    def statements(self, use_sqlite: bool) -> typing.Tuple[str, ...]:
+        return self.sqlite_statements if use_sqlite else self.mysql_statements
+
+
+class IndexDefinition(typing.NamedTuple):
+    """An index on table(columns)"""
+
+    table: str
+    columns: typing.Tuple[str, ...]
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{'ux' if self.unique else 'ix'}_{self.table}_{'_'.join(self.columns)}"
+
+    def sql(self, use_sqlite: bool) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        # MySQL doesn't support CREATE INDEX IF NOT EXISTS (the migration runner ignores "duplicate key name" instead)
+        if_not_exists = "IF NOT EXISTS " if use_sqlite else ""
+        return f"CREATE {unique}INDEX {if_not_exists}{self.name} ON {self.table} ({', '.join(self.columns)})"
+
+
+def index_migration(
+    version: int,
+    description: str,
+    *indexes: IndexDefinition,
+    prepare: typing.Optional[
+        typing.Callable[[typing.Any, bool], typing.Awaitable[None]]
+    ] = None,
+) -> SchemaMigration:
+    """Make a migration that creates indexes"""
+    return SchemaMigration(
+        version=version,
+        description=description,
+        sqlite_statements=tuple(index.sql(use_sqlite=True) for index in indexes),
+        mysql_statements=tuple(index.sql(use_sqlite=False) for index in indexes),
+        prepare=prepare,
+    )
+
+
+async def remove_duplicate_problem_ids(cursor, use_sqlite: bool) -> None:
+    """Prepares migration 1: delete the rows of the problems table that have the same problem id as another row,
+    keeping one row per problem id, so that the unique index on problem_id can be created"""
+    if use_sqlite:
+        await cursor.execute(
+            """DELETE FROM problems WHERE problem_id IS NOT NULL AND rowid NOT IN (
+                SELECT MIN(rowid) FROM problems WHERE problem_id IS NOT NULL GROUP BY problem_id
+            )"""
+        )
+        return
+    # MySQL tables don't have a rowid, so all but one of the rows with each duplicated id are deleted with LIMIT
+    await cursor.execute(
+        "SELECT problem_id, COUNT(*) FROM problems GROUP BY problem_id HAVING COUNT(*) > 1"
+    )
+    for problem_id, num_rows in await cursor.fetchall():
+        if problem_id is None:
+            continue
+        await cursor.execute(
+            "DELETE FROM problems WHERE problem_id = %s LIMIT %s",
+            (problem_id, num_rows - 1),
+        )
+
+
+def vote_and_solve_statements(use_sqlite: bool) -> typing.Tuple[str, ...]:
+    """Return the statements of migration 4: index problem_votes and problem_solves by user id,
+    add the num_voters and num_solvers columns, and delete the votes and solves of a problem when it is deleted"""
+    integer = "INTEGER" if use_sqlite else "INT"
+    statements = [
+        IndexDefinition("problem_votes", ("user_id",)).sql(use_sqlite),
+        IndexDefinition("problem_solves", ("user_id",)).sql(use_sqlite),
+        f"ALTER TABLE problems ADD COLUMN num_voters {integer} NOT NULL DEFAULT 0",
+        f"ALTER TABLE problems ADD COLUMN num_solvers {integer} NOT NULL DEFAULT 0",
+    ]
+    for table in ("problem_votes", "problem_solves"):
+        body = f"DELETE FROM {table} WHERE problem_id = OLD.problem_id"
+        if use_sqlite:
+            body = f"BEGIN {body}; END"
+        statements.append(
+            f"""CREATE TRIGGER IF NOT EXISTS problems_delete_{table}
+            AFTER DELETE ON problems FOR EACH ROW {body}"""
+        )
+    return tuple(statements)
+
+
+async def move_votes_and_solves_into_tables(cursor, use_sqlite: bool) -> None:
+    """Data migration of migration 4: copy the voters and solvers columns of every problem into
+    problem_votes and problem_solves, count them, and empty the columns"""
+    placeholder = "?" if use_sqlite else "%s"
+    insert = "INSERT OR IGNORE" if use_sqlite else "INSERT IGNORE"
+    await cursor.execute("SELECT problem_id, voters, solvers FROM problems")
+    votes = []
+    solves = []
+    for problem_id, voters, solvers in await cursor.fetchall():
+        if problem_id is None:
+            continue
+        votes.extend((problem_id, int(user_id)) for user_id in decode_list(voters or b"[]"))
+        solves.extend((problem_id, int(user_id)) for user_id in decode_list(solvers or b"[]"))
+    for table, rows in (("problem_votes", votes), ("problem_solves", solves)):
+        if rows:
+            await cursor.executemany(
+                f"{insert} INTO {table} (problem_id, user_id) VALUES ({placeholder}, {placeholder})",
+                rows,
+            )
+    empty = encode_id_list(())
+    await cursor.execute(
+        f"""UPDATE problems SET voters = {placeholder}, solvers = {placeholder},
+        num_voters = (SELECT COUNT(*) FROM problem_votes WHERE problem_votes.problem_id = problems.problem_id),
+        num_solvers = (SELECT COUNT(*) FROM problem_solves WHERE problem_solves.problem_id = problems.problem_id)""",
+        (empty, empty),
+    )
+
+
+def content_fingerprint_statements(use_sqlite: bool) -> typing.Tuple[str, ...]:
+    """Return the statements of migration 5: add the content_fingerprint column, and index it with the guild id
+    (so that duplicates in a guild can be found with one index lookup, or all of them with one GROUP BY)"""
+    column_type = "TEXT" if use_sqlite else "CHAR(64)"
+    return (
+        f"ALTER TABLE problems ADD COLUMN content_fingerprint {column_type}",
+        IndexDefinition("problems", ("content_fingerprint", "guild_id")).sql(use_sqlite),
+    )
+
+
+async def fill_in_content_fingerprints(cursor, use_sqlite: bool) -> None:
+    """Data migration of migration 5: compute the content fingerprint of every problem"""
+    placeholder = "?" if use_sqlite else "%s"
+    await cursor.execute("SELECT problem_id, question, answers FROM problems")
+    fingerprints = [
+        (content_fingerprint(question, decode_list(answers or b"[]")), problem_id)
+        for problem_id, question, answers in await cursor.fetchall()
+        if problem_id is not None
+    ]
+    if fingerprints:
+        await cursor.executemany(
+            f"UPDATE problems SET content_fingerprint = {placeholder} WHERE problem_id = {placeholder}",
+            fingerprints,
+        )
+
+
+def redis_cold_storage_statements(use_sqlite: bool) -> typing.Tuple[str, ...]:
+    """Return the statements of migration 6: add the table that RedisCache moves cold problems and quizzes to"""
+    if use_sqlite:
+        return (
+            """CREATE TABLE IF NOT EXISTS redis_cold_storage (
+            redis_key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            demoted_at INTEGER NOT NULL
+            )""",
+        )
+    return (
+        """CREATE TABLE IF NOT EXISTS redis_cold_storage (
+        redis_key VARCHAR(255) PRIMARY KEY,
+        value LONGTEXT NOT NULL,
+        demoted_at BIGINT NOT NULL
+        )""",
+    )
+
+
+SCHEMA_MIGRATIONS: typing.Tuple[SchemaMigration, ...] = (
+    index_migration(
+        1,
+        "Index problems by problem id (unique), guild id and author",
+        IndexDefinition("problems", ("problem_id",), unique=True),
+        IndexDefinition("problems", ("guild_id",)),
+        IndexDefinition("problems", ("author",)),
+        prepare=remove_duplicate_problem_ids,
+    ),
+    index_migration(
+        2,
+        "Index the quiz tables by quiz id, user id and guild id",
+        IndexDefinition("quizzes", ("guild_id",)),
+        IndexDefinition("quizzes", ("author",)),
+        IndexDefinition("quiz_submissions", ("quiz_id", "user_id")),
+        IndexDefinition("quiz_submissions", ("user_id",)),
+        IndexDefinition("quiz_submissions", ("guild_id",)),
+        IndexDefinition("quiz_submission_sessions", ("quiz_id",)),
+        IndexDefinition("quiz_submission_sessions", ("user_id",)),
+        IndexDefinition("quiz_submission_sessions", ("guild_id",)),
+        IndexDefinition("quiz_submission_sessions", ("special_id",)),
+        IndexDefinition("quiz_description", ("author",)),
+        IndexDefinition("quiz_description", ("guild_id",)),
+    ),
+    index_migration(
+        3,
+        "Index appeals by user id",
+        IndexDefinition("appeals", ("user_id",)),
+        IndexDefinition("appeal_view_info", ("user_id",)),
+    ),
+    SchemaMigration(
+        4,
+        "Store votes and solves in problem_votes and problem_solves, and count them in the problems table",
+        sqlite_statements=vote_and_solve_statements(use_sqlite=True),
+        mysql_statements=vote_and_solve_statements(use_sqlite=False),
+        data_migration=move_votes_and_solves_into_tables,
+    ),
+    SchemaMigration(
+        5,
+        "Fingerprint the question and answers of every problem, to find duplicate problems",
+        sqlite_statements=content_fingerprint_statements(use_sqlite=True),
+        mysql_statements=content_fingerprint_statements(use_sqlite=False),
+        data_migration=fill_in_content_fingerprints,
+    ),
+    SchemaMigration(
+        6,
+        "Add redis_cold_storage, where RedisCache keeps the problems and quizzes it moves out of Redis",
+        sqlite_statements=redis_cold_storage_statements(use_sqlite=True),
+        mysql_statements=redis_cold_storage_statements(use_sqlite=False),
+    ),
+)
+LATEST_SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1].version
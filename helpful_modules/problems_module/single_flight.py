@@ -0,0 +1,101 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - SingleFlight
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import asyncio
+import time
+import typing
+
+T = typing.TypeVar("T")
+
+
+class SingleFlight:
+    """Make concurrent calls share one run of a coroutine function.
+
+    If run() is called before the run in flight has started, it shares that run. If the run in flight has already
+    started, it may have read things before the caller wrote them, so the caller waits for it and then shares
+    the next run (all the callers that waited share one run).
+    If run() is called less than min_interval seconds after a run finished successfully, it returns immediately,
+    unless invalidate() was called since that run started.
+    Callers that get cancelled don't cancel the shared run, because other callers may still be waiting for it."""
+
+    def __init__(self, min_interval: float = 0.0):
+        if min_interval < 0:
+            raise ValueError("min_interval must not be negative")
+        self.min_interval = min_interval
+        self.last_finished: typing.Optional[float] = None
+        self.runs = 0
+        self.coalesced_calls = 0
+        self.generation = 0  # Incremented by invalidate()
+        self._fresh_generation: typing.Optional[int] = None  # The generation the last successful run started at
+        self._calls = 0
+        self._task: typing.Optional[asyncio.Task] = None
+        self._task_covers: typing.Optional[int] = None  # The run in flight covers the calls up to this one
+
+    @property
+    def in_flight(self) -> bool:
+        """Return whether a run hasn't finished yet"""
+        return self._task is not None and not self._task.done()
+
+    def is_fresh(self) -> bool:
+        """Return whether the last successful run finished less than min_interval seconds ago,
+        and invalidate() hasn't been called since it started"""
+        return (
+            self.last_finished is not None
+            and self._fresh_generation == self.generation
+            and time.monotonic() - self.last_finished < self.min_interval
+        )
+
+    def invalidate(self) -> None:
+        """Make the next call run func again, even if the last run is fresh. Call this after writing something
+        func reads, so that this process sees its own writes."""
+        self.generation += 1
+
+    async def _run(self, func: typing.Callable[[], typing.Awaitable[T]]) -> T:
+        generation = self.generation
+        self._task_covers = self._calls  # Whatever these calls wrote before calling is seen by this run
+        result = await func()
+        self.last_finished = time.monotonic()
+        self._fresh_generation = generation
+        return result
+
+    async def run(
+        self, func: typing.Callable[[], typing.Awaitable[T]]
+    ) -> typing.Optional[T]:
+        """Run func(), or share a run that reads everything written before this call.
+        Returns None if the last run is still fresh."""
+        self._calls += 1
+        call = self._calls
+        waited = False
+        # A task from an event loop that is no longer running can never finish
+        while self.in_flight and self._task.get_loop() is asyncio.get_running_loop():
+            if self._task_covers is None or call <= self._task_covers:
+                self.coalesced_calls += 1
+                return await asyncio.shield(self._task)
+            waited = True
+            try:
+                await asyncio.shield(self._task)
+            except Exception:
+                pass  # The next run will report its own errors
+        if self.is_fresh() and not waited:
+            self.coalesced_calls += 1
+            return None
+        self.runs += 1
+        self._task_covers = None
+        self._task = asyncio.ensure_future(self._run(func))
+        return await asyncio.shield(self._task)
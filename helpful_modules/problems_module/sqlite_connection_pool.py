@@ -0,0 +1,346 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - SQLiteConnectionPool
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import asyncio
+import contextlib
+import logging
+import re
+import typing
+
+import aiosqlite
+
+log = logging.getLogger(__name__)
+
+_PRAGMA_NAME_REGEX = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Named sets of pragmas. "default" leaves SQLite's defaults alone (a rollback journal and synchronous=FULL,
+# so writers block readers and every commit fsyncs twice).
+# "throughput" uses write-ahead logging, so readers don't wait for the writer, and only fsyncs at checkpoints.
+# A commit can be lost if the machine (not just the bot) crashes, but the database can't be corrupted.
+SQLITE_PROFILES: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+    "default": {},
+    "throughput": {
+        "journal_mode": "WAL",  # First, because the other pragmas don't depend on it but it changes the file
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,  # in bytes
+        "cache_size": -64 * 1024,  # negative means in KiB, so 64 MiB per connection
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # in milliseconds
+    },
+}
+
+
+class _QueuedWrite:
+    """A write waiting for its turn on the writer connection"""
+
+    __slots__ = ("turn", "done", "committed")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.turn: asyncio.Future = loop.create_future()  # The writer connection, when it's this write's turn
+        self.done: asyncio.Future = loop.create_future()  # The exception the write raised, or None
+        self.committed: asyncio.Future = loop.create_future()  # Set once the write is committed
+
+    def finish(self, error: typing.Optional[BaseException]) -> None:
+        if not self.done.done():
+            self.done.set_result(error)
+
+    def fail(self, error: BaseException) -> None:
+        """Tell the caller that the write (or the transaction it was in) failed"""
+        for future in (self.turn, self.committed):
+            if not future.done():
+                future.set_exception(error)
+                future.exception()  # The caller might have stopped waiting, so don't log "never retrieved"
+
+
+class SQLiteConnectionPool:
+    """A small pool of persistent aiosqlite connections.
+
+    There are a fixed number of reader connections, which can be used concurrently, and exactly one writer connection,
+    which is handed out to one coroutine at a time (SQLite only allows one writer anyway).
+    Short writes should use transaction() instead of writer(): they are queued, and the writes that are queued
+    within group_commit_delay seconds of each other are committed together, so there is one commit (and fsync)
+    per group instead of one per write.
+    Every connection is opened lazily and has the pragmas applied to it when it is opened.
+
+    The connections are not bound to an event loop (aiosqlite creates its futures in whatever loop is running),
+    but the asyncio primitives are, so they are re-created if the pool is used from a new event loop
+    (this happens because MathProblemCache.__init__ uses asyncio.run)."""
+
+    def __init__(
+        self,
+        db_name: str,
+        *,
+        num_readers: int = 4,
+        pragmas: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        profile: str = "default",
+        group_commit_delay: float = 0.002,
+        max_group_size: int = 100,
+    ):
+        """The pragmas of the profile (one of SQLITE_PROFILES) are applied first, then pragmas,
+        so pragmas can override the profile.
+        group_commit_delay is how long (in seconds) to wait for more writes before committing a group,
+        and max_group_size is the most writes to commit at once."""
+        if not isinstance(db_name, str):
+            raise TypeError("db_name is not a string")
+        if not isinstance(num_readers, int):
+            raise TypeError("num_readers is not an integer")
+        if num_readers < 0:
+            raise ValueError("num_readers must be at least 0")
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(
+                f"{profile} is not a SQLite profile (the profiles are {', '.join(SQLITE_PROFILES)})"
+            )
+        if pragmas is None:
+            pragmas = {}
+        pragmas = {**SQLITE_PROFILES[profile], **pragmas}
+        if group_commit_delay < 0:
+            raise ValueError("group_commit_delay must not be negative")
+        if max_group_size < 1:
+            raise ValueError("max_group_size must be at least 1")
+        for name in pragmas.keys():
+            if not _PRAGMA_NAME_REGEX.match(name):
+                raise ValueError(f"{name} is not a valid pragma name")
+        self.db_name = db_name
+        # Every connection to an in-memory database is its own database, so readers can't see the writer's changes
+        self.num_readers = 0 if db_name == ":memory:" else num_readers
+        self.profile = profile
+        self.pragmas = pragmas
+        self._readers: typing.List[aiosqlite.Connection] = []
+        self._writer: typing.Optional[aiosqlite.Connection] = None
+        self._idle_readers: typing.Optional[asyncio.Queue] = None
+        self._writer_lock: typing.Optional[asyncio.Lock] = None
+        self._writer_holder: typing.Optional[asyncio.Task] = None  # The task that is using the writer connection
+        self._open_lock: typing.Optional[asyncio.Lock] = None
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.group_commit_delay = group_commit_delay
+        self.max_group_size = max_group_size
+        self._write_queue: typing.Optional[asyncio.Queue] = None
+        self._write_task: typing.Optional[asyncio.Task] = None
+        self.group_commits = 0
+        self.grouped_writes = 0
+        self.closed = False
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether the connections have been opened"""
+        return self._writer is not None
+
+    def _bind_to_running_loop(self) -> None:
+        """Make sure the asyncio primitives belong to the running event loop.
+        If the loop changed, nobody can still be holding a connection from the old loop, so every reader is idle."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._writer_lock = asyncio.Lock()
+        self._writer_holder = None
+        self._open_lock = asyncio.Lock()
+        self._idle_readers = asyncio.Queue()
+        for reader in self._readers:
+            self._idle_readers.put_nowait(reader)
+        self._write_queue = asyncio.Queue()
+        self._write_task = None  # It ran in the old loop
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """Open one connection and apply the pragmas to it"""
+        conn = aiosqlite.connect(self.db_name)
+        # These connections outlive asyncio.run(), so their worker threads must not keep the interpreter alive
+        # (older versions of aiosqlite make the Connection itself the thread)
+        getattr(conn, "_thread", conn).daemon = True
+        await conn
+        for name, value in self.pragmas.items():
+            if isinstance(value, str) and not value.isidentifier():
+                value = "'" + value.replace("'", "''") + "'"
+            await conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    async def open(self) -> None:
+        """Open every connection in the pool. This does nothing if they are already open."""
+        if self.closed:
+            raise RuntimeError("This pool has been closed")
+        self._bind_to_running_loop()
+        async with self._open_lock:
+            if self.is_open:
+                return
+            log.info(
+                f"Opening {self.num_readers} reader connection(s) and 1 writer connection to {self.db_name}"
+            )
+            self._writer = await self._connect()
+            for _ in range(self.num_readers):
+                reader = await self._connect()
+                self._readers.append(reader)
+                self._idle_readers.put_nowait(reader)
+
+    async def close(self) -> None:
+        """Close every connection in the pool. The pool can't be used afterwards.
+        Writes that are still queued fail."""
+        self.closed = True
+        if self._write_task is not None and self._write_task.get_loop() is asyncio.get_running_loop():
+            self._write_task.cancel()
+            try:
+                await self._write_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._write_task = None
+        while self._write_queue is not None and not self._write_queue.empty():
+            self._write_queue.get_nowait().fail(RuntimeError("This pool has been closed"))
+        connections = list(self._readers)
+        if self._writer is not None:
+            connections.append(self._writer)
+        self._readers = []
+        self._writer = None
+        for conn in connections:
+            try:
+                await conn.close()
+            except Exception as exc:
+                log.exception(exc)
+
+    @staticmethod
+    async def _release(conn: aiosqlite.Connection) -> None:
+        """Reset a connection so that the next borrower gets it in the same state as a fresh connection"""
+        if conn.in_transaction:
+            # aiosqlite.connect() would have closed the connection without committing, so roll back
+            await conn.rollback()
+        conn.row_factory = None
+
+    @contextlib.asynccontextmanager
+    async def reader(self) -> typing.AsyncIterator[aiosqlite.Connection]:
+        """Borrow a reader connection. Use this for SELECT statements only!
+        If there are no reader connections (":memory:" databases), this borrows the writer connection instead,
+        or reuses it if this task is already using it, because waiting for it would never end."""
+        if self.num_readers == 0:
+            if self._writer_holder is not None and self._writer_holder is asyncio.current_task():
+                yield self._writer  # The outer block releases it
+                return
+            async with self.writer() as conn:
+                yield conn
+            return
+        await self.open()
+        conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            try:
+                await self._release(conn)
+            finally:
+                self._idle_readers.put_nowait(conn)
+
+    @contextlib.asynccontextmanager
+    async def writer(self) -> typing.AsyncIterator[aiosqlite.Connection]:
+        """Borrow the writer connection. Only one coroutine can hold it at once."""
+        await self.open()
+        async with self._writer_lock:
+            self._writer_holder = asyncio.current_task()
+            try:
+                yield self._writer
+            finally:
+                self._writer_holder = None
+                await self._release(self._writer)
+
+    @property
+    def group_commit_stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        """Return how many groups of writes were committed, and how many writes there were per group"""
+        return {
+            "group_commits": self.group_commits,
+            "grouped_writes": self.grouped_writes,
+            "average_group_size": self.grouped_writes / self.group_commits
+            if self.group_commits
+            else 0.0,
+        }
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> typing.AsyncIterator[aiosqlite.Connection]:
+        """Borrow the writer connection for one write, which is committed together with the other queued writes.
+        Leaving the block waits until the write is committed.
+        If the block raises an exception, only its own changes are rolled back (each write has its own savepoint).
+        Don't commit or roll back inside the block, and don't wait for another write inside it!"""
+        await self.open()
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.ensure_future(self._run_writes())
+        write = _QueuedWrite(asyncio.get_running_loop())
+        self._write_queue.put_nowait(write)
+        try:
+            conn = await write.turn
+        except asyncio.CancelledError as exc:
+            write.finish(exc)  # In case it was cancelled just after its turn came
+            raise
+        self._writer_holder = asyncio.current_task()  # The writer task holds the lock, but this task uses conn
+        try:
+            yield conn
+        except BaseException as exc:
+            self._writer_holder = None
+            write.finish(exc)
+            raise
+        self._writer_holder = None
+        write.finish(None)
+        await write.committed
+
+    async def _run_writes(self) -> None:
+        """Run the queued writes one after another, and commit them in groups"""
+        loop = asyncio.get_running_loop()
+        while True:
+            write = await self._write_queue.get()
+            async with self._writer_lock:
+                group = []
+                try:
+                    await self._writer.execute("BEGIN")
+                    deadline = loop.time() + self.group_commit_delay
+                    while True:
+                        if await self._run_write(write):
+                            group.append(write)
+                        write = None
+                        if len(group) >= self.max_group_size:
+                            break
+                        try:
+                            write = self._write_queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            timeout = deadline - loop.time()
+                            if timeout <= 0:
+                                break
+                            try:
+                                write = await asyncio.wait_for(self._write_queue.get(), timeout)
+                            except asyncio.TimeoutError:
+                                break
+                    await self._writer.commit()
+                except BaseException as exc:
+                    for failed in group + ([write] if write is not None else []):
+                        failed.fail(exc)
+                    await self._release(self._writer)
+                    if isinstance(exc, asyncio.CancelledError):
+                        raise
+                    log.exception(exc)
+                    continue
+            self.group_commits += 1
+            self.grouped_writes += len(group)
+            for committed in group:
+                if not committed.committed.done():
+                    committed.committed.set_result(None)
+
+    async def _run_write(self, write: _QueuedWrite) -> bool:
+        """Let one write use the writer connection, in a savepoint. Return whether it succeeded."""
+        if write.turn.done():
+            return False  # Cancelled while it was queued
+        await self._writer.execute("SAVEPOINT queued_write")
+        write.turn.set_result(self._writer)
+        error = await write.done
+        if error is not None:
+            await self._writer.execute("ROLLBACK TO queued_write")
+        await self._writer.execute("RELEASE queued_write")
+        self._writer.row_factory = None  # Like _release, so the next write in the group gets a clean connection
+        return error is None
@@ -0,0 +1,113 @@
+"""You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - TTL cache
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import time
+import typing
+from collections import OrderedDict
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+MISSING: typing.Any = object()  # Returned by TTLCache.get() when the key isn't cached
+
+
+class TTLCache(typing.Generic[K, V]):
+    """A bounded in-memory cache. Entries expire ttl seconds after they were stored,
+    and the least recently used entry is evicted when there are more than maxsize entries.
+    A maxsize of 0 disables the cache (nothing is stored).
+
+    To avoid caching a value that was overwritten while it was being loaded, get the version before loading
+    and pass it to put(): the value isn't stored if anything was written through or invalidated in the meantime."""
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+        if ttl < 0:
+            raise ValueError("ttl must not be negative")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[K, typing.Tuple[float, V]]" = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self._clock()
+
+    def get(self, key: K) -> V:
+        """Return the cached value, or MISSING if it isn't cached (or has expired)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: K, value: V, version: typing.Optional[int] = None) -> None:
+        """Store a value. If version is given and a value was written or invalidated since then, nothing is stored
+        (use this for values loaded from the database). Otherwise, the value is written through."""
+        if version is None:
+            self.version += 1
+        elif version != self.version:
+            return
+        if self.maxsize == 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: K) -> None:
+        """Forget the cached value of a key"""
+        self.version += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget every cached value"""
+        self.version += 1
+        self._entries.clear()
+
+    @property
+    def stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        """Return the hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
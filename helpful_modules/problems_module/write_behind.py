@@ -0,0 +1,131 @@
+"""
+You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - Write-behind buffer
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)"""
+import asyncio
+import logging
+import typing
+
+from .ttl_cache import MISSING
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+log = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer(typing.Generic[K, V]):
+    """Buffer writes in memory and write them in batches.
+
+    Writing a key that is already buffered replaces the buffered value, so only the last value is written.
+    The buffer is flushed interval seconds after the first write into an empty buffer, or when flush() is called.
+    Flushes never overlap, so a value is never overwritten by an older one. If a flush fails,
+    the values that weren't written are put back (unless they were written again in the meantime).
+    A timed flush that fails is retried, waiting twice as long each time (but at most max_retry_delay seconds)."""
+
+    def __init__(
+        self,
+        write: typing.Callable[[typing.List[V]], typing.Awaitable[None]],
+        interval: float,
+        max_retry_delay: float = 300.0,
+    ):
+        if interval < 0:
+            raise ValueError("interval must not be negative")
+        self._write = write
+        self.interval = interval
+        self.max_retry_delay = max_retry_delay
+        self._pending: typing.Dict[K, V] = {}
+        self._timer: typing.Optional[asyncio.Task] = None
+        self._flush_task: typing.Optional[asyncio.Task] = None
+        self.puts = 0
+        self.flushes = 0
+        self.values_written = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._pending
+
+    def get(self, key: K) -> V:
+        """Return the buffered value of a key, or MISSING if it isn't buffered"""
+        return self._pending.get(key, MISSING)
+
+    def put(self, key: K, value: V) -> None:
+        """Buffer a value, replacing the buffered value of the same key"""
+        self.puts += 1
+        self._pending[key] = value
+        loop = asyncio.get_running_loop()
+        # A timer from an event loop that is no longer running will never fire
+        if self._timer is None or self._timer.done() or self._timer.get_loop() is not loop:
+            self._timer = loop.create_task(self._flush_later())
+
+    def discard(self, key: K) -> None:
+        """Forget the buffered value of a key without writing it"""
+        self._pending.pop(key, None)
+
+    async def _flush_later(self) -> None:
+        delay = self.interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.flush()
+                return
+            except Exception as exc:
+                # Nobody is waiting for this flush, and the values are still buffered, so it is retried with backoff
+                log.exception(exc)
+                delay = min(delay * 2 or 1.0, self.max_retry_delay)
+
+    async def flush(self) -> None:
+        """Write everything that is buffered, after waiting for the flush in progress (if any)"""
+        loop = asyncio.get_running_loop()
+        while (
+            self._flush_task is not None
+            and not self._flush_task.done()
+            and self._flush_task.get_loop() is loop
+        ):
+            try:
+                await asyncio.shield(self._flush_task)
+            except Exception:
+                pass  # That flush's caller gets the exception
+        if not self._pending:
+            return
+        batch = self._pending
+        self._pending = {}
+        self._flush_task = loop.create_task(self._write_batch(batch))
+        await asyncio.shield(self._flush_task)
+
+    async def _write_batch(self, batch: typing.Dict[K, V]) -> None:
+        try:
+            await self._write(list(batch.values()))
+        except BaseException:
+            for key, value in batch.items():
+                self._pending.setdefault(key, value)
+            raise
+        self.flushes += 1
+        self.values_written += len(batch)
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        """Return how many writes were buffered and how many were actually written"""
+        return {
+            "pending": len(self._pending),
+            "puts": self.puts,
+            "flushes": self.flushes,
+            "values_written": self.values_written,
+        }
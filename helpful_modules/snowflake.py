@@ -0,0 +1,151 @@
+"""You can distribute any version of the Software created and distributed *before* 23:17:55.00 July 28, 2024 GMT-4
+under the GNU General Public License version 3 or at your option, any  later option.
+But versions of the code created and/or distributed *on or after* that date must be distributed
+under the GNU *Affero* General Public License, version 3, or, at your option, any later version.
+
+The Discord Math Problem Bot Repo - Snowflake ids
+
+This program is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License along with this program.
+If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+
+Ids that are unique without asking the database, like Discord's snowflakes.
+An id is (milliseconds since EPOCH_MS, worker id, sequence number), packed into 53 bits, so ids always fit in
+a double (and in the range generate_new_id() has always returned). 41 bits of milliseconds last until 2093.
+Two processes that generate ids at the same time must have different worker ids.
+A generator with a state file (see SnowflakeGenerator.use_state_file) also doesn't reuse ids after a restart,
+even if the clock went backwards while it was down."""
+import os
+import threading
+import time
+import typing
+
+TIMESTAMP_BITS = 41
+WORKER_ID_BITS = 4
+SEQUENCE_BITS = 8
+MAX_WORKER_ID = 2**WORKER_ID_BITS - 1
+MAX_SEQUENCE = 2**SEQUENCE_BITS - 1
+EPOCH_MS = 1704067200000  # 2024-01-01 00:00:00 UTC
+# How far ahead of the last timestamp used the state file reserves timestamps, so it's written about once per second
+RESERVATION_MS = 1000
+# How long use_state_file() waits for the clock to pass the reserved timestamps, before giving up
+MAX_STATE_WAIT = 10.0
+
+
+class SnowflakeParts(typing.NamedTuple):
+    timestamp_ms: int  # Unix time, in milliseconds
+    worker_id: int
+    sequence: int
+
+
+class SnowflakeGenerator:
+    """Generates unique ids in O(1) time. Up to 256 ids can be generated per millisecond per worker;
+    after that, the ids use the next millisecond (instead of waiting for it). This is thread-safe."""
+
+    def __init__(
+        self,
+        worker_id: int = 0,
+        clock: typing.Callable[[], float] = time.time,
+        sleep: typing.Callable[[float], None] = time.sleep,
+    ):
+        self.worker_id = worker_id
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._last_timestamp = -1
+        self._sequence = 0
+        self._state_path: typing.Optional[str] = None
+        self._reserved_until = -1  # The timestamps up to this one are reserved in the state file
+
+    @property
+    def worker_id(self) -> int:
+        return self._worker_id
+
+    @worker_id.setter
+    def worker_id(self, worker_id: int) -> None:
+        if not isinstance(worker_id, int):
+            raise TypeError("worker_id is not an int")
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self._worker_id = worker_id
+
+    def _timestamp(self) -> int:
+        return int(self._clock() * 1000) - EPOCH_MS
+
+    def use_state_file(self, path: str, max_wait: float = MAX_STATE_WAIT) -> None:
+        """Reserve the timestamps this generator uses in the file at path, so that a generator using the same file
+        after a restart doesn't reuse them. If the file says timestamps at or after the current time could have been
+        used, this waits until the clock passes them. Raises RuntimeError if that would take more than max_wait seconds
+        (for example, because the clock went far backwards), instead of generating ids that could collide."""
+        try:
+            with open(path) as file:
+                contents = file.read()
+        except FileNotFoundError:
+            contents = "-1"
+        try:
+            reserved_until = int(contents)
+        except ValueError:
+            raise RuntimeError(f"The id state file {path} is corrupted: {contents!r}")
+        with self._lock:
+            wait = (reserved_until + 1 - self._timestamp()) / 1000
+            if wait > max_wait:
+                raise RuntimeError(
+                    f"The ids reserved in {path} are {wait:.1f} seconds ahead of the clock; "
+                    "ids can't be generated until the clock passes them"
+                )
+            while self._timestamp() <= reserved_until:
+                self._sleep((reserved_until + 1 - self._timestamp()) / 1000)
+            self._last_timestamp = max(self._last_timestamp, reserved_until)
+            self._reserved_until = reserved_until
+            self._state_path = path
+
+    def _reserve(self, reserved_until: int) -> None:
+        """Write reserved_until to the state file. The file is replaced atomically, so a crash can't corrupt it."""
+        temporary_path = self._state_path + ".tmp"
+        with open(temporary_path, "w") as file:
+            file.write(str(reserved_until))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self._state_path)
+        self._reserved_until = reserved_until
+
+    def next_id(self) -> int:
+        """Return a new id. Ids generated later are bigger, unless the clock goes backwards."""
+        with self._lock:
+            timestamp = self._timestamp()
+            if timestamp > self._last_timestamp:
+                self._last_timestamp = timestamp
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                # Same millisecond (or the clock went backwards): keep using the last timestamp
+                self._sequence += 1
+            else:
+                # Out of sequence numbers for this millisecond, so borrow the next one
+                self._last_timestamp += 1
+                self._sequence = 0
+            if self._last_timestamp >= 2**TIMESTAMP_BITS:
+                raise OverflowError("Snowflake ids have run out of timestamps")
+            if self._state_path is not None and self._last_timestamp > self._reserved_until:
+                self._reserve(self._last_timestamp + RESERVATION_MS)
+            return (
+                (self._last_timestamp << (WORKER_ID_BITS + SEQUENCE_BITS))
+                | (self._worker_id << SEQUENCE_BITS)
+                | self._sequence
+            )
+
+
+def parse_snowflake(snowflake: int) -> SnowflakeParts:
+    """Split an id made by a SnowflakeGenerator into its parts"""
+    return SnowflakeParts(
+        timestamp_ms=(snowflake >> (WORKER_ID_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+        worker_id=(snowflake >> SEQUENCE_BITS) & MAX_WORKER_ID,
+        sequence=snowflake & MAX_SEQUENCE,
+    )
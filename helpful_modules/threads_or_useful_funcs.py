@@ -39,6 +39,7 @@ from typing import Any, Optional, Callable
 import aiofiles
 import disnake
 
+from .snowflake import SnowflakeGenerator
 from .the_documentation_file_loader import DocumentationFileLoader
 
 # Licensed under GPLv3
@@ -46,11 +47,26 @@ from .the_documentation_file_loader import DocumentationFileLoader
 log = logging.getLogger(__name__)
 
 TYPE_CLASS = type(int)  # the class 'type'
+_id_generator = SnowflakeGenerator()
 
 
 def generate_new_id():
-    """Generate a random number from 0 to 2**53-1"""
-    return random.randint(0, 2**53 - 1)
+    """Generate a new id from 0 to 2**53-1 in O(1) time. Ids never collide, so there's no need to check whether
+    an id is already used (as long as every process running the bot has its own worker id, and ids are remembered
+    between restarts; see set_id_worker_id and set_id_state_file)
+    """
+    return _id_generator.next_id()
+
+
+def set_id_worker_id(worker_id: int) -> None:
+    """Set the worker id of the ids generated by this process (from 0 to 15)"""
+    _id_generator.worker_id = worker_id
+
+
+def set_id_state_file(path: str) -> None:
+    """Remember the ids generated by this process in a file, so they aren't generated again after a restart.
+    This waits until the clock passes the ids the file says were used (see SnowflakeGenerator.use_state_file)."""
+    _id_generator.use_state_file(path)
 
 
 def async_wrap(func):
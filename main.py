@@ -156,6 +156,8 @@ except (KeyError, AssertionError):
         "You haven't setup the .env file correctly! You need DISCORD_TOKEN=<your token>"
     )
 bot_constants = BotConstants(dotenv.find_dotenv())
+set_id_worker_id(bot_constants.ID_WORKER_ID)
+set_id_state_file(bot_constants.ID_STATE_FILE)
 main_cache = problems_module.MathProblemCache(
     max_answer_length=2000,
     max_question_limit=2000,
@@ -169,6 +171,7 @@ main_cache = problems_module.MathProblemCache(
     mysql_db_ip=bot_constants.MYSQL_DB_IP,
     mysql_db_name=bot_constants.MYSQL_DB_NAME,
     use_sqlite=bot_constants.USE_SQLITE,
+    sqlite_profile="throughput",
 )  # Generate a new cache for the bot!
 asyncio.run(main_cache.initialize_sql_table())
 assert main_cache.db is main_cache.db_name
@@ -214,6 +217,7 @@ async def on_ready(bot: TheDiscordMathProblemBot):
         bot.owner_id = app_info.owner.id
 
     print(f"My owner ids are {bot.owner_ids}")
+    bot.cache.start_maintenance()  # Re-encodes pickled problems and prunes the change feed
     try:
         await bot.register_appeal_views()
     except BaseExceptionGroup as begroup:
@@ -0,0 +1,77 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import os
+import tempfile
+import unittest
+
+from helpful_modules.config_source import ConfigSource
+
+
+class TestConfigSource(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tempdir.name, "config.json")
+        self.write('{"permissions_required": {"sql": {"trusted": true}}}')
+        self.source = ConfigSource(self.filename)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write(self, contents: str, mtime_ns: int = 1_000_000_000) -> None:
+        with open(self.filename, "w") as file:
+            file.write(contents)
+        os.utime(self.filename, ns=(mtime_ns, mtime_ns))
+
+    async def test_only_parses_when_the_file_changes(self):
+        self.assertEqual(
+            dict(await self.source.get_permissions_required_for_command("sql")),
+            {"trusted": True},
+        )
+        await self.source.get()
+        self.assertEqual(self.source.reloads, 1)
+        self.write('{"permissions_required": {"sql": {"trusted": false}}}', mtime_ns=2_000_000_000)
+        self.assertFalse((await self.source.get_permissions_required_for_command("sql"))["trusted"])
+        self.assertEqual(self.source.reloads, 2)
+        with self.assertRaises(KeyError):
+            await self.source.get_permissions_required_for_command("not a command")
+
+    async def test_reload(self):
+        await self.source.get()
+        # Same size and modification time, so only an explicit reload notices the change
+        self.write('{"permissions_required": {"sql": {"trusted": 0   }}}')
+        self.assertTrue((await self.source.get_permissions_required_for_command("sql"))["trusted"])
+        await self.source.reload()
+        self.assertEqual((await self.source.get_permissions_required_for_command("sql"))["trusted"], 0)
+
+    async def test_snapshots_are_read_only(self):
+        requirements = await self.source.get_permissions_required_for_command("sql")
+        with self.assertRaises(TypeError):
+            requirements["trusted"] = False
+
+    async def test_invalid_json_keeps_the_last_snapshot(self):
+        snapshot = await self.source.get()
+        self.write("", mtime_ns=2_000_000_000)  # Read while it was being rewritten
+        self.assertIs(await self.source.get(), snapshot)
+        self.write('{"permissions_required": {}}', mtime_ns=3_000_000_000)
+        self.assertEqual(dict((await self.source.get()).permissions_required), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
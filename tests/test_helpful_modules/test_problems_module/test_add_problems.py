@@ -0,0 +1,90 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+
+from helpful_modules.problems_module.errors import (
+    DuplicateProblem,
+    MathProblemsModuleException,
+    TooManyProblems,
+)
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase, make_problem
+
+
+class TestAddProblems(SQLiteCacheTestCase):
+    cache_kwargs = {"max_guild_problems": 3}
+
+    async def problem_ids(self) -> list:
+        rows = await self.cache.run_sql("SELECT problem_id FROM problems ORDER BY problem_id")
+        return [row["problem_id"] for row in rows]
+
+    async def test_add_problems(self):
+        problems = [make_problem(id) for id in range(1, 101)]
+        problems[0].voters.append(10)
+        self.assertEqual(await self.cache.add_problems(problems), problems)
+        self.assertEqual(await self.problem_ids(), list(range(1, 101)))
+        self.assertEqual(len(self.cache.global_problems), 100)
+        self.assertEqual((await self.cache.get_problem(None, 1)).voters, [10])
+        self.assertEqual(await self.cache.add_problems([]), [])
+
+    async def test_existing_ids_are_rejected(self):
+        await self.cache.add_problems([make_problem(1)])
+        with self.assertRaises(MathProblemsModuleException):
+            await self.cache.add_problems([make_problem(2), make_problem(1)])
+        with self.assertRaises(MathProblemsModuleException):
+            await self.cache.add_problems([make_problem(3), make_problem(3)])
+        self.assertEqual(await self.problem_ids(), [1])  # Nothing else was added
+
+    async def test_guild_limit(self):
+        await self.cache.add_problems([make_problem(1, "7"), make_problem(2, "7")])
+        with self.assertRaises(TooManyProblems):
+            await self.cache.add_problems([make_problem(3, "7"), make_problem(4, "7")])
+        await self.cache.add_problems([make_problem(3, "7"), make_problem(4, "8")])
+        self.assertEqual(await self.problem_ids(), [1, 2, 3, 4])
+
+    async def test_duplicates_are_rejected(self):
+        await self.cache.add_problems([make_problem(1, question="What is 2+2?")])
+        with self.assertRaises(DuplicateProblem):
+            await self.cache.add_problem(2, make_problem(2, question="what is 2+2? "))
+        await self.cache.add_problem(2, make_problem(2, "7", question="What is 2+2?"))  # Another guild
+        added = await self.cache.add_problems(
+            [make_problem(3, question="What is 2+2?"), make_problem(4), make_problem(5, question="What is 4+1?")],
+            skip_duplicates=True,
+        )
+        self.assertEqual([problem.id for problem in added], [4])
+        self.assertEqual(await self.problem_ids(), [1, 2, 4])
+
+    async def test_remove_duplicate_problems(self):
+        await self.cache.add_problems([make_problem(1), make_problem(2, "7"), make_problem(3, "7")])
+        # Make problems 2 and 3 duplicates of problem 1, like problems added before duplicates were rejected
+        await self.cache.run_sql(
+            "UPDATE problems SET question = 'What is 1+1?', answers = '[\"2\"]', content_fingerprint = ? "
+            "WHERE problem_id IN (2, 3)",
+            [make_problem(1).get_content_fingerprint()],
+        )
+        await self.cache.add_voter(3, 10)
+        self.assertEqual(await self.cache.remove_duplicate_problems(), 1)
+        self.assertEqual(await self.problem_ids(), [1, 2])  # Problem 2 is in another guild than problem 1
+        self.assertIsNone(self.cache._problem_index.get(3))  # It isn't cached any more
+        self.assertEqual(await self.cache.run_sql("SELECT * FROM problem_votes"), [])
+        self.assertEqual(await self.cache.remove_duplicate_problems(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import unittest
+
+from helpful_modules.problems_module.batch_loader import BatchLoader
+from helpful_modules.problems_module.errors import QuizNotFound
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase
+
+
+class TestBatchLoader(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.batches = []
+
+    async def batch_load(self, keys):
+        self.batches.append(sorted(keys))
+        await asyncio.sleep(0.01)
+        return {key: key * 10 for key in keys if key >= 0}
+
+    async def test_loads_in_the_same_iteration_are_batched(self):
+        loader = BatchLoader(self.batch_load)
+        results = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1))
+        self.assertEqual(results, [10, 20, 10])
+        self.assertEqual(self.batches, [[1, 2]])
+        self.assertEqual(loader.loads, 3)
+
+    async def test_later_loads_get_a_new_batch(self):
+        loader = BatchLoader(self.batch_load)
+        await loader.load(1)
+        await loader.load(1)
+        self.assertEqual(self.batches, [[1], [1]])
+
+    async def test_max_batch_size(self):
+        loader = BatchLoader(self.batch_load, max_batch_size=2)
+        self.assertEqual(await loader.load_many(range(5)), [0, 10, 20, 30, 40])
+        self.assertEqual(self.batches, [[0, 1], [2, 3], [4]])
+
+    async def test_missing_keys_raise(self):
+        loader = BatchLoader(self.batch_load, not_found=lambda key: LookupError(key))
+        results = await asyncio.gather(
+            loader.load(-1), loader.load(3), return_exceptions=True
+        )
+        self.assertIsInstance(results[0], LookupError)
+        self.assertEqual(results[1], 30)
+
+    async def test_errors_are_shared(self):
+        async def fail(keys):
+            raise ValueError("oops")
+
+        loader = BatchLoader(fail)
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_cancelling_one_caller_does_not_cancel_the_batch(self):
+        loader = BatchLoader(self.batch_load)
+        first = asyncio.ensure_future(loader.load(1))
+        second = asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, 10)
+
+
+class TestGetQuizBatching(SQLiteCacheTestCase):
+
+    async def insert_quiz(self, quiz_id: int):
+        async with self.cache.sqlite_pool.writer() as conn:
+            await conn.execute(
+                """INSERT INTO quizzes (guild_id, quiz_id, problem_id, question, answer, voters, author, solvers)
+                VALUES (NULL, ?, 1, 'What is 1+1?', X'', X'', 5, 0)""",
+                (quiz_id,),
+            )
+            await conn.execute(
+                "INSERT INTO quiz_submissions (guild_id, quiz_id, user_id, submissions) VALUES (NULL, ?, 6, X'')",
+                (quiz_id,),
+            )
+            await conn.execute(
+                "INSERT INTO quiz_description (quiz_id, description, author) VALUES (?, 'A quiz', 5)",
+                (quiz_id,),
+            )
+            await conn.commit()
+
+    async def test_concurrent_loads_share_one_batch(self):
+        await self.insert_quiz(1)
+        await self.insert_quiz(2)
+        loader = self.cache._quiz_loader
+        first, second, third = await asyncio.gather(
+            loader.load(1), loader.load(2), loader.load(1)
+        )
+        self.assertEqual(loader.batches, 1)
+        self.assertIs(first, third)
+        self.assertEqual([row["quiz_id"] for row in second.problems], [2])
+        self.assertEqual([row["user_id"] for row in second.submissions], [6])
+        self.assertEqual(second.sessions, [])
+        self.assertEqual(second.description["description"], "A quiz")
+
+    async def test_missing_quiz(self):
+        await self.insert_quiz(1)
+        results = await asyncio.gather(
+            self.cache._quiz_loader.load(1),
+            self.cache.get_quiz(2),
+            return_exceptions=True,
+        )
+        self.assertEqual(results[0].problems[0]["quiz_id"], 1)
+        self.assertIsInstance(results[1], QuizNotFound)
+        self.assertEqual(self.cache._quiz_loader.batches, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,212 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import pickle
+import unittest
+
+from helpful_modules.problems_module.column_codec import encode_answers, encode_id_list
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase
+
+INSERT_PROBLEM = """INSERT INTO problems (guild_id, problem_id, question, answers, voters, solvers, author, extra_stuff)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+
+def problem_row(problem_id: int, question: str) -> list:
+    return [
+        None,
+        problem_id,
+        question,
+        pickle.dumps(["1"]),
+        pickle.dumps([]),
+        pickle.dumps([]),
+        5,
+        str({"type": "BaseProblem"}),
+    ]
+
+INSERT_QUIZ_PROBLEM = """INSERT INTO quizzes (guild_id, quiz_id, problem_id, question, answer, voters, author, solvers)
+VALUES (NULL, ?, ?, ?, ?, ?, 5, ?)"""
+INSERT_QUIZ_DESCRIPTION = """INSERT INTO quiz_description (quiz_id, description, time_limit, intensity, license, category, author, guild_id)
+VALUES (?, 'A quiz', 60, 1, 'CC BY-SA 4.0', 'Unspecified', 5, NULL)"""
+
+
+def quiz_problem_row(quiz_id: int, question: str) -> list:
+    return [
+        quiz_id,
+        1,
+        question,
+        pickle.dumps(["1"]),
+        pickle.dumps([]),
+        pickle.dumps([]),
+    ]
+
+
+class TestChangeFeed(SQLiteCacheTestCase):
+    cache_kwargs = {"cache_refresh_min_interval": 0}
+
+    def cached_questions(self) -> dict:
+        return {
+            problem_id: problem.question
+            for problem_id, problem in self.cache.global_problems.items()
+        }
+
+    async def test_first_update_loads_everything(self):
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.update_cache()
+        self.assertEqual(self.cached_questions(), {1: "a"})
+
+    async def test_inserts_and_updates_are_applied(self):
+        await self.cache.update_cache()
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(2, "b"))
+        await self.cache.run_sql("UPDATE problems SET question = 'c' WHERE problem_id = 1")
+        await self.cache.update_cache()
+        self.assertEqual(self.cached_questions(), {1: "c", 2: "b"})
+
+    async def test_deletes_are_applied(self):
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(2, "b"))
+        await self.cache.update_cache()
+        await self.cache.run_sql("DELETE FROM problems WHERE problem_id = 2")
+        await self.cache.update_cache()
+        self.assertEqual(self.cached_questions(), {1: "a"})
+
+    async def test_only_changed_rows_are_reloaded(self):
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.update_cache()
+        unchanged = self.cache.global_problems[1]
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(2, "b"))
+        await self.cache.update_cache()
+        self.assertIs(self.cache.global_problems[1], unchanged)
+
+    async def test_indexes_follow_the_change_feed(self):
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.update_cache()
+        self.assertEqual(len(await self.cache.get_problems_by_author_id(5)), 1)
+        await self.cache.run_sql("UPDATE problems SET author = 6 WHERE problem_id = 1")
+        await self.cache.update_cache()
+        self.assertEqual(await self.cache.get_problems_by_author_id(5), [])
+        self.assertEqual(len(await self.cache.get_problems_by_author_id(6)), 1)
+        await self.cache.remove_problem_without_returning(None, 1)
+        self.assertEqual(await self.cache.get_problems_by_author_id(6), [])
+
+    async def test_deleting_a_users_data_uncaches_their_problems(self):
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.update_cache()
+        await self.cache.delete_all_by_user_id(5)
+        self.assertEqual(self.cached_questions(), {})
+        self.assertEqual(await self.cache.get_problems_by_author_id(5), [])
+
+    async def test_deleting_a_guilds_data_uncaches_its_problems(self):
+        row = problem_row(1, "a")
+        row[0] = 3
+        await self.cache.run_sql(INSERT_PROBLEM, row)
+        await self.cache.update_cache()
+        self.assertEqual(self.cached_questions(), {})  # It isn't a global problem
+        self.assertEqual(len(await self.cache.get_problems_by_author_id(5)), 1)
+        await self.cache.delete_all_by_guild_id(3)
+        self.assertFalse(any(self.cache.guild_problems.values()))
+        self.assertEqual(await self.cache.get_problems_by_author_id(5), [])
+
+    async def test_changes_that_commit_late_are_applied(self):
+        self.cache.change_feed_reread_window = 100  # As on MySQL
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.run_sql(
+            "INSERT INTO change_feed (revision, table_name, item_id, guild_id, deleted) "
+            "VALUES (10, 'problems', 99, NULL, 1)"
+        )
+        await self.cache.update_cache()
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(2, "b"))
+        # Pretend that the insert got its revision before revision 10 did, but committed after
+        await self.cache.run_sql("UPDATE change_feed SET revision = 5 WHERE revision = 11")
+        await self.cache.update_cache()
+        self.assertEqual(self.cached_questions(), {1: "a", 2: "b"})
+        unchanged = self.cache.global_problems[2]
+        await self.cache.update_cache()
+        self.assertIs(self.cache.global_problems[2], unchanged)  # Applied changes aren't applied again
+
+    async def test_own_writes_are_seen_right_away(self):
+        self.cache._update_cache_flight.min_interval = 60
+        await self.cache.update_cache()
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.update_cache()  # The last refresh is fresh, but it started before the write
+        self.assertEqual(self.cached_questions(), {1: "a"})
+        runs = self.cache._update_cache_flight.runs
+        await self.cache.update_cache()
+        self.assertEqual(self.cache._update_cache_flight.runs, runs)  # Nothing was written since
+
+    async def test_quizzes_are_loaded(self):
+        await self.cache.run_sql(INSERT_QUIZ_PROBLEM, quiz_problem_row(7, "a"))
+        await self.cache.run_sql(INSERT_QUIZ_DESCRIPTION, [7])
+        await self.cache.update_cache()
+        quiz = self.cache._cached_quizzes_by_id[7]
+        self.assertEqual([problem.question for problem in quiz.problems], ["a"])
+        self.assertEqual(quiz.authors, [5])
+        self.assertEqual(quiz.description.description, "A quiz")
+        self.assertEqual(quiz.existing_sessions, [])
+        await self.cache.run_sql("UPDATE quizzes SET question = 'b' WHERE quiz_id = 7")
+        await self.cache.update_cache()
+        quiz = self.cache._cached_quizzes_by_id[7]
+        self.assertEqual([problem.question for problem in quiz.problems], ["b"])
+
+    async def test_description_changes_are_applied(self):
+        await self.cache.run_sql(INSERT_QUIZ_PROBLEM, quiz_problem_row(7, "a"))
+        await self.cache.run_sql(INSERT_QUIZ_DESCRIPTION, [7])
+        await self.cache.update_cache()
+        await self.cache.run_sql("UPDATE quiz_description SET description = 'A harder quiz' WHERE quiz_id = 7")
+        await self.cache.update_cache()
+        self.assertEqual(self.cache._cached_quizzes_by_id[7].description.description, "A harder quiz")
+
+    async def test_prune_keeps_the_newest_entry(self):
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(2, "b"))
+        await self.cache.prune_change_feed(older_than=-60)
+        rows = await self.cache.run_sql("SELECT item_id FROM change_feed")
+        self.assertEqual(rows, [{"item_id": 2}])
+
+    async def test_maintenance_prunes_the_change_feed(self):
+        for problem_id in (1, 2):
+            row = problem_row(problem_id, "a")
+            row[3:6] = [encode_answers(["1"]), encode_id_list([]), encode_id_list([])]  # Nothing to re-encode
+            await self.cache.run_sql(INSERT_PROBLEM, row)
+        await self.cache.run_sql("UPDATE change_feed SET changed_at = 0")
+        self.cache.start_maintenance()
+        task = self.cache._maintenance_task
+        self.cache.start_maintenance()  # Already running
+        self.assertIs(self.cache._maintenance_task, task)
+        for _ in range(100):
+            rows = await self.cache.run_sql("SELECT item_id FROM change_feed")
+            if len(rows) == 1:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(rows, [{"item_id": 2}])
+        await self.cache.close()
+        self.assertTrue(task.done())
+
+    async def test_pruned_changes_cause_a_full_reload(self):
+        await self.cache.update_cache()
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(1, "a"))
+        await self.cache.run_sql(INSERT_PROBLEM, problem_row(2, "b"))
+        await self.cache.prune_change_feed(older_than=-60)
+        await self.cache.update_cache()
+        self.assertEqual(self.cached_questions(), {1: "a", 2: "b"})
+
+
+if __name__ == "__main__":
+    unittest.main()
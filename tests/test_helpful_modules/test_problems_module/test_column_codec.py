@@ -0,0 +1,145 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import pickle
+import unittest
+
+from helpful_modules.problems_module.column_codec import (
+    content_fingerprint,
+    decode_id_list,
+    decode_list,
+    encode_answers,
+    encode_id_list,
+    is_pickled,
+)
+from tests.test_helpful_modules.test_problems_module.utils import (
+    TempConfigDirMixin,
+    make_sqlite_cache,
+)
+
+
+class TestColumnCodec(unittest.TestCase):
+    def test_id_lists_round_trip(self):
+        ids = [0, 1, 2**64 - 1, 1086784474214256722]
+        encoded = encode_id_list(ids)
+        self.assertEqual(len(encoded), 1 + 8 * len(ids))
+        self.assertEqual(decode_id_list(encoded), ids)
+        self.assertEqual(decode_list(encoded), ids)
+        self.assertEqual(decode_list(encode_id_list([])), [])
+
+    def test_long_id_lists_round_trip(self):
+        for length in (255, 256, 257, 1000):
+            ids = list(range(length))
+            self.assertEqual(decode_list(encode_id_list(ids)), ids)
+            self.assertEqual(decode_list(memoryview(encode_id_list(ids))), ids)
+
+    def test_answers_round_trip(self):
+        answers = ["1", "x = 2", "ünïcödé"]
+        self.assertEqual(decode_list(encode_answers(answers)), answers)
+        self.assertEqual(decode_list(encode_answers([])), [])
+
+    def test_pickled_values_can_still_be_decoded(self):
+        for value in ([], [1, 2, 3], ["a", "b"]):
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                pickled = pickle.dumps(value, protocol=protocol)
+                self.assertTrue(is_pickled(pickled))
+                self.assertEqual(decode_list(pickled), value)
+
+    def test_new_values_are_not_pickled(self):
+        self.assertFalse(is_pickled(encode_id_list([1, 2])))
+        self.assertFalse(is_pickled(encode_answers(["1"])))
+
+    def test_invalid_ids(self):
+        with self.assertRaises(ValueError):
+            encode_id_list([-1])
+        with self.assertRaises(ValueError):
+            decode_id_list(b"\x01\x00")
+
+    def test_content_fingerprint(self):
+        fingerprint = content_fingerprint("What is 1+1?", ["2", "two"])
+        self.assertEqual(content_fingerprint("  what IS 1+1? ", ["Two", "2"]), fingerprint)
+        self.assertNotEqual(content_fingerprint("What is 1+1?", ["2"]), fingerprint)
+        self.assertNotEqual(content_fingerprint("What is 1+2?", ["2", "two"]), fingerprint)
+
+
+class TestReencodingPickledRows(TempConfigDirMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = make_sqlite_cache()
+
+    def tearDown(self):
+        asyncio.run(self.cache.close())
+        super().tearDown()
+
+    def test_reencode(self):
+        async def run():
+            for problem_id in range(7):
+                await self.cache.run_sql(
+                    """INSERT INTO problems (guild_id, problem_id, question, answers, voters, solvers, author, extra_stuff)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [
+                        None,
+                        problem_id,
+                        "What is 1+1?",
+                        pickle.dumps(["2"]),
+                        pickle.dumps([problem_id]),
+                        pickle.dumps([]),
+                        5,
+                        str({"type": "BaseProblem"}),
+                    ],
+                )
+            self.assertEqual(
+                await self.cache.reencode_pickled_problem_rows(batch_size=3), 7
+            )
+            self.assertEqual(await self.cache.reencode_pickled_problem_rows(), 0)
+            return await self.cache.run_sql(
+                "SELECT problem_id, answers, voters, solvers FROM problems ORDER BY problem_id"
+            )
+
+        rows = asyncio.run(run())
+        self.assertEqual(len(rows), 7)
+        for row in rows:
+            self.assertEqual(row["answers"], encode_answers(["2"]))
+            self.assertEqual(row["voters"], encode_id_list([row["problem_id"]]))
+            self.assertEqual(row["solvers"], encode_id_list([]))
+
+
+    def test_maintenance_reencodes_pickled_rows(self):
+        async def run():
+            await self.cache.run_sql(
+                """INSERT INTO problems (guild_id, problem_id, question, answers, voters, solvers, author, extra_stuff)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                [None, 1, "What is 1+1?", pickle.dumps(["2"]), pickle.dumps([3]), pickle.dumps([]), 5,
+                 str({"type": "BaseProblem"})],
+            )
+            self.cache.start_maintenance()
+            for _ in range(100):
+                rows = await self.cache.run_sql("SELECT voters FROM problems")
+                if not is_pickled(rows[0]["voters"]):
+                    break
+                await asyncio.sleep(0.01)
+            await self.cache.close()
+            return rows
+
+        rows = asyncio.run(run())
+        self.assertEqual(rows, [{"voters": encode_id_list([3])}])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+from unittest.mock import MagicMock
+
+import disnake
+
+from helpful_modules.problems_module.GuildData import CheckForUserPassage, GuildData
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase
+
+
+def make_member(id: int, role_ids=(), **permissions) -> MagicMock:
+    member = MagicMock(spec=disnake.Member)
+    member.id = id
+    member.roles = [MagicMock(id=role_id) for role_id in role_ids]
+    member.guild_permissions = disnake.Permissions(**permissions)
+    return member
+
+
+class TestCheckForUserPassage(unittest.TestCase):
+    def setUp(self):
+        self.check = CheckForUserPassage(
+            denylisted_users=[1],
+            allowlisted_users=[2],
+            roles_allowed=[10],
+            permissions_needed=["manage_guild", "kick_members"],
+        )
+
+    def test_check_for_user_passage(self):
+        self.assertFalse(self.check.check_for_user_passage(make_member(1, [10], administrator=True)))
+        self.assertTrue(self.check.check_for_user_passage(make_member(2)))
+        self.assertTrue(self.check.check_for_user_passage(make_member(3, [11, 10])))
+        self.assertFalse(self.check.check_for_user_passage(make_member(3, [11], manage_guild=True)))
+        self.assertTrue(
+            self.check.check_for_user_passage(make_member(3, manage_guild=True, kick_members=True))
+        )
+
+    def test_no_permissions_needed(self):
+        self.check.permissions_needed = []
+        self.assertTrue(self.check.check_for_user_passage(make_member(3)))
+
+    def test_assigning_recompiles(self):
+        self.assertFalse(self.check.check_for_user_passage(make_member(3, [11])))
+        self.check.roles_allowed = [11]
+        self.assertTrue(self.check.check_for_user_passage(make_member(3, [11])))
+
+    def test_copy_is_compiled_separately(self):
+        self.assertTrue(self.check.check_for_user_passage(make_member(3, [10])))
+        copy = self.check.copy()
+        copy.denylisted_users.append(3)  # Before the copy is compiled
+        self.assertFalse(copy.check_for_user_passage(make_member(3, [10])))
+        self.assertEqual(self.check.denylisted_users, [1])
+        self.assertTrue(self.check.check_for_user_passage(make_member(3, [10])))
+
+
+class TestGuildDataCache(SQLiteCacheTestCase):
+
+    async def test_guild_data_is_cached(self):
+        self.assertFalse((await self.cache.get_guild_data(5)).denylisted)
+        data = GuildData.default(5)
+        data.mods_check.roles_allowed = [10]
+        await self.cache.set_guild_data(data)
+        data.mods_check.roles_allowed = [11]  # Doesn't change the cache
+        cached = await self.cache.get_guild_data(5)
+        self.assertEqual(cached.mods_check.roles_allowed, [10])
+        self.assertTrue(cached.mods_check.check_for_user_passage(make_member(3, [10])))
+        cached.mods_check.roles_allowed.append(11)  # Doesn't change the cache either
+        self.assertEqual((await self.cache.get_guild_data(5)).mods_check.roles_allowed, [10])
+        self.assertEqual(self.cache.guild_data_cache_stats["hits"], 2)
+
+    async def test_cached_guild_data_matches_the_database(self):
+        data = GuildData.default(5)
+        data.can_create_problems_check.permissions_needed = ["manage_guild"]
+        await self.cache.set_guild_data(data)
+        cached = (await self.cache.get_guild_data(5)).to_dict()
+        self.cache._guild_data_cache.clear()
+        self.assertEqual((await self.cache.get_guild_data(5)).to_dict(), cached)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+
+from helpful_modules.problems_module.errors import (
+    MathProblemsModuleException,
+    TooManyProblems,
+)
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase, make_problem
+
+
+class TestGuildLimits(SQLiteCacheTestCase):
+    cache_kwargs = {"max_guild_problems": 2}
+
+    async def test_add_problem_does_not_reload_the_cache(self):
+        async def update_cache():
+            self.fail("add_problem reloaded the cache")
+
+        self.cache.update_cache = update_cache
+        await self.cache.add_problem(1, make_problem(1, "7"))
+        await self.cache.add_problem(2, make_problem(2, "7"))
+        with self.assertRaises(TooManyProblems):
+            await self.cache.add_problem(3, make_problem(3, "7"))
+        with self.assertRaises(MathProblemsModuleException):
+            await self.cache.add_problem(1, make_problem(1, "8"))
+        await self.cache.add_problem(3, make_problem(3))  # There is no limit for global problems
+        self.assertEqual(await self.cache.count_guild_problems(7), 2)
+        self.assertEqual(await self.cache.count_guild_problems(8), 0)
+
+    async def test_count_guild_quizzes(self):
+        for guild_id, quiz_id in ((7, 1), (7, 2), (8, 3), (None, 4)):
+            await self.cache.run_sql(
+                "INSERT INTO quizzes (guild_id, quiz_id, problem_id, question, answer, voters, author, solvers) "
+                "VALUES (?, ?, 1, 'a', x'', x'', 5, 0)",
+                [guild_id, quiz_id],
+            )
+        self.assertEqual(await self.cache.count_guild_quizzes(7), 2)
+        self.assertEqual(await self.cache.count_guild_quizzes(8), 1)
+        self.assertEqual(await self.cache.count_guild_quizzes(9), 0)
+        self.assertEqual(await self.cache.count_guild_quizzes(None), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
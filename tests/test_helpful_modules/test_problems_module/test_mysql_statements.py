@@ -0,0 +1,310 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import collections
+import contextlib
+import re
+import typing
+import unittest
+import warnings
+
+from helpful_modules.problems_module import (
+    Appeal,
+    AppealViewInfo,
+    GuildData,
+    MathProblemCache,
+    MathProblemsModuleException,
+    UserData,
+)
+from helpful_modules.problems_module.cache.quiz_related_cache import QuizRelatedCache
+from helpful_modules.problems_module.query import ProblemQuery, QuizQuery
+from helpful_modules.problems_module.quizzes import Quiz
+from helpful_modules.problems_module.quizzes.quiz_description import QuizDescription
+from tests.test_helpful_modules.test_problems_module.test_write_behind import make_session
+from tests.test_helpful_modules.test_problems_module.utils import (
+    TempConfigDirMixin,
+    make_problem,
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_TABLE_REFERENCE = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|JOIN|REFERENCES|ALTER TABLE)\s+([A-Za-z_]\w*)"
+    r"|\bON\s+([A-Za-z_]\w*)\s*(?:\(|FOR\b)",
+    re.IGNORECASE,
+)
+_CREATE_TABLE = re.compile(
+    r"^\s*CREATE TABLE (?:IF NOT EXISTS )?(\w+)\s*\((.*)\)\s*;?\s*$", re.IGNORECASE | re.DOTALL
+)
+_KEYWORDS = {"ON", "SET", "SELECT", "IGNORE"}
+# (pattern, what is wrong with a statement that matches it)
+_INVALID_SYNTAX = (
+    (r"\?", "SQLite placeholder"),
+    (r"\bINSERT\s+OR\b", "INSERT OR ... is SQLite-only"),
+    (r"\bAUTOINCREMENT\b", "AUTOINCREMENT is SQLite-only (MySQL uses AUTO_INCREMENT)"),
+    (r"\bWITHOUT\s+ROWID\b", "WITHOUT ROWID is SQLite-only"),
+    (r"\bstrftime\s*\(", "strftime is SQLite-only"),
+    (r"\bAS\s+INT(?:EGER)?\s*\)", "MySQL can only CAST AS SIGNED"),
+    (r"\bVARCHAR\b(?!\s*\()", "VARCHAR needs a length"),
+    (r",\s*\)", "trailing comma"),
+    (r"\bDELETE\s+\*", "DELETE * is not valid"),
+    (r"[\w%]\.\s", "stray period"),
+    (r'"', "stray double quote"),
+)
+
+
+class MySQLStatementChecker:
+    """Checks the statements sent to MySQL for mistakes that MySQL would reject, since no MySQL server
+    is available in the tests. It also remembers the tables created so far (like CREATE TABLE IF NOT EXISTS,
+    only the first definition counts), and checks that every statement only uses tables that exist."""
+
+    def __init__(self):
+        self.tables: typing.Dict[str, str] = {}
+        self.primary_keys: typing.Dict[str, str] = {}  # Primary keys that aren't AUTO_INCREMENT
+        self.problems: typing.List[str] = []
+
+    def check(self, sql: str, params) -> None:
+        without_literals = _STRING_LITERAL.sub("''", sql)
+        problems = [
+            message
+            for pattern, message in _INVALID_SYNTAX
+            if re.search(pattern, without_literals, re.IGNORECASE)
+        ]
+        if without_literals.count("'") % 2:
+            problems.append("unbalanced quotes")
+        depth = 0
+        for char in without_literals:
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if depth < 0:
+                break
+        if depth:
+            problems.append("unbalanced parentheses")
+        num_placeholders = without_literals.replace("%%", "").count("%s")
+        if num_placeholders != len(params or ()):
+            problems.append(f"{num_placeholders} placeholders but {len(params or ())} parameters")
+        created = _CREATE_TABLE.match(without_literals)
+        if created is not None:
+            problems.extend(self._check_create_table(*created.groups()))
+        for match in _TABLE_REFERENCE.finditer(without_literals.replace("ON DUPLICATE KEY UPDATE", "")):
+            table = match.group(1) or match.group(2)
+            if table.upper() not in _KEYWORDS and table not in self.tables:
+                problems.append(f"table {table} doesn't exist")
+        insert = re.match(r"\s*(?:INSERT|REPLACE)(?: IGNORE)? INTO (\w+) \(([^)]*)\)", without_literals)
+        if insert is not None and insert.group(1) in self.primary_keys:
+            columns = {column.strip() for column in insert.group(2).split(",")}
+            if self.primary_keys[insert.group(1)] not in columns:
+                problems.append(f"the primary key of {insert.group(1)} isn't AUTO_INCREMENT or given")
+        if problems:
+            self.problems.append(f"{' '.join(sql.split())}: {', '.join(problems)}")
+
+    def _check_create_table(self, table: str, body: str) -> typing.List[str]:
+        problems = []
+        first_definition = table not in self.tables
+        self.tables.setdefault(table, body)
+        for column in body.split(","):
+            words = column.split()
+            if len(words) < 2 or words[0].upper() in {"PRIMARY", "FOREIGN", "UNIQUE", "KEY", "INDEX"}:
+                continue
+            name, column_type = words[0], words[1].upper()
+            auto_increment = "AUTO_INCREMENT" in column.upper()
+            # Discord ids and the ids from generate_new_id don't fit in an INT
+            if name.lower().endswith("id") and column_type in {"INT", "INTEGER"} and not auto_increment:
+                problems.append(f"{name} is an id, so it needs to be a BIGINT")
+            if first_definition and "PRIMARY" in column.upper() and not auto_increment:
+                self.primary_keys[table] = name
+        return problems
+
+
+class RecordingCursor:
+    """Checks every statement, and returns the rows of the first pattern in canned_rows that the statement matches.
+    Otherwise, it acts as if every table is empty: aggregates (like COUNT and MAX) return one row of zeros
+    (row[0] and row["anything"] are both 0), and other queries return no rows."""
+
+    def __init__(self, checker: MySQLStatementChecker, canned_rows: typing.Dict[str, list]):
+        self.checker = checker
+        self.canned_rows = canned_rows
+        self.rowcount = 0
+        self._rows = []
+
+    async def execute(self, sql: str, params=None) -> int:
+        self.checker.check(sql, params)
+        for pattern, rows in self.canned_rows.items():
+            if re.search(pattern, sql):
+                self._rows = list(rows)
+                return len(rows)
+        aggregate = re.match(r"\s*SELECT\s+(?:MIN|MAX|COUNT)\(", sql, re.IGNORECASE)
+        if aggregate and "GROUP BY" not in sql.upper():
+            self._rows = [collections.defaultdict(int)]
+        else:
+            self._rows = []
+        return 0
+
+    async def executemany(self, sql: str, seq_of_params) -> int:
+        for params in seq_of_params:
+            self.checker.check(sql, params)
+        self._rows = []
+        return 0
+
+    async def fetchall(self) -> list:
+        return self._rows
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def close(self) -> None:
+        pass
+
+
+class RecordingConnection:
+    def __init__(self, checker: MySQLStatementChecker, canned_rows: typing.Dict[str, list]):
+        self.checker = checker
+        self.canned_rows = canned_rows
+
+    async def cursor(self, *args) -> RecordingCursor:
+        return RecordingCursor(self.checker, self.canned_rows)
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        pass
+
+
+class RecordingMathProblemCache(MathProblemCache):
+    """A MySQL MathProblemCache whose connections check the statements instead of running them"""
+
+    def __init__(self, checker: MySQLStatementChecker, **kwargs):
+        self.checker = checker
+        self.canned_rows: typing.Dict[str, list] = {}
+        super().__init__(**kwargs)
+
+    @contextlib.asynccontextmanager
+    async def get_a_connection(self):
+        yield RecordingConnection(self.checker, self.canned_rows)
+
+
+class TestMySQLStatements(TempConfigDirMixin, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.checker = MySQLStatementChecker()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            self.cache = RecordingMathProblemCache(
+                self.checker,
+                mysql_username="",
+                mysql_password="",
+                mysql_db_ip="",
+                mysql_db_name="",
+                use_sqlite=False,
+                quiz_session_flush_interval=60,
+            )
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    def assertNoProblems(self):
+        self.assertEqual(self.checker.problems, [])
+
+    async def test_initialization(self):
+        self.assertNoProblems()
+        self.assertIn("problems", self.checker.tables)
+        self.assertIn("quiz_submission_sessions", self.checker.tables)
+
+    async def test_the_tables_of_the_mixins_can_be_created_on_their_own(self):
+        # MathProblemCache creates these tables in MiscRelatedCache, but the mixins have their own definitions
+        checker = MySQLStatementChecker()
+        self.cache.checker = checker
+        await QuizRelatedCache.initialize_sql_table(self.cache)
+        self.assertEqual(checker.problems, [])
+        self.assertIn("quiz_description", checker.tables)
+
+    async def test_problems(self):
+        self.cache.canned_rows[r"^SELECT num_(?:voters|solvers) FROM problems"] = [(0,)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            await self.cache.add_problem(1, make_problem(1, guild_id="3"))
+            await self.cache.add_problems([make_problem(2), make_problem(3)])
+            await self.cache.update_problem(1, make_problem(1, guild_id="3", question="What is 5+5?"))
+            await self.cache.add_voter(1, 10)
+            await self.cache.remove_voter(1, 10)
+            await self.cache.add_solver(1, 10)
+            await self.cache.remove_all_votes_by(10)
+            await self.cache.remove_all_solves_by(10)
+            await self.cache.count_guild_problems(3)
+            await self.cache.get_problems(ProblemQuery().where("guild_id", 3).where_in("author", [5, 6]))
+            await self.cache.remove_duplicate_problems()
+            await self.cache.update_cache()
+            with contextlib.suppress(MathProblemsModuleException):
+                await self.cache.remove_problem(3, 1)
+        self.assertNoProblems()
+
+    async def test_quizzes_and_quiz_sessions(self):
+        self.cache.canned_rows[r"^SELECT 1 FROM quiz_submission_sessions"] = [(1,)]
+        description = QuizDescription(
+            cache=None, quiz_id=1, author=5, guild_id=None, time_limit=60, intensity=1
+        )
+        quiz = Quiz(1, authors=[5], quiz_problems=[], description=description)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            await self.cache.add_quiz(quiz, insert_sessions=False)
+            await self.cache.add_quiz_description(description)
+            with contextlib.suppress(MathProblemsModuleException):
+                await self.cache.update_quiz_description(1, description)  # It wasn't really added
+            await self.cache.add_quiz_session(make_session(10, {}))
+            await self.cache.update_quiz_session(10, make_session(10, {0: "1"}))
+            await self.cache.get_quiz_session_by_special_id(10)
+            await self.cache.get_quiz_sessions(1)
+            await self.cache.delete_quiz_session(10)
+            await self.cache.count_guild_quizzes(None)
+            await self.cache.get_quiz_ids(QuizQuery().where("guild_id", 3))
+            with contextlib.suppress(MathProblemsModuleException):
+                await self.cache.update_quiz(1, quiz)
+            await self.cache.delete_quiz_description(1)
+            await self.cache.delete_quiz(1)
+        self.assertNoProblems()
+
+    async def test_appeals_and_verification_codes(self):
+        appeal = Appeal(user_id=10, appeal_msg="Please", timestamp=100, appeal_num=1, special_id=20, type=1)
+        await self.cache.set_appeal_data(appeal)
+        await self.cache.get_appeal(20, default=appeal)
+        await self.cache.get_all_appeals()
+        await self.cache.set_appeal_view_info(AppealViewInfo(message_id=30, user_id=10, guild_id=3))
+        with contextlib.suppress(MathProblemsModuleException):
+            await self.cache.get_appeal_view_info(30)
+        with contextlib.suppress(MathProblemsModuleException):
+            async for _ in self.cache.get_all_appeal_view_infos():
+                pass
+        await self.cache.del_appeal_view_info(30)
+        with contextlib.suppress(MathProblemsModuleException):
+            await self.cache.get_verification_code_info(10)
+        await self.cache.delete_verification_code_info(10)
+        self.assertNoProblems()
+
+    async def test_user_and_guild_data(self):
+        await self.cache.set_user_data(10, UserData.default(user_id=10))
+        await self.cache.get_user_data(11)
+        await self.cache.del_user_data(10)
+        await self.cache.set_guild_data(GuildData.default(guild_id=3))
+        await self.cache.get_guild_data(4)
+        await self.cache.delete_all_by_user_id(10)
+        await self.cache.delete_all_by_guild_id(3)
+        self.assertNoProblems()
+
+
+if __name__ == "__main__":
+    unittest.main()
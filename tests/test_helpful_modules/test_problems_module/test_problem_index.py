@@ -0,0 +1,86 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+
+from helpful_modules.problems_module.problem_index import ProblemIndex
+from tests.test_helpful_modules.test_problems_module.utils import (
+    SQLiteCacheTestCase,
+    make_problem,
+)
+
+
+class TestProblemIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ProblemIndex()
+        self.first = make_problem(1, author=10, voters=[20, 21], solvers=[30])
+        self.second = make_problem(2, author=10, voters=[21])
+        self.index.add(self.first)
+        self.index.add(self.second)
+
+    def test_lookups(self):
+        self.assertEqual(self.index.ids_by_author(10), {1, 2})
+        self.assertEqual(self.index.ids_voted_by(20), {1})
+        self.assertEqual(self.index.ids_voted_by(21), {1, 2})
+        self.assertEqual(self.index.ids_solved_by(30), {1})
+        self.assertEqual(self.index.ids_by_guild(None), {1, 2})
+        self.assertEqual(self.index.ids_by_author(999), frozenset())
+        self.assertEqual(
+            self.index.problems(self.index.ids_voted_by(21)), [self.first, self.second]
+        )
+
+    def test_remove(self):
+        self.index.remove(1)
+        self.assertNotIn(1, self.index)
+        self.assertEqual(self.index.ids_voted_by(20), frozenset())
+        self.assertEqual(self.index.ids_by_author(10), {2})
+        self.index.remove(1)  # Removing twice does nothing
+
+    def test_readding_after_mutating_in_place(self):
+        self.first.voters.remove(20)
+        self.first.voters.append(22)
+        self.index.add(self.first)
+        self.assertEqual(self.index.ids_voted_by(20), frozenset())
+        self.assertEqual(self.index.ids_voted_by(22), {1})
+        self.assertEqual(len(self.index), 2)
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.ids_by_author(10), frozenset())
+
+
+class TestGuildProblemsCache(SQLiteCacheTestCase):
+    cache_kwargs = {"use_cached_problems": True}
+
+    async def test_a_guild_problem_round_trips_through_the_cache(self):
+        await self.cache.add_problem(1, make_problem(1, guild_id="3"))
+        await self.cache.cache_all_problems()  # Problems read from the database store the guild id as a string
+        self.assertEqual(list(self.cache.guild_problems), [3])
+        self.assertEqual((await self.cache.get_problem(3, 1)).id, 1)
+        self.assertEqual(list(await self.cache.get_problems_by_guild_id(3)), [1])
+        self.assertIn(3, self.cache.guild_ids)
+
+        await self.cache.remove_problem(3, 1)
+        self.assertEqual(await self.cache.get_problems_by_guild_id(3), {})
+        self.assertNotIn(1, self.cache._problem_index)
+
+
+if __name__ == "__main__":
+    unittest.main()
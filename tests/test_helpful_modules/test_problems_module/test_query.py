@@ -0,0 +1,205 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+
+import unittest
+
+import fakeredis
+
+from helpful_modules.problems_module import ProblemQuery, QuizQuery
+from helpful_modules.problems_module.cache_rewrite_with_redis.rediscache import RedisCache
+from helpful_modules.problems_module.problem_index import ProblemIndex
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase, make_problem
+
+
+def ids(problems) -> list:
+    return [int(problem["id"] if isinstance(problem, dict) else problem.id) for problem in problems]
+
+
+class TestQuery(unittest.TestCase):
+    def test_queries_are_immutable(self):
+        query = ProblemQuery()
+        limited = query.limit(5)
+        self.assertIsNone(query.max_results)
+        self.assertEqual(limited.max_results, 5)
+        self.assertEqual(ProblemQuery().where("author", 5), ProblemQuery().where("author", 5))
+
+    def test_invalid_queries(self):
+        with self.assertRaises(ValueError):
+            ProblemQuery().where("question", "a")
+        with self.assertRaises(ValueError):
+            ProblemQuery().where("voters", 5)  # voters is a collection
+        with self.assertRaises(ValueError):
+            ProblemQuery().contains("author", 5)
+        with self.assertRaises(ValueError):
+            QuizQuery().order_by("authors")
+        with self.assertRaises(ValueError):
+            ProblemQuery().limit(-1)
+
+    def test_where_sql(self):
+        columns = {
+            "id": "problem_id",
+            "guild_id": "guild_id",
+            "author": "author",
+            "voters": "problem_id IN (SELECT problem_id FROM problem_votes WHERE user_id = ?)",
+            "solvers": "solvers",
+        }
+        query = (
+            ProblemQuery()
+            .where("guild_id", None)
+            .where_in("author", [5])
+            .contains("voters", 20)
+            .order_by("id", descending=True)
+            .limit(3)
+        )
+        where, params = query.where_sql(columns, "?")
+        self.assertEqual(
+            where,
+            " WHERE guild_id IS NULL AND author IN (?) AND "
+            "problem_id IN (SELECT problem_id FROM problem_votes WHERE user_id = ?)",
+        )
+        self.assertEqual(params, [5, 20])
+        self.assertEqual(query.order_sql(columns), " ORDER BY problem_id DESC LIMIT 3")
+        where, params = ProblemQuery().where_in("guild_id", [None, 7]).where_in("id", []).where_sql(columns, "%s")
+        self.assertEqual(where, " WHERE (guild_id IN (%s) OR guild_id IS NULL) AND 1 = 0")
+        self.assertEqual(params, [7])
+        self.assertEqual(ProblemQuery().where_sql(columns, "?"), ("", []))
+
+    def test_where_sql_chunks(self):
+        columns = {"id": "problem_id", "guild_id": "guild_id", "author": "author"}
+        query = ProblemQuery().where("guild_id", 7).where_in("id", range(5)).where_in("author", [5, 6, 7])
+        clauses = list(query.where_sql_chunks(columns, "?", chunk_size=3))
+        self.assertEqual(len(clauses), 2)  # The ids are split into 2 chunks, and the authors fit in one
+        ids_selected = []
+        for where, params in clauses:
+            self.assertEqual(where.count("?"), len(params))
+            self.assertEqual((params[0], sorted(params[-3:])), (7, [5, 6, 7]))
+            ids_selected.extend(params[1:-3])
+        self.assertEqual(sorted(ids_selected), [0, 1, 2, 3, 4])
+        self.assertEqual(list(query.where_sql_chunks(columns, "?", chunk_size=5)), [query.where_sql(columns, "?")])
+
+    def test_matches_and_sort(self):
+        problems = [
+            {"id": "3", "guild_id": "None", "author": 5, "voters": [20]},
+            {"id": "10", "guild_id": "7", "author": 5, "voters": []},
+            {"id": "2", "guild_id": "None", "author": 6, "voters": [20]},
+        ]
+        query = ProblemQuery().contains("voters", 20).where("guild_id", None)
+        self.assertEqual(ids(query.sort_and_limit(filter(query.matches, problems))), [2, 3])
+        query = ProblemQuery().where("author", 5).order_by("id", descending=True).limit(1)
+        self.assertEqual(ids(query.sort_and_limit(filter(query.matches, problems))), [10])
+
+
+class TestProblemIndexQuery(unittest.TestCase):
+    def setUp(self):
+        self.index = ProblemIndex()
+        for problem in (
+            make_problem(1, voters=[20]),
+            make_problem(2, "7", voters=[20, 21]),
+            make_problem(3, "7", author=6),
+            make_problem(4, author=6, voters=[21]),
+        ):
+            self.index.add(problem)
+
+    def test_query(self):
+        self.assertEqual(ids(self.index.query(ProblemQuery().where("guild_id", 7))), [2, 3])
+        self.assertEqual(ids(self.index.query(ProblemQuery().where("guild_id", None))), [1, 4])
+        self.assertEqual(
+            ids(self.index.query(ProblemQuery().contains("voters", 21).where("author", 6))), [4]
+        )
+        self.assertEqual(
+            ids(self.index.query(ProblemQuery().where_in("id", [1, "3", 99]).order_by("id", descending=True))),
+            [3, 1],
+        )
+        self.assertEqual(ids(self.index.query(ProblemQuery().limit(2))), [1, 2])
+        self.assertEqual(self.index.query(ProblemQuery().where("author", 999)), [])
+
+
+class TestSQLProblemQuery(SQLiteCacheTestCase):
+
+    async def test_get_problems(self):
+        await self.cache.add_problems(
+            [
+                make_problem(1, voters=[20]),
+                make_problem(2, voters=[20, 21]),
+                make_problem(3, author=6),
+            ]
+        )
+        problems = await self.cache.get_problems(ProblemQuery().contains("voters", 20))
+        self.assertEqual(ids(problems), [1, 2])
+        self.assertEqual(sorted(problems[1].voters), [20, 21])
+        self.assertEqual(
+            ids(await self.cache.get_problems(ProblemQuery().where("author", 5).order_by("id", True).limit(1))),
+            [2],
+        )
+        self.assertEqual(ids(await self.cache.get_problems(ProblemQuery().where("guild_id", 7))), [])
+        self.cache.use_cached_problems = True
+        await self.cache.cache_all_problems()
+        self.assertEqual(
+            ids(await self.cache.get_problems(ProblemQuery().where_in("author", [6]))), [3]
+        )
+
+    async def test_long_where_in_is_chunked(self):
+        await self.cache.add_problems([make_problem(id) for id in range(1, 601)])
+        query = ProblemQuery().where_in("id", range(1, 1201)).order_by("id", descending=True).limit(3)
+        self.assertEqual(ids(await self.cache.get_problems(query)), [600, 599, 598])
+        self.assertEqual(len(await self.cache.get_problems(query.limit(None))), 600)
+        self.assertEqual(await self.cache.get_quiz_ids(QuizQuery().where_in("id", range(1200))), [])
+
+    async def test_get_quiz_ids(self):
+        self.assertEqual(await self.cache.get_quiz_ids(QuizQuery().contains("authors", 5)), [])
+        with self.assertRaises(TypeError):
+            await self.cache.get_quiz_ids(ProblemQuery())
+
+
+class TestRedisProblemQuery(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = RedisCache("redis://localhost", "")
+        self.cache.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await self.cache.add_problems(
+            [
+                make_problem(1, voters=[20]),
+                make_problem(2, "7", voters=[20, 21]),
+                make_problem(3, "7", author=6),
+                make_problem(4, "8", author=6),
+            ]
+        )
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def test_get_problems(self):
+        get_problems = self.cache.get_problems
+        self.assertEqual(ids(await get_problems(ProblemQuery().where("guild_id", 7))), [2, 3])
+        self.assertEqual(ids(await get_problems(ProblemQuery().where("guild_id", None))), [1])
+        self.assertEqual(
+            ids(await get_problems(ProblemQuery().where_in("guild_id", [7, 8]).where("author", 6))), [3, 4]
+        )
+        self.assertEqual(
+            ids(await get_problems(ProblemQuery().where("guild_id", 7).contains("voters", 20))), [2]
+        )
+        self.assertEqual(ids(await get_problems(ProblemQuery().contains("voters", 20))), [1, 2])
+        self.assertEqual(
+            ids(await get_problems(ProblemQuery().where_in("id", [4, 1, 99]).order_by("id", True))), [4, 1]
+        )
+        self.assertEqual(await get_problems(ProblemQuery().where_in("author", [])), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+import warnings
+
+import fakeredis
+import orjson
+
+from helpful_modules.problems_module import ComputationalProblem
+from helpful_modules.problems_module.cache_rewrite_with_redis.rediscache import (
+    ALL_PROBLEMS_KEY,
+    RedisCache,
+    author_problems_key,
+    guild_problems_key,
+    user_keys_key,
+)
+from tests.test_helpful_modules.test_problems_module.utils import make_problem
+
+
+class TestRedisProblemIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = RedisCache("redis://localhost", "")
+        self.cache.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def members(self, key: str) -> set:
+        return await self.cache.redis.smembers(key)
+
+    async def test_adding_problems_indexes_them(self):
+        await self.cache.add_problems([make_problem(1), make_problem(2, "7", author=6)])
+        self.assertEqual(await self.members(guild_problems_key(None)), {"BaseProblem:None:1"})
+        self.assertEqual(await self.members(guild_problems_key(7)), {"BaseProblem:7:2"})
+        self.assertEqual(await self.members(author_problems_key(6)), {"BaseProblem:7:2"})
+        self.assertEqual(len(await self.members(ALL_PROBLEMS_KEY)), 2)
+        self.assertEqual(
+            [problem.id for problem in await self.cache.get_all_problems_by_guild(7)], [2]
+        )
+        self.assertEqual(
+            [problem.id for problem in await self.cache.get_global_problems()], [1]
+        )
+
+    async def test_updating_the_author_moves_the_problem(self):
+        await self.cache.add_problem(1, make_problem(1, author=5))
+        await self.cache.update_problem(1, make_problem(1, author=6))
+        self.assertEqual(await self.members(author_problems_key(5)), set())
+        self.assertEqual(
+            [problem.author for problem in await self.cache.get_problems_by_author_id(6)], [6]
+        )
+
+    async def test_removing_problems_unindexes_them(self):
+        await self.cache.add_problems([make_problem(1, "7"), make_problem(2, "7")])
+        await self.cache.remove_problem(1, 7)
+        self.assertEqual(await self.members(guild_problems_key(7)), {"BaseProblem:7:2"})
+        self.assertEqual(await self.members(author_problems_key(5)), {"BaseProblem:7:2"})
+        self.assertEqual(await self.cache.get_problems_many([1]), {})
+
+    async def test_get_problems_many(self):
+        await self.cache.add_problems([make_problem(1), make_problem(2, "7")])
+        problems = await self.cache.get_problems_many([2, 3, 1])
+        self.assertEqual(sorted(problems.keys()), [1, 2])
+        self.assertEqual(problems[2].question, "What is 2+1?")
+
+    async def test_problems_round_trip(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            computational = ComputationalProblem(
+                question="What is 1/3?", answers=["0.333"], id=3, author=5, tolerance=0.01
+            )
+        problems = [make_problem(11), make_problem(12, "7"), computational]
+        await self.cache.add_problems(problems)
+        self.assertEqual(await self.cache.get_problem(None, 11), problems[0])
+        self.assertEqual(await self.cache.get_problem(7, 12), problems[1])
+        self.assertEqual(await self.cache.get_problem(None, 3), computational)
+        self.assertEqual((await self.cache.get_problem(None, 3)).tolerance, 0.01)
+        self.assertEqual(
+            sorted(await self.cache.get_all_problems(), key=lambda problem: problem.id),
+            [computational, problems[0], problems[1]],
+        )
+
+    async def test_scanning_in_batches(self):
+        await self.cache.add_problems([make_problem(id, "7") for id in range(25)])
+        problems = [
+            problem async for problem in self.cache._scan_problems(guild_problems_key(7), batch_size=4)
+        ]
+        self.assertEqual(sorted(problem.id for problem in problems), list(range(25)))
+
+    async def test_get_all_problems_by_func(self):
+        await self.cache.add_problems([make_problem(id) for id in range(5)])
+        problems = await self.cache.get_all_problems_by_func(lambda problem: problem.id % 2 == 0)
+        self.assertEqual(sorted(problem.id for problem in problems), [0, 2, 4])
+
+
+class TestRedisUserIndex(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.cache = RedisCache("redis://localhost", "")
+        self.cache.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def test_every_write_updates_the_user_sets(self):
+        await self.cache.add_problem(1, make_problem(1, author=5))
+        await self.cache.set_key("UserData:5", {"user_id": 5, "trusted": False})
+        await self.cache.set_key("Quiz:3", {"authors": [5, 6]})
+        self.assertEqual(
+            await self.cache.redis.smembers(user_keys_key(5)),
+            {"BaseProblem:None:1", "UserData:5", "Quiz:3"},
+        )
+        await self.cache.set_key("Quiz:3", {"authors": [6]})
+        self.assertNotIn("Quiz:3", await self.cache.redis.smembers(user_keys_key(5)))
+        self.assertEqual(await self.cache.redis.smembers(user_keys_key(6)), {"Quiz:3"})
+
+    async def test_export(self):
+        await self.cache.set_key("UserData:5", {"user_id": 5, "trusted": False})
+        await self.cache.set_key("UserData:6", {"user_id": 6, "trusted": True})
+        values = await self.cache.get_all_by_user_id(5)
+        self.assertEqual([orjson.loads(value) for value in values], [{"user_id": 5, "trusted": False}])
+
+    async def test_delete(self):
+        await self.cache.add_problems([make_problem(1, "7", author=5), make_problem(2, "7", author=6)])
+        await self.cache.set_key("UserData:5", {"user_id": 5})
+        await self.cache.set_key("UserData:6", {"user_id": 6})
+        await self.cache.del_all_by_user_id(5)
+        self.assertEqual(await self.cache.get_all_by_user_id(5), [])
+        self.assertIsNone(await self.cache.get_key("UserData:5"))
+        self.assertEqual(await self.cache.redis.smembers(guild_problems_key(7)), {"BaseProblem:7:2"})
+        self.assertIsNotNone(await self.cache.get_key("UserData:6"))
+        self.assertEqual(len(await self.cache.get_all_by_user_id(6)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import unittest
+
+import fakeredis
+import orjson
+
+from helpful_modules.problems_module.cache_rewrite_with_redis.rediscache import (
+    RedisCache,
+)
+from tests.test_helpful_modules.test_problems_module.utils import make_problem
+
+
+class TestRedisNearCache(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Two processes sharing one Redis server
+        self.server = fakeredis.FakeServer()
+        self.caches = []
+        for _ in range(2):
+            cache = RedisCache("redis://localhost", "", near_cache_size=10, near_cache_ttl=60)
+            cache.redis = fakeredis.aioredis.FakeRedis(server=self.server, decode_responses=True)
+            self.caches.append(cache)
+        self.first, self.second = self.caches
+
+    async def asyncTearDown(self):
+        for cache in self.caches:
+            await cache.close()
+
+    async def wait_for_listeners(self):
+        await asyncio.gather(*(cache._subscribed.wait() for cache in self.caches))
+
+    async def test_hits_are_served_locally(self):
+        await self.first.add_problem(1, make_problem(1, question="What is 1+1?"))
+        await self.second.get_problem(None, 1)
+        await self.second._subscribed.wait()
+        await self.second.get_problem(None, 1)  # Only cached once the process is listening for invalidations
+        await self.second.redis.set("BaseProblem:None:1", orjson.dumps({"question": "behind the cache's back"}))
+        self.assertEqual((await self.second.get_problem(None, 1)).question, "What is 1+1?")
+        self.assertEqual(self.second.near_cache_stats["hits"], 1)
+
+    async def test_writes_invalidate_other_processes(self):
+        await self.first.add_problem(1, make_problem(1, question="What is 1+1?"))
+        await self.first.get_problem(None, 1)
+        await self.second.get_problem(None, 1)
+        await self.wait_for_listeners()
+        await self.second.get_problem(None, 1)
+        self.assertEqual(self.second.near_cache_stats["size"], 1)
+
+        await self.first.update_problem(1, make_problem(1, question="What is 1+2?"))
+        # The writer evicts its own copy right away
+        self.assertEqual((await self.first.get_problem(None, 1)).question, "What is 1+2?")
+        for _ in range(50):
+            if self.second.invalidations_received:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual((await self.second.get_problem(None, 1)).question, "What is 1+2?")
+        stats = self.second.near_cache_stats
+        self.assertEqual(stats["invalidations_received"], 1)
+        self.assertGreaterEqual(stats["max_invalidation_lag"], 0.0)
+
+    async def test_missing_keys_are_cached_too(self):
+        self.assertEqual(await self.first.get_user_data(1, default="default"), "default")
+        await self.first._subscribed.wait()
+        for _ in range(2):
+            self.assertEqual(await self.first.get_user_data(1, default="default"), "default")
+        self.assertEqual(self.first.near_cache_stats["hits"], 1)
+
+    async def test_disabled_by_default(self):
+        cache = RedisCache("redis://localhost", "")
+        cache.redis = fakeredis.aioredis.FakeRedis(server=self.server, decode_responses=True)
+        self.assertIsNone(cache.near_cache_stats)
+        self.assertEqual(await cache.get_user_data(1, default="default"), "default")
+        self.assertIsNone(cache._listener)
+        await cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+
+import fakeredis
+
+from helpful_modules.problems_module.cache_rewrite_with_redis.rediscache import (
+    ACCESS_TIMES_KEY,
+    COLD_KEYS_KEY,
+    RedisCache,
+    author_problems_key,
+)
+from helpful_modules.problems_module.errors import ProblemNotFoundException
+from tests.test_helpful_modules.test_problems_module.utils import (
+    TempConfigDirMixin,
+    make_problem,
+    make_sqlite_cache,
+)
+
+
+class TestRedisTiering(TempConfigDirMixin, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sql_cache = make_sqlite_cache()
+
+    async def asyncSetUp(self):
+        self.cache = RedisCache(
+            "redis://localhost", "", cold_store=self.sql_cache, memory_high_watermark=1000, memory_low_watermark=500
+        )
+        self.cache.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+        await self.sql_cache.close()
+
+    async def test_demoted_problems_are_promoted_on_read(self):
+        await self.cache.add_problems([make_problem(1), make_problem(2)])
+        self.assertEqual(await self.cache.demote_coldest(min_idle=0), 2)
+        self.assertIsNone(await self.cache.redis.get("BaseProblem:None:1"))
+        self.assertEqual(await self.cache.redis.smembers(COLD_KEYS_KEY), {"BaseProblem:None:1", "BaseProblem:None:2"})
+
+        self.assertEqual((await self.cache.get_problem(None, 1)).question, "What is 1+1?")
+        self.assertIsNotNone(await self.cache.redis.get("BaseProblem:None:1"))
+        self.assertEqual(await self.cache.redis.smembers(COLD_KEYS_KEY), {"BaseProblem:None:2"})
+        self.assertIsNotNone(await self.cache.redis.zscore(ACCESS_TIMES_KEY, "BaseProblem:None:1"))
+        self.assertEqual(self.cache.tiering_stats["promotions"], 1)
+
+    async def test_listing_includes_cold_problems(self):
+        await self.cache.add_problems([make_problem(1), make_problem(2)])
+        await self.cache.demote_coldest(count=1, min_idle=0)
+        self.assertEqual(sorted(problem.id for problem in await self.cache.get_all_problems()), [1, 2])
+        self.assertEqual(sorted((await self.cache.get_problems_many([1, 2])).keys()), [1, 2])
+        self.assertEqual(len(await self.cache.redis.smembers(COLD_KEYS_KEY)), 1)  # Listing doesn't promote
+
+    async def test_recently_accessed_problems_stay(self):
+        await self.cache.add_problems([make_problem(1), make_problem(2)])
+        await self.cache.redis.zadd(ACCESS_TIMES_KEY, {"BaseProblem:None:1": 0})  # Accessed long ago
+        self.assertEqual(await self.cache.demote_coldest(), 1)
+        self.assertEqual(await self.cache.redis.smembers(COLD_KEYS_KEY), {"BaseProblem:None:1"})
+
+    async def test_writing_cold_problems(self):
+        await self.cache.add_problem(1, make_problem(1, author=5))
+        await self.cache.demote_coldest(min_idle=0)
+        await self.cache.update_problem(1, make_problem(1, author=6))
+        # The old value was read from the cold store, so the problem was moved to its new author's set
+        self.assertEqual(await self.cache.redis.smembers(author_problems_key(5)), set())
+        self.assertEqual(await self.cache.redis.smembers(COLD_KEYS_KEY), set())
+        self.assertEqual((await self.cache.get_problem(None, 1)).author, 6)
+
+        await self.cache.demote_coldest(min_idle=0)
+        await self.cache.remove_problem(1, None)
+        with self.assertRaises(ProblemNotFoundException):
+            await self.cache.get_problem(None, 1)
+        self.assertEqual(await self.sql_cache.get_cold_storage_values(["BaseProblem:None:1"]), {})
+
+    async def test_enforce_memory_watermark(self):
+        await self.cache.add_problems([make_problem(id) for id in range(10)])
+        await self.cache.redis.zadd(ACCESS_TIMES_KEY, {f"BaseProblem:None:{id}": 0 for id in range(10)})
+        memory = iter([2000, 1200, 400])  # fakeredis doesn't support INFO
+
+        async def used_memory():
+            return next(memory)
+
+        self.cache.used_memory = used_memory
+        self.assertEqual(await self.cache.enforce_memory_watermark(batch_size=3), 6)
+        self.assertEqual(len(await self.cache.redis.smembers(COLD_KEYS_KEY)), 6)
+
+    async def test_disabled_without_a_cold_store(self):
+        cache = RedisCache("redis://localhost", "", memory_high_watermark=0)
+        cache.redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        self.assertEqual(await cache.enforce_memory_watermark(), 0)
+        with self.assertRaises(ValueError):
+            await cache.demote_coldest()
+        await cache.add_problem(1, make_problem(1))
+        self.assertEqual(await cache.redis.zcard(ACCESS_TIMES_KEY), 0)
+        await cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
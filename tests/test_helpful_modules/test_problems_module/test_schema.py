@@ -0,0 +1,108 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import sqlite3
+import unittest
+
+from helpful_modules.problems_module import MathProblemCache
+from helpful_modules.problems_module.schema import (
+    LATEST_SCHEMA_VERSION,
+    SCHEMA_MIGRATIONS,
+    IndexDefinition,
+)
+from tests.test_helpful_modules.test_problems_module.utils import (
+    TempConfigDirMixin,
+    make_sqlite_cache,
+)
+
+
+class TestSchemaMigrations(TempConfigDirMixin, unittest.TestCase):
+    # Not an IsolatedAsyncioTestCase, because MathProblemCache() can't be created while an event loop is running
+    def setUp(self):
+        super().setUp()
+        self.caches = []
+
+    def make_cache(self) -> MathProblemCache:
+        cache = make_sqlite_cache()
+        self.caches.append(cache)
+        return cache
+
+    def tearDown(self):
+        for cache in self.caches:
+            asyncio.run(cache.close())
+        super().tearDown()
+
+    def index_names(self) -> set:
+        with sqlite3.connect("test.db") as conn:
+            return {
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index'"
+                )
+            }
+
+    def test_migrations_are_applied(self):
+        cache = self.make_cache()
+        self.assertEqual(asyncio.run(cache.get_schema_version()), LATEST_SCHEMA_VERSION)
+        self.assertIn("ux_problems_problem_id", self.index_names())
+
+    def test_applied_migrations_are_skipped(self):
+        cache = self.make_cache()
+        self.make_cache()  # Starting up again shouldn't apply anything twice
+        rows = asyncio.run(cache.run_sql("SELECT version FROM schema_version"))
+        self.assertEqual(
+            [row["version"] for row in rows],
+            [migration.version for migration in SCHEMA_MIGRATIONS],
+        )
+
+    def test_duplicate_problem_ids_are_removed(self):
+        with sqlite3.connect("test.db") as conn:
+            conn.execute(
+                "CREATE TABLE problems (id INTEGER PRIMARY KEY, guild_id INTEGER, problem_id INTEGER, "
+                "question TEXT, answers BLOB, voters BLOB, solvers BLOB, author INTEGER, extra_stuff TEXT)"
+            )
+            conn.execute("INSERT INTO problems (problem_id, question) VALUES (1, 'a')")
+            conn.execute("INSERT INTO problems (problem_id, question) VALUES (1, 'b')")
+            conn.execute("INSERT INTO problems (problem_id, question) VALUES (2, 'c')")
+        cache = self.make_cache()
+        self.assertEqual(asyncio.run(cache.get_schema_version()), LATEST_SCHEMA_VERSION)
+        self.assertIn("ux_problems_problem_id", self.index_names())
+        rows = asyncio.run(
+            cache.run_sql("SELECT problem_id, question FROM problems ORDER BY problem_id")
+        )
+        self.assertEqual(
+            rows,
+            [{"problem_id": 1, "question": "a"}, {"problem_id": 2, "question": "c"}],
+        )
+
+    def test_index_definition_sql(self):
+        index = IndexDefinition("problems", ("problem_id",), unique=True)
+        self.assertEqual(
+            index.sql(use_sqlite=True),
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_problems_problem_id ON problems (problem_id)",
+        )
+        self.assertEqual(
+            index.sql(use_sqlite=False),
+            "CREATE UNIQUE INDEX ux_problems_problem_id ON problems (problem_id)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
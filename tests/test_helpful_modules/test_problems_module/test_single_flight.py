@@ -0,0 +1,108 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import unittest
+
+from helpful_modules.problems_module.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = 0
+
+    async def refresh(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.calls
+
+    async def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run(self.refresh) for _ in range(5)))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(flight.coalesced_calls, 4)
+
+    async def test_sequential_calls_run_again(self):
+        flight = SingleFlight()
+        await flight.run(self.refresh)
+        await flight.run(self.refresh)
+        self.assertEqual(self.calls, 2)
+
+    async def test_calls_within_min_interval_return_immediately(self):
+        flight = SingleFlight(min_interval=60)
+        await flight.run(self.refresh)
+        self.assertIsNone(await flight.run(self.refresh))
+        self.assertEqual(self.calls, 1)
+
+    async def test_errors_are_shared_and_not_fresh(self):
+        flight = SingleFlight(min_interval=60)
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("oops")
+
+        results = await asyncio.gather(
+            flight.run(fail), flight.run(fail), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertFalse(flight.is_fresh())
+        await flight.run(self.refresh)
+        self.assertEqual(self.calls, 1)
+
+    async def test_cancelling_a_caller_does_not_cancel_the_run(self):
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.run(self.refresh))
+        second = asyncio.ensure_future(flight.run(self.refresh))
+        await asyncio.sleep(0)  # Both calls are made before the run starts, so they share it
+        first.cancel()
+        self.assertEqual(await second, 1)
+
+    async def test_calls_after_the_run_started_get_another_run(self):
+        flight = SingleFlight()
+        first = asyncio.ensure_future(flight.run(self.refresh))
+        await asyncio.sleep(0.001)  # The run has started
+        later = [asyncio.ensure_future(flight.run(self.refresh)) for _ in range(3)]
+        self.assertEqual(await first, 1)
+        self.assertEqual(await asyncio.gather(*later), [2, 2, 2])  # The calls that waited share one run
+        self.assertEqual(flight.runs, 2)
+
+    async def test_invalidate_makes_the_next_call_run(self):
+        flight = SingleFlight(min_interval=60)
+        await flight.run(self.refresh)
+        flight.invalidate()
+        self.assertFalse(flight.is_fresh())
+        self.assertEqual(await flight.run(self.refresh), 2)
+        self.assertIsNone(await flight.run(self.refresh))
+
+    async def test_invalidating_during_a_run_keeps_it_stale(self):
+        flight = SingleFlight(min_interval=60)
+        run = asyncio.ensure_future(flight.run(self.refresh))
+        await asyncio.sleep(0.001)
+        flight.invalidate()  # A write that the run may have missed
+        await run
+        self.assertFalse(flight.is_fresh())
+
+    def test_negative_min_interval(self):
+        with self.assertRaises(ValueError):
+            SingleFlight(min_interval=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from helpful_modules.dict_factory import dict_factory
+from helpful_modules.problems_module.sqlite_connection_pool import SQLiteConnectionPool
+
+
+class TestSQLiteConnectionPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.pool = SQLiteConnectionPool(
+            os.path.join(self.tempdir.name, "test.db"),
+            num_readers=2,
+            pragmas={"cache_size": -2000, "temp_store": "MEMORY"},
+        )
+        async with self.pool.writer() as conn:
+            await conn.execute("CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT)")
+            await conn.commit()
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        self.tempdir.cleanup()
+
+    async def test_connections_are_reused(self):
+        async with self.pool.writer() as first:
+            pass
+        async with self.pool.writer() as second:
+            pass
+        self.assertIs(first, second)
+        async with self.pool.reader() as reader:
+            self.assertIsNot(reader, first)
+
+    async def test_readers_see_committed_writes(self):
+        async with self.pool.writer() as conn:
+            await conn.execute("INSERT INTO things (id, name) VALUES (?, ?)", (1, "a"))
+            await conn.commit()
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT name FROM things WHERE id = 1")
+            self.assertEqual(await cursor.fetchall(), [("a",)])
+
+    async def test_uncommitted_writes_are_rolled_back(self):
+        async with self.pool.writer() as conn:
+            await conn.execute("INSERT INTO things (id, name) VALUES (?, ?)", (2, "b"))
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT * FROM things WHERE id = 2")
+            self.assertEqual(list(await cursor.fetchall()), [])
+
+    async def test_row_factory_is_reset(self):
+        async with self.pool.writer() as conn:
+            conn.row_factory = dict_factory
+        async with self.pool.writer() as conn:
+            self.assertIsNone(conn.row_factory)
+
+    async def test_pragmas_are_applied(self):
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("PRAGMA temp_store")
+            self.assertEqual((await cursor.fetchone())[0], 2)  # 2 = MEMORY
+
+    async def test_readers_can_be_used_concurrently(self):
+        async def read():
+            async with self.pool.reader() as conn:
+                await asyncio.sleep(0.01)
+                return id(conn)
+
+        results = await asyncio.gather(read(), read(), read(), read())
+        self.assertEqual(len(set(results)), 2)
+
+    async def test_memory_reader_inside_writer(self):
+        pool = SQLiteConnectionPool(":memory:")
+        try:
+            async with pool.writer() as writer:
+                await writer.execute("CREATE TABLE things (id INTEGER PRIMARY KEY)")
+                await writer.execute("INSERT INTO things (id) VALUES (1)")
+                async with pool.reader() as reader:  # Would wait for the writer forever
+                    self.assertIs(reader, writer)
+                    cursor = await reader.execute("SELECT id FROM things")
+                    self.assertEqual(await cursor.fetchall(), [(1,)])
+                self.assertTrue(writer.in_transaction)  # Not rolled back by the reader
+                await writer.commit()
+            async with pool.reader() as reader:
+                cursor = await reader.execute("SELECT COUNT(*) FROM things")
+                self.assertEqual((await cursor.fetchone())[0], 1)
+        finally:
+            await pool.close()
+
+    def test_invalid_pragma_name(self):
+        with self.assertRaises(ValueError):
+            SQLiteConnectionPool("test.db", pragmas={"cache_size; DROP TABLE things": 1})
+
+    async def test_throughput_profile(self):
+        pool = SQLiteConnectionPool(
+            os.path.join(self.tempdir.name, "wal.db"),
+            num_readers=1,
+            pragmas={"busy_timeout": 1000},
+            profile="throughput",
+        )
+        try:
+            async with pool.writer() as conn:
+                cursor = await conn.execute("PRAGMA journal_mode")
+                self.assertEqual((await cursor.fetchone())[0], "wal")
+            async with pool.reader() as conn:
+                cursor = await conn.execute("PRAGMA synchronous")
+                self.assertEqual((await cursor.fetchone())[0], 1)  # 1 = NORMAL
+                cursor = await conn.execute("PRAGMA busy_timeout")
+                self.assertEqual((await cursor.fetchone())[0], 1000)  # pragmas override the profile
+        finally:
+            await pool.close()
+
+    async def test_queued_writes_are_committed_together(self):
+        async def write(id: int) -> None:
+            async with self.pool.transaction() as conn:
+                await conn.execute("INSERT INTO things (id, name) VALUES (?, ?)", (id, str(id)))
+
+        await asyncio.gather(*(write(id) for id in range(10)))
+        self.assertEqual(self.pool.group_commits, 1)
+        self.assertEqual(self.pool.grouped_writes, 10)
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT COUNT(*) FROM things")
+            self.assertEqual((await cursor.fetchone())[0], 10)
+
+    async def test_a_failed_write_only_rolls_back_itself(self):
+        async def write(id: int) -> None:
+            async with self.pool.transaction() as conn:
+                await conn.execute("INSERT INTO things (id, name) VALUES (?, ?)", (id, str(id)))
+                if id == 2:
+                    raise KeyError(id)
+
+        results = await asyncio.gather(*(write(id) for id in range(4)), return_exceptions=True)
+        self.assertEqual([type(result) for result in results], [type(None)] * 2 + [KeyError, type(None)])
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT id FROM things ORDER BY id")
+            self.assertEqual(await cursor.fetchall(), [(0,), (1,), (3,)])
+
+    async def test_a_failed_commit_fails_the_group(self):
+        async def write(id: int) -> None:
+            async with self.pool.transaction() as conn:
+                await conn.execute("INSERT INTO things (id, name) VALUES (?, ?)", (id, str(id)))
+
+        async with self.pool.writer() as conn:
+            # Make the commit fail: a deferred foreign key that is still violated when committing
+            await conn.execute("PRAGMA foreign_keys = ON")
+            await conn.execute(
+                "CREATE TABLE children (id INTEGER, parent INTEGER REFERENCES things (id) DEFERRABLE INITIALLY DEFERRED)"
+            )
+            await conn.commit()
+
+        async def bad_write() -> None:
+            async with self.pool.transaction() as conn:
+                await conn.execute("INSERT INTO children (id, parent) VALUES (1, 100)")
+
+        results = await asyncio.gather(write(1), bad_write(), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+        await write(2)  # The writer task is still running
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT id FROM things")
+            self.assertEqual(await cursor.fetchall(), [(2,)])
+
+    async def test_memory_reader_inside_transaction(self):
+        pool = SQLiteConnectionPool(":memory:")
+        try:
+            async with pool.writer() as conn:
+                await conn.execute("CREATE TABLE things (id INTEGER PRIMARY KEY)")
+                await conn.commit()
+            async with pool.transaction() as conn:
+                await conn.execute("INSERT INTO things (id) VALUES (1)")
+                async with pool.reader() as reader:  # The writer task holds the lock until this block ends
+                    self.assertIs(reader, conn)
+            async with pool.reader() as reader:
+                cursor = await reader.execute("SELECT COUNT(*) FROM things")
+                self.assertEqual((await cursor.fetchone())[0], 1)
+        finally:
+            await pool.close()
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            SQLiteConnectionPool("test.db", profile="fastest")
+
+
+if __name__ == "__main__":
+    unittest.main()
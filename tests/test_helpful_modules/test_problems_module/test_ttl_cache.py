@@ -0,0 +1,106 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import unittest
+
+from helpful_modules.problems_module.ttl_cache import MISSING, TTLCache
+from helpful_modules.problems_module.user_data import UserData
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_hits_and_misses(self):
+        self.assertIs(self.cache.get(1), MISSING)
+        self.cache.put(1, None)
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(self.cache.stats["hits"], 1)
+        self.assertEqual(self.cache.stats["misses"], 1)
+
+    def test_entries_expire(self):
+        self.cache.put(1, "a")
+        self.clock.now = 10
+        self.assertIs(self.cache.get(1), MISSING)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put(1, "a")
+        self.cache.put(2, "b")
+        self.cache.get(1)
+        self.cache.put(3, "c")
+        self.assertNotIn(2, self.cache)
+        self.assertIn(1, self.cache)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_stale_loads_are_not_stored(self):
+        version = self.cache.version
+        self.cache.invalidate(1)  # Changed while it was being loaded
+        self.cache.put(1, "old", version=version)
+        self.assertNotIn(1, self.cache)
+        self.cache.put(1, "new", version=self.cache.version)
+        self.assertEqual(self.cache.get(1), "new")
+
+    def test_maxsize_0_disables_the_cache(self):
+        cache = TTLCache(maxsize=0, ttl=10)
+        cache.put(1, "a")
+        self.assertIs(cache.get(1), MISSING)
+
+
+class TestUserDataCache(SQLiteCacheTestCase):
+
+    async def test_user_data_is_cached(self):
+        self.assertFalse((await self.cache.get_user_data(5)).trusted)
+        self.assertFalse((await self.cache.get_user_data(5)).trusted)
+        self.assertEqual(self.cache.user_data_cache_stats["hits"], 1)
+        self.assertEqual(self.cache.user_data_cache_stats["misses"], 1)
+
+    async def test_set_and_del_user_data_update_the_cache(self):
+        await self.cache.get_user_data(5)
+        await self.cache.set_user_data(5, UserData(user_id=5, trusted=True))
+        user_data = await self.cache.get_user_data(5)
+        self.assertTrue(user_data.trusted)
+        user_data.trusted = False  # Changing it doesn't change the cache
+        self.assertTrue((await self.cache.get_user_data(5)).trusted)
+        await self.cache.del_user_data(5)
+        self.assertFalse((await self.cache.get_user_data(5)).trusted)
+        self.assertEqual(await self.cache.run_sql("SELECT * FROM user_data"), [])
+
+    async def test_cached_user_data_matches_the_database(self):
+        await self.cache.set_user_data(
+            5, UserData(user_id=5, denylisted=True, denylist_reason="spam", denylist_expiry=1.5)
+        )
+        cached = (await self.cache.get_user_data(5)).to_dict()
+        self.cache._user_data_cache.clear()
+        loaded = (await self.cache.get_user_data(5)).to_dict()
+        for key in ("user_id", "trusted", "denylisted", "denylist_reason", "denylist_expiry"):
+            self.assertEqual(cached[key], loaded[key])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import pickle
+import unittest
+from types import SimpleNamespace
+
+from helpful_modules.problems_module import Quiz
+from helpful_modules.problems_module.errors import QuizNotFound
+from helpful_modules.problems_module.quizzes.quiz_description import QuizDescription
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase
+
+
+def make_problem(id: int) -> SimpleNamespace:
+    # QuizProblem needs a cache to be created, but update_quiz only reads these attributes
+    return SimpleNamespace(
+        id=id, guild_id=None, question=f"What is {id}+1?", answers=[str(id + 1)], voters=[], solvers=[], author=5
+    )
+
+
+def make_session(special_id: int, answers=None) -> SimpleNamespace:
+    return SimpleNamespace(
+        user_id=special_id,
+        quiz_id=1,
+        guild_id=None,
+        is_finished=False,
+        answers=answers or {},
+        start_time=100,
+        expire_time=200,
+        special_id=special_id,
+        attempt_num=1,
+    )
+
+
+def make_quiz(problems, sessions) -> Quiz:
+    quiz = Quiz(
+        1,
+        authors=[5],
+        quiz_problems=problems,
+        description=QuizDescription(cache=None, quiz_id=1, author=5, guild_id=None, time_limit=60, intensity=1),
+    )
+    quiz.existing_sessions = sessions
+    return quiz
+
+
+class TestUpdateQuiz(SQLiteCacheTestCase):
+    async def asyncSetUp(self):
+        quiz = make_quiz([make_problem(1)], [make_session(10), make_session(11)])
+        async with self.cache.sqlite_pool.writer() as conn:
+            cursor = await conn.cursor()
+            await self.cache._write_changed_rows(
+                cursor, "?", "quizzes", "problem_id", [], [self.cache._quiz_problem_row(1, make_problem(1))]
+            )
+            await self.cache._write_changed_rows(
+                cursor,
+                "?",
+                "quiz_submission_sessions",
+                "special_id",
+                [],
+                list(map(self.cache._quiz_session_row, quiz.existing_sessions)),
+            )
+            await self.cache._write_changed_rows(
+                cursor, "?", "quiz_description", "quiz_id", [], [self.cache._quiz_description_row(1, quiz.description)]
+            )
+            await conn.commit()
+
+    async def session_answers(self):
+        rows = await self.cache._quiz_loader.load(1)
+        return {int(row["special_id"]): pickle.loads(row["answers"]) for row in rows.sessions}
+
+    async def test_unchanged_quiz_writes_nothing(self):
+        quiz = make_quiz([make_problem(1)], [make_session(10), make_session(11)])
+        self.assertEqual(await self.cache.update_quiz(1, quiz), 0)
+
+    async def test_answering_writes_one_row(self):
+        quiz = make_quiz([make_problem(1)], [make_session(10, {0: "2"}), make_session(11)])
+        self.assertEqual(await self.cache.update_quiz(1, quiz), 1)
+        self.assertEqual(await self.session_answers(), {10: {0: "2"}, 11: {}})
+        # The quiz remembers what it wrote, so writing it again does nothing
+        self.assertEqual(await self.cache.update_quiz(1, quiz), 0)
+
+    async def test_loaded_quizzes_do_not_overwrite_concurrent_changes(self):
+        first = make_quiz([make_problem(1)], [make_session(10), make_session(11)])
+        second = make_quiz([make_problem(1)], [make_session(10), make_session(11)])
+        first._loaded_rows = second._loaded_rows = await self.cache._quiz_loader.load(1)
+        first.existing_sessions = [make_session(10, {0: "2"}), make_session(11)]
+        second.existing_sessions = [make_session(10), make_session(11, {0: "3"})]
+        self.assertEqual(await self.cache.update_quiz(1, first), 1)
+        self.assertEqual(await self.cache.update_quiz(1, second), 1)
+        self.assertEqual(await self.session_answers(), {10: {0: "2"}, 11: {0: "3"}})
+
+    async def test_replacing_a_problem(self):
+        quiz = make_quiz([make_problem(2)], [make_session(10), make_session(11)])
+        self.assertEqual(await self.cache.update_quiz(1, quiz), 2)  # One delete and one insert
+        rows = await self.cache._quiz_loader.load(1)
+        self.assertEqual([row["problem_id"] for row in rows.problems], [2])
+
+    async def test_description_changes(self):
+        quiz = make_quiz([make_problem(1)], [make_session(10), make_session(11)])
+        quiz.description.description = "Harder than it looks"
+        self.assertEqual(await self.cache.update_quiz(1, quiz), 1)
+        rows = await self.cache._quiz_loader.load(1)
+        self.assertEqual(rows.description["description"], "Harder than it looks")
+
+    async def test_missing_quiz(self):
+        quiz = Quiz(
+            2,
+            authors=[5],
+            quiz_problems=[],
+            description=QuizDescription(cache=None, quiz_id=2, author=5, guild_id=None),
+        )
+        with self.assertRaises(QuizNotFound):
+            await self.cache.update_quiz(2, quiz)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import pickle
+import sqlite3
+import unittest
+
+from helpful_modules.problems_module.errors import ProblemNotFound
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase, make_problem
+
+
+class TestVotesAndSolves(SQLiteCacheTestCase):
+    cache_kwargs = {"cache_refresh_min_interval": 0}
+
+    def prepare_database(self):
+        with sqlite3.connect("test.db") as conn:
+            # A problem from before votes had their own table
+            conn.execute(
+                "CREATE TABLE problems (id INTEGER PRIMARY KEY, guild_id INTEGER, problem_id INTEGER, "
+                "question TEXT, answers BLOB, voters BLOB, solvers BLOB, author INTEGER, extra_stuff TEXT)"
+            )
+            conn.execute(
+                "INSERT INTO problems (guild_id, problem_id, question, answers, voters, solvers, author, extra_stuff) "
+                "VALUES (NULL, 1, 'a', ?, ?, ?, 5, ?)",
+                (
+                    pickle.dumps(["1"]),
+                    pickle.dumps([10, 11]),
+                    pickle.dumps([12]),
+                    str({"type": "BaseProblem"}),
+                ),
+            )
+
+    async def counts(self, problem_id: int) -> dict:
+        return (
+            await self.cache.run_sql(
+                "SELECT num_voters, num_solvers FROM problems WHERE problem_id = ?",
+                [problem_id],
+            )
+        )[0]
+
+    async def test_existing_votes_are_moved_into_the_tables(self):
+        problem = await self.cache.get_problem(None, 1)
+        self.assertEqual(sorted(problem.voters), [10, 11])
+        self.assertEqual(problem.solvers, [12])
+        self.assertEqual(await self.counts(1), {"num_voters": 2, "num_solvers": 1})
+
+    async def test_add_and_remove_voter(self):
+        self.assertEqual(await self.cache.add_voter(1, 20), 3)
+        self.assertEqual(await self.cache.add_voter(1, 20), 3)  # Voting twice does nothing
+        self.assertEqual(await self.cache.remove_voter(1, 10), 2)
+        self.assertEqual(await self.cache.remove_voter(1, 10), 2)
+        self.assertEqual(await self.cache.add_solver(1, 20), 2)
+        problem = await self.cache.get_problem(None, 1)
+        self.assertEqual(sorted(problem.voters), [11, 20])
+        self.assertEqual(sorted(problem.solvers), [12, 20])
+        self.assertEqual(await self.counts(1), {"num_voters": 2, "num_solvers": 2})
+
+    async def test_voting_for_a_missing_problem(self):
+        with self.assertRaises(ProblemNotFound):
+            await self.cache.add_voter(2, 20)
+        rows = await self.cache.run_sql("SELECT * FROM problem_votes WHERE problem_id = 2")
+        self.assertEqual(rows, [])
+
+    async def test_cached_problems_are_updated(self):
+        await self.cache.update_cache()
+        await self.cache.add_voter(1, 20)
+        self.assertIn(20, self.cache.global_problems[1].voters)
+        self.assertEqual(len(await self.cache.get_problems_voted_for_by(20)), 1)
+        await self.cache.remove_all_votes_by(20)
+        self.assertNotIn(20, self.cache.global_problems[1].voters)
+        self.assertEqual(await self.cache.get_problems_voted_for_by(20), [])
+
+    async def test_remove_all_votes_and_solves_by(self):
+        await self.cache.add_problem(2, make_problem(2, voters=[10]))
+        self.assertEqual((await self.counts(2))["num_voters"], 1)
+        await self.cache.remove_all_votes_by(10)
+        await self.cache.remove_all_solves_by(12)
+        self.assertEqual(await self.counts(1), {"num_voters": 1, "num_solvers": 0})
+        self.assertEqual((await self.counts(2))["num_voters"], 0)
+        rows = await self.cache.run_sql("SELECT * FROM problem_votes WHERE user_id = 10")
+        self.assertEqual(rows, [])
+
+    async def test_updating_a_problem_keeps_its_votes(self):
+        problem = await self.cache.get_problem(None, 1)
+        await self.cache.add_voter(1, 20)
+        problem.question = "b"
+        await self.cache.update_problem(1, problem)  # problem.voters doesn't have the new vote
+        self.assertEqual(await self.cache.add_voter(1, 21), 4)
+
+    async def test_deleting_a_problem_deletes_its_votes(self):
+        await self.cache.remove_problem_without_returning(None, 1)
+        self.assertEqual(await self.cache.run_sql("SELECT * FROM problem_votes"), [])
+        self.assertEqual(await self.cache.run_sql("SELECT * FROM problem_solves"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
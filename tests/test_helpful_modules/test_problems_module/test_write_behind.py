@@ -0,0 +1,195 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import asyncio
+import pickle
+import sqlite3
+import unittest
+from types import SimpleNamespace
+
+from helpful_modules.problems_module.errors import (
+    MathProblemsModuleException,
+    QuizSessionNotFoundException,
+)
+from helpful_modules.problems_module.quizzes import Quiz, QuizSolvingSession
+from helpful_modules.problems_module.quizzes.quiz_description import QuizDescription
+from helpful_modules.problems_module.ttl_cache import MISSING
+from helpful_modules.problems_module.write_behind import WriteBehindBuffer
+from tests.test_helpful_modules.test_problems_module.utils import SQLiteCacheTestCase
+
+
+class TestWriteBehindBuffer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.batches = []
+
+    async def write(self, values):
+        await asyncio.sleep(0.01)
+        self.batches.append(values)
+
+    async def test_writes_to_the_same_key_are_coalesced(self):
+        buffer = WriteBehindBuffer(self.write, interval=60)
+        buffer.put(1, "a")
+        buffer.put(2, "b")
+        buffer.put(1, "c")
+        self.assertEqual(buffer.get(1), "c")
+        self.assertIs(buffer.get(3), MISSING)
+        await buffer.flush()
+        self.assertEqual(self.batches, [["c", "b"]])
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(buffer.stats["values_written"], 2)
+
+    async def test_flushes_after_the_interval(self):
+        buffer = WriteBehindBuffer(self.write, interval=0.01)
+        buffer.put(1, "a")
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.batches, [["a"]])
+
+    async def test_flushes_do_not_overlap(self):
+        buffer = WriteBehindBuffer(self.write, interval=60)
+        buffer.put(1, "a")
+        first = asyncio.ensure_future(buffer.flush())
+        await asyncio.sleep(0)
+        buffer.put(1, "b")
+        await asyncio.gather(first, buffer.flush())
+        self.assertEqual(self.batches, [["a"], ["b"]])
+
+    async def test_failed_flushes_keep_the_values(self):
+        async def fail(values):
+            raise ValueError("oops")
+
+        buffer = WriteBehindBuffer(fail, interval=60)
+        buffer.put(1, "a")
+        with self.assertRaises(ValueError):
+            await buffer.flush()
+        self.assertEqual(buffer.get(1), "a")
+
+    async def test_failed_timed_flushes_are_retried(self):
+        failures = []
+
+        async def fail_twice(values):
+            if len(failures) < 2:
+                failures.append(values)
+                raise ValueError("oops")
+            await self.write(values)
+
+        buffer = WriteBehindBuffer(fail_twice, interval=0.01)
+        buffer.put(1, "a")
+        with self.assertLogs("helpful_modules.problems_module.write_behind", "ERROR"):
+            for _ in range(100):
+                if self.batches:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertEqual(self.batches, [["a"]])
+        self.assertEqual(len(buffer), 0)
+
+    async def test_discard(self):
+        buffer = WriteBehindBuffer(self.write, interval=60)
+        buffer.put(1, "a")
+        buffer.discard(1)
+        await buffer.flush()
+        self.assertEqual(self.batches, [])
+
+
+def make_session(special_id: int, answers: dict, expire_time: float = 2**40) -> QuizSolvingSession:
+    # QuizSolvingSession.__init__ loads its quiz from a cache, which isn't needed here
+    session = object.__new__(QuizSolvingSession)
+    session.user_id = special_id
+    session.quiz_id = 1
+    session.guild_id = None
+    session.special_id = special_id
+    session.is_final = False
+    session.answers = answers
+    session.start_time = 100
+    session.expire_time = expire_time
+    session.attempt_num = 1
+    return session
+
+
+class TestBufferedQuizSessions(SQLiteCacheTestCase):
+    cache_kwargs = {"quiz_session_flush_interval": 60}
+
+    async def asyncSetUp(self):
+        for special_id in (10, 11):
+            await self.cache.add_quiz_session(make_session(special_id, {}))
+
+    def stored_answers(self) -> dict:
+        with sqlite3.connect("test.db") as conn:
+            rows = conn.execute("SELECT special_id, answers FROM quiz_submission_sessions").fetchall()
+        conn.close()
+        return {int(special_id): pickle.loads(answers) for special_id, answers in rows}
+
+    async def test_updates_are_buffered_until_close(self):
+        for num in range(5):
+            await self.cache.update_quiz_session(10, make_session(10, {0: str(num)}))
+        self.assertEqual(self.stored_answers(), {10: {}, 11: {}})
+        self.assertEqual((await self.cache.get_quiz_session_by_special_id(10)).answers, {0: "4"})
+        await self.cache.close()
+        self.assertEqual(self.stored_answers(), {10: {0: "4"}, 11: {}})
+        self.assertEqual(self.cache.quiz_session_buffer_stats["flushes"], 1)
+
+    async def test_flushed_updates_are_read_back_from_the_database(self):
+        await self.cache.update_quiz_session(10, make_session(10, {0: "1"}))
+        await self.cache.flush_quiz_session_updates()
+        session = await self.cache.get_quiz_session_by_special_id(10)
+        self.assertEqual((session.special_id, session.answers, session.attempt_num), (10, {0: "1"}, 1))
+        await self.cache.update_quiz_session(11, make_session(11, {0: "2"}))
+        sessions = await self.cache.get_quiz_sessions(1)  # This writes the buffered update first
+        self.assertEqual(
+            sorted((session.special_id, session.answers) for session in sessions),
+            [(10, {0: "1"}), (11, {0: "2"})],
+        )
+
+    async def test_sessions_can_only_be_added_once(self):
+        with self.assertRaises(MathProblemsModuleException):
+            await self.cache.add_quiz_session(make_session(10, {}))
+        with self.assertRaises(QuizSessionNotFoundException):
+            await self.cache.update_quiz_session(12, make_session(12, {}))
+
+    async def test_update_quiz_writes_the_buffered_updates_first(self):
+        problem = SimpleNamespace(
+            id=1, guild_id=None, question="What is 1+1?", answers=["2"], voters=[], solvers=[], author=5
+        )
+        async with self.cache.sqlite_pool.writer() as conn:
+            cursor = await conn.cursor()
+            await self.cache._write_changed_rows(
+                cursor, "?", "quizzes", "problem_id", [], [self.cache._quiz_problem_row(1, problem)]
+            )
+            await conn.commit()
+        await self.cache.update_quiz_session(10, make_session(10, {0: "1"}))
+        await self.cache.update_quiz_session(11, make_session(11, {0: "2"}))
+        quiz = Quiz(
+            1,
+            authors=[5],
+            quiz_problems=[problem],
+            description=QuizDescription(cache=None, quiz_id=1, author=5, guild_id=None, time_limit=60, intensity=1),
+        )
+        quiz.existing_sessions = [make_session(10, {0: "3"})]
+        await self.cache.update_quiz(1, quiz)
+        await self.cache.close()
+        self.assertEqual(self.stored_answers(), {10: {0: "3"}, 11: {0: "2"}})
+
+    async def test_finished_sessions_are_written_immediately(self):
+        await self.cache.update_quiz_session(10, make_session(10, {0: "1"}))
+        await self.cache.update_quiz_session(11, make_session(11, {0: "2"}, expire_time=0))
+        self.assertEqual(self.stored_answers(), {10: {0: "1"}, 11: {0: "2"}})
+        await self.cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+
+import os
+import tempfile
+import unittest
+import warnings
+
+from helpful_modules.problems_module import BaseProblem, MathProblemCache
+
+
+def make_problem(
+    id: int, guild_id=None, author: int = 5, voters=None, solvers=None, question=None
+) -> BaseProblem:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # There's no cache
+        return BaseProblem(
+            question=question or f"What is {id}+1?",
+            answer=str(id + 1),
+            id=id,
+            author=author,
+            guild_id=guild_id,
+            voters=voters or [],
+            solvers=solvers or [],
+        )
+
+
+def make_sqlite_cache(**kwargs) -> MathProblemCache:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return MathProblemCache(
+            mysql_username="",
+            mysql_password="",
+            mysql_db_ip="",
+            mysql_db_name="",
+            use_sqlite=True,
+            db_name="test.db",
+            **kwargs,
+        )
+
+
+class TempConfigDirMixin:
+    """Runs each test in a temporary directory with an empty config.json, which MathProblemCache reads"""
+
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.tempdir = tempfile.TemporaryDirectory()
+        os.chdir(self.tempdir.name)
+        with open("config.json", "w") as file:
+            file.write('{"permissions_required": {}}')
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        self.tempdir.cleanup()
+
+
+class SQLiteCacheTestCase(TempConfigDirMixin, unittest.IsolatedAsyncioTestCase):
+    """Gives each test a fresh SQLite-backed MathProblemCache in self.cache
+
+    Subclasses can set cache_kwargs to pass more arguments to MathProblemCache,
+    and override prepare_database to set up test.db before the cache opens it."""
+
+    cache_kwargs: dict = {}
+
+    def setUp(self):
+        super().setUp()
+        self.prepare_database()
+        # Not in asyncSetUp, because MathProblemCache() can't be created while an event loop is running
+        self.cache = make_sqlite_cache(**self.cache_kwargs)
+
+    def prepare_database(self):
+        pass
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
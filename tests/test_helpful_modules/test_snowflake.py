@@ -0,0 +1,161 @@
+"""
+This file is part of The Discord Math Problem Bot Repo
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Author: Samuel Guo (64931063+rf20008@users.noreply.github.com)
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from helpful_modules.constants_loader import BotConstants
+from helpful_modules.snowflake import (
+    EPOCH_MS,
+    MAX_SEQUENCE,
+    RESERVATION_MS,
+    SnowflakeGenerator,
+    SnowflakeParts,
+    parse_snowflake,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestSnowflakeGenerator(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(EPOCH_MS / 1000 + 100)
+
+    def test_parts(self):
+        generator = SnowflakeGenerator(worker_id=3, clock=self.clock)
+        generator.next_id()
+        self.assertEqual(
+            parse_snowflake(generator.next_id()),
+            SnowflakeParts(timestamp_ms=EPOCH_MS + 100000, worker_id=3, sequence=1),
+        )
+
+    def test_ids_are_unique_and_increasing(self):
+        generator = SnowflakeGenerator(clock=self.clock)
+        ids = [generator.next_id() for _ in range(MAX_SEQUENCE * 3)]  # Runs out of sequence numbers
+        self.assertEqual(ids, sorted(set(ids)))
+        self.clock.now -= 5  # The clock went backwards
+        self.assertGreater(generator.next_id(), ids[-1])
+        self.assertLess(generator.next_id(), 2**53)
+
+    def test_workers_dont_collide(self):
+        first = SnowflakeGenerator(worker_id=0, clock=self.clock)
+        second = SnowflakeGenerator(worker_id=1, clock=self.clock)
+        ids = [first.next_id() for _ in range(100)] + [
+            second.next_id() for _ in range(100)
+        ]
+        self.assertEqual(len(set(ids)), 200)
+
+    def test_threads_dont_collide(self):
+        generator = SnowflakeGenerator()
+        ids = []
+
+        def generate():
+            ids.extend(generator.next_id() for _ in range(1000))
+
+        threads = [threading.Thread(target=generate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(ids)), 4000)
+
+    def test_bad_worker_id(self):
+        with self.assertRaises(ValueError):
+            SnowflakeGenerator(worker_id=16)
+        with self.assertRaises(TypeError):
+            SnowflakeGenerator(worker_id="1")
+
+
+class TestSnowflakeStateFile(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(EPOCH_MS / 1000 + 100)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "state.txt")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def make_generator(self) -> SnowflakeGenerator:
+        generator = SnowflakeGenerator(clock=self.clock, sleep=self.clock.sleep)
+        generator.use_state_file(self.path)
+        return generator
+
+    def reserved_until(self) -> int:
+        with open(self.path) as file:
+            return int(file.read())
+
+    def test_ids_are_not_reused_after_a_restart(self):
+        ids = [self.make_generator().next_id() for _ in range(3)]  # 3 restarts in the same millisecond
+        before_restart = self.make_generator()
+        ids.extend(before_restart.next_id() for _ in range(MAX_SEQUENCE * 3))  # Borrows future timestamps
+        self.clock.now -= 0.5  # The clock went backwards while the bot was down
+        after_restart = self.make_generator()
+        self.assertGreater(self.clock.now, parse_snowflake(ids[-1]).timestamp_ms / 1000)  # It waited
+        ids.append(after_restart.next_id())
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_the_reservation_is_extended_once_it_is_used_up(self):
+        generator = self.make_generator()
+        first = parse_snowflake(generator.next_id()).timestamp_ms - EPOCH_MS
+        self.assertEqual(self.reserved_until(), first + RESERVATION_MS)
+        self.clock.now += RESERVATION_MS / 2000
+        generator.next_id()
+        self.assertEqual(self.reserved_until(), first + RESERVATION_MS)
+        self.clock.now += RESERVATION_MS / 1000
+        latest = parse_snowflake(generator.next_id()).timestamp_ms - EPOCH_MS
+        self.assertEqual(self.reserved_until(), latest + RESERVATION_MS)
+
+    def test_ids_are_refused_if_the_clock_is_far_behind(self):
+        self.make_generator().next_id()
+        self.clock.now -= 60
+        generator = SnowflakeGenerator(clock=self.clock, sleep=self.clock.sleep)
+        with self.assertRaises(RuntimeError):
+            generator.use_state_file(self.path)
+
+    def test_corrupted_state_file(self):
+        with open(self.path, "w") as file:
+            file.write("oops")
+        with self.assertRaises(RuntimeError):
+            self.make_generator()
+
+
+class TestIdWorkerIdSetting(unittest.TestCase):
+    def test_id_worker_id_is_validated(self):
+        for value in ("16", "-1", "one"):
+            with mock.patch.dict(os.environ, {"id_worker_id": value}):
+                with self.assertRaises(ValueError):
+                    BotConstants(None)
+        with mock.patch.dict(os.environ, {"id_worker_id": "15"}):
+            self.assertEqual(BotConstants(None).ID_WORKER_ID, 15)
+
+
+if __name__ == "__main__":
+    unittest.main()